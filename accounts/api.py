@@ -96,28 +96,28 @@ def _serialize_pickup_point(request, obj: UserPickupPoint | None):
 
 
 def _pickup_snapshot_from_dpd(*, pickup_point_id: str):
-    from dpd.models import DpdLocker
+    from shipping.pickup_points import resolve_pickup_point
 
-    locker = DpdLocker.objects.filter(locker_id=pickup_point_id, is_active=True).first()
-    if not locker:
+    point = resolve_pickup_point("dpd", pickup_point_id)
+    if point is None:
         raise HttpError(400, "Invalid pickup_point_id")
     return {
-        "pickup_point_name": str(locker.name or "").strip(),
-        "pickup_point_raw": locker.raw or {},
-        "country_code": str(locker.country_code or "").strip().upper(),
+        "pickup_point_name": point.name,
+        "pickup_point_raw": point.raw,
+        "country_code": point.country_code,
     }
 
 
 def _pickup_snapshot_from_unisend(*, pickup_point_id: str):
-    from unisend.models import UnisendTerminal
+    from shipping.pickup_points import resolve_pickup_point
 
-    t = UnisendTerminal.objects.filter(terminal_id=pickup_point_id, is_active=True).first()
-    if not t:
+    point = resolve_pickup_point("unisend", pickup_point_id)
+    if point is None:
         raise HttpError(400, "Invalid pickup_point_id")
     return {
-        "pickup_point_name": str(t.name or "").strip(),
-        "pickup_point_raw": t.raw or {},
-        "country_code": str(t.country_code or "").strip().upper(),
+        "pickup_point_name": point.name,
+        "pickup_point_raw": point.raw,
+        "country_code": point.country_code,
     }
 
 
@@ -273,7 +273,7 @@ def otp_verify(request, payload: OTPVerifyIn):
         user.set_unusable_password()
         user.save(update_fields=["password"])
 
-    access = issue_access_token(user_id=user.id)
+    access = issue_access_token(user_id=user.id, user=user)
     refresh = issue_refresh_token(user_id=user.id)
     body = {"status": "ok"}
     if bool(getattr(settings, "AUTH_RETURN_ACCESS_IN_BODY", False)):
@@ -302,7 +302,7 @@ def register(request, payload: RegisterIn):
     except IntegrityError:
         raise HttpError(400, "User with this email already exists")
 
-    access = issue_access_token(user_id=user.id)
+    access = issue_access_token(user_id=user.id, user=user)
     refresh = issue_refresh_token(user_id=user.id)
     resp = JsonResponse({"status": "ok"})
     _set_auth_cookies(request, resp, access=access, refresh=refresh)
@@ -323,7 +323,7 @@ def login(request, payload: LoginIn):
     if user is None:
         raise HttpError(401, "Invalid credentials")
 
-    access = issue_access_token(user_id=user.id)
+    access = issue_access_token(user_id=user.id, user=user)
     refresh = issue_refresh_token(user_id=user.id)
     resp = JsonResponse({"status": "ok"})
     _set_auth_cookies(request, resp, access=access, refresh=refresh)
@@ -363,7 +363,11 @@ def refresh(request, payload: RefreshIn | None = None):
     if not user_id:
         raise HttpError(401, "Invalid refresh token")
 
-    access = issue_access_token(user_id=int(user_id))
+    user = User.objects.filter(id=int(user_id), is_active=True).first()
+    if user is None:
+        raise HttpError(401, "Invalid refresh token")
+
+    access = issue_access_token(user_id=user.id, user=user)
     body = {"status": "ok"}
     if bool(getattr(settings, "AUTH_RETURN_ACCESS_IN_BODY", False)):
         body["access"] = access
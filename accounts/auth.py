@@ -4,24 +4,74 @@ from django.contrib.auth import get_user_model
 from django.conf import settings
 from ninja.security import HttpBearer
 
+from .claims import AuthUser, GroupClaim, auth_state, claims_auth_enabled
 from .jwt_utils import decode_token
 
 User = get_user_model()
 
+_UNSET = object()
 
-class JWTAuth(HttpBearer):
-    def __call__(self, request):
-        # Cookie-only auth: access token is stored in HttpOnly cookie.
-        try:
-            cookie_name = getattr(settings, "AUTH_COOKIE_ACCESS_NAME", "access_token")
-            token = (request.COOKIES.get(cookie_name) or "").strip()
-        except Exception:
-            token = ""
 
-        if not token:
+def user_for_access_payload(payload: dict):
+    """User for a decoded access token, or None.
+
+    Tokens carrying claims (JWT_CLAIMS_AUTH) resolve to a lazy `AuthUser` after a
+    cached active/version check; older tokens load the user as before.
+    """
+    if payload.get("type") != "access":
+        return None
+
+    try:
+        user_id = int(payload.get("sub") or 0)
+    except (TypeError, ValueError):
+        return None
+    if not user_id:
+        return None
+
+    if claims_auth_enabled() and "ver" in payload:
+        is_active, version = auth_state(user_id)
+        if not is_active:
             return None
+        groups = None
+        if payload.get("ver") == version:
+            try:
+                groups = [GroupClaim.from_claim(g) for g in payload.get("grp") or []]
+            except (TypeError, ValueError):
+                groups = None
+        return AuthUser(user_id, version, groups)
+
+    try:
+        return User.objects.get(id=user_id, is_active=True)
+    except User.DoesNotExist:
+        return None
+
+
+def user_from_access_cookie(request):
+    """User from the access-token cookie, or None; resolved once per request."""
+    user = getattr(request, "_access_cookie_user", _UNSET)
+    if user is not _UNSET:
+        return user
+
+    user = None
+    try:
+        cookie_name = getattr(settings, "AUTH_COOKIE_ACCESS_NAME", "access_token")
+        token = (request.COOKIES.get(cookie_name) or "").strip()
+        if token:
+            user = user_for_access_payload(decode_token(token))
+    except Exception:
+        user = None
 
-        return self.authenticate(request, token)
+    try:
+        request._access_cookie_user = user
+    except Exception:
+        pass
+    return user
+
+
+class JWTAuth(HttpBearer):
+    def __call__(self, request):
+        # Cookie-only auth: access token is stored in HttpOnly cookie.
+        return user_from_access_cookie(request)
 
     def authenticate(self, request, token: str):
         try:
@@ -29,14 +79,4 @@ class JWTAuth(HttpBearer):
         except Exception:
             return None
 
-        if payload.get("type") != "access":
-            return None
-
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
-
-        try:
-            return User.objects.get(id=int(user_id), is_active=True)
-        except User.DoesNotExist:
-            return None
+        return user_for_access_payload(payload)
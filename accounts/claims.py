@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject, empty
+
+from .models import CustomerGroup
+
+User = get_user_model()
+
+_STATE_CACHE_KEY = "accounts:auth-state:{}"
+
+
+@dataclass(frozen=True)
+class GroupClaim:
+    """The part of a customer group that pricing and discounts need, as carried in access tokens."""
+
+    id: int
+    pricing_type: str
+    allow_additional_discounts: bool
+    allow_coupons: bool
+
+    def as_claim(self) -> list:
+        return [self.id, self.pricing_type, int(self.allow_additional_discounts), int(self.allow_coupons)]
+
+    @classmethod
+    def from_claim(cls, raw) -> "GroupClaim":
+        group_id, pricing_type, allow_additional_discounts, allow_coupons = raw
+        return cls(
+            id=int(group_id),
+            pricing_type=str(pricing_type),
+            allow_additional_discounts=bool(allow_additional_discounts),
+            allow_coupons=bool(allow_coupons),
+        )
+
+
+def claims_auth_enabled() -> bool:
+    return bool(getattr(settings, "JWT_CLAIMS_AUTH", False))
+
+
+def active_group_claims(user_id: int) -> list[GroupClaim]:
+    """Active customer groups of a user, highest priority first (one query)."""
+    rows = (
+        CustomerGroup.objects.filter(users__id=user_id, is_active=True)
+        .order_by("-priority", "code")
+        .values_list("id", "pricing_type", "allow_additional_discounts", "allow_coupons")
+    )
+    return [GroupClaim.from_claim(row) for row in rows]
+
+
+def user_claims(user) -> dict:
+    """Claims added to an access token issued to `user`."""
+    return {
+        "ver": int(user.auth_version),
+        "grp": [g.as_claim() for g in active_group_claims(user.id)],
+    }
+
+
+def auth_state(user_id: int) -> tuple[bool, int]:
+    """(is_active, auth_version) of a user, cached for AUTH_STATE_CACHE_SECONDS.
+
+    This is the only per-request check behind claims auth, so a deactivated user
+    is rejected within that many seconds. A missing user reads as inactive.
+    """
+    key = _STATE_CACHE_KEY.format(int(user_id))
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(id=user_id).values_list("is_active", "auth_version").first()
+        state = (bool(row[0]), int(row[1])) if row else (False, -1)
+        ttl = int(getattr(settings, "AUTH_STATE_CACHE_SECONDS", 10))
+        if ttl > 0:
+            cache.set(key, state, ttl)
+    return state
+
+
+def forget_auth_state(user_ids) -> None:
+    keys = [_STATE_CACHE_KEY.format(int(i)) for i in user_ids if i]
+    if keys:
+        cache.delete_many(keys)
+
+
+def bump_auth_version(user_ids) -> int:
+    """Mark the claims in access tokens already issued to these users as stale.
+
+    Such tokens keep authenticating, but their customer groups are read from the
+    database until the client refreshes its access token.
+    """
+    ids = sorted({int(i) for i in user_ids if i})
+    if not ids:
+        return 0
+    updated = User.objects.filter(id__in=ids).update(auth_version=F("auth_version") + 1)
+    forget_auth_state(ids)
+    return updated
+
+
+class AuthUser(SimpleLazyObject):
+    """User authenticated from access-token claims.
+
+    The id, auth_version, the auth flags and the customer group claims are
+    answered without a query; any other attribute loads the User row on first
+    use, after which the object behaves like the model instance.
+    `isinstance(obj, User)` holds and the object can be used in ORM filters
+    (`user=...`) without being loaded.
+    """
+
+    def __init__(self, user_id: int, auth_version: int, groups: list[GroupClaim] | None = None):
+        SimpleLazyObject.__init__(self, lambda: User.objects.get(id=user_id))
+        # LazyObject forwards attribute writes to the wrapped user; keep these on the proxy.
+        self.__dict__["_user_id"] = int(user_id)
+        self.__dict__["auth_version"] = int(auth_version)
+        # The token's groups, highest priority first; None when the token predates
+        # the user's current auth_version.
+        self.__dict__["group_claims"] = groups
+
+    @property
+    def __class__(self):
+        return User
+
+    def __getattr__(self, name):
+        # ORM probes such as hasattr(value, "resolve_expression") must not load the row.
+        if self._wrapped is empty and name != "_state" and not hasattr(User, name):
+            raise AttributeError(name)
+        return SimpleLazyObject.__getattr__(self, name)
+
+    @property
+    def _meta(self):
+        return User._meta
+
+    @property
+    def id(self) -> int:
+        return self._user_id
+
+    pk = id
+
+    def _is_pk_set(self) -> bool:
+        return True
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, User) and other.pk == self._user_id
+
+    def __hash__(self) -> int:
+        return hash(self._user_id)
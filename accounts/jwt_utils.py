@@ -4,6 +4,9 @@ from datetime import datetime, timedelta, timezone
 
 import jwt
 from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .claims import claims_auth_enabled, user_claims
 
 
 def _now() -> datetime:
@@ -14,7 +17,7 @@ def _encode(payload: dict) -> str:
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
-def issue_access_token(*, user_id: int) -> str:
+def issue_access_token(*, user_id: int, user=None) -> str:
     exp = _now() + timedelta(minutes=int(settings.JWT_ACCESS_TTL_MINUTES))
     payload = {
         "sub": str(user_id),
@@ -22,6 +25,10 @@ def issue_access_token(*, user_id: int) -> str:
         "iat": int(_now().timestamp()),
         "exp": int(exp.timestamp()),
     }
+    if claims_auth_enabled():
+        if user is None:
+            user = get_user_model().objects.get(id=user_id)
+        payload.update(user_claims(user))
     return _encode(payload)
 
 
@@ -46,6 +46,10 @@ class User(AbstractBaseUser, PermissionsMixin):
         blank=True,
     )
 
+    # Bumped whenever the claims carried by access tokens (active customer groups)
+    # go stale; see accounts/claims.py.
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
+
     objects = UserManager()
 
     USERNAME_FIELD = "email"
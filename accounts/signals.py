@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .claims import bump_auth_version, forget_auth_state
+from .models import CustomerGroup, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Deactivation is picked up at once in this process and within
+    # AUTH_STATE_CACHE_SECONDS in the others.
+    if not created:
+        forget_auth_state([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.customer_groups.through)
+def user_customer_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in {"post_add", "post_remove", "post_clear"}:
+            bump_auth_version([instance.pk])
+        return
+
+    # group.users.add()/remove()/clear(): pk_set holds user ids, except for clear.
+    if action == "pre_clear":
+        instance._cleared_user_ids = list(instance.users.values_list("id", flat=True))
+    elif action == "post_clear":
+        bump_auth_version(getattr(instance, "_cleared_user_ids", []))
+    elif action in {"post_add", "post_remove"}:
+        bump_auth_version(pk_set or [])
+
+
+@receiver(post_save, sender=CustomerGroup)
+@receiver(pre_delete, sender=CustomerGroup)
+def customer_group_changed(sender, instance, **kwargs):
+    # Priority, pricing type and flags are part of every member's token claims.
+    if instance.pk:
+        bump_auth_version(instance.users.values_list("id", flat=True))
@@ -1,8 +1,22 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from django.contrib import admin
+from django.db.models import Count, Sum
+from django.utils import timezone
 
-from .models import AnalyticsEvent, AnalyticsOutbox, RecentlyViewedProduct, VisitorLink
+from .models import (
+    AnalyticsDispatchBatch,
+    AnalyticsEvent,
+    AnalyticsEventArchive,
+    AnalyticsOutbox,
+    CategoryMetricsRollup,
+    ProductMetricsRollup,
+    RecentlyViewedList,
+    RollupWatermark,
+    VisitorLink,
+)
 
 
 @admin.register(AnalyticsEvent)
@@ -10,6 +24,16 @@ class AnalyticsEventAdmin(admin.ModelAdmin):
     list_display = ("name", "occurred_at", "user", "visitor_id", "object_type", "object_id")
     list_filter = ("name", "country_code", "channel")
     search_fields = ("visitor_id", "user__email", "object_type", "object_id")
+    # Drilling down by date lets Postgres prune the monthly partitions.
+    date_hierarchy = "occurred_at"
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+
+
+@admin.register(AnalyticsEventArchive)
+class AnalyticsEventArchiveAdmin(admin.ModelAdmin):
+    list_display = ("partition", "month", "rows", "size_bytes", "path", "created_at", "dropped_at")
+    readonly_fields = ("partition", "month", "path", "rows", "size_bytes", "sha256", "created_at", "dropped_at")
 
 
 @admin.register(VisitorLink)
@@ -20,13 +44,131 @@ class VisitorLinkAdmin(admin.ModelAdmin):
 
 @admin.register(AnalyticsOutbox)
 class AnalyticsOutboxAdmin(admin.ModelAdmin):
-    list_display = ("provider", "status", "attempts", "created_at", "event")
+    list_display = ("provider", "status", "attempts", "run_after", "sent_at", "created_at", "event")
     list_filter = ("provider", "status")
-    search_fields = ("event__id",)
+    search_fields = ("event__id", "last_error")
+    raw_id_fields = ("event",)
+    actions = ("retry_now",)
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=AnalyticsOutbox.Status.SENT).update(
+            status=AnalyticsOutbox.Status.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_at=None,
+        )
+        self.message_user(request, f"Requeued {count} row(s).")
+
+    retry_now.short_description = "Retry selected rows now (incl. dead)"
+
+
+@admin.register(AnalyticsDispatchBatch)
+class AnalyticsDispatchBatchAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "provider",
+        "size",
+        "sent",
+        "failed",
+        "dead",
+        "http_status",
+        "duration_ms",
+        "events_per_sec",
+        "created_at",
+    )
+    list_filter = ("provider", "http_status", "created_at")
+    search_fields = ("error",)
+    readonly_fields = (
+        "provider",
+        "size",
+        "sent",
+        "failed",
+        "dead",
+        "http_status",
+        "duration_ms",
+        "error",
+        "created_at",
+    )
+
+    def events_per_sec(self, obj):
+        return f"{obj.events_per_sec:.1f}"
+
+    def changelist_view(self, request, extra_context=None):
+        # Throughput over the last hour per provider, shown above the list.
+        since = timezone.now() - timedelta(hours=1)
+        totals = (
+            AnalyticsDispatchBatch.objects.filter(created_at__gte=since)
+            .values("provider")
+            .annotate(batches=Count("id"), sent=Sum("sent"), failed=Sum("failed"), dead=Sum("dead"), ms=Sum("duration_ms"))
+            .order_by("provider")
+        )
+        for row in totals:
+            rate = (row["sent"] or 0) * 1000 / row["ms"] if row["ms"] else 0
+            self.message_user(
+                request,
+                f"{row['provider']} (1h): batches={row['batches']} sent={row['sent']} "
+                f"failed={row['failed']} dead={row['dead']} ~{rate:.1f} events/s",
+            )
+        pending = (
+            AnalyticsOutbox.objects.filter(status=AnalyticsOutbox.Status.PENDING)
+            .values("provider")
+            .annotate(n=Count("id"))
+            .order_by("provider")
+        )
+        for row in pending:
+            self.message_user(request, f"{row['provider']}: pending={row['n']}")
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(RecentlyViewedList)
+class RecentlyViewedListAdmin(admin.ModelAdmin):
+    list_display = ("owner_key", "user", "visitor_id", "items_count", "updated_at")
+    search_fields = ("owner_key", "visitor_id", "user__email")
+    list_filter = ("updated_at",)
+    raw_id_fields = ("user",)
+
+    def items_count(self, obj):
+        return len(obj.items or [])
+
+
+@admin.register(ProductMetricsRollup)
+class ProductMetricsRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "bucket_start",
+        "granularity",
+        "product",
+        "channel",
+        "views",
+        "add_to_cart",
+        "orders",
+        "units_sold",
+        "revenue_net",
+    )
+    list_filter = ("granularity", "channel")
+    search_fields = ("product__name", "product__sku")
+    raw_id_fields = ("product",)
+    date_hierarchy = "bucket_start"
+
+
+@admin.register(CategoryMetricsRollup)
+class CategoryMetricsRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "bucket_start",
+        "granularity",
+        "category",
+        "channel",
+        "views",
+        "add_to_cart",
+        "orders",
+        "units_sold",
+        "revenue_net",
+    )
+    list_filter = ("granularity", "channel")
+    search_fields = ("category__name",)
+    raw_id_fields = ("category",)
+    date_hierarchy = "bucket_start"
 
 
-@admin.register(RecentlyViewedProduct)
-class RecentlyViewedProductAdmin(admin.ModelAdmin):
-    list_display = ("user", "visitor_id", "product", "last_viewed_at")
-    search_fields = ("visitor_id", "user__email", "product__slug", "product__sku")
-    list_filter = ("last_viewed_at",)
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ("name", "value", "updated_at")
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """In-process queue of tracked events, written in batches by a daemon thread.
+
+    Requests only `put()`; the flusher hands up to `batch_size` items to
+    `writer` once the batch is full or `flush_interval` seconds passed since
+    its first item. The queue is bounded: when it stays full for
+    `put_timeout` seconds the caller writes its own item synchronously
+    (backpressure instead of unbounded memory or silent loss).
+    """
+
+    def __init__(
+        self,
+        *,
+        writer: Callable[[list], None],
+        max_events: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        put_timeout: float = 0.05,
+    ):
+        self.writer = writer
+        self.max_events = max(1, int(max_events))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.put_timeout = max(0.0, float(put_timeout))
+
+        self.stats: Counter = Counter()
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_events)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def put(self, item) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            self.stats["overflow"] += 1
+            self._write([item])
+        else:
+            self.stats["enqueued"] += 1
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> int:
+        """Write everything queued so far in the calling thread."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # Forked worker (e.g. gunicorn --preload): the parent's queued items
+                # are the parent's to flush.
+                self._queue = queue.Queue(maxsize=self.max_events)
+                self.stats = Counter()
+            self._pid = pid
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-event-flusher", daemon=True)
+            self._thread.start()
+
+    def _take(self, limit: int, *, first=None) -> list:
+        batch = [] if first is None else [first]
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            self.writer(batch)
+        except Exception:
+            # One bad row must not take the whole batch down with it.
+            logger.exception("Analytics batch write failed; retrying %s events one by one", len(batch))
+            for item in batch:
+                try:
+                    self.writer([item])
+                except Exception:
+                    self.stats["failed"] += 1
+                    logger.exception("Dropping analytics event")
+                else:
+                    self.stats["written"] += 1
+        else:
+            self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["write_ms"] += int((time.perf_counter() - started) * 1000)
+
+
+_buffer: EventBuffer | None = None
+_buffer_lock = threading.Lock()
+
+
+def get_event_buffer() -> EventBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from .services import write_tracked_events
+
+                _buffer = EventBuffer(
+                    writer=write_tracked_events,
+                    max_events=int(getattr(settings, "ANALYTICS_BUFFER_MAX_EVENTS", 10000) or 10000),
+                    batch_size=int(getattr(settings, "ANALYTICS_BUFFER_BATCH_SIZE", 500) or 500),
+                    flush_interval=int(getattr(settings, "ANALYTICS_BUFFER_FLUSH_MS", 500) or 500) / 1000,
+                    put_timeout=int(getattr(settings, "ANALYTICS_BUFFER_PUT_TIMEOUT_MS", 50) or 0) / 1000,
+                )
+                atexit.register(_buffer.close)
+    return _buffer
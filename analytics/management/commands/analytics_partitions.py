@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.models import RollupWatermark
+from analytics.partitions import (
+    add_months,
+    ensure_future_partitions,
+    expired_partitions,
+    is_partitioned,
+    list_partitions,
+    partition_month,
+    retire_partition,
+)
+from analytics.rollups import EVENTS_WATERMARK
+
+
+class Command(BaseCommand):
+    help = (
+        "AnalyticsEvent mėnesinės particijos (PostgreSQL): sukuria ateities particijas, "
+        "senas (pagal retention) archyvuoja į .csv.gz, atjungia ir ištrina. Kartoti saugu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=None,
+            help="Kiek mėnesių į priekį sukurti (default settings.ANALYTICS_EVENT_PARTITIONS_AHEAD).",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=None,
+            help="Kiek pilnų mėnesių laikyti DB; 0 – nieko netrinti (default settings.ANALYTICS_EVENT_RETENTION_MONTHS).",
+        )
+        parser.add_argument("--no-archive", action="store_true", help="Trinti be archyvavimo į failą.")
+        parser.add_argument("--archive-dir", default=None, help="Default settings.ANALYTICS_EVENT_ARCHIVE_DIR.")
+        parser.add_argument("--dry-run", action="store_true", help="Tik parodyti, ką darytų.")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Trinti ir dar nesutrauktas į rollup'us particijas (ignoruoti rollup watermark).",
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError("analytics_analyticsevent nėra particionuota lentelė (reikia PostgreSQL ir migracijos 0007).")
+
+        ahead = options.get("ahead")
+        if ahead is None:
+            ahead = int(getattr(settings, "ANALYTICS_EVENT_PARTITIONS_AHEAD", 3))
+        retention = options.get("retention_months")
+        if retention is None:
+            retention = int(getattr(settings, "ANALYTICS_EVENT_RETENTION_MONTHS", 0))
+        archive = not options.get("no_archive") and bool(getattr(settings, "ANALYTICS_EVENT_ARCHIVE", True))
+        dry_run = bool(options.get("dry_run"))
+
+        if dry_run:
+            self.stdout.write(f"Particijos: {', '.join(list_partitions()) or '-'}")
+        else:
+            created = ensure_future_partitions(ahead=ahead)
+            self.stdout.write(f"Sukurta particijų: {len(created)} {', '.join(created)}")
+
+        expired = expired_partitions(retention_months=retention)
+        if not expired:
+            self.stdout.write("Pasenusių particijų nėra.")
+            return
+
+        watermark = RollupWatermark.objects.filter(name=EVENTS_WATERMARK).values_list("value", flat=True).first()
+        for name in expired:
+            end = add_months(partition_month(name), 1)
+            if not options.get("force") and (watermark is None or watermark < end):
+                self.stdout.write(self.style.WARNING(f"{name}: dar nesutraukta į rollup'us – praleidžiama (--force)."))
+                continue
+            if dry_run:
+                self.stdout.write(f"{name}: būtų {'archyvuota ir ' if archive else ''}ištrinta")
+                continue
+            record = retire_partition(name, archive=archive, directory=options.get("archive_dir"))
+            if record is not None:
+                self.stdout.write(
+                    self.style.SUCCESS(f"{name}: archyvas {record.path} ({record.rows} eilučių, {record.size_bytes} B), ištrinta")
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ištrinta"))
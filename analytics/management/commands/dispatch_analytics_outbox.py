@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.outbox import dispatch_outbox
+from analytics.providers import get_outbox_providers
+
+
+class Command(BaseCommand):
+    help = (
+        "Išsiunčia AnalyticsOutbox įrašus tiekėjams (newsman ir kt.) batch'ais: "
+        "SKIP LOCKED claim, lygiagretus siuntimas, exponential backoff, dead-letter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--provider",
+            action="append",
+            default=None,
+            help="Provider kodas (pvz. newsman). Galima kartoti. Default – visi sukonfigūruoti.",
+        )
+        parser.add_argument("--batch-size", type=int, default=None, help="Default – provider'io batch_size.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Kiek batch'ų siųsti vienu metu (default settings.ANALYTICS_OUTBOX_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=None,
+            help="Po tiek nesėkmių įrašas pažymimas dead (default settings.ANALYTICS_OUTBOX_MAX_ATTEMPTS).",
+        )
+        parser.add_argument("--loop", action="store_true", help="Veikti nuolat (worker režimas).")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Pauzė (s) kai eilė tuščia (su --loop).")
+
+    def handle(self, *args, **options):
+        configured = get_outbox_providers()
+        codes = options.get("provider")
+        if codes:
+            unknown = [c for c in codes if c not in configured]
+            if unknown:
+                raise CommandError(f"Nežinomas provider: {', '.join(unknown)}")
+        disabled = [c for c, p in configured.items() if not p.enabled and (not codes or c in codes)]
+        if disabled:
+            self.stdout.write(self.style.WARNING(f"Be URL (praleidžiami): {', '.join(disabled)}"))
+
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 5.0))
+
+        try:
+            while True:
+                stats = dispatch_outbox(
+                    providers=codes,
+                    batch_size=options.get("batch_size"),
+                    concurrency=options.get("concurrency"),
+                    max_attempts=options.get("max_attempts"),
+                )
+                if stats.batches or not loop:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"batches={stats.batches} sent={stats.sent} failed={stats.failed} "
+                            f"dead={stats.dead} events_per_sec={stats.events_per_sec:.1f}"
+                        )
+                    )
+                if not loop:
+                    break
+                if not stats.batches:
+                    time.sleep(sleep_s)
+        except KeyboardInterrupt:
+            self.stderr.write("Nutraukta; užrakinti įrašai bus paimti pasibaigus lock laikui.")
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import reset_rollups, run_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Sutraukia AnalyticsEvent ir apmokėtus užsakymus į valandines/dienines rollup lenteles "
+        "(prekė, kategorija, kanalas). Inkrementinis: tęsia nuo watermark'o."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window-hours",
+            type=int,
+            default=None,
+            help="Kiek valandų eventų apdoroti vienoje transakcijoje (default settings.ANALYTICS_ROLLUP_WINDOW_HOURS).",
+        )
+        parser.add_argument("--reset", action="store_true", help="Ištrinti rollup'us ir watermark'us, perskaičiuoti nuo pradžių.")
+        parser.add_argument("--loop", action="store_true", help="Veikti nuolat (worker režimas).")
+        parser.add_argument("--sleep", type=float, default=60.0, help="Pauzė (s) tarp paleidimų (su --loop).")
+
+    def handle(self, *args, **options):
+        if options.get("reset"):
+            reset_rollups()
+            self.stdout.write(self.style.WARNING("Rollup'ai išvalyti."))
+
+        loop = bool(options.get("loop"))
+        sleep_s = max(1.0, float(options.get("sleep") or 60.0))
+
+        try:
+            while True:
+                started = time.perf_counter()
+                stats = run_rollups(window_hours=options.get("window_hours"))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"events={stats.events_folded} windows={stats.events_windows} "
+                    f"orders={stats.orders_folded} reversed={stats.orders_reversed} hours={len(stats.hours_touched)} elapsed={elapsed:.2f}s"
+                )
+                if not loop:
+                    break
+                time.sleep(sleep_s)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Nutraukta."))
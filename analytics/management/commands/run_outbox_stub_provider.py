@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.events = 0
+        self.errors = 0
+        self.rejected = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Local stub of an analytics provider endpoint for testing dispatch_analytics_outbox. "
+        "Point ANALYTICS_NEWSMAN_OUTBOX_URL at http://127.0.0.1:<port>/events."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--delay-ms", type=int, default=0, help="Artificial latency per request.")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503.")
+        parser.add_argument("--reject-rate", type=float, default=0.0, help="Share of events rejected individually.")
+
+    def handle(self, *args, **options):
+        delay = max(0, int(options["delay_ms"])) / 1000
+        fail_rate = float(options["fail_rate"])
+        reject_rate = float(options["reject_rate"])
+        stats = _Stats()
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._reply(400, {"error": "invalid json"})
+                    return
+                if delay:
+                    time.sleep(delay)
+
+                events = payload.get("events") or []
+                with stats.lock:
+                    stats.requests += 1
+                if random.random() < fail_rate:
+                    with stats.lock:
+                        stats.errors += 1
+                    self._reply(503, {"error": "stub failure"})
+                    return
+
+                rejected = {
+                    str(e.get("outbox_id")): "stub reject"
+                    for e in events
+                    if random.random() < reject_rate
+                }
+                with stats.lock:
+                    stats.events += len(events) - len(rejected)
+                    stats.rejected += len(rejected)
+                self._reply(200, {"accepted": len(events) - len(rejected), "rejected": rejected})
+
+            def log_message(self, format, *args):
+                return
+
+        server = ThreadingHTTPServer((options["host"], int(options["port"])), Handler)
+        stdout.write(f"Stub provider listening on http://{options['host']}:{options['port']}/events (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stdout.write(
+                f"requests={stats.requests} events={stats.events} "
+                f"rejected={stats.rejected} errors={stats.errors}"
+            )
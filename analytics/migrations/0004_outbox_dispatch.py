@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_rename_analytics_an_name_3a9193_idx_analytics_a_name_119f75_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsDispatchBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('newsman', 'Newsman'), ('facebook', 'Facebook'), ('google', 'Google')], max_length=32)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('dead', models.PositiveIntegerField(default=0)),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='analyticsoutbox',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyticsoutbox',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='analyticsoutbox',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='analyticsoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('dead', 'Dead')], default='pending', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsoutbox',
+            index=models.Index(fields=['provider', 'status', 'run_after'], name='analytics_a_provide_fba249_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsdispatchbatch',
+            index=models.Index(fields=['provider', 'created_at'], name='analytics_a_provide_e1631f_idx'),
+        ),
+    ]
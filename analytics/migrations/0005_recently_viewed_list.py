@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_recently_viewed(apps, schema_editor):
+    RecentlyViewedProduct = apps.get_model("analytics", "RecentlyViewedProduct")
+    RecentlyViewedList = apps.get_model("analytics", "RecentlyViewedList")
+    max_items = max(1, int(getattr(settings, "RECENTLY_VIEWED_MAX", 12) or 12))
+
+    lists = {}
+    rows = RecentlyViewedProduct.objects.order_by("-last_viewed_at").values_list(
+        "user_id", "visitor_id", "product_id", "last_viewed_at"
+    )
+    for user_id, visitor_id, product_id, last_viewed_at in rows.iterator(chunk_size=2000):
+        if user_id is not None:
+            key, owner = f"u:{user_id}", (user_id, "")
+        elif visitor_id:
+            key, owner = f"v:{visitor_id}", (None, visitor_id)
+        else:
+            continue
+        entry = lists.setdefault(key, (owner, []))
+        if len(entry[1]) < max_items:
+            entry[1].append([int(product_id), int(last_viewed_at.timestamp() * 1000)])
+
+    RecentlyViewedList.objects.bulk_create(
+        [
+            RecentlyViewedList(owner_key=key, user_id=owner[0], visitor_id=owner[1], items=items)
+            for key, (owner, items) in lists.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_outbox_dispatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentlyViewedList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_key', models.CharField(max_length=80, unique=True)),
+                ('visitor_id', models.CharField(blank=True, default='', max_length=64)),
+                ('items', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recently_viewed_lists', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_recently_viewed, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='RecentlyViewedProduct',
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_recently_viewed_list'),
+        ('catalog', '0023_productimage_srcset_files'),
+        ('checkout', '0019_alter_order_shipping_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolledUpOrder',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='checkout.order')),
+                ('rolled_up_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryMetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket_start', models.DateTimeField()),
+                ('channel', models.CharField(blank=True, default='', max_length=32)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('add_to_cart', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics_rollups', to='catalog.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'category', 'bucket_start'], name='analytics_c_granula_1bacbe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket_start', 'category', 'channel'), name='analytics_category_rollup_unique_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductMetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket_start', models.DateTimeField()),
+                ('channel', models.CharField(blank=True, default='', max_length=32)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('add_to_cart', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics_rollups', to='catalog.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'product', 'bucket_start'], name='analytics_p_granula_db8cc5_idx'), models.Index(fields=['granularity', 'bucket_start'], name='analytics_p_granula_4cde7f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket_start', 'product', 'channel'), name='analytics_product_rollup_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,195 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:51
+
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month, n):
+    idx = month.year * 12 + (month.month - 1) + n
+    return datetime(idx // 12, idx % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _is_partitioned(cur, table):
+    cur.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [table],
+    )
+    return cur.fetchone() is not None
+
+
+def _non_unique_index_defs(cur, table):
+    cur.execute(
+        "SELECT indexdef FROM pg_indexes i JOIN pg_index x ON x.indexrelid = (quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))::regclass "
+        "WHERE i.tablename = %s AND i.schemaname = current_schema() AND NOT x.indisunique",
+        [table],
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def _foreign_keys(cur, table):
+    cur.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return cur.fetchall()
+
+
+def _copy_checked(cur, q, source, target):
+    cur.execute(f"INSERT INTO {q(target)} SELECT * FROM {q(source)}")
+    cur.execute(f"SELECT (SELECT count(*) FROM {q(source)}), (SELECT count(*) FROM {q(target)})")
+    expected, copied = cur.fetchone()
+    if expected != copied:
+        raise RuntimeError(f"{target}: copied {copied} of {expected} rows from {source}")
+
+
+def partition_events_table(apps, schema_editor):
+    """Rebuild analytics_analyticsevent as a monthly range-partitioned table (Postgres only).
+
+    Django's model state is unchanged (`id` stays the pk, `idempotency_key` stays
+    unique); in the database the pk becomes (id, occurred_at) and the unique
+    index on idempotency_key exists per partition (global uniqueness is kept by
+    `AnalyticsEventKey`, migration 0008). Runs inside the migration transaction:
+    a failure, including a row count mismatch after the copy, leaves the
+    original table untouched. Reversed by `unpartition_events_table`.
+    """
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    q = conn.ops.quote_name
+    table = "analytics_analyticsevent"
+    legacy = f"{table}_legacy"
+
+    with conn.cursor() as cur:
+        if _is_partitioned(cur, table):
+            return
+
+        index_defs = _non_unique_index_defs(cur, table)
+        foreign_keys = _foreign_keys(cur, table)
+        cur.execute(f"SELECT min(occurred_at) FROM {q(table)}")
+        first = cur.fetchone()[0]
+
+        cur.execute(f"ALTER TABLE {q(table)} RENAME TO {q(legacy)}")
+        cur.execute(f"ALTER TABLE {q(legacy)} RENAME CONSTRAINT {q(table + '_pkey')} TO {q(legacy + '_pkey')}")
+        for conname, _ in foreign_keys:
+            cur.execute(f"ALTER TABLE {q(legacy)} DROP CONSTRAINT {q(conname)}")
+        cur.execute(
+            f"CREATE TABLE {q(table)} (LIKE {q(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE (occurred_at)"
+        )
+        cur.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(table + '_pkey')} PRIMARY KEY (id, occurred_at)")
+        for conname, definition in foreign_keys:
+            cur.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(conname)} {definition}")
+
+        now = datetime.now(timezone.utc)
+        month = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+        if first is not None:
+            first = first.astimezone(timezone.utc)
+            month = min(month, datetime(first.year, first.month, 1, tzinfo=timezone.utc))
+        last = _add_months(datetime(now.year, now.month, 1, tzinfo=timezone.utc), PARTITIONS_AHEAD)
+        partitions = [f"{table}_default"]
+        cur.execute(f"CREATE TABLE {q(table + '_default')} PARTITION OF {q(table)} DEFAULT")
+        while month <= last:
+            name = f"{table}_p{month.year:04d}_{month.month:02d}"
+            cur.execute(
+                f"CREATE TABLE {q(name)} PARTITION OF {q(table)} FOR VALUES FROM (%s) TO (%s)",
+                [month, _add_months(month, 1)],
+            )
+            partitions.append(name)
+            month = _add_months(month, 1)
+        for name in partitions:
+            cur.execute(f"CREATE UNIQUE INDEX {q(name + '_idem_uniq')} ON {q(name)} (idempotency_key)")
+
+        _copy_checked(cur, q, legacy, table)
+        cur.execute(f"DROP TABLE {q(legacy)}")
+        for definition in index_defs:
+            cur.execute(definition)
+
+
+def unpartition_events_table(apps, schema_editor):
+    """Reverse of `partition_events_table`: back to a plain table with pk (id).
+
+    Copies every partition (archived and dropped ones are gone) into a new
+    table with the original constraints and indexes. Should keys repeat across
+    partitions, the earliest event per key is kept. Outbox rows left without an
+    event are deleted so the reversed AlterField can restore the outbox FK.
+    """
+    conn = schema_editor.connection
+    if conn.vendor != "postgresql":
+        return
+    q = conn.ops.quote_name
+    table = "analytics_analyticsevent"
+    legacy = f"{table}_partitioned"
+
+    with conn.cursor() as cur:
+        if not _is_partitioned(cur, table):
+            return
+
+        index_defs = _non_unique_index_defs(cur, table)
+        foreign_keys = _foreign_keys(cur, table)
+
+        cur.execute(f"ALTER TABLE {q(table)} RENAME TO {q(legacy)}")
+        cur.execute(f"ALTER TABLE {q(legacy)} RENAME CONSTRAINT {q(table + '_pkey')} TO {q(legacy + '_pkey')}")
+        for conname, _ in foreign_keys:
+            cur.execute(f"ALTER TABLE {q(legacy)} DROP CONSTRAINT {q(conname)}")
+        cur.execute(f"CREATE TABLE {q(table)} (LIKE {q(legacy)} INCLUDING DEFAULTS)")
+        cur.execute(
+            f"INSERT INTO {q(table)} SELECT DISTINCT ON (idempotency_key) * FROM {q(legacy)} "
+            f"ORDER BY idempotency_key, occurred_at, id"
+        )
+        cur.execute(f"SELECT (SELECT count(DISTINCT idempotency_key) FROM {q(legacy)}), (SELECT count(*) FROM {q(table)})")
+        expected, copied = cur.fetchone()
+        if expected != copied:
+            raise RuntimeError(f"{table}: copied {copied} of {expected} events from {legacy}")
+        cur.execute(f"DROP TABLE {q(legacy)}")
+
+        cur.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(table + '_pkey')} PRIMARY KEY (id)")
+        cur.execute(
+            f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(table + '_idempotency_key_key')} UNIQUE (idempotency_key)"
+        )
+        for conname, definition in foreign_keys:
+            cur.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(conname)} {definition}")
+        for definition in index_defs:
+            # Indexes of a partitioned table are defined "ON ONLY <table>".
+            cur.execute(definition.replace(" ON ONLY ", " ON ", 1))
+        cur.execute(
+            "DELETE FROM analytics_analyticsoutbox o WHERE NOT EXISTS "
+            f"(SELECT 1 FROM {q(table)} e WHERE e.id = o.event_id)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_metrics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsEventArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partition', models.CharField(max_length=100, unique=True)),
+                ('month', models.DateField(blank=True, null=True)),
+                ('path', models.CharField(max_length=500)),
+                ('rows', models.PositiveBigIntegerField(default=0)),
+                ('size_bytes', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dropped_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='analyticsoutbox',
+            name='event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='analytics.analyticsevent'),
+        ),
+        migrations.RunPython(partition_events_table, unpartition_events_table),
+    ]
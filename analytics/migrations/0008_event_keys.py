@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+def backfill_event_keys(apps, schema_editor):
+    """Claim the keys of the events already stored (one INSERT ... SELECT)."""
+    q = schema_editor.connection.ops.quote_name
+    events = apps.get_model("analytics", "AnalyticsEvent")._meta.db_table
+    keys = apps.get_model("analytics", "AnalyticsEventKey")._meta.db_table
+    with schema_editor.connection.cursor() as cur:
+        # "WHERE true" keeps sqlite from reading ON CONFLICT as a join clause.
+        cur.execute(
+            f"INSERT INTO {q(keys)} (idempotency_key, event_id, occurred_at) "
+            f"SELECT idempotency_key, id, occurred_at FROM {q(events)} WHERE true "
+            f"ON CONFLICT (idempotency_key) DO NOTHING"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0007_partition_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalyticsEventKey",
+            fields=[
+                ("idempotency_key", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("event_id", models.UUIDField()),
+                ("occurred_at", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [models.Index(fields=["occurred_at"], name="analytics_a_occurre_3223aa_idx")],
+            },
+        ),
+        migrations.RunPython(backfill_event_keys, migrations.RunPython.noop),
+    ]
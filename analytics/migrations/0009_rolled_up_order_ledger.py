@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+def refold_orders(apps, schema_editor):
+    # Order metrics folded so far were bucketed by updated_at and kept no ledger
+    # details to reverse; drop them so the next rollup run refolds every paid
+    # order by paid_at. Until then best_selling falls back to the live query.
+    for name in ("ProductMetricsRollup", "CategoryMetricsRollup"):
+        apps.get_model("analytics", name).objects.update(orders=0, units_sold=0, revenue_net=0)
+    apps.get_model("analytics", "RolledUpOrder").objects.all().delete()
+    apps.get_model("analytics", "RollupWatermark").objects.filter(name="orders").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0008_event_keys"),
+        ("checkout", "0022_order_paid_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rolleduporder",
+            name="bucket_start",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rolleduporder",
+            name="channel",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="rolleduporder",
+            name="lines",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="rolleduporder",
+            name="reversed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(refold_orders, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,7 @@ import uuid
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class AnalyticsEvent(models.Model):
@@ -45,6 +46,42 @@ class AnalyticsEvent(models.Model):
         ]
 
 
+class AnalyticsEventKey(models.Model):
+    """Idempotency key of a stored event.
+
+    The events table is partitioned by month on Postgres, where a unique index
+    on `idempotency_key` can only exist per partition; this unpartitioned table
+    keeps the keys unique across all months. `write_tracked_events` claims the
+    key here before inserting the event.
+    """
+
+    idempotency_key = models.CharField(max_length=64, primary_key=True)
+    event_id = models.UUIDField()
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["occurred_at"])]
+
+
+class AnalyticsEventArchive(models.Model):
+    """A monthly events partition exported to a compressed file before it was dropped."""
+
+    partition = models.CharField(max_length=100, unique=True)
+    month = models.DateField(null=True, blank=True)
+    path = models.CharField(max_length=500)
+    rows = models.PositiveBigIntegerField(default=0)
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    dropped_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-month"]
+
+    def __str__(self) -> str:
+        return self.partition
+
+
 class VisitorLink(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     visitor_id = models.CharField(max_length=64)
@@ -63,55 +100,176 @@ class AnalyticsOutbox(models.Model):
         FACEBOOK = "facebook", "Facebook"
         GOOGLE = "google", "Google"
 
-    event = models.ForeignKey(AnalyticsEvent, on_delete=models.CASCADE, related_name="outbox")
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        SENT = "sent", "Sent"
+        DEAD = "dead", "Dead"
+
+    # No DB-level FK: the events table is range-partitioned on Postgres, where `id`
+    # alone is not a unique key (see analytics.partitions). Retiring a partition
+    # deletes its outbox rows, and the dispatcher dead-letters rows whose event
+    # is missing.
+    event = models.ForeignKey(AnalyticsEvent, on_delete=models.CASCADE, related_name="outbox", db_constraint=False)
     provider = models.CharField(max_length=32, choices=Provider.choices)
 
-    status = models.CharField(max_length=32, default="pending")
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.PENDING)
     attempts = models.IntegerField(default=0)
     last_error = models.TextField(blank=True, default="")
+    # Retry schedule for `dispatch_analytics_outbox` (exponential backoff).
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("event", "provider")
-        indexes = [models.Index(fields=["provider", "status", "created_at"]) ]
+        indexes = [
+            models.Index(fields=["provider", "status", "created_at"]),
+            models.Index(fields=["provider", "status", "run_after"]),
+        ]
+
+
+class AnalyticsDispatchBatch(models.Model):
+    """One provider request made by the outbox dispatcher (throughput metrics)."""
+
+    provider = models.CharField(max_length=32, choices=AnalyticsOutbox.Provider.choices)
+    size = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    dead = models.PositiveIntegerField(default=0)
+    http_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["provider", "created_at"])]
 
+    @property
+    def events_per_sec(self) -> float:
+        if not self.duration_ms:
+            return 0.0
+        return self.sent * 1000 / self.duration_ms
 
-class RecentlyViewedProduct(models.Model):
+
+class RecentlyViewedList(models.Model):
+    """Capped "recently viewed" list: one row per signed-in user or anonymous visitor.
+
+    `items` holds `[product_id, viewed_at_unix_ms]` pairs, newest first, at most
+    `RECENTLY_VIEWED_MAX` long; a product appears once.
+    """
+
+    # "u:<user_id>" or "v:<visitor_id>" – single unique key for upserts.
+    owner_key = models.CharField(max_length=80, unique=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         null=True,
         blank=True,
         on_delete=models.CASCADE,
-        related_name="recently_viewed_products",
+        related_name="recently_viewed_lists",
     )
     visitor_id = models.CharField(max_length=64, blank=True, default="")
+    items = models.JSONField(blank=True, default=list)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    product = models.ForeignKey(
-        "catalog.Product",
-        on_delete=models.CASCADE,
-        related_name="recently_viewed_by",
-    )
+    def __str__(self) -> str:
+        return self.owner_key
 
-    last_viewed_at = models.DateTimeField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    @staticmethod
+    def key_for(*, user_id: int | None = None, visitor_id: str = "") -> str | None:
+        if user_id is not None:
+            return f"u:{int(user_id)}"
+        if visitor_id:
+            return f"v:{visitor_id}"
+        return None
+
+    @property
+    def product_ids(self) -> list[int]:
+        return [int(item[0]) for item in (self.items or [])]
+
+
+class RollupGranularity(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+
+
+class ProductMetricsRollup(models.Model):
+    """Per-product metrics per hour/day bucket, maintained by `rollup_analytics`."""
+
+    granularity = models.CharField(max_length=8, choices=RollupGranularity.choices)
+    bucket_start = models.DateTimeField()
+    product = models.ForeignKey("catalog.Product", on_delete=models.CASCADE, related_name="metrics_rollups")
+    channel = models.CharField(max_length=32, blank=True, default="")
+
+    views = models.PositiveIntegerField(default=0)
+    add_to_cart = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["user", "product"],
-                condition=models.Q(user__isnull=False),
-                name="analytics_rvp_unique_user_product",
-            ),
-            models.UniqueConstraint(
-                fields=["visitor_id", "product"],
-                condition=~models.Q(visitor_id=""),
-                name="analytics_rvp_unique_visitor_product",
-            ),
+                fields=["granularity", "bucket_start", "product", "channel"],
+                name="analytics_product_rollup_unique_bucket",
+            )
         ]
         indexes = [
-            models.Index(fields=["user", "last_viewed_at"]),
-            models.Index(fields=["visitor_id", "last_viewed_at"]),
-            models.Index(fields=["product", "last_viewed_at"]),
+            models.Index(fields=["granularity", "product", "bucket_start"]),
+            models.Index(fields=["granularity", "bucket_start"]),
         ]
+
+
+class CategoryMetricsRollup(models.Model):
+    """Per-category metrics, derived from the product hourly rollups."""
+
+    granularity = models.CharField(max_length=8, choices=RollupGranularity.choices)
+    bucket_start = models.DateTimeField()
+    category = models.ForeignKey("catalog.Category", on_delete=models.CASCADE, related_name="metrics_rollups")
+    channel = models.CharField(max_length=32, blank=True, default="")
+
+    views = models.PositiveIntegerField(default=0)
+    add_to_cart = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket_start", "category", "channel"],
+                name="analytics_category_rollup_unique_bucket",
+            )
+        ]
+        indexes = [models.Index(fields=["granularity", "category", "bucket_start"])]
+
+
+class RollupWatermark(models.Model):
+    """How far each rollup source has been folded in (exclusive upper bound)."""
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name}@{self.value.isoformat()}"
+
+
+class RolledUpOrder(models.Model):
+    """Paid orders already counted in the rollups (guards against double counting).
+
+    Keeps what was added (bucket, channel and per-product units/revenue) so the
+    exact amounts can be subtracted when the order leaves PAID.
+    """
+
+    order = models.OneToOneField("checkout.Order", on_delete=models.CASCADE, primary_key=True)
+    bucket_start = models.DateTimeField(null=True, blank=True)
+    channel = models.CharField(max_length=32, blank=True, default="")
+    # {product_id: [units, revenue_net]}
+    lines = models.JSONField(default=dict, blank=True)
+    rolled_up_at = models.DateTimeField(auto_now_add=True)
+    reversed_at = models.DateTimeField(null=True, blank=True)
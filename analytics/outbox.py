@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AnalyticsDispatchBatch, AnalyticsOutbox
+from .providers import DeliveryResult, OutboxDeliveryError, OutboxProvider, get_outbox_providers
+
+
+_local = threading.local()
+
+
+def _session(pool_size: int) -> requests.Session:
+    # One keep-alive session per sender thread; requests.Session is not thread-safe.
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _local.session = session
+    return session
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    base = _setting_int("ANALYTICS_OUTBOX_BACKOFF_SECONDS", 30)
+    cap = _setting_int("ANALYTICS_OUTBOX_BACKOFF_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def claim_outbox_batch(*, provider: str, batch_size: int) -> list[int]:
+    """Lock a batch of due rows of one provider (pending, or processing with an expired lock)."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting_int("ANALYTICS_OUTBOX_LOCK_SECONDS", 300))
+    with transaction.atomic():
+        ids = list(
+            AnalyticsOutbox.objects.select_for_update(skip_locked=True)
+            .filter(provider=provider)
+            .filter(
+                Q(status=AnalyticsOutbox.Status.PENDING, run_after__lte=now)
+                | Q(status=AnalyticsOutbox.Status.PROCESSING, locked_at__lt=stale_before)
+            )
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[: max(1, int(batch_size))]
+        )
+        if ids:
+            AnalyticsOutbox.objects.filter(id__in=ids).update(
+                status=AnalyticsOutbox.Status.PROCESSING,
+                locked_at=now,
+                updated_at=now,
+            )
+    return ids
+
+
+@dataclass
+class DispatchStats:
+    batches: int = 0
+    sent: int = 0
+    failed: int = 0
+    dead: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def events_per_sec(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+def _deliver(provider: OutboxProvider, rows: list[AnalyticsOutbox], pool_size: int):
+    started = time.perf_counter()
+    try:
+        result = provider.send(_session(pool_size), rows)
+        error = None
+    except OutboxDeliveryError as exc:
+        result = DeliveryResult(http_status=exc.http_status)
+        error = str(exc) or exc.__class__.__name__
+    except Exception as exc:
+        result = DeliveryResult()
+        error = str(exc) or exc.__class__.__name__
+    return result, error, int((time.perf_counter() - started) * 1000)
+
+
+def _record_delivery(
+    *,
+    provider: OutboxProvider,
+    rows: list[AnalyticsOutbox],
+    result: DeliveryResult,
+    error: str | None,
+    duration_ms: int,
+    max_attempts: int,
+) -> AnalyticsDispatchBatch:
+    now = timezone.now()
+    if error is not None:
+        failures = {row.id: error for row in rows}
+    else:
+        failures = dict(result.rejected or {})
+
+    sent_ids = [row.id for row in rows if row.id not in failures]
+    retry: list[AnalyticsOutbox] = []
+    dead = 0
+    for row in rows:
+        if row.id not in failures:
+            continue
+        row.attempts += 1
+        row.locked_at = None
+        row.last_error = failures[row.id][:2000]
+        row.updated_at = now
+        if row.attempts >= max_attempts:
+            row.status = AnalyticsOutbox.Status.DEAD
+            dead += 1
+        else:
+            row.status = AnalyticsOutbox.Status.PENDING
+            row.run_after = now + backoff_delay(row.attempts)
+        retry.append(row)
+
+    with transaction.atomic():
+        if sent_ids:
+            AnalyticsOutbox.objects.filter(id__in=sent_ids).update(
+                status=AnalyticsOutbox.Status.SENT,
+                sent_at=now,
+                locked_at=None,
+                last_error="",
+                updated_at=now,
+            )
+        if retry:
+            AnalyticsOutbox.objects.bulk_update(
+                retry, ["status", "attempts", "run_after", "locked_at", "last_error", "updated_at"]
+            )
+        return AnalyticsDispatchBatch.objects.create(
+            provider=provider.code,
+            size=len(rows),
+            sent=len(sent_ids),
+            failed=len(retry) - dead,
+            dead=dead,
+            http_status=result.http_status,
+            duration_ms=duration_ms,
+            error=(error or "")[:2000],
+        )
+
+
+def dispatch_outbox(
+    *,
+    providers: list[str] | None = None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+    max_attempts: int | None = None,
+    max_batches: int | None = None,
+) -> DispatchStats:
+    """Drain due outbox rows: claim batches per provider, send them concurrently.
+
+    Claiming and bookkeeping happen on the calling thread; sender threads only do
+    HTTP, each over its own keep-alive session. Failed rows are retried with
+    exponential backoff and dead-lettered (`status=dead`) after `max_attempts`.
+    Providers without a configured URL are left untouched.
+    """
+    concurrency = max(1, int(concurrency or _setting_int("ANALYTICS_OUTBOX_CONCURRENCY", 4)))
+    max_attempts = max(1, int(max_attempts or _setting_int("ANALYTICS_OUTBOX_MAX_ATTEMPTS", 8)))
+
+    available = {code: p for code, p in get_outbox_providers().items() if p.enabled}
+    if providers:
+        available = {code: p for code, p in available.items() if code in providers}
+
+    stats = DispatchStats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="analytics-outbox") as pool:
+        while available and (max_batches is None or stats.batches < max_batches):
+            work: list[tuple[OutboxProvider, list[AnalyticsOutbox]]] = []
+            exhausted: set[str] = set()
+            # Round-robin over providers so one busy provider can't starve the others.
+            while len(work) < concurrency and len(exhausted) < len(available):
+                for code, provider in available.items():
+                    if code in exhausted or len(work) >= concurrency:
+                        continue
+                    ids = claim_outbox_batch(provider=code, batch_size=batch_size or provider.batch_size)
+                    if not ids:
+                        exhausted.add(code)
+                        continue
+                    rows = list(
+                        AnalyticsOutbox.objects.select_related("event", "event__user")
+                        .filter(id__in=ids)
+                        .order_by("id")
+                    )
+                    # The event FK is not enforced in the database (partitioned table).
+                    orphans = set(ids) - {row.id for row in rows}
+                    if orphans:
+                        stats.dead += AnalyticsOutbox.objects.filter(id__in=orphans).update(
+                            status=AnalyticsOutbox.Status.DEAD,
+                            locked_at=None,
+                            last_error="Event no longer exists.",
+                            updated_at=timezone.now(),
+                        )
+                    if rows:
+                        work.append((provider, rows))
+            if not work:
+                break
+
+            futures = {pool.submit(_deliver, provider, rows, concurrency): (provider, rows) for provider, rows in work}
+            for future in as_completed(futures):
+                provider, rows = futures[future]
+                result, error, duration_ms = future.result()
+                batch = _record_delivery(
+                    provider=provider,
+                    rows=rows,
+                    result=result,
+                    error=error,
+                    duration_ms=duration_ms,
+                    max_attempts=max_attempts,
+                )
+                stats.batches += 1
+                stats.sent += batch.sent
+                stats.failed += batch.failed
+                stats.dead += batch.dead
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
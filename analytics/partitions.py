@@ -0,0 +1,226 @@
+"""Monthly range partitions of `AnalyticsEvent` (PostgreSQL only).
+
+The events table is partitioned by `occurred_at`: one partition per calendar
+month (UTC) named `<table>_pYYYY_MM` plus a `<table>_default` catch-all, so
+inserts never fail when the maintenance command has not run yet. The primary
+key is `(id, occurred_at)` and `idempotency_key` is unique per partition;
+`AnalyticsEventKey` keeps it unique across partitions.
+
+`manage.py analytics_partitions` creates partitions ahead of time and retires
+old ones (optionally archiving them to gzip'ed CSV first).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AnalyticsEvent, AnalyticsEventArchive, AnalyticsEventKey, AnalyticsOutbox
+
+
+PARENT = AnalyticsEvent._meta.db_table
+DEFAULT_PARTITION = f"{PARENT}_default"
+_NAME_RE = re.compile(rf"^{re.escape(PARENT)}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(dt_timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month: datetime, n: int) -> datetime:
+    idx = month.year * 12 + (month.month - 1) + n
+    return datetime(idx // 12, idx % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> datetime | None:
+    m = _NAME_RE.match(name)
+    if not m:
+        return None
+    return datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=dt_timezone.utc)
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [PARENT],
+        )
+        return cur.fetchone() is not None
+
+
+def list_partitions() -> list[str]:
+    """Names of the attached partitions (monthly and default)."""
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid) ORDER BY child.relname",
+            [PARENT],
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+def _q(name: str) -> str:
+    return connection.ops.quote_name(name)
+
+
+def _create_unique_idempotency_index(cur, table: str) -> None:
+    cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_q(table + '_idem_uniq')} ON {_q(table)} (idempotency_key)")
+
+
+def ensure_partition(month: datetime) -> bool:
+    """Create the partition for `month` if missing. Returns True when created.
+
+    Rows that already landed in the default partition for that month are moved
+    into the new partition (Postgres refuses to attach a range that overlaps
+    rows in the default partition).
+    """
+    name = partition_name(month)
+    lo, hi = month, add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", [name])
+        if cur.fetchone()[0] is not None:
+            return False
+        cur.execute(f"LOCK TABLE {_q(PARENT)} IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {_q(DEFAULT_PARTITION)} WHERE occurred_at >= %s AND occurred_at < %s)",
+            [lo, hi],
+        )
+        if cur.fetchone()[0]:
+            cur.execute(f"CREATE TABLE {_q(name)} (LIKE {_q(PARENT)} INCLUDING DEFAULTS)")
+            cur.execute(
+                f"WITH moved AS (DELETE FROM {_q(DEFAULT_PARTITION)} "
+                f"WHERE occurred_at >= %s AND occurred_at < %s RETURNING *) "
+                f"INSERT INTO {_q(name)} SELECT * FROM moved",
+                [lo, hi],
+            )
+            cur.execute(f"ALTER TABLE {_q(PARENT)} ATTACH PARTITION {_q(name)} FOR VALUES FROM (%s) TO (%s)", [lo, hi])
+        else:
+            cur.execute(f"CREATE TABLE {_q(name)} PARTITION OF {_q(PARENT)} FOR VALUES FROM (%s) TO (%s)", [lo, hi])
+        _create_unique_idempotency_index(cur, name)
+    return True
+
+
+def ensure_future_partitions(*, ahead: int, now: datetime | None = None) -> list[str]:
+    """Make sure partitions exist from the current month up to `ahead` months ahead."""
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    created = []
+    for i in range(max(0, int(ahead)) + 1):
+        month = add_months(current, i)
+        if ensure_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(*, retention_months: int, now: datetime | None = None) -> list[str]:
+    """Monthly partitions that ended more than `retention_months` full months ago."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(dt_timezone.utc)), -int(retention_months))
+    return [
+        name
+        for name in list_partitions()
+        if (month := partition_month(name)) is not None and add_months(month, 1) <= cutoff
+    ]
+
+
+def archive_dir() -> Path:
+    return Path(getattr(settings, "ANALYTICS_EVENT_ARCHIVE_DIR", "") or (Path(settings.BASE_DIR) / "var" / "analytics_archive"))
+
+
+@dataclass
+class ArchiveResult:
+    path: Path
+    rows: int
+    size: int
+    sha256: str
+
+
+def archive_partition(name: str, *, directory: Path | None = None) -> ArchiveResult:
+    """Stream a partition to `<dir>/<name>.csv.gz` with COPY (constant memory).
+
+    The file is written under a temporary name and renamed when complete, so a
+    crash never leaves a truncated archive that looks finished.
+    """
+    directory = Path(directory or archive_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.csv.gz"
+    tmp = path.with_suffix(path.suffix + ".tmp")
+
+    digest = hashlib.sha256()
+    rows = 0
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {_q(name)}")
+        rows = int(cur.fetchone()[0])
+        with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            with cur.copy(f"COPY (SELECT * FROM {_q(name)} ORDER BY occurred_at) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+                for chunk in copy:
+                    gz.write(chunk)
+            gz.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+    with open(tmp, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    os.replace(tmp, path)
+    return ArchiveResult(path=path, rows=rows, size=path.stat().st_size, sha256=digest.hexdigest())
+
+
+def retire_partition(name: str, *, archive: bool, directory: Path | None = None) -> AnalyticsEventArchive | None:
+    """Archive (optionally), detach and drop one monthly partition.
+
+    Safe to rerun: an existing archive record for the partition is reused, and
+    a partition that is already gone is a no-op. Outbox rows and idempotency
+    keys of the dropped events are deleted (the outbox FK is not enforced by
+    the database).
+    """
+    record = AnalyticsEventArchive.objects.filter(partition=name).first()
+    with connection.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", [name])
+        exists = cur.fetchone()[0] is not None
+    if not exists:
+        return record
+
+    if archive and record is None:
+        result = archive_partition(name, directory=directory)
+        month = partition_month(name)
+        record = AnalyticsEventArchive.objects.create(
+            partition=name,
+            month=month.date() if month else None,
+            path=str(result.path),
+            rows=result.rows,
+            size_bytes=result.size,
+            sha256=result.sha256,
+        )
+
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(
+            f"DELETE FROM {_q(AnalyticsOutbox._meta.db_table)} WHERE event_id IN (SELECT id FROM {_q(name)})"
+        )
+        month = partition_month(name)
+        if month is not None:
+            AnalyticsEventKey.objects.filter(occurred_at__gte=month, occurred_at__lt=add_months(month, 1)).delete()
+        cur.execute(f"ALTER TABLE {_q(PARENT)} DETACH PARTITION {_q(name)}")
+        cur.execute(f"DROP TABLE {_q(name)}")
+    if record is not None and record.dropped_at is None:
+        record.dropped_at = timezone.now()
+        record.save(update_fields=["dropped_at"])
+    return record
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import AnalyticsOutbox
+
+
+class OutboxDeliveryError(RuntimeError):
+    def __init__(self, message: str, *, http_status: int | None = None):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    http_status: int | None = None
+    # Outbox ids the provider rejected individually (the rest count as sent).
+    rejected: dict[int, str] | None = None
+
+
+class OutboxProvider:
+    """Sends a batch of outbox rows of one provider in a single request.
+
+    The default implementation POSTs JSON `{"provider": ..., "events": [...]}`
+    to `url` with an optional bearer token. A 2xx response marks the whole
+    batch as sent, unless it returns `{"rejected": {"<outbox id>": "reason"}}`.
+    Subclass and override `build_event` / `build_payload` for provider formats.
+    """
+
+    def __init__(self, code: str, *, url: str = "", token: str = "", batch_size: int = 100, timeout: float = 10.0):
+        self.code = code
+        self.url = (url or "").strip()
+        self.token = (token or "").strip()
+        self.batch_size = max(1, int(batch_size or 100))
+        self.timeout = float(timeout or 10.0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def build_event(self, row: AnalyticsOutbox) -> dict:
+        ev = row.event
+        return {
+            "outbox_id": row.id,
+            "event_id": str(ev.id),
+            "name": ev.name,
+            "occurred_at": ev.occurred_at.isoformat(),
+            "user_id": ev.user_id,
+            "email": getattr(ev.user, "email", "") if ev.user_id else "",
+            "visitor_id": ev.visitor_id,
+            "object_type": ev.object_type,
+            "object_id": ev.object_id,
+            "country_code": ev.country_code,
+            "channel": ev.channel,
+            "language_code": ev.language_code,
+            "payload": ev.payload,
+        }
+
+    def build_payload(self, rows: list[AnalyticsOutbox]) -> dict:
+        return {"provider": self.code, "events": [self.build_event(r) for r in rows]}
+
+    def headers(self) -> dict[str, str]:
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def send(self, session: requests.Session, rows: list[AnalyticsOutbox]) -> DeliveryResult:
+        try:
+            resp = session.post(self.url, json=self.build_payload(rows), headers=self.headers(), timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise OutboxDeliveryError(str(exc)) from exc
+
+        if resp.status_code >= 300:
+            raise OutboxDeliveryError(
+                f"{self.code} HTTP {resp.status_code}: {(resp.text or '')[:500]}",
+                http_status=resp.status_code,
+            )
+
+        rejected: dict[int, str] = {}
+        try:
+            data = resp.json()
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("rejected"), dict):
+            for key, reason in data["rejected"].items():
+                try:
+                    rejected[int(key)] = str(reason or "rejected")
+                except (TypeError, ValueError):
+                    continue
+        return DeliveryResult(http_status=resp.status_code, rejected=rejected or None)
+
+
+@lru_cache(maxsize=1)
+def _load_providers() -> dict[str, OutboxProvider]:
+    providers: dict[str, OutboxProvider] = {}
+    for code, conf in (getattr(settings, "ANALYTICS_OUTBOX_PROVIDERS", None) or {}).items():
+        conf = dict(conf or {})
+        cls = import_string(conf.pop("class", "analytics.providers.OutboxProvider"))
+        providers[code] = cls(code, **conf)
+    return providers
+
+
+def get_outbox_providers() -> dict[str, OutboxProvider]:
+    return dict(_load_providers())
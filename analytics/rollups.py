@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import (
+    AnalyticsEvent,
+    CategoryMetricsRollup,
+    ProductMetricsRollup,
+    RolledUpOrder,
+    RollupGranularity,
+    RollupWatermark,
+)
+
+
+METRICS = ("views", "add_to_cart", "orders", "units_sold", "revenue_net")
+
+EVENTS_WATERMARK = "events"
+ORDERS_WATERMARK = "orders"
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _lag() -> timedelta:
+    # Events are written by the in-process buffer a little after they occur.
+    return timedelta(seconds=max(0, _setting_int("ANALYTICS_ROLLUP_LAG_SECONDS", 300)))
+
+
+def _get_watermark(name: str) -> datetime | None:
+    return RollupWatermark.objects.filter(name=name).values_list("value", flat=True).first()
+
+
+def _set_watermark(name: str, value: datetime) -> None:
+    RollupWatermark.objects.update_or_create(name=name, defaults={"value": value})
+
+
+@dataclass
+class RollupStats:
+    events_windows: int = 0
+    events_folded: int = 0
+    orders_folded: int = 0
+    orders_reversed: int = 0
+    hours_touched: set = field(default_factory=set)
+
+
+def _empty() -> dict:
+    return {"views": 0, "add_to_cart": 0, "orders": 0, "units_sold": 0, "revenue_net": Decimal("0")}
+
+
+def _increment_product_hours(deltas: dict[tuple, dict]) -> None:
+    """Add `deltas` {(hour, product_id, channel): {metric: n}} onto the hourly rows."""
+    if not deltas:
+        return
+    from catalog.models import Product
+
+    product_ids = {pid for _, pid, _ in deltas}
+    existing_products = set(Product.objects.filter(id__in=product_ids).values_list("id", flat=True))
+    deltas = {k: v for k, v in deltas.items() if k[1] in existing_products}
+    if not deltas:
+        return
+
+    current = {
+        (r.bucket_start, r.product_id, r.channel): r
+        for r in ProductMetricsRollup.objects.select_for_update().filter(
+            granularity=RollupGranularity.HOUR,
+            bucket_start__in={h for h, _, _ in deltas},
+            product_id__in={p for _, p, _ in deltas},
+        )
+    }
+    rows = []
+    for (hour, product_id, channel), delta in deltas.items():
+        row = current.get((hour, product_id, channel)) or ProductMetricsRollup(
+            granularity=RollupGranularity.HOUR,
+            bucket_start=hour,
+            product_id=product_id,
+            channel=channel,
+        )
+        for metric in METRICS:
+            setattr(row, metric, (getattr(row, metric) or 0) + delta.get(metric, 0))
+        rows.append(row)
+
+    ProductMetricsRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["granularity", "bucket_start", "product", "channel"],
+        update_fields=list(METRICS),
+    )
+
+
+def _fold_events(lo: datetime, hi: datetime) -> tuple[int, set]:
+    """Fold product views and add-to-cart events with lo <= occurred_at < hi."""
+    from catalog.models import Variant
+
+    base = AnalyticsEvent.objects.filter(occurred_at__gte=lo, occurred_at__lt=hi)
+    deltas: dict[tuple, dict] = {}
+    folded = 0
+
+    views = (
+        base.filter(name=AnalyticsEvent.Name.PRODUCT_VIEW, object_type="product", object_id__isnull=False)
+        .annotate(hour=TruncHour("occurred_at"))
+        .values("hour", "object_id", "channel")
+        .annotate(n=Count("id"))
+    )
+    for r in views:
+        deltas.setdefault((r["hour"], int(r["object_id"]), r["channel"]), _empty())["views"] += r["n"]
+        folded += r["n"]
+
+    carts = list(
+        base.filter(name=AnalyticsEvent.Name.ADD_TO_CART, object_type="variant", object_id__isnull=False)
+        .annotate(hour=TruncHour("occurred_at"))
+        .values("hour", "object_id", "channel")
+        .annotate(n=Count("id"))
+    )
+    if carts:
+        product_by_variant = dict(
+            Variant.objects.filter(id__in={int(r["object_id"]) for r in carts}).values_list("id", "product_id")
+        )
+        for r in carts:
+            product_id = product_by_variant.get(int(r["object_id"]))
+            if product_id is None:
+                continue
+            deltas.setdefault((r["hour"], int(product_id), r["channel"]), _empty())["add_to_cart"] += r["n"]
+            folded += r["n"]
+
+    _increment_product_hours(deltas)
+    return folded, {k[0] for k in deltas}
+
+
+def _fold_orders(order_ids: list[int]) -> set:
+    """Fold the lines of newly paid orders (bucketed by the hour they were paid)."""
+    from checkout.models import OrderLine
+
+    channel_by_order = dict(
+        AnalyticsEvent.objects.filter(
+            name=AnalyticsEvent.Name.PURCHASE, object_type="order", object_id__in=order_ids
+        ).values_list("object_id", "channel")
+    )
+    lines = (
+        OrderLine.objects.filter(order_id__in=order_ids, variant__isnull=False)
+        .annotate(hour=TruncHour(Coalesce("order__paid_at", "order__updated_at")))
+        .values("hour", "order_id", "variant__product_id")
+        .annotate(units=Sum("qty"), revenue=Sum("total_net"))
+    )
+    deltas: dict[tuple, dict] = {}
+    ledger = {i: RolledUpOrder(order_id=i, lines={}) for i in order_ids}
+    for r in lines:
+        product_id = int(r["variant__product_id"])
+        channel = channel_by_order.get(r["order_id"], "") or ""
+        units = int(r["units"] or 0)
+        revenue = Decimal(r["revenue"] or 0)
+        d = deltas.setdefault((r["hour"], product_id, channel), _empty())
+        d["orders"] += 1
+        d["units_sold"] += units
+        d["revenue_net"] += revenue
+        entry = ledger[r["order_id"]]
+        entry.bucket_start, entry.channel = r["hour"], channel
+        entry.lines[str(product_id)] = [units, str(revenue)]
+
+    _increment_product_hours(deltas)
+    # A reversed entry (order paid again after a cancellation) is replaced.
+    RolledUpOrder.objects.bulk_create(
+        list(ledger.values()),
+        update_conflicts=True,
+        unique_fields=["order"],
+        update_fields=["bucket_start", "channel", "lines", "rolled_up_at", "reversed_at"],
+    )
+    return {k[0] for k in deltas}
+
+
+def _reverse_orders(entries: list[RolledUpOrder]) -> set:
+    """Subtract what `entries` added, for rolled-up orders that are no longer paid.
+
+    The amounts are taken from the ledger and removed from the bucket they were
+    added to, so the rollups match the orders that are paid now.
+    """
+    deltas: dict[tuple, dict] = {}
+    for entry in entries:
+        if entry.bucket_start is None:
+            continue
+        for product_id, (units, revenue) in (entry.lines or {}).items():
+            d = deltas.setdefault((entry.bucket_start, int(product_id), entry.channel), _empty())
+            d["orders"] -= 1
+            d["units_sold"] -= int(units)
+            d["revenue_net"] -= Decimal(revenue)
+
+    _increment_product_hours(deltas)
+    RolledUpOrder.objects.filter(order_id__in=[e.order_id for e in entries]).update(reversed_at=timezone.now())
+    return {k[0] for k in deltas}
+
+
+def _sum_metrics():
+    return {
+        "views_sum": Sum("views"),
+        "add_to_cart_sum": Sum("add_to_cart"),
+        "orders_sum": Sum("orders"),
+        "units_sold_sum": Sum("units_sold"),
+        "revenue_net_sum": Sum("revenue_net"),
+    }
+
+
+def _metrics_from(row: dict) -> dict:
+    return {m: row[f"{m}_sum"] or 0 for m in METRICS}
+
+
+def _rebuild_derived(hours: set) -> None:
+    """Recompute product daily and category hourly/daily rows for the touched buckets.
+
+    Derived rows are rebuilt from the product hourly rows, so rerunning is idempotent.
+    """
+    if not hours:
+        return
+    tz = timezone.get_current_timezone()
+    days = {timezone.localtime(h, tz).replace(hour=0, minute=0, second=0, microsecond=0) for h in hours}
+    hourly = ProductMetricsRollup.objects.filter(granularity=RollupGranularity.HOUR)
+
+    day_q = None
+    for day in days:
+        q = hourly.filter(bucket_start__gte=day, bucket_start__lt=day + timedelta(days=1))
+        day_q = q if day_q is None else day_q | q
+
+    # Product daily
+    ProductMetricsRollup.objects.filter(granularity=RollupGranularity.DAY, bucket_start__in=days).delete()
+    ProductMetricsRollup.objects.bulk_create(
+        [
+            ProductMetricsRollup(
+                granularity=RollupGranularity.DAY,
+                bucket_start=r["day"],
+                product_id=r["product_id"],
+                channel=r["channel"],
+                **_metrics_from(r),
+            )
+            for r in day_q.annotate(day=TruncDay("bucket_start"))
+            .values("day", "product_id", "channel")
+            .annotate(**_sum_metrics())
+        ],
+        batch_size=1000,
+    )
+
+    # Category hourly + daily
+    CategoryMetricsRollup.objects.filter(
+        granularity=RollupGranularity.HOUR, bucket_start__in=hours
+    ).delete()
+    CategoryMetricsRollup.objects.filter(granularity=RollupGranularity.DAY, bucket_start__in=days).delete()
+    CategoryMetricsRollup.objects.bulk_create(
+        [
+            CategoryMetricsRollup(
+                granularity=RollupGranularity.HOUR,
+                bucket_start=r["bucket_start"],
+                category_id=r["product__category_id"],
+                channel=r["channel"],
+                **_metrics_from(r),
+            )
+            for r in hourly.filter(bucket_start__in=hours, product__category_id__isnull=False)
+            .values("bucket_start", "product__category_id", "channel")
+            .annotate(**_sum_metrics())
+        ]
+        + [
+            CategoryMetricsRollup(
+                granularity=RollupGranularity.DAY,
+                bucket_start=r["day"],
+                category_id=r["product__category_id"],
+                channel=r["channel"],
+                **_metrics_from(r),
+            )
+            for r in day_q.filter(product__category_id__isnull=False)
+            .annotate(day=TruncDay("bucket_start"))
+            .values("day", "product__category_id", "channel")
+            .annotate(**_sum_metrics())
+        ],
+        batch_size=1000,
+    )
+
+
+def run_rollups(*, now: datetime | None = None, window_hours: int | None = None, order_batch_size: int = 500) -> RollupStats:
+    """Fold new events and paid orders into the rollup tables.
+
+    Events are processed in `[watermark, upper)` windows where `upper` trails
+    `now` by `ANALYTICS_ROLLUP_LAG_SECONDS`; each window commits together with
+    its watermark, so an interrupted run resumes where it stopped. Paid orders
+    are bucketed by `paid_at` and recorded in `RolledUpOrder`, so they are never
+    counted twice; rolled-up orders that later leave PAID (cancelled, refunded)
+    are subtracted again.
+    """
+    now = now or timezone.now()
+    upper = now - _lag()
+    window = timedelta(hours=max(1, int(window_hours or _setting_int("ANALYTICS_ROLLUP_WINDOW_HOURS", 24))))
+    stats = RollupStats()
+
+    # Events
+    wm = _get_watermark(EVENTS_WATERMARK)
+    if wm is None:
+        first = AnalyticsEvent.objects.order_by("occurred_at").values_list("occurred_at", flat=True).first()
+        wm = first.replace(minute=0, second=0, microsecond=0) if first else upper
+    while wm < upper:
+        hi = min(wm + window, upper)
+        with transaction.atomic():
+            folded, hours = _fold_events(wm, hi)
+            _rebuild_derived(hours)
+            _set_watermark(EVENTS_WATERMARK, hi)
+        stats.events_windows += 1
+        stats.events_folded += folded
+        stats.hours_touched |= hours
+        wm = hi
+
+    # Paid orders
+    from checkout.models import Order
+
+    owm = _get_watermark(ORDERS_WATERMARK)
+    candidates = Order.objects.filter(status=Order.Status.PAID, updated_at__lt=upper).exclude(
+        id__in=RolledUpOrder.objects.filter(reversed_at__isnull=True).values("order_id")
+    )
+    if owm is not None:
+        # The ledger prevents double counting; the overlap catches late commits.
+        candidates = candidates.filter(updated_at__gte=owm - _lag())
+    while True:
+        batch = list(candidates.order_by("updated_at", "id").values_list("id", "updated_at")[:order_batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            hours = _fold_orders([i for i, _ in batch])
+            _rebuild_derived(hours)
+            _set_watermark(ORDERS_WATERMARK, batch[-1][1])
+        stats.orders_folded += len(batch)
+        stats.hours_touched |= hours
+
+    # Rolled-up orders that are no longer paid
+    reversals = RolledUpOrder.objects.filter(reversed_at__isnull=True).exclude(order__status=Order.Status.PAID)
+    while True:
+        with transaction.atomic():
+            entries = list(reversals.select_for_update(of=("self",)).order_by("order_id")[:order_batch_size])
+            if not entries:
+                break
+            hours = _reverse_orders(entries)
+            _rebuild_derived(hours)
+        stats.orders_reversed += len(entries)
+        stats.hours_touched |= hours
+
+    return stats
+
+
+def reset_rollups() -> None:
+    with transaction.atomic():
+        ProductMetricsRollup.objects.all().delete()
+        CategoryMetricsRollup.objects.all().delete()
+        RolledUpOrder.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+
+
+def sold_qty_expression(*, days: int | None = None):
+    """Units sold per product (OuterRef("pk")) from the daily rollups, for annotate().
+
+    Until orders have been rolled up (fresh deploy, `--reset`) the paid order
+    lines are summed directly instead.
+    """
+    if days is None:
+        days = _setting_int("ANALYTICS_BEST_SELLING_DAYS", 0)
+    since = timezone.now() - timedelta(days=days) if days and days > 0 else None
+
+    if _get_watermark(ORDERS_WATERMARK) is None:
+        from checkout.models import Order, OrderLine
+
+        qs = OrderLine.objects.filter(variant__product=OuterRef("pk"), order__status=Order.Status.PAID)
+        if since is not None:
+            qs = qs.filter(order__paid_at__gte=since)
+        total = qs.order_by().values("variant__product").annotate(total=Sum("qty")).values("total")[:1]
+        return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+    qs = ProductMetricsRollup.objects.filter(granularity=RollupGranularity.DAY, product=OuterRef("pk"))
+    if since is not None:
+        qs = qs.filter(bucket_start__gte=since)
+    total = qs.order_by().values("product").annotate(total=Sum("units_sold")).values("total")[:1]
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def top_products(*, metric: str = "views", days: int = 7, limit: int = 12, channel: str | None = None) -> list[int]:
+    """Product ids ranked by a rollup metric over the last `days` (for trending widgets)."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    qs = ProductMetricsRollup.objects.filter(
+        granularity=RollupGranularity.DAY,
+        bucket_start__gte=timezone.now() - timedelta(days=max(1, int(days))),
+    )
+    if channel is not None:
+        qs = qs.filter(channel=channel)
+    rows = (
+        qs.values("product_id")
+        .annotate(total=Sum(metric))
+        .filter(total__gt=0)
+        .order_by("-total", "product_id")[: max(1, int(limit))]
+    )
+    return [int(r["product_id"]) for r in rows]
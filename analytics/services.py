@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import hashlib
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.db import transaction
-from django.db import IntegrityError
 from django.utils import timezone
 
-from .models import AnalyticsEvent, AnalyticsOutbox, VisitorLink, RecentlyViewedProduct
+from .models import AnalyticsEvent, AnalyticsEventKey, AnalyticsOutbox, RecentlyViewedList, VisitorLink
 
 
 User = get_user_model()
@@ -38,6 +40,24 @@ def _get_user_from_request(request):
         return a
 
     # Public endpoints may not run django-ninja auth. Try access token from HttpOnly cookie.
+    from accounts.auth import user_from_access_cookie
+
+    return user_from_access_cookie(request)
+
+
+def _get_user_id_from_request(request) -> int | None:
+    """Like `_get_user_from_request` but without the User query for cookie tokens.
+
+    Ids taken from the token are validated in bulk when the event batch is written.
+    """
+    u = getattr(request, "user", None)
+    if u is not None and getattr(u, "is_authenticated", False):
+        return int(u.id)
+
+    a = getattr(request, "auth", None)
+    if isinstance(a, User) or (a is not None and getattr(a, "is_authenticated", False)):
+        return int(a.id)
+
     try:
         from accounts.jwt_utils import decode_token
 
@@ -49,14 +69,10 @@ def _get_user_from_request(request):
         if payload.get("type") != "access":
             return None
         user_id = payload.get("sub")
-        if not user_id:
-            return None
-        return User.objects.get(id=int(user_id), is_active=True)
+        return int(user_id) if user_id else None
     except Exception:
         return None
 
-    return None
-
 
 def _product_view_window_index(now) -> int:
     return int(int(now.timestamp()) // 1800)
@@ -69,46 +85,80 @@ def _recently_viewed_max() -> int:
         return 12
 
 
-def record_recently_viewed_product(*, request, product_id: int, now=None) -> None:
-    now = now or timezone.now()
+def _merge_viewed_items(*lists, max_items: int) -> list[list[int]]:
+    """Merge newest-first `[product_id, ts_ms]` lists (later lists win ties).
 
-    visitor_id = _get_visitor_id_from_request(request)
+    Keeps the newest view per product and returns at most `max_items`, newest first.
+    """
+    latest: dict[int, tuple[int, int]] = {}
+    seq = 0
+    for items in lists:
+        for product_id, ts in reversed(items or []):
+            seq += 1
+            product_id = int(product_id)
+            rank = (int(ts), seq)
+            if rank > latest.get(product_id, (-1, -1)):
+                latest[product_id] = rank
+    ordered = sorted(latest.items(), key=lambda kv: kv[1], reverse=True)
+    return [[product_id, rank[0]] for product_id, rank in ordered[:max_items]]
+
+
+def record_recently_viewed_product(*, request, product_id: int, now=None) -> None:
     user = _get_user_from_request(request)
-    if user is None and not visitor_id:
+    record_recently_viewed_products(
+        [(getattr(user, "id", None), _get_visitor_id_from_request(request), int(product_id), now or timezone.now())]
+    )
+
+
+def record_recently_viewed_products(views: list[tuple[int | None, str, int, datetime]]) -> None:
+    """Fold (user_id, visitor_id, product_id, viewed_at) views into the capped lists.
+
+    One locking read of the affected lists and one upsert, however many views
+    or owners the batch contains.
+    """
+    new_items: dict[str, list[list[int]]] = {}
+    owners: dict[str, tuple[int | None, str]] = {}
+    for user_id, visitor_id, product_id, viewed_at in views:
+        key = RecentlyViewedList.key_for(user_id=user_id, visitor_id=visitor_id)
+        if key is None:
+            continue
+        owners[key] = (user_id, "" if user_id is not None else str(visitor_id))
+        new_items.setdefault(key, []).insert(0, [int(product_id), int(viewed_at.timestamp() * 1000)])
+    if not new_items:
         return
 
     max_items = _recently_viewed_max()
-
     with transaction.atomic():
-        if user is not None:
-            RecentlyViewedProduct.objects.update_or_create(
-                user=user,
-                product_id=int(product_id),
-                defaults={"visitor_id": "", "last_viewed_at": now},
-            )
-            ids_to_keep = list(
-                RecentlyViewedProduct.objects.filter(user=user)
-                .order_by("-last_viewed_at")
-                .values_list("id", flat=True)[:max_items]
-            )
-            RecentlyViewedProduct.objects.filter(user=user).exclude(
-                id__in=ids_to_keep
-            ).delete()
-        else:
-            RecentlyViewedProduct.objects.update_or_create(
-                user=None,
-                visitor_id=str(visitor_id),
-                product_id=int(product_id),
-                defaults={"last_viewed_at": now},
-            )
-            ids_to_keep = list(
-                RecentlyViewedProduct.objects.filter(user__isnull=True, visitor_id=str(visitor_id))
-                .order_by("-last_viewed_at")
-                .values_list("id", flat=True)[:max_items]
-            )
-            RecentlyViewedProduct.objects.filter(user__isnull=True, visitor_id=str(visitor_id)).exclude(
-                id__in=ids_to_keep
-            ).delete()
+        existing = dict(
+            RecentlyViewedList.objects.select_for_update()
+            .filter(owner_key__in=list(new_items))
+            .values_list("owner_key", "items")
+        )
+        RecentlyViewedList.objects.bulk_create(
+            [
+                RecentlyViewedList(
+                    owner_key=key,
+                    user_id=owners[key][0],
+                    visitor_id=owners[key][1],
+                    items=_merge_viewed_items(existing.get(key), items, max_items=max_items),
+                )
+                for key, items in new_items.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["owner_key"],
+            update_fields=["items", "updated_at"],
+        )
+
+
+def get_recently_viewed_product_ids(*, request, limit: int | None = None) -> list[int]:
+    """Product ids for the current user (or anonymous visitor), newest first; one query."""
+    user_id = _get_user_id_from_request(request)
+    key = RecentlyViewedList.key_for(user_id=user_id, visitor_id=_get_visitor_id_from_request(request))
+    if key is None:
+        return []
+    items = RecentlyViewedList.objects.filter(owner_key=key).values_list("items", flat=True).first() or []
+    ids = [int(item[0]) for item in items]
+    return ids[:limit] if limit is not None else ids
 
 
 def merge_recently_viewed_from_visitor_to_user(*, request, user) -> None:
@@ -116,33 +166,142 @@ def merge_recently_viewed_from_visitor_to_user(*, request, user) -> None:
     if not visitor_id or user is None:
         return
 
-    max_items = _recently_viewed_max()
-    now = timezone.now()
+    visitor_key = RecentlyViewedList.key_for(visitor_id=visitor_id)
+    user_key = RecentlyViewedList.key_for(user_id=user.id)
 
     with transaction.atomic():
-        anon_qs = (
-            RecentlyViewedProduct.objects.filter(user__isnull=True, visitor_id=str(visitor_id))
-            .order_by("-last_viewed_at")
-            .values_list("product_id", "last_viewed_at")
+        lists = dict(
+            RecentlyViewedList.objects.select_for_update()
+            .filter(owner_key__in=[visitor_key, user_key])
+            .values_list("owner_key", "items")
+        )
+        if visitor_key not in lists:
+            return
+        RecentlyViewedList.objects.bulk_create(
+            [
+                RecentlyViewedList(
+                    owner_key=user_key,
+                    user_id=user.id,
+                    items=_merge_viewed_items(
+                        lists.get(user_key), lists[visitor_key], max_items=_recently_viewed_max()
+                    ),
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["owner_key"],
+            update_fields=["items", "updated_at"],
         )
+        # Remove anon list after merge
+        RecentlyViewedList.objects.filter(owner_key=visitor_key).delete()
+
+
+@dataclass
+class TrackedEvent:
+    """Everything needed to persist one `track_event` call, detached from the request."""
+
+    id: uuid.UUID
+    name: str
+    occurred_at: datetime
+    user_id: int | None
+    visitor_id: str
+    object_type: str
+    object_id: int | None
+    country_code: str
+    channel: str
+    language_code: str
+    payload: dict
+    idempotency_key: str
+    outbox_providers: list[str] = field(default_factory=list)
+
+    def to_model(self, *, user_id: int | None) -> AnalyticsEvent:
+        return AnalyticsEvent(
+            id=self.id,
+            name=self.name,
+            occurred_at=self.occurred_at,
+            user_id=user_id,
+            visitor_id=self.visitor_id,
+            object_type=self.object_type,
+            object_id=self.object_id,
+            country_code=self.country_code,
+            channel=self.channel,
+            language_code=self.language_code,
+            payload=self.payload,
+            idempotency_key=self.idempotency_key,
+        )
+
 
-        for product_id, last_viewed_at in anon_qs:
-            RecentlyViewedProduct.objects.update_or_create(
-                user=user,
-                product_id=int(product_id),
-                defaults={"visitor_id": "", "last_viewed_at": last_viewed_at or now},
+def write_tracked_events(events: list[TrackedEvent]) -> int:
+    """Persist a batch of tracked events with a handful of bulk statements.
+
+    Duplicates (same idempotency key, in the batch or already stored) are
+    skipped; visitor links and outbox rows are only created for events that
+    were actually inserted, like the old per-request path. Returns the number
+    of inserted events.
+    """
+    unique: dict[str, TrackedEvent] = {}
+    for ev in events:
+        unique.setdefault(ev.idempotency_key, ev)
+    if not unique:
+        return 0
+
+    user_ids = {ev.user_id for ev in unique.values() if ev.user_id is not None}
+    active_user_ids = (
+        set(User.objects.filter(id__in=user_ids, is_active=True).values_list("id", flat=True))
+        if user_ids
+        else set()
+    )
+
+    def _user_id(ev: TrackedEvent) -> int | None:
+        return ev.user_id if ev.user_id in active_user_ids else None
+
+    # Claim the keys in the global key table first: the events table is
+    # partitioned on Postgres and can only enforce unique keys per month. A key
+    # already claimed (now or by a concurrent writer) keeps its original event.
+    with transaction.atomic():
+        AnalyticsEventKey.objects.bulk_create(
+            [
+                AnalyticsEventKey(idempotency_key=key, event_id=ev.id, occurred_at=ev.occurred_at)
+                for key, ev in unique.items()
+            ],
+            ignore_conflicts=True,
+        )
+        owners = dict(
+            AnalyticsEventKey.objects.filter(idempotency_key__in=list(unique)).values_list("idempotency_key", "event_id")
+        )
+        inserted = [ev for key, ev in unique.items() if owners.get(key) == ev.id]
+        if inserted:
+            AnalyticsEvent.objects.bulk_create([ev.to_model(user_id=_user_id(ev)) for ev in inserted], ignore_conflicts=True)
+
+        links = {(_user_id(ev), ev.visitor_id) for ev in inserted if _user_id(ev) is not None and ev.visitor_id}
+        if links:
+            VisitorLink.objects.bulk_create(
+                [VisitorLink(user_id=u, visitor_id=v) for u, v in links],
+                update_conflicts=True,
+                unique_fields=["user", "visitor_id"],
+                update_fields=["last_seen_at"],
             )
 
-        # Remove anon list after merge
-        RecentlyViewedProduct.objects.filter(user__isnull=True, visitor_id=str(visitor_id)).delete()
+        outbox = [
+            AnalyticsOutbox(event_id=ev.id, provider=str(p))
+            for ev in inserted
+            for p in dict.fromkeys(ev.outbox_providers)
+        ]
+        if outbox:
+            AnalyticsOutbox.objects.bulk_create(outbox, ignore_conflicts=True)
+
+    # Recently viewed is refreshed for every product view, duplicates included.
+    views = [
+        (_user_id(ev), ev.visitor_id, int(ev.object_id), ev.occurred_at)
+        for ev in events
+        if ev.name == AnalyticsEvent.Name.PRODUCT_VIEW and ev.object_type == "product" and ev.object_id is not None
+    ]
+    if views:
+        try:
+            record_recently_viewed_products(views)
+        except Exception:
+            pass
 
-        # Enforce cap on user
-        ids_to_keep = list(
-            RecentlyViewedProduct.objects.filter(user=user)
-            .order_by("-last_viewed_at")
-            .values_list("id", flat=True)[:max_items]
-        )
-        RecentlyViewedProduct.objects.filter(user=user).exclude(id__in=ids_to_keep).delete()
+    return len(inserted)
 
 
 def track_event(
@@ -157,63 +316,48 @@ def track_event(
     language_code: str = "",
     outbox_providers: list[str] | None = None,
 ):
+    """Record an analytics event without writing to the DB on the request path.
+
+    The event is handed to the in-process buffer (see `analytics.buffer`) once the
+    surrounding transaction commits; with `ANALYTICS_BUFFER_ENABLED=False` it is
+    written synchronously. Returns the (possibly not yet stored) event data.
+    """
     now = timezone.now()
     payload = payload or {}
 
     visitor_id = _get_visitor_id_from_request(request)
-    user = _get_user_from_request(request)
+    user_id = _get_user_id_from_request(request)
 
-    raw_key = f"{name}:u:{getattr(user, 'id', 0)}:v:{visitor_id}:o:{object_type}:{object_id}:cc:{country_code}:ch:{channel}:lc:{language_code}"
+    raw_key = f"{name}:u:{user_id or 0}:v:{visitor_id}:o:{object_type}:{object_id}:cc:{country_code}:ch:{channel}:lc:{language_code}"
 
     if name == AnalyticsEvent.Name.PRODUCT_VIEW:
         w = _product_view_window_index(now)
         raw_key = raw_key + f":w:{w}"
     elif name == AnalyticsEvent.Name.PURCHASE and object_type == "order" and object_id is not None:
-        raw_key = f"purchase:u:{getattr(user, 'id', 0)}:order:{int(object_id)}"
-
-    idempotency_key = _sha256(raw_key)
-
-    try:
-        ev = AnalyticsEvent.objects.create(
-            name=name,
-            occurred_at=now,
-            user=user,
-            visitor_id=visitor_id,
-            object_type=(object_type or ""),
-            object_id=object_id,
-            country_code=(country_code or ""),
-            channel=(channel or ""),
-            language_code=(language_code or ""),
-            payload=payload,
-            idempotency_key=idempotency_key,
-        )
-    except IntegrityError:
-        ev = None
-
-    if name == AnalyticsEvent.Name.PRODUCT_VIEW and object_type == "product" and object_id is not None:
-        try:
-            record_recently_viewed_product(request=request, product_id=int(object_id), now=now)
-        except Exception:
-            pass
-
-    if ev is None:
-        return None
-
-    if user is not None and visitor_id:
-        try:
-            VisitorLink.objects.update_or_create(
-                user=user,
-                visitor_id=visitor_id,
-                defaults={},
-            )
-        except Exception:
-            pass
-
-    providers = outbox_providers or []
-    for p in providers:
-        try:
-            AnalyticsOutbox.objects.get_or_create(event=ev, provider=str(p))
-        except Exception:
-            pass
-
+        raw_key = f"purchase:u:{user_id or 0}:order:{int(object_id)}"
+
+    ev = TrackedEvent(
+        id=uuid.uuid4(),
+        name=name,
+        occurred_at=now,
+        user_id=user_id,
+        visitor_id=visitor_id,
+        object_type=(object_type or ""),
+        object_id=object_id,
+        country_code=(country_code or ""),
+        channel=(channel or ""),
+        language_code=(language_code or ""),
+        payload=payload,
+        idempotency_key=_sha256(raw_key),
+        outbox_providers=[str(p) for p in (outbox_providers or [])],
+    )
+
+    if not getattr(settings, "ANALYTICS_BUFFER_ENABLED", True):
+        write_tracked_events([ev])
+        return ev
+
+    from .buffer import get_event_buffer
+
+    buffer = get_event_buffer()
+    transaction.on_commit(lambda: buffer.put(ev))
     return ev
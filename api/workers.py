@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def _init_django_worker(settings_module: str) -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+
+    django.setup()
+
+
+def django_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool for management commands; every worker boots its own Django.
+
+    Uses the `spawn` start method so children never inherit the parent's open DB
+    connections (each worker opens its own on first query).
+    """
+    connections.close_all()
+    settings_module = os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")
+    return ProcessPoolExecutor(
+        max_workers=max(1, int(max_workers)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_django_worker,
+        initargs=(settings_module,),
+    )
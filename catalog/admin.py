@@ -24,6 +24,8 @@ from .models import (
     ProductFeatureValue,
     ProductGroup,
     ProductImage,
+    ImageRenditionJob,
+    ImageRegenerationRun,
     ProductOptionType,
     TaxClass,
     TaxRate,
@@ -31,6 +33,7 @@ from .models import (
     VariantOptionValue,
     Warehouse,
     InventoryItem,
+    BackInStockNotificationJob,
     BackInStockSubscription,
     EnrichmentRule,
     EnrichmentRun,
@@ -88,7 +91,8 @@ class BrandAdmin(admin.ModelAdmin):
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 0
-    fields = ("image", "image_url", "alt_text", "sort_order")
+    fields = ("image", "image_url", "alt_text", "sort_order", "renditions_status")
+    readonly_fields = ("renditions_status",)
 
 
 class ProductFeatureValueInline(admin.TabularInline):
@@ -575,6 +579,38 @@ class BackInStockSubscriptionAdmin(admin.ModelAdmin):
     autocomplete_fields = ("product", "variant")
 
 
+@admin.register(BackInStockNotificationJob)
+class BackInStockNotificationJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "variant",
+        "product",
+        "channel",
+        "status",
+        "sent",
+        "failed",
+        "attempts",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "channel")
+    search_fields = ("variant__sku", "product__sku", "last_error")
+    raw_id_fields = ("product", "variant")
+    readonly_fields = (
+        "status",
+        "attempts",
+        "run_after",
+        "locked_at",
+        "last_error",
+        "last_subscription_id",
+        "sent",
+        "failed",
+        "created_at",
+        "updated_at",
+        "finished_at",
+    )
+
+
 class ContentBlockTranslationInline(admin.StackedInline):
     model = ContentBlockTranslation
     extra = 0
@@ -783,3 +819,58 @@ class EnrichmentMatchAdmin(admin.ModelAdmin):
         "extracted_value",
         "created_at",
     )
+
+
+@admin.register(ImageRenditionJob)
+class ImageRenditionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "product_image",
+        "status",
+        "attempts",
+        "run_after",
+        "locked_at",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("product_image__product__sku", "last_error")
+    raw_id_fields = ("product_image",)
+    readonly_fields = (
+        "status",
+        "attempts",
+        "run_after",
+        "locked_at",
+        "last_error",
+        "created_at",
+        "updated_at",
+    )
+    actions = ("requeue",)
+
+    def requeue(self, request, queryset):
+        from catalog.images import enqueue_renditions
+
+        count = enqueue_renditions(image_ids=list(queryset.values_list("product_image_id", flat=True)))
+        self.message_user(request, f"Requeued {count} job(s).")
+
+    requeue.short_description = "Requeue selected jobs"
+
+
+@admin.register(ImageRegenerationRun)
+class ImageRegenerationRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "processed",
+        "total",
+        "rendered",
+        "unchanged",
+        "failed",
+        "images_per_sec",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = [f.name for f in ImageRegenerationRun._meta.fields]
+
+    def images_per_sec(self, obj):
+        return f"{obj.images_per_sec:.2f}"
@@ -3,24 +3,32 @@ from __future__ import annotations
 from decimal import Decimal
 
 from django.conf import settings
-from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Min, Q, Sum, Value, When
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Min, Q, Value, When
 from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
-from django.contrib.auth import get_user_model
+from django.http import HttpResponseRedirect
 from django.utils import timezone
 from ninja import Router
 from ninja.errors import HttpError
 from ninja.pagination import PageNumberPagination, paginate
 
 from api.i18n import get_request_language_code
+from pricing.context import get_pricing_context
 from pricing.services import compute_vat, get_vat_rate
 from shipping.services import estimate_delivery_window
 
-from analytics.services import track_event
-from analytics.models import RecentlyViewedProduct
+from analytics.services import get_recently_viewed_product_ids, track_event
 
 from .content_blocks import get_content_blocks_for_product
+from .images import (
+    RenditionBusy,
+    ensure_srcset_rendition,
+    rendition_base_url,
+    srcset_for,
+    srcset_formats,
+    srcset_widths,
+)
 from .api_schemas import (
     BackInStockSubscribeIn,
     BackInStockSubscribeOut,
@@ -50,6 +58,7 @@ from .models import (
     Product,
     ProductFeatureValue,
     ProductGroup,
+    ProductImage,
     ProductOptionType,
     Variant,
     VariantOptionValue,
@@ -59,9 +68,6 @@ from promotions.services import apply_promo_to_unit_net
 router = Router(tags=["catalog"])
 
 
-User = get_user_model()
-
-
 def _money_out(*, currency: str, unit_net: Decimal, vat_rate: Decimal) -> MoneyOut:
     b = compute_vat(unit_net=Decimal(unit_net),
                     vat_rate=Decimal(vat_rate), qty=1)
@@ -140,42 +146,7 @@ def recently_viewed(
     limit_v = int(limit) if limit is not None else default_limit
     limit_v = max(1, min(100, limit_v))
 
-    user = None
-    u = getattr(request, "user", None)
-    if u is not None and getattr(u, "is_authenticated", False):
-        user = u
-    a = getattr(request, "auth", None)
-    if user is None and isinstance(a, User):
-        user = a
-    if user is None and a is not None and getattr(a, "is_authenticated", False):
-        user = a
-    if user is None:
-        try:
-            from accounts.jwt_utils import decode_token
-
-            cookie_name = getattr(settings, "AUTH_COOKIE_ACCESS_NAME", "access_token")
-            token = (request.COOKIES.get(cookie_name) or "").strip()
-            if token:
-                payload = decode_token(token)
-                if payload.get("type") == "access" and payload.get("sub"):
-                    user = User.objects.get(id=int(payload["sub"]), is_active=True)
-        except Exception:
-            user = None
-
-    try:
-        visitor_id = (request.COOKIES.get("vid") or "").strip()
-    except Exception:
-        visitor_id = ""
-
-    qs = RecentlyViewedProduct.objects.all()
-    if user is not None:
-        qs = qs.filter(user=user)
-    elif visitor_id:
-        qs = qs.filter(user__isnull=True, visitor_id=visitor_id)
-    else:
-        return []
-
-    ids = list(qs.order_by("-last_viewed_at").values_list("product_id", flat=True)[:limit_v])
+    ids = get_recently_viewed_product_ids(request=request, limit=limit_v)
     if not ids:
         return []
 
@@ -242,6 +213,8 @@ def recently_viewed(
         vat_cache[key] = Decimal(rate)
         return vat_cache[key]
 
+    customer_group_id = get_pricing_context(request).customer_group_id
+    rendition_base = rendition_base_url(request)
     out: list[ProductListOut] = []
     for p in ordered:
         list_net = Decimal(p._min_variant_price if getattr(p, "_min_variant_price", None) is not None else 0)
@@ -261,7 +234,7 @@ def recently_viewed(
             brand_id=p.brand_id,
             product_id=p.id,
             variant_id=None,
-            customer_group_id=None,
+            customer_group_id=customer_group_id,
             allow_additional_promotions=allow_additional_promotions,
             is_discounted_offer=is_discounted_offer,
         )
@@ -287,6 +260,7 @@ def recently_viewed(
                     "url": list_url,
                     "alt_text": img.alt_text,
                     "sort_order": img.sort_order,
+                    "srcset": srcset_for(img, square=True, base_url=rendition_base),
                 }
             )
             if len(images_out) >= 2:
@@ -580,18 +554,10 @@ def products(
             else qs.order_by("-_has_stock", "_is_discounted", "name", "id")
         )
     elif sort_v in {"best_selling", "-best_selling"}:
-        from checkout.models import Order
+        from analytics.rollups import sold_qty_expression
 
-        qs = qs.annotate(
-            _sold_qty=Coalesce(
-                Sum(
-                    "variants__order_lines__qty",
-                    filter=Q(variants__order_lines__order__status=Order.Status.PAID),
-                    output_field=IntegerField(),
-                ),
-                Value(0),
-            )
-        )
+        # Read from the pre-aggregated daily rollups instead of joining order lines.
+        qs = qs.annotate(_sold_qty=sold_qty_expression())
         qs = (
             qs.order_by("-_has_stock", "-_sold_qty", "name", "id")
             if sort_v == "best_selling"
@@ -659,6 +625,8 @@ def products(
         vat_cache[key] = Decimal(rate)
         return vat_cache[key]
 
+    customer_group_id = get_pricing_context(request).customer_group_id
+    rendition_base = rendition_base_url(request)
     out: list[ProductListOut] = []
     for p in qs:
         list_net = Decimal(p._min_variant_price if getattr(p, "_min_variant_price", None) is not None else 0)
@@ -682,7 +650,7 @@ def products(
             brand_id=p.brand_id,
             product_id=p.id,
             variant_id=None,
-            customer_group_id=None,
+            customer_group_id=customer_group_id,
             allow_additional_promotions=allow_additional_promotions,
             is_discounted_offer=is_discounted_offer,
         )
@@ -710,6 +678,7 @@ def products(
                     "url": list_url,
                     "alt_text": img.alt_text,
                     "sort_order": img.sort_order,
+                    "srcset": srcset_for(img, square=True, base_url=rendition_base),
                 }
             )
             if len(images_out) >= 2:
@@ -1094,6 +1063,41 @@ def back_in_stock_subscribe(request, payload: BackInStockSubscribeIn):
     return {"status": "ok"}
 
 
+def _image_rendition(image_id: int, width: int, fmt: str, *, square: bool):
+    if width not in srcset_widths() or fmt not in srcset_formats():
+        raise HttpError(404, "Rendition not configured")
+
+    fields = ("listing_avif", "listing_webp") if square else ("image_avif", "image_webp")
+    img = ProductImage.objects.filter(pk=image_id).only("id", "image", "srcset_files", *fields).first()
+    if img is None or not img.image:
+        raise HttpError(404, "Image not found")
+
+    try:
+        name = ensure_srcset_rendition(img, width=width, fmt=fmt, square=square)
+    except RenditionBusy:
+        # All render slots are busy: serve the stored rendition meanwhile (not cached by the browser).
+        fallback = getattr(img, f"{'listing' if square else 'image'}_{fmt}")
+        if not fallback:
+            raise HttpError(503, "Rendition is being generated, retry later")
+        return HttpResponseRedirect(fallback.url)
+    if not name:
+        raise HttpError(404, "Image not found")
+    storage = ProductImage._meta.get_field("image_avif").storage
+    return HttpResponseRedirect(storage.url(name))
+
+
+@router.get("/images/{image_id}/renditions/{width}/{fmt}")
+def product_image_rendition(request, image_id: int, width: int, fmt: str):
+    """Lazy srcset rendition: render on first request, store, redirect to the file."""
+    return _image_rendition(image_id, width, fmt, square=False)
+
+
+@router.get("/images/{image_id}/renditions/square/{width}/{fmt}")
+def product_image_square_rendition(request, image_id: int, width: int, fmt: str):
+    """Lazy 1:1 srcset rendition (listing crop)."""
+    return _image_rendition(image_id, width, fmt, square=True)
+
+
 @router.get("/products/{slug}", response=ProductDetailOut)
 def product_detail(
     request,
@@ -1156,6 +1160,7 @@ def product_detail(
     variants_qs = [v for v in product.variants.all() if v.is_active]
     variants_qs.sort(key=lambda v: (v.sku, v.id))
 
+    customer_group_id = get_pricing_context(request).customer_group_id
     variants: list[VariantOut] = []
     delivery_window_out = None
     best_delivery_min = None
@@ -1228,7 +1233,7 @@ def product_detail(
             brand_id=product.brand_id,
             product_id=product.id,
             variant_id=v.id,
-            customer_group_id=None,
+            customer_group_id=customer_group_id,
             allow_additional_promotions=bool(getattr(best_offer, "allow_additional_promotions", False)) if best_offer else False,
             is_discounted_offer=is_discounted_offer,
         )
@@ -1303,6 +1308,7 @@ def product_detail(
         language_code=language_code,
         now=timezone.now().date(),
     )
+    rendition_base = rendition_base_url(request)
 
     return {
         "id": product.id,
@@ -1335,6 +1341,7 @@ def product_detail(
                 "url": img.url,
                 "alt_text": img.alt_text,
                 "sort_order": img.sort_order,
+                "srcset": srcset_for(img, base_url=rendition_base),
             }
             for img in images
             if img.url
@@ -46,12 +46,20 @@ class CategoryRefOut(Schema):
     name: str
 
 
+class ProductImageSrcOut(Schema):
+    width: int
+    avif_url: str | None = None
+    webp_url: str | None = None
+
+
 class ProductImageOut(Schema):
     avif_url: str | None = None
     webp_url: str | None = None
     url: str
     alt_text: str
     sort_order: int
+    # Responsive renditions, ascending by width (for `srcset="<url> <width>w, ..."`).
+    srcset: list[ProductImageSrcOut] = []
 
 
 class VariantOptionOut(Schema):
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.services import TemplatedEmail, send_templated_emails
+
+from .models import BackInStockNotificationJob, BackInStockSubscription, Product, Variant
+
+
+TEMPLATE_KEY = "catalog_back_in_stock"
+
+
+def _stale_lock_after() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "BACK_IN_STOCK_LOCK_SECONDS", 600) or 600))
+
+
+def _chunk_size() -> int:
+    return max(1, int(getattr(settings, "BACK_IN_STOCK_CHUNK_SIZE", 500) or 500))
+
+
+def _waiting_subscriptions(*, variant_id: int | None, product_id: int | None, channel: str):
+    target = Q()
+    if variant_id:
+        target |= Q(variant_id=variant_id)
+    if product_id:
+        target |= Q(product_id=product_id)
+    return BackInStockSubscription.objects.filter(target, is_active=True, notified_at__isnull=True, channel=channel)
+
+
+def enqueue_back_in_stock_job(*, variant_id: int | None, product_id: int | None, channel: str):
+    """Queue a fan-out for a restock; an identical job that has not started yet is reused."""
+    if variant_id is None and product_id is None:
+        return None
+    # Most restocks (e.g. supplier stock imports) have nobody waiting; don't create empty jobs.
+    if not _waiting_subscriptions(variant_id=variant_id, product_id=product_id, channel=channel).exists():
+        return None
+    job = BackInStockNotificationJob.objects.filter(
+        variant_id=variant_id,
+        product_id=product_id,
+        channel=channel,
+        status=BackInStockNotificationJob.Status.PENDING,
+    ).first()
+    if job is None:
+        job = BackInStockNotificationJob.objects.create(variant_id=variant_id, product_id=product_id, channel=channel)
+
+    if not getattr(settings, "BACK_IN_STOCK_ASYNC", True):
+        process_back_in_stock_job(job.id)
+    return job
+
+
+def claim_back_in_stock_jobs(*, batch_size: int) -> list[int]:
+    """Lock a batch of due jobs (pending, or processing with an expired lock)."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            BackInStockNotificationJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=BackInStockNotificationJob.Status.PENDING, run_after__lte=now)
+                | Q(status=BackInStockNotificationJob.Status.PROCESSING, locked_at__lt=now - _stale_lock_after())
+            )
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[: max(1, int(batch_size))]
+        )
+        if ids:
+            BackInStockNotificationJob.objects.filter(id__in=ids).update(
+                status=BackInStockNotificationJob.Status.PROCESSING,
+                locked_at=now,
+                updated_at=now,
+            )
+    return ids
+
+
+@dataclass(frozen=True)
+class BackInStockJobResult:
+    job_id: int
+    ok: bool
+    sent: int = 0
+    failed: int = 0
+    error: str = ""
+
+
+def _email_context(job: BackInStockNotificationJob) -> dict:
+    variant = Variant.objects.select_related("product").filter(pk=job.variant_id).first() if job.variant_id else None
+    product = variant.product if variant is not None else None
+    if product is None and job.product_id:
+        product = Product.objects.filter(pk=job.product_id).first()
+    return {
+        "product_name": getattr(product, "name", "") if product else "",
+        "product_slug": getattr(product, "slug", "") if product else "",
+        "product_sku": getattr(product, "sku", "") if product else "",
+        "variant_sku": getattr(variant, "sku", "") if variant else "",
+        "channel": job.channel,
+    }
+
+
+def process_back_in_stock_job(
+    job_id: int,
+    *,
+    max_attempts: int = 5,
+    chunk_size: int | None = None,
+    connection=None,
+) -> BackInStockJobResult:
+    """Email all waiting subscribers of one restock, `chunk_size` subscriptions at a time.
+
+    Each chunk is rendered against one compiled template and sent over
+    `connection` (reused across chunks and jobs when given). Notified
+    subscriptions and the job checkpoint are updated in bulk per chunk, so an
+    interrupted job resumes after the last finished chunk.
+    """
+    job = BackInStockNotificationJob.objects.filter(id=job_id).first()
+    if job is None:
+        return BackInStockJobResult(job_id=job_id, ok=False, error="missing job")
+
+    chunk_size = max(1, int(chunk_size or _chunk_size()))
+    job.attempts += 1
+    sent = failed = 0
+    try:
+        subscriptions = _waiting_subscriptions(
+            variant_id=job.variant_id, product_id=job.product_id, channel=job.channel
+        )
+        context = _email_context(job)
+
+        while True:
+            chunk = list(
+                subscriptions.filter(id__gt=job.last_subscription_id)
+                .order_by("id")
+                .values_list("id", "email", "language_code")[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            results = send_templated_emails(
+                template_key=TEMPLATE_KEY,
+                messages=[TemplatedEmail(to_email=email, context=context, language_code=lang or None) for _, email, lang in chunk],
+                connection=connection,
+            )
+            ok_ids = [sub_id for (sub_id, _, _), result in zip(chunk, results) if result.ok]
+            now = timezone.now()
+            with transaction.atomic():
+                if ok_ids:
+                    BackInStockSubscription.objects.filter(id__in=ok_ids).update(notified_at=now, is_active=False)
+                job.last_subscription_id = chunk[-1][0]
+                job.sent += len(ok_ids)
+                job.failed += len(chunk) - len(ok_ids)
+                job.locked_at = now  # heartbeat: keeps the lock fresh on long fan-outs
+                job.save(update_fields=["last_subscription_id", "sent", "failed", "locked_at", "attempts", "updated_at"])
+            sent += len(ok_ids)
+            failed += len(chunk) - len(ok_ids)
+    except Exception as exc:
+        error = str(exc)[:2000] or exc.__class__.__name__
+        if job.attempts >= max_attempts:
+            job.status = BackInStockNotificationJob.Status.FAILED
+        else:
+            job.status = BackInStockNotificationJob.Status.PENDING
+            job.run_after = timezone.now() + timedelta(minutes=2 ** job.attempts)
+        job.locked_at = None
+        job.last_error = error
+        job.save(update_fields=["status", "attempts", "run_after", "locked_at", "last_error", "updated_at"])
+        return BackInStockJobResult(job_id=job_id, ok=False, sent=sent, failed=failed, error=error)
+
+    job.status = BackInStockNotificationJob.Status.DONE
+    job.locked_at = None
+    job.last_error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "attempts", "locked_at", "last_error", "finished_at", "updated_at"])
+    return BackInStockJobResult(job_id=job_id, ok=True, sent=sent, failed=failed)
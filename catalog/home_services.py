@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
-from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, Min, Q, Sum, Value, When
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, Min, Q, Value, When
 from django.db.models.functions import Coalesce
 from ninja.errors import HttpError
 
@@ -10,6 +10,7 @@ from pricing.services import compute_vat, get_vat_rate
 from promotions.services import apply_promo_to_unit_net
 
 from .api_schemas import MoneyOut, ProductListOut
+from .images import srcset_for
 from .models import Brand, Category, InventoryItem, Product, ProductGroup
 
 
@@ -80,6 +81,7 @@ def get_products_by_slugs_for_grid(
     channel: str,
     product_slugs: list[str],
     in_stock_only: bool = True,
+    rendition_base: str = "",
 ) -> list[ProductListOut]:
     slugs = [(s or "").strip() for s in (product_slugs or [])]
     slugs = [s for s in slugs if s]
@@ -215,6 +217,7 @@ def get_products_by_slugs_for_grid(
                     "url": list_url,
                     "alt_text": img.alt_text,
                     "sort_order": img.sort_order,
+                    "srcset": srcset_for(img, square=True, base_url=rendition_base),
                 }
             )
             if len(images_out) >= 2:
@@ -255,6 +258,7 @@ def get_products_for_grid(
     in_stock_only: bool = False,
     limit: int = 12,
     exclude_product_ids: set[int] | None = None,
+    rendition_base: str = "",
 ) -> list[ProductListOut]:
     country_code = (country_code or "").strip().upper()
     if len(country_code) != 2:
@@ -392,18 +396,10 @@ def get_products_for_grid(
             else qs.order_by("-_has_stock", "_is_discounted", "name", "id")
         )
     elif sort_v in {"best_selling", "-best_selling"}:
-        from checkout.models import Order
+        from analytics.rollups import sold_qty_expression
 
-        qs = qs.annotate(
-            _sold_qty=Coalesce(
-                Sum(
-                    "variants__order_lines__qty",
-                    filter=Q(variants__order_lines__order__status=Order.Status.PAID),
-                    output_field=IntegerField(),
-                ),
-                Value(0),
-            )
-        )
+        # Read from the pre-aggregated daily rollups instead of joining order lines.
+        qs = qs.annotate(_sold_qty=sold_qty_expression())
         qs = (
             qs.order_by("-_has_stock", "-_sold_qty", "name", "id")
             if sort_v == "best_selling"
@@ -475,6 +471,7 @@ def get_products_for_grid(
                     "url": list_url,
                     "alt_text": img.alt_text,
                     "sort_order": img.sort_order,
+                    "srcset": srcset_for(img, square=True, base_url=rendition_base),
                 }
             )
             if len(images_out) >= 2:
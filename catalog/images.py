@@ -0,0 +1,635 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ImageRenditionJob, ProductImage
+
+
+RENDITION_FIELDS = ("image_avif", "image_webp", "listing_avif", "listing_webp")
+
+# Bump when the rendering code changes in a way that should invalidate stored
+# renditions even though the settings did not change.
+RENDITIONS_VERSION = 1
+
+
+SRCSET_ENCODERS = {
+    "avif": ("AVIF", {"quality": 60}),
+    "webp": ("WEBP", {"quality": 75, "method": 4}),
+}
+
+
+def srcset_widths() -> list[int]:
+    return sorted({int(w) for w in (getattr(settings, "IMAGE_SRCSET_WIDTHS", None) or []) if int(w) > 0})
+
+
+def srcset_formats() -> list[str]:
+    return [f for f in (getattr(settings, "IMAGE_SRCSET_FORMATS", None) or []) if f in SRCSET_ENCODERS]
+
+
+def srcset_key(width: int, fmt: str, *, square: bool = False) -> str:
+    return f"{'sq' if square else 'w'}{int(width)}.{fmt}"
+
+
+class RenditionBusy(RuntimeError):
+    """Every lazy rendition slot of this process is in use."""
+
+
+_render_slots: threading.BoundedSemaphore | None = None
+_render_slots_lock = threading.Lock()
+
+
+def _render_slot() -> threading.BoundedSemaphore:
+    global _render_slots
+    with _render_slots_lock:
+        if _render_slots is None:
+            _render_slots = threading.BoundedSemaphore(
+                max(1, int(getattr(settings, "IMAGE_SRCSET_RENDER_CONCURRENCY", 2) or 2))
+            )
+        return _render_slots
+
+
+def rendition_params() -> dict:
+    medium_edge = int(getattr(settings, "MEDIUM_SIZE", 300) or 300)
+    params = {
+        "medium_edge": medium_edge,
+        "listing_edge": int(getattr(settings, "LISTING_IMAGE_SIZE", medium_edge) or medium_edge),
+        "listing_tol": int(getattr(settings, "LISTING_TRIM_TOLERANCE", 18) or 18),
+    }
+    if getattr(settings, "IMAGE_SRCSET_EAGER", False):
+        params["srcset_widths"] = srcset_widths()
+        params["srcset_formats"] = srcset_formats()
+    return params
+
+
+def rendition_signature() -> str:
+    """Hash of everything (besides the original) that affects rendition output."""
+    payload = json.dumps({"version": RENDITIONS_VERSION, **rendition_params()}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _background_rgb(im) -> tuple[int, int, int]:
+    w, h = im.size
+    corners = [
+        im.getpixel((0, 0)),
+        im.getpixel((w - 1, 0)),
+        im.getpixel((0, h - 1)),
+        im.getpixel((w - 1, h - 1)),
+    ]
+    return (
+        sum(c[0] for c in corners) // 4,
+        sum(c[1] for c in corners) // 4,
+        sum(c[2] for c in corners) // 4,
+    )
+
+
+def _pad_bbox(bbox: tuple[int, int, int, int], *, w: int, h: int, pad: int = 2) -> tuple[int, int, int, int] | None:
+    # `bbox` holds inclusive pixel bounds; expand a little to avoid over-trimming.
+    x0, y0, x1, y1 = bbox
+    x0 = max(0, x0 - pad)
+    y0 = max(0, y0 - pad)
+    x1 = min(w - 1, x1 + pad)
+    y1 = min(h - 1, y1 + pad)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 + 1, y1 + 1)
+
+
+def foreground_bbox(im, *, tol: int = 18) -> tuple[int, int, int, int] | None:
+    """Inclusive bounds of pixels differing from the corner background by > `tol`.
+
+    Runs entirely inside Pillow: per-channel absolute difference against a solid
+    background, zero every band value <= `tol`, then `getbbox()` (which treats
+    a pixel as foreground when any band is non-zero).
+    """
+    from PIL import Image, ImageChops
+
+    bg = Image.new("RGB", im.size, _background_rgb(im))
+    diff = ImageChops.difference(im, bg)
+    table = [255 if v > tol else 0 for v in range(256)]
+    bbox = diff.point(table * 3).getbbox()
+    if bbox is None:
+        return None
+    left, upper, right, lower = bbox
+    return (left, upper, right - 1, lower - 1)
+
+
+def _trim_whitespace(im, *, tol: int = 18):
+    """Trim near-solid background borders.
+
+    Heuristic: take corner pixel average as background and crop to pixels
+    that differ from it by more than `tol`.
+    """
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+
+    w, h = im.size
+    if w < 10 or h < 10:
+        return im
+
+    bbox = foreground_bbox(im, tol=tol)
+    if bbox is None:
+        return im
+
+    box = _pad_bbox(bbox, w=w, h=h)
+    if box is None:
+        return im
+    return im.crop(box)
+
+
+def _fit_pad_square(im, *, edge: int, bg=(255, 255, 255)):
+    from PIL import Image
+
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+    w, h = im.size
+    if w <= 0 or h <= 0:
+        return im
+
+    scale = min(edge / w, edge / h)
+    new_w = max(1, int(round(w * scale)))
+    new_h = max(1, int(round(h * scale)))
+    resized = im.resize((new_w, new_h), resample=Image.LANCZOS)
+
+    canvas = Image.new("RGB", (edge, edge), color=bg)
+    left = (edge - new_w) // 2
+    top = (edge - new_h) // 2
+    canvas.paste(resized, (left, top))
+    return canvas
+
+
+def _encode(im, *, format: str, **params) -> bytes:
+    buf = BytesIO()
+    im.save(buf, format=format, **params)
+    return buf.getvalue()
+
+
+def build_renditions(fp, *, stem: str) -> dict[str, tuple[str, bytes]]:
+    """Decode the original and encode every derived rendition.
+
+    Returns {field_name: (filename, content)}. Pure CPU work without DB access,
+    so it is safe to run in worker processes.
+    """
+    from PIL import Image
+    import pillow_avif  # noqa: F401
+
+    img = Image.open(fp)
+
+    # Normalize mode (AVIF/WEBP require RGB for most cases)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    out: dict[str, tuple[str, bytes]] = {}
+    params = rendition_params()
+
+    # Create medium renditions (used by listing). Keep originals as-is.
+    medium_edge = params["medium_edge"]
+    rendition = img.copy()
+    if max(rendition.size) > medium_edge:
+        rendition.thumbnail((medium_edge, medium_edge))
+
+    out["image_avif"] = (
+        f"{stem}_m{medium_edge}.avif",
+        _encode(rendition, format="AVIF", quality=60),
+    )
+    out["image_webp"] = (
+        f"{stem}_m{medium_edge}.webp",
+        _encode(rendition, format="WEBP", quality=75, method=6),
+    )
+
+    # Listing square renditions: trim supplier whitespace then fit+pad to 1:1.
+    listing_edge = params["listing_edge"]
+    listing_tol = params["listing_tol"]
+    trimmed = _trim_whitespace(img.copy(), tol=listing_tol)
+    square = _fit_pad_square(trimmed, edge=listing_edge, bg=(255, 255, 255))
+
+    out["listing_avif"] = (
+        f"{stem}_sq{listing_edge}.avif",
+        _encode(square, format="AVIF", quality=60),
+    )
+    out["listing_webp"] = (
+        f"{stem}_sq{listing_edge}.webp",
+        _encode(square, format="WEBP", quality=78, method=6),
+    )
+    return out
+
+
+def build_srcset(
+    fp, *, stem: str, sizes: list[tuple[int, str]], square: bool = False
+) -> dict[str, tuple[str, bytes]]:
+    """Encode responsive renditions for (width, format) pairs.
+
+    The original is decoded once and downscaled from the largest width to the
+    smallest; widths above the original are served at the original size. With
+    `square` the image is trimmed and padded to 1:1 like the listing renditions.
+    Returns {srcset_key: (filename, content)}.
+    """
+    from PIL import Image
+    import pillow_avif  # noqa: F401
+
+    img = Image.open(fp)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    out: dict[str, tuple[str, bytes]] = {}
+    if square:
+        trimmed = _trim_whitespace(img, tol=rendition_params()["listing_tol"])
+        edge = max(trimmed.size)
+        for width in sorted({w for w, _ in sizes}, reverse=True):
+            current = _fit_pad_square(trimmed, edge=min(width, edge), bg=(255, 255, 255))
+            for fmt in [f for w, f in sizes if w == width]:
+                pil_format, params = SRCSET_ENCODERS[fmt]
+                out[srcset_key(width, fmt, square=True)] = (
+                    f"{stem}_sq{width}.{fmt}",
+                    _encode(current, format=pil_format, **params),
+                )
+        return out
+
+    current = img
+    for width in sorted({w for w, _ in sizes}, reverse=True):
+        if current.width > width:
+            height = max(1, int(round(current.height * width / current.width)))
+            current = current.resize((width, height), resample=Image.LANCZOS)
+        for fmt in [f for w, f in sizes if w == width]:
+            pil_format, params = SRCSET_ENCODERS[fmt]
+            out[srcset_key(width, fmt)] = (
+                f"{stem}_w{width}.{fmt}",
+                _encode(current, format=pil_format, **params),
+            )
+    return out
+
+
+def _save_srcset_files(image: ProductImage, srcset: dict[str, tuple[str, bytes]]) -> dict[str, str]:
+    storage = ProductImage._meta.get_field("image_avif").storage
+    folder = timezone.now().strftime("product-images/srcset/%Y/%m/") + str(image.pk)
+    return {
+        key: storage.save(f"{folder}/{filename}", ContentFile(data))
+        for key, (filename, data) in srcset.items()
+    }
+
+
+def _delete_srcset_files(names) -> None:
+    storage = ProductImage._meta.get_field("image_avif").storage
+    for name in names:
+        storage.delete(name)
+
+
+def _image_stem(image: ProductImage) -> str:
+    base_name = image.image.name.rsplit("/", 1)[-1]
+    return base_name.rsplit(".", 1)[0] if "." in base_name else base_name
+
+
+def ensure_srcset_rendition(image: ProductImage, *, width: int, fmt: str, square: bool = False) -> str | None:
+    """Return the storage name of one srcset rendition, rendering it on first use.
+
+    Used by the lazy rendition endpoint. At most IMAGE_SRCSET_RENDER_CONCURRENCY
+    renders run per process; when all slots stay busy for
+    IMAGE_SRCSET_RENDER_WAIT_SECONDS, `RenditionBusy` is raised. The file is
+    recorded in `srcset_files` under a row lock; if a concurrent request got
+    there first, its file is kept and ours is discarded.
+    """
+    key = srcset_key(width, fmt, square=square)
+    existing = (image.srcset_files or {}).get(key)
+    if existing:
+        return existing
+    if not image.image:
+        return None
+
+    slots = _render_slot()
+    if not slots.acquire(timeout=max(0.0, float(getattr(settings, "IMAGE_SRCSET_RENDER_WAIT_SECONDS", 5) or 0))):
+        raise RenditionBusy(key)
+    try:
+        source_name = image.image.name
+        srcset = build_srcset(
+            BytesIO(read_original(image)), stem=_image_stem(image), sizes=[(width, fmt)], square=square
+        )
+        saved = _save_srcset_files(image, srcset)
+    finally:
+        slots.release()
+
+    with transaction.atomic():
+        row = (
+            ProductImage.objects.select_for_update()
+            .filter(pk=image.pk, image=source_name)
+            .only("id", "srcset_files")
+            .first()
+        )
+        if row is None:
+            _delete_srcset_files(saved.values())
+            return None
+        files = dict(row.srcset_files or {})
+        if files.get(key):
+            _delete_srcset_files(saved.values())
+        else:
+            files[key] = saved[key]
+            ProductImage.objects.filter(pk=row.pk).update(srcset_files=files)
+
+    image.srcset_files = files
+    return files[key]
+
+
+def rendition_base_url(request=None) -> str:
+    """Absolute URL of the catalog API (`API_PUBLIC_URL`, else the request's host)."""
+    path = f"/{settings.API_BASE_PATH.strip('/')}/v1/catalog"
+    public = (getattr(settings, "API_PUBLIC_URL", "") or "").rstrip("/")
+    if public:
+        return public + path
+    if request is not None:
+        return request.build_absolute_uri(path)
+    return path
+
+
+def srcset_for(image: ProductImage, *, square: bool = False, base_url: str = "") -> list[dict]:
+    """`srcset`-ready entries for the API: one dict per configured width.
+
+    Rendered files are linked directly; missing ones point to the lazy
+    rendition endpoint under `base_url` (see `rendition_base_url`), which
+    renders, stores and redirects on first hit. `square` gives the 1:1
+    renditions that match the listing `url`.
+    """
+    if not image.image:
+        return []
+    formats = srcset_formats()
+    files = image.srcset_files or {}
+    storage = ProductImage._meta.get_field("image_avif").storage
+    base = f"{base_url or rendition_base_url()}/images/{image.pk}/renditions{'/square' if square else ''}"
+
+    out = []
+    for width in srcset_widths():
+        entry = {"width": width}
+        for fmt in ("avif", "webp"):
+            if fmt not in formats:
+                entry[f"{fmt}_url"] = None
+                continue
+            name = files.get(srcset_key(width, fmt, square=square))
+            entry[f"{fmt}_url"] = storage.url(name) if name else f"{base}/{width}/{fmt}"
+        out.append(entry)
+    return out
+
+
+def read_original(image: ProductImage) -> bytes:
+    image.image.open("rb")
+    try:
+        return image.image.read()
+    finally:
+        image.image.close()
+
+
+def render_product_image(image: ProductImage, *, content: bytes | None = None) -> bool:
+    """Generate and store renditions for `image`.
+
+    Files are written first, then the row is updated only if it still points to
+    the same original (a newer upload wins; its own job renders it). Returns
+    False when there was nothing to render or the original changed meanwhile.
+    """
+    if not image.image:
+        return False
+
+    source_name = image.image.name
+    stem = _image_stem(image)
+
+    if content is None:
+        content = read_original(image)
+    source_hash = hashlib.sha256(content).hexdigest()
+    signature = rendition_signature()
+    renditions = build_renditions(BytesIO(content), stem=stem)
+
+    srcset_files: dict[str, str] = {}
+    if getattr(settings, "IMAGE_SRCSET_EAGER", False):
+        sizes = [(w, f) for w in srcset_widths() for f in srcset_formats()]
+        if sizes:
+            srcset_files = _save_srcset_files(
+                image,
+                {
+                    **build_srcset(BytesIO(content), stem=stem, sizes=sizes),
+                    **build_srcset(BytesIO(content), stem=stem, sizes=sizes, square=True),
+                },
+            )
+
+    updates: dict[str, str] = {}
+    for field_name, (filename, data) in renditions.items():
+        field = ProductImage._meta.get_field(field_name)
+        name = field.generate_filename(image, filename)
+        updates[field_name] = field.storage.save(name, ContentFile(data), max_length=field.max_length)
+
+    updated = ProductImage.objects.filter(pk=image.pk, image=source_name).update(
+        renditions_status=ProductImage.RenditionStatus.READY,
+        renditions_updated_at=timezone.now(),
+        source_hash=source_hash,
+        renditions_signature=signature,
+        **({"srcset_files": srcset_files} if srcset_files else {}),
+        **updates,
+    )
+    if not updated:
+        for field_name, name in updates.items():
+            ProductImage._meta.get_field(field_name).storage.delete(name)
+        _delete_srcset_files(srcset_files.values())
+        return False
+
+    for field_name, name in updates.items():
+        setattr(image, field_name, name)
+    image.renditions_status = ProductImage.RenditionStatus.READY
+    image.source_hash = source_hash
+    image.renditions_signature = signature
+    if srcset_files:
+        image.srcset_files = srcset_files
+    return True
+
+
+@dataclass(frozen=True)
+class RegenerateResult:
+    image_id: int
+    status: str  # rendered | unchanged | skipped | failed
+    error: str = ""
+
+
+def regenerate_product_image(image_id: int, force: bool = False) -> RegenerateResult:
+    """Bulk re-render entry point (runs inside a process pool child).
+
+    Renditions are left alone when they are READY and were built from the same
+    original bytes with the same rendition settings, unless `force` is set.
+    """
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return RegenerateResult(image_id=image_id, status="skipped")
+
+    try:
+        content = read_original(image)
+        if (
+            not force
+            and image.renditions_status == ProductImage.RenditionStatus.READY
+            and image.renditions_signature == rendition_signature()
+            and image.source_hash == hashlib.sha256(content).hexdigest()
+            and all(getattr(image, f) for f in RENDITION_FIELDS)
+        ):
+            return RegenerateResult(image_id=image_id, status="unchanged")
+
+        if not render_product_image(image, content=content):
+            return RegenerateResult(image_id=image_id, status="skipped")
+    except Exception as exc:
+        return RegenerateResult(image_id=image_id, status="failed", error=str(exc)[:2000] or exc.__class__.__name__)
+    return RegenerateResult(image_id=image_id, status="rendered")
+
+
+def schedule_renditions(image: ProductImage) -> None:
+    """Queue rendition generation for a freshly stored original.
+
+    With `IMAGE_RENDITIONS_ASYNC=False` (dev without a worker) renditions are
+    rendered inline after the transaction commits.
+    """
+    image_id = image.pk
+
+    if not getattr(settings, "IMAGE_RENDITIONS_ASYNC", True):
+        def _render():
+            obj = ProductImage.objects.filter(pk=image_id).first()
+            if obj is not None:
+                try:
+                    render_product_image(obj)
+                except Exception as exc:
+                    ProductImage.objects.filter(pk=image_id).update(
+                        renditions_status=ProductImage.RenditionStatus.FAILED,
+                    )
+                    ImageRenditionJob.objects.update_or_create(
+                        product_image_id=image_id,
+                        defaults={"status": ImageRenditionJob.Status.FAILED, "last_error": str(exc)[:2000]},
+                    )
+
+        transaction.on_commit(_render)
+        return
+
+    transaction.on_commit(lambda: enqueue_renditions(image_ids=[image_id]))
+
+
+def enqueue_renditions(*, image_ids: list[int]) -> int:
+    """(Re)queue rendition jobs; one job row per ProductImage."""
+    if not image_ids:
+        return 0
+    now = timezone.now()
+    jobs = [
+        ImageRenditionJob(
+            product_image_id=int(i),
+            status=ImageRenditionJob.Status.PENDING,
+            attempts=0,
+            run_after=now,
+            locked_at=None,
+            last_error="",
+        )
+        for i in image_ids
+    ]
+    ImageRenditionJob.objects.bulk_create(
+        jobs,
+        update_conflicts=True,
+        unique_fields=["product_image"],
+        update_fields=["status", "attempts", "run_after", "locked_at", "last_error", "updated_at"],
+    )
+    ProductImage.objects.filter(id__in=image_ids).update(
+        renditions_status=ProductImage.RenditionStatus.PENDING
+    )
+    return len(jobs)
+
+
+def _stale_lock_after() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "IMAGE_RENDITION_LOCK_SECONDS", 600) or 600))
+
+
+def _max_attempts(max_attempts: int | None = None) -> int:
+    return max(1, int(max_attempts or getattr(settings, "IMAGE_RENDITION_MAX_ATTEMPTS", 5) or 5))
+
+
+def claim_rendition_jobs(*, batch_size: int, max_attempts: int | None = None) -> list[int]:
+    """Lock a batch of due jobs (pending, or processing with an expired lock).
+
+    The attempt is counted here, so a worker that dies on an image (and leaves
+    its lock to expire) uses it up too; expired jobs without attempts left are
+    marked FAILED instead of being claimed again.
+    """
+    now = timezone.now()
+    max_attempts = _max_attempts(max_attempts)
+    stale = Q(status=ImageRenditionJob.Status.PROCESSING, locked_at__lt=now - _stale_lock_after())
+    with transaction.atomic():
+        exhausted = list(
+            ImageRenditionJob.objects.select_for_update(skip_locked=True)
+            .filter(stale, attempts__gte=max_attempts)
+            .values_list("id", "product_image_id")
+        )
+        if exhausted:
+            ImageRenditionJob.objects.filter(id__in=[i for i, _ in exhausted]).update(
+                status=ImageRenditionJob.Status.FAILED,
+                locked_at=None,
+                last_error="Worker did not finish the job before its lock expired.",
+                updated_at=now,
+            )
+            ProductImage.objects.filter(id__in=[i for _, i in exhausted]).update(
+                renditions_status=ProductImage.RenditionStatus.FAILED
+            )
+
+        ids = list(
+            ImageRenditionJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ImageRenditionJob.Status.PENDING, run_after__lte=now) | stale)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[: max(1, int(batch_size))]
+        )
+        if ids:
+            ImageRenditionJob.objects.filter(id__in=ids).update(
+                status=ImageRenditionJob.Status.PROCESSING,
+                attempts=F("attempts") + 1,
+                locked_at=now,
+                updated_at=now,
+            )
+    return ids
+
+
+@dataclass(frozen=True)
+class RenditionJobResult:
+    job_id: int
+    ok: bool
+    error: str = ""
+
+
+def process_rendition_job(job_id: int, max_attempts: int | None = None) -> RenditionJobResult:
+    """Worker entry point (runs inside a process pool child).
+
+    A failed job is retried with backoff until it has used `max_attempts`
+    (IMAGE_RENDITION_MAX_ATTEMPTS), then it and the image are marked FAILED.
+    """
+    job = ImageRenditionJob.objects.select_related("product_image").filter(id=job_id).first()
+    if job is None:
+        return RenditionJobResult(job_id=job_id, ok=False, error="missing job")
+
+    try:
+        render_product_image(job.product_image)
+    except Exception as exc:
+        error = str(exc)[:2000] or exc.__class__.__name__
+        now = timezone.now()
+        failed = job.attempts >= _max_attempts(max_attempts)
+        # A re-upload during rendering resets the job to PENDING; don't overwrite that.
+        updated = ImageRenditionJob.objects.filter(id=job.id, status=ImageRenditionJob.Status.PROCESSING).update(
+            status=ImageRenditionJob.Status.FAILED if failed else ImageRenditionJob.Status.PENDING,
+            run_after=job.run_after if failed else now + timedelta(minutes=2 ** job.attempts),
+            locked_at=None,
+            last_error=error,
+            updated_at=now,
+        )
+        if updated and failed:
+            ProductImage.objects.filter(pk=job.product_image_id).update(
+                renditions_status=ProductImage.RenditionStatus.FAILED
+            )
+        return RenditionJobResult(job_id=job_id, ok=False, error=error)
+
+    ImageRenditionJob.objects.filter(id=job.id, status=ImageRenditionJob.Status.PROCESSING).update(
+        status=ImageRenditionJob.Status.DONE,
+        locked_at=None,
+        last_error="",
+        updated_at=timezone.now(),
+    )
+    return RenditionJobResult(job_id=job_id, ok=True)
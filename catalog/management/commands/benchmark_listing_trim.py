@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.images import _background_rgb, _pad_bbox, _trim_whitespace, foreground_bbox
+from catalog.models import ProductImage
+
+
+def _legacy_trim_box(im, *, tol: int):
+    """Previous per-pixel implementation (kept here only for comparison)."""
+    w, h = im.size
+    if w < 10 or h < 10:
+        return None
+
+    px = im.load()
+    bg = _background_rgb(im)
+
+    def is_fg(rgb):
+        return (
+            abs(int(rgb[0]) - int(bg[0])) > tol
+            or abs(int(rgb[1]) - int(bg[1])) > tol
+            or abs(int(rgb[2]) - int(bg[2])) > tol
+        )
+
+    x0, y0 = w, h
+    x1, y1 = 0, 0
+    any_fg = False
+    step_x = 1 if w <= 800 else max(1, w // 800)
+    step_y = 1 if h <= 800 else max(1, h // 800)
+    for y in range(0, h, step_y):
+        for x in range(0, w, step_x):
+            if is_fg(px[x, y]):
+                any_fg = True
+                if x < x0:
+                    x0 = x
+                if y < y0:
+                    y0 = y
+                if x > x1:
+                    x1 = x
+                if y > y1:
+                    y1 = y
+
+    if not any_fg:
+        return None
+    return _pad_bbox((x0, y0, x1, y1), w=w, h=h)
+
+
+def _synthetic_images(count: int):
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(42)
+    sizes = [(800, 800), (1200, 900), (2000, 2000), (3000, 2250), (4000, 3000)]
+    for i in range(count):
+        w, h = sizes[i % len(sizes)]
+        # Supplier-style packshot: off-white background, product somewhere inside.
+        bg = tuple(250 + rng.randint(0, 5) for _ in range(3))
+        im = Image.new("RGB", (w, h), bg)
+        draw = ImageDraw.Draw(im)
+        left = rng.randint(w // 10, w // 3)
+        top = rng.randint(h // 10, h // 3)
+        right = rng.randint(2 * w // 3, w - w // 10)
+        bottom = rng.randint(2 * h // 3, h - h // 10)
+        draw.ellipse((left, top, right, bottom), fill=(rng.randint(0, 200), rng.randint(0, 200), rng.randint(0, 200)))
+        draw.rectangle((left + 5, top + 5, left + (right - left) // 3, bottom - 5), fill=(30, 30, 30))
+        yield f"synthetic-{i}-{w}x{h}", im
+
+
+def _db_images(limit: int):
+    from PIL import Image
+
+    qs = ProductImage.objects.exclude(image="").exclude(image__isnull=True).order_by("-id")[:limit]
+    for img in qs:
+        try:
+            img.image.open("rb")
+            im = Image.open(img.image)
+            im.load()
+        except Exception:
+            continue
+        finally:
+            img.image.close()
+        yield f"image:{img.id}", im
+
+
+class Command(BaseCommand):
+    help = "Benchmark listing whitespace trimming: legacy per-pixel loop vs Pillow ImageChops bbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            choices=["synthetic", "db"],
+            default="synthetic",
+            help="Sample images: generated packshots or the newest ProductImage originals.",
+        )
+        parser.add_argument("--count", type=int, default=10)
+        parser.add_argument("--tolerance", type=int, default=18)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        count = int(options.get("count") or 10)
+        tol = int(options.get("tolerance") or 18)
+        repeat = max(1, int(options.get("repeat") or 3))
+        if count < 1:
+            raise CommandError("--count must be >= 1")
+
+        samples = _synthetic_images(count) if options.get("source") == "synthetic" else _db_images(count)
+
+        total_old = 0.0
+        total_new = 0.0
+        worst_delta = 0
+        n = 0
+        for label, im in samples:
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                old_box = _legacy_trim_box(im, tol=tol)
+            old_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                trimmed = _trim_whitespace(im, tol=tol)
+            new_ms = (time.perf_counter() - started) * 1000 / repeat
+
+            w, h = im.size
+            fg = foreground_bbox(im, tol=tol)
+            new_box = (_pad_bbox(fg, w=w, h=h) if fg else None) or (0, 0, w, h)
+            old_box = old_box or (0, 0, w, h)
+            assert trimmed.size == (new_box[2] - new_box[0], new_box[3] - new_box[1])
+            delta = max(abs(a - b) for a, b in zip(old_box, new_box))
+            worst_delta = max(worst_delta, delta)
+
+            total_old += old_ms
+            total_new += new_ms
+            n += 1
+            self.stdout.write(
+                f"{label}: legacy={old_ms:.1f}ms chops={new_ms:.1f}ms "
+                f"speedup={old_ms / max(new_ms, 0.001):.1f}x box_delta_px={delta}"
+            )
+
+        if not n:
+            raise CommandError("No sample images.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"images={n} avg_legacy={total_old / n:.1f}ms avg_chops={total_new / n:.1f}ms "
+                f"speedup={total_old / max(total_new, 0.001):.1f}x max_box_delta_px={worst_delta}"
+            )
+        )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from catalog.back_in_stock import claim_back_in_stock_jobs, process_back_in_stock_job
+
+
+class Command(BaseCommand):
+    help = "Send queued back-in-stock notifications (chunked fan-out over one mail connection)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed per poll.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Subscriptions per chunk (default settings.BACK_IN_STOCK_CHUNK_SIZE).",
+        )
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            default=False,
+            help="Keep polling the queue instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when the queue is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, int(options.get("batch_size") or 10))
+        max_attempts = max(1, int(options.get("max_attempts") or 5))
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 5.0))
+
+        jobs = sent = failed = 0
+        started = time.perf_counter()
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                job_ids = claim_back_in_stock_jobs(batch_size=batch_size)
+                if not job_ids:
+                    if not loop:
+                        break
+                    # Don't hold an idle SMTP session open between polls.
+                    connection.close()
+                    time.sleep(sleep_s)
+                    continue
+
+                for job_id in job_ids:
+                    result = process_back_in_stock_job(
+                        job_id,
+                        max_attempts=max_attempts,
+                        chunk_size=options.get("chunk_size"),
+                        connection=connection,
+                    )
+                    jobs += 1
+                    sent += result.sent
+                    failed += result.failed
+                    if not result.ok:
+                        self.stderr.write(f"job={result.job_id} error={result.error}")
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted; the job resumes after its last finished chunk once its lock expires.")
+        finally:
+            connection.close()
+
+        elapsed = max(0.001, time.perf_counter() - started)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done. jobs={jobs}, sent={sent}, failed={failed}, emails_per_sec={sent / elapsed:.2f}"
+            )
+        )
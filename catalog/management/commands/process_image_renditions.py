@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.workers import django_process_pool
+from catalog.images import claim_rendition_jobs, process_rendition_job
+
+
+class Command(BaseCommand):
+    help = "Process queued ProductImage rendition jobs (AVIF/WEBP) with a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker processes (default settings.IMAGE_RENDITION_WORKERS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=None,
+            help="Attempts before a job is marked failed (default settings.IMAGE_RENDITION_MAX_ATTEMPTS).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            default=False,
+            help="Keep polling the queue instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when the queue is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        workers = options.get("workers")
+        if workers is None:
+            workers = int(getattr(settings, "IMAGE_RENDITION_WORKERS", 2) or 1)
+        if workers < 1:
+            raise CommandError("--workers must be >= 1")
+        batch_size = max(1, int(options.get("batch_size") or 50))
+        max_attempts = max(1, int(options.get("max_attempts") or getattr(settings, "IMAGE_RENDITION_MAX_ATTEMPTS", 5) or 5))
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 5.0))
+
+        done = 0
+        failed = 0
+        started = time.perf_counter()
+
+        with django_process_pool(workers) as pool:
+            try:
+                while True:
+                    job_ids = claim_rendition_jobs(batch_size=batch_size, max_attempts=max_attempts)
+                    if not job_ids:
+                        if not loop:
+                            break
+                        time.sleep(sleep_s)
+                        continue
+
+                    for result in pool.map(process_rendition_job, job_ids, [max_attempts] * len(job_ids)):
+                        if result.ok:
+                            done += 1
+                        else:
+                            failed += 1
+                            self.stderr.write(f"job={result.job_id} error={result.error}")
+            except KeyboardInterrupt:
+                self.stderr.write("Interrupted; claimed jobs are retried after their lock expires.")
+
+        elapsed = max(0.001, time.perf_counter() - started)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done. rendered={done}, failed={failed}, images_per_sec={done / elapsed:.2f}"
+            )
+        )
@@ -1,49 +1,171 @@
 from __future__ import annotations
 
-from django.core.management.base import BaseCommand
+import time
 
-from catalog.models import ProductImage
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.workers import django_process_pool
+from catalog.images import regenerate_product_image, rendition_signature
+from catalog.models import ImageRegenerationRun, ProductImage
 
 
 class Command(BaseCommand):
-    help = "Regenerate square (1:1) listing renditions for ProductImage records."
+    help = (
+        "Regenerate AVIF/WEBP renditions (incl. square listing ones) for ProductImage records "
+        "with a process pool. Progress is checkpointed in ImageRegenerationRun; images whose "
+        "original and rendition settings are unchanged are skipped."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--limit", type=int, default=None)
         parser.add_argument(
             "--only-missing", action="store_true", default=False)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker processes (default settings.IMAGE_RENDITION_WORKERS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Images per checkpoint.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            default=False,
+            help="Re-render even when the original and settings are unchanged.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            default=False,
+            help="Continue the latest unfinished run with the same rendition settings.",
+        )
+
+    def _get_run(self, *, resume: bool, signature: str, force: bool, only_missing: bool, workers: int):
+        if resume:
+            run = (
+                ImageRegenerationRun.objects.filter(signature=signature)
+                .exclude(status=ImageRegenerationRun.Status.DONE)
+                .order_by("-id")
+                .first()
+            )
+            if run is None:
+                raise CommandError("No unfinished run with the current rendition settings to resume.")
+            run.status = ImageRegenerationRun.Status.RUNNING
+            run.workers = workers
+            run.save(update_fields=["status", "workers", "updated_at"])
+            self.stdout.write(
+                f"Resuming run={run.id} after image={run.last_image_id} ({run.processed}/{run.total} done)"
+            )
+            return run
+
+        return ImageRegenerationRun.objects.create(
+            signature=signature,
+            force=force,
+            only_missing=only_missing,
+            workers=workers,
+        )
 
     def handle(self, *args, **options):
         limit = options.get("limit")
-        only_missing = bool(options.get("only_missing"))
+        workers = options.get("workers")
+        if workers is None:
+            workers = int(getattr(settings, "IMAGE_RENDITION_WORKERS", 2) or 1)
+        if workers < 1:
+            raise CommandError("--workers must be >= 1")
+        chunk_size = max(1, int(options.get("chunk_size") or 200))
 
-        qs = ProductImage.objects.all().order_by("id")
-        if only_missing:
+        signature = rendition_signature()
+        run = self._get_run(
+            resume=bool(options.get("resume")),
+            signature=signature,
+            force=bool(options.get("force")),
+            only_missing=bool(options.get("only_missing")),
+            workers=workers,
+        )
+
+        qs = ProductImage.objects.all()
+        if run.only_missing:
             qs = qs.filter(listing_avif__isnull=True,
                            listing_webp__isnull=True)
+        if not run.total:
+            run.total = qs.count()
+            run.save(update_fields=["total", "updated_at"])
+
+        remaining = None if limit is None else max(0, int(limit))
+        session_processed = 0
+        session_started = time.perf_counter()
+        chunk_started = session_started
+
+        with django_process_pool(workers) as pool:
+            try:
+                while remaining is None or remaining > 0:
+                    size = chunk_size if remaining is None else min(chunk_size, remaining)
+                    ids = list(
+                        qs.filter(id__gt=run.last_image_id)
+                        .order_by("id")
+                        .values_list("id", flat=True)[:size]
+                    )
+                    if not ids:
+                        break
 
-        if limit is not None:
-            qs = qs[: max(0, int(limit))]
+                    results = pool.map(
+                        regenerate_product_image,
+                        ids,
+                        [run.force] * len(ids),
+                        chunksize=max(1, len(ids) // (workers * 4)),
+                    )
+                    for result in results:
+                        if result.status == "rendered":
+                            run.rendered += 1
+                        elif result.status == "unchanged":
+                            run.unchanged += 1
+                        elif result.status == "failed":
+                            run.failed += 1
+                            self.stderr.write(f"image={result.image_id} error={result.error}")
+                        else:
+                            run.skipped += 1
 
-        processed = 0
-        updated = 0
-        skipped = 0
+                    # Checkpoint only after the whole chunk finished; an interrupted chunk
+                    # is redone on resume (already rendered images come back "unchanged").
+                    now = time.perf_counter()
+                    run.last_image_id = ids[-1]
+                    run.processed += len(ids)
+                    run.elapsed_seconds += now - chunk_started
+                    chunk_started = now
+                    run.save()
 
-        for img in qs.iterator(chunk_size=200):
-            processed += 1
-            if not img.image:
-                skipped += 1
-                continue
+                    session_processed += len(ids)
+                    if remaining is not None:
+                        remaining -= len(ids)
+            except KeyboardInterrupt:
+                run.status = ImageRegenerationRun.Status.INTERRUPTED
+                run.save(update_fields=["status", "updated_at"])
+                self.stderr.write(
+                    f"Interrupted; continue with --resume (run={run.id}, last_image={run.last_image_id})."
+                )
+                return
 
-            before = (bool(img.listing_avif), bool(img.listing_webp))
-            # Trigger save() image processing; we want derived renditions.
-            img.save()
-            after = (bool(img.listing_avif), bool(img.listing_webp))
-            if after != before:
-                updated += 1
+        finished = not qs.filter(id__gt=run.last_image_id).exists()
+        if finished:
+            run.status = ImageRegenerationRun.Status.DONE
+            run.finished_at = timezone.now()
+        else:
+            run.status = ImageRegenerationRun.Status.INTERRUPTED
+        run.save(update_fields=["status", "finished_at", "updated_at"])
 
+        elapsed = max(0.001, time.perf_counter() - session_started)
         self.stdout.write(
             self.style.SUCCESS(
-                f"Done. processed={processed}, updated={updated}, skipped={skipped}"
+                f"{'Done' if finished else 'Paused'}. run={run.id} processed={run.processed}/{run.total}, "
+                f"rendered={run.rendered}, unchanged={run.unchanged}, skipped={run.skipped}, "
+                f"failed={run.failed}, images_per_sec={session_processed / elapsed:.2f} "
+                f"(overall {run.images_per_sec:.2f})"
             )
         )
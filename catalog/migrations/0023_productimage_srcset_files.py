@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0022_productimage_source_hash_imageregenerationrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='srcset_files',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
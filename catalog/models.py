@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-from io import BytesIO
-
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
 from django.db import models
+from django.utils import timezone
 
 
 class TaxClass(models.Model):
@@ -186,6 +184,11 @@ class Product(models.Model):
 
 
 class ProductImage(models.Model):
+    class RenditionStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(
@@ -216,6 +219,17 @@ class ProductImage(models.Model):
         null=True,
         blank=True,
     )
+    # Set to PENDING when a new original is stored; the rendition worker flips it to READY.
+    renditions_status = models.CharField(
+        max_length=20, choices=RenditionStatus.choices, default=RenditionStatus.READY
+    )
+    renditions_updated_at = models.DateTimeField(null=True, blank=True)
+    # SHA-256 of the original and of the rendition settings the current renditions
+    # were built from; `regenerate_listing_images` skips images where both match.
+    source_hash = models.CharField(max_length=64, blank=True, default="")
+    renditions_signature = models.CharField(max_length=64, blank=True, default="")
+    # Responsive renditions already on storage: {"w400.avif": "<storage name>", ...}.
+    srcset_files = models.JSONField(blank=True, default=dict)
     # Legacy/external image source (optional). Prefer `image`.
     image_url = models.URLField(blank=True, default="")
     alt_text = models.CharField(max_length=255, blank=True)
@@ -234,7 +248,8 @@ class ProductImage(models.Model):
 
     @property
     def url(self) -> str:
-        # Prefer optimized renditions if available.
+        # Prefer optimized renditions if available; while they are pending the
+        # original upload is served.
         if self.image_avif:
             try:
                 return self.image_avif.url
@@ -289,161 +304,128 @@ class ProductImage(models.Model):
                 return ""
         return ""
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        raw = instance.__dict__.get("image")
+        instance._loaded_image_name = getattr(raw, "name", raw) or ""
+        return instance
+
+    def _image_changed(self) -> bool:
+        if "image" in self.get_deferred_fields():
+            return False
+        name = self.image.name if self.image else ""
+        return bool(name) and name != getattr(self, "_loaded_image_name", "")
+
     def save(self, *args, **kwargs):
-        # Lightweight processing: resize large uploads + optimize.
-        if self.image and hasattr(self.image, "file"):
-            try:
-                from PIL import Image
-                import pillow_avif  # noqa: F401
-
-                def _trim_whitespace(im: Image.Image, *, tol: int = 18):
-                    """Trim near-solid background borders.
-
-                    Heuristic: take corner pixel average as background and crop to pixels
-                    that differ from it by more than `tol`.
-                    """
-                    if im.mode != "RGB":
-                        im = im.convert("RGB")
-
-                    w, h = im.size
-                    if w < 10 or h < 10:
-                        return im
-
-                    px = im.load()
-                    corners = [
-                        px[0, 0],
-                        px[w - 1, 0],
-                        px[0, h - 1],
-                        px[w - 1, h - 1],
-                    ]
-                    bg = (
-                        sum(c[0] for c in corners) // 4,
-                        sum(c[1] for c in corners) // 4,
-                        sum(c[2] for c in corners) // 4,
-                    )
-
-                    def is_fg(rgb):
-                        return (
-                            abs(int(rgb[0]) - int(bg[0])) > tol
-                            or abs(int(rgb[1]) - int(bg[1])) > tol
-                            or abs(int(rgb[2]) - int(bg[2])) > tol
-                        )
-
-                    x0, y0 = w, h
-                    x1, y1 = 0, 0
-                    any_fg = False
-                    step_x = 1 if w <= 800 else max(1, w // 800)
-                    step_y = 1 if h <= 800 else max(1, h // 800)
-                    for y in range(0, h, step_y):
-                        for x in range(0, w, step_x):
-                            if is_fg(px[x, y]):
-                                any_fg = True
-                                if x < x0:
-                                    x0 = x
-                                if y < y0:
-                                    y0 = y
-                                if x > x1:
-                                    x1 = x
-                                if y > y1:
-                                    y1 = y
-
-                    if not any_fg:
-                        return im
-
-                    # Expand bounds a little to avoid over-trimming.
-                    pad = 2
-                    x0 = max(0, x0 - pad)
-                    y0 = max(0, y0 - pad)
-                    x1 = min(w - 1, x1 + pad)
-                    y1 = min(h - 1, y1 + pad)
-
-                    if x1 <= x0 or y1 <= y0:
-                        return im
-                    return im.crop((x0, y0, x1 + 1, y1 + 1))
-
-                def _fit_pad_square(im: Image.Image, *, edge: int, bg=(255, 255, 255)):
-                    if im.mode != "RGB":
-                        im = im.convert("RGB")
-                    w, h = im.size
-                    if w <= 0 or h <= 0:
-                        return im
-
-                    scale = min(edge / w, edge / h)
-                    new_w = max(1, int(round(w * scale)))
-                    new_h = max(1, int(round(h * scale)))
-                    resized = im.resize((new_w, new_h), resample=Image.LANCZOS)
-
-                    canvas = Image.new("RGB", (edge, edge), color=bg)
-                    left = (edge - new_w) // 2
-                    top = (edge - new_h) // 2
-                    canvas.paste(resized, (left, top))
-                    return canvas
-
-                self.image.open()
-                img = Image.open(self.image)
-
-                # Normalize mode (AVIF/WEBP require RGB for most cases)
-                if img.mode in ("P", "RGBA"):
-                    img = img.convert("RGB")
-                elif img.mode != "RGB":
-                    img = img.convert("RGB")
-
-                # Create medium renditions (used by listing). Keep originals as-is.
-                medium_edge = int(getattr(settings, "MEDIUM_SIZE", 300) or 300)
-                rendition = img.copy()
-                if max(rendition.size) > medium_edge:
-                    rendition.thumbnail((medium_edge, medium_edge))
-
-                base_name = self.image.name.rsplit("/", 1)[-1]
-                stem = base_name.rsplit(
-                    ".", 1)[0] if "." in base_name else base_name
-
-                avif_buf = BytesIO()
-                rendition.save(avif_buf, format="AVIF", quality=60)
-                avif_buf.seek(0)
-                self.image_avif.save(f"{stem}_m{medium_edge}.avif", ContentFile(
-                    avif_buf.read()), save=False)
-
-                webp_buf = BytesIO()
-                rendition.save(webp_buf, format="WEBP", quality=75, method=6)
-                webp_buf.seek(0)
-                self.image_webp.save(f"{stem}_m{medium_edge}.webp", ContentFile(
-                    webp_buf.read()), save=False)
-
-                # Listing square renditions: trim supplier whitespace then fit+pad to 1:1.
-                listing_edge = int(
-                    getattr(settings, "LISTING_IMAGE_SIZE",
-                            medium_edge) or medium_edge
-                )
-                listing_tol = int(
-                    getattr(settings, "LISTING_TRIM_TOLERANCE", 18) or 18)
-                trimmed = _trim_whitespace(img.copy(), tol=listing_tol)
-                square = _fit_pad_square(
-                    trimmed, edge=listing_edge, bg=(255, 255, 255))
-
-                listing_avif_buf = BytesIO()
-                square.save(listing_avif_buf, format="AVIF", quality=60)
-                listing_avif_buf.seek(0)
-                self.listing_avif.save(
-                    f"{stem}_sq{listing_edge}.avif",
-                    ContentFile(listing_avif_buf.read()),
-                    save=False,
-                )
-
-                listing_webp_buf = BytesIO()
-                square.save(listing_webp_buf, format="WEBP",
-                            quality=78, method=6)
-                listing_webp_buf.seek(0)
-                self.listing_webp.save(
-                    f"{stem}_sq{listing_edge}.webp",
-                    ContentFile(listing_webp_buf.read()),
-                    save=False,
-                )
-            except Exception:
-                # If processing fails, store original upload.
-                pass
+        # Renditions are produced by the background worker (`process_image_renditions`);
+        # here we only store the original and mark renditions pending.
+        image_changed = self._image_changed()
+        if image_changed:
+            # Old renditions belong to the previous original; until the worker is done
+            # the API falls back to the original upload (see `url`).
+            for field_name in ("image_avif", "image_webp", "listing_avif", "listing_webp"):
+                setattr(self, field_name, None)
+            self.renditions_status = self.RenditionStatus.PENDING
+            self.source_hash = ""
+            self.renditions_signature = ""
+            self.srcset_files = {}
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "image_avif",
+                    "image_webp",
+                    "listing_avif",
+                    "listing_webp",
+                    "renditions_status",
+                    "source_hash",
+                    "renditions_signature",
+                    "srcset_files",
+                }
+
+        super().save(*args, **kwargs)
+        self._loaded_image_name = self.image.name if self.image else ""
+
+        if image_changed:
+            from .images import schedule_renditions
+
+            schedule_renditions(self)
+
+
+class ImageRenditionJob(models.Model):
+    """DB-backed queue for ProductImage renditions (one row per image)."""
 
-        return super().save(*args, **kwargs)
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    product_image = models.OneToOneField(
+        ProductImage, on_delete=models.CASCADE, related_name="rendition_job"
+    )
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self) -> str:
+        return f"renditions:{self.product_image_id}:{self.status}"
+
+
+class ImageRegenerationRun(models.Model):
+    """Checkpoint for `regenerate_listing_images`; an interrupted run resumes after `last_image_id`."""
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        INTERRUPTED = "interrupted", "Interrupted"
+
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.RUNNING
+    )
+    # Rendition settings signature the run renders towards; resume only matches the same one.
+    signature = models.CharField(max_length=64)
+    force = models.BooleanField(default=False)
+    only_missing = models.BooleanField(default=False)
+    workers = models.PositiveSmallIntegerField(default=1)
+
+    last_image_id = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # Wall-clock seconds spent rendering across all resumed sessions.
+    elapsed_seconds = models.FloatField(default=0)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self) -> str:
+        return f"regenerate:{self.id}:{self.status}"
+
+    @property
+    def images_per_sec(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.processed / self.elapsed_seconds
 
 
 class ContentBlock(models.Model):
@@ -892,6 +874,61 @@ class BackInStockSubscription(models.Model):
         return f"{self.email} {self.channel} {target}".strip()
 
 
+class BackInStockNotificationJob(models.Model):
+    """Fan-out of back-in-stock emails for one restocked variant/product (resumable)."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    product = models.ForeignKey(
+        Product,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="back_in_stock_jobs",
+    )
+    variant = models.ForeignKey(
+        "Variant",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="back_in_stock_jobs",
+    )
+    channel = models.CharField(
+        max_length=20,
+        choices=BackInStockSubscription.Channel.choices,
+        default=BackInStockSubscription.Channel.NORMAL,
+    )
+
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    # Checkpoint: subscriptions are processed in id order; a resumed job continues after this id.
+    last_subscription_id = models.PositiveBigIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self) -> str:
+        target = f"variant:{self.variant_id}" if self.variant_id else f"product:{self.product_id}"
+        return f"back-in-stock:{target}:{self.channel}:{self.status}"
+
+
 class ProductOptionType(models.Model):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="option_types")
@@ -1,14 +1,11 @@
 from __future__ import annotations
 
 from django.db import transaction
-from django.db.models import Q
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from django.utils import timezone
 
-from notifications.services import send_templated_email
-
-from .models import BackInStockSubscription, InventoryItem
+from .back_in_stock import enqueue_back_in_stock_job
+from .models import InventoryItem
 
 
 @receiver(pre_save, sender=InventoryItem)
@@ -30,41 +27,10 @@ def inventory_item_post_save(sender, instance: InventoryItem, created: bool, **k
         return
 
     channel = "outlet" if instance.offer_visibility == InventoryItem.OfferVisibility.OUTLET else "normal"
-    variant = instance.variant
-    product = getattr(variant, "product", None)
-
-    def _send():
-        q = Q()
-        if variant is not None:
-            q |= Q(variant=variant)
-        if product is not None:
-            q |= Q(product=product)
-        if not q:
-            return
-
-        qs = BackInStockSubscription.objects.filter(
-            is_active=True,
-            notified_at__isnull=True,
-            channel=channel,
-        ).filter(q)
-
-        now = timezone.now()
-        for sub in qs.distinct().iterator():
-            result = send_templated_email(
-                template_key="catalog_back_in_stock",
-                to_email=sub.email,
-                context={
-                    "product_name": getattr(product, "name", "") if product else "",
-                    "product_slug": getattr(product, "slug", "") if product else "",
-                    "product_sku": getattr(product, "sku", "") if product else "",
-                    "variant_sku": getattr(variant, "sku", "") if variant else "",
-                    "channel": channel,
-                },
-                language_code=(getattr(sub, "language_code", "") or None),
-            )
-            if result.ok:
-                sub.notified_at = now
-                sub.is_active = False
-                sub.save(update_fields=["notified_at", "is_active"])
+    variant_id = instance.variant_id
+    product_id = getattr(instance.variant, "product_id", None) if variant_id else None
 
-    transaction.on_commit(_send)
+    # Emails go out from `process_back_in_stock_jobs`, not from the save that restocked.
+    transaction.on_commit(
+        lambda: enqueue_back_in_stock_job(variant_id=variant_id, product_id=product_id, channel=channel)
+    )
@@ -8,6 +8,7 @@ from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.html import format_html
 
 from .models import Cart, CartItem, FeeRule, Order, OrderConsent, OrderDiscount, OrderEvent, OrderFee, OrderLine, PaymentIntent
 
@@ -152,7 +153,11 @@ class OrderAdmin(admin.ModelAdmin):
     readonly_fields = (
         "created_at",
         "updated_at",
+        "paid_at",
         "carrier_shipment_id",
+        "tracking_status_text",
+        "tracking_status_code",
+        "tracking_status_changed_at",
         "shipping_label_generated_at",
         "shipping_label_pdf",
         "delivery_min_date",
@@ -173,6 +178,7 @@ class OrderAdmin(admin.ModelAdmin):
     fields = (
         "user",
         "status",
+        "paid_at",
         "delivery_status",
         "fulfillment_mode",
         "supplier_reservation_status",
@@ -187,6 +193,9 @@ class OrderAdmin(admin.ModelAdmin):
         "carrier_code",
         "carrier_shipment_id",
         "tracking_number",
+        "tracking_status_text",
+        "tracking_status_code",
+        "tracking_status_changed_at",
         "shipping_label_generated_at",
         "shipping_label_pdf",
         "pickup_locker",
@@ -325,6 +334,8 @@ class OrderAdmin(admin.ModelAdmin):
         "backfill_delivery_eta_snapshot",
         "generate_dpd_labels_a6",
         "generate_unisend_labels_10x15",
+        "download_cached_labels",
+        "download_cached_labels_a4",
     )
 
     @admin.action(description="Backfill: įrašyti Delivery ETA snapshot (agreguotas)")
@@ -523,7 +534,8 @@ class OrderAdmin(admin.ModelAdmin):
                     continue
 
                 o.status = Order.Status.PAID
-                o.save(update_fields=["status", "updated_at"])
+                o.paid_at = timezone.now()
+                o.save(update_fields=["status", "paid_at", "updated_at"])
                 pi.status = PaymentIntent.Status.SUCCEEDED
                 pi.save(update_fields=["status", "updated_at"])
                 capture_inventory_for_order(order_id=o.id)
@@ -635,37 +647,30 @@ class OrderAdmin(admin.ModelAdmin):
         ]
         return custom + urls
 
-    def generate_dpd_label_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
-        from dpd.client import DpdApiError
-        from dpd.labels import DpdLabelConfigError, generate_a6_label_pdf_for_order
+    def _label_response(self, request: HttpRequest, object_id: str, *, carrier_code: str, error_label: str) -> HttpResponse:
+        from shipping.labels import get_label_provider, label_pdf_for_order
 
         order = get_object_or_404(Order, pk=object_id)
         try:
-            pdf = generate_a6_label_pdf_for_order(order, store_on_order=True)
-            filename = f"dpd_label_a6_order_{order.id}.pdf"
-            resp = HttpResponse(pdf, content_type="application/pdf")
-            resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-            return resp
-        except (DpdLabelConfigError, DpdApiError, RuntimeError, ValueError) as e:
-            messages.error(request, f"Nepavyko sugeneruoti DPD lipduko: {e}")
-
-        return redirect(reverse("admin:checkout_order_change", args=[order.pk]))
+            # Reprints come from the cached PDF; `?regenerate=1` asks the carrier again.
+            pdf = label_pdf_for_order(
+                order, carrier_code=carrier_code, regenerate=request.GET.get("regenerate") == "1"
+            )
+        except (RuntimeError, ValueError) as e:
+            messages.error(request, f"Nepavyko sugeneruoti {error_label} lipduko: {e}")
+            return redirect(reverse("admin:checkout_order_change", args=[order.pk]))
 
-    def generate_unisend_label_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
-        from unisend.client import UnisendApiError
-        from unisend.labels import UnisendLabelConfigError, generate_label_pdf_for_order
+        label_format = get_label_provider(carrier_code).label_format.lower()
+        filename = f"{carrier_code}_label_{label_format}_order_{order.id}.pdf"
+        resp = HttpResponse(pdf, content_type="application/pdf")
+        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return resp
 
-        order = get_object_or_404(Order, pk=object_id)
-        try:
-            pdf = generate_label_pdf_for_order(order, store_on_order=True)
-            filename = f"unisend_label_10x15_order_{order.id}.pdf"
-            resp = HttpResponse(pdf, content_type="application/pdf")
-            resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-            return resp
-        except (UnisendLabelConfigError, UnisendApiError, RuntimeError, ValueError) as e:
-            messages.error(request, f"Nepavyko sugeneruoti Unisend lipduko: {e}")
+    def generate_dpd_label_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
+        return self._label_response(request, object_id, carrier_code="dpd", error_label="DPD")
 
-        return redirect(reverse("admin:checkout_order_change", args=[order.pk]))
+    def generate_unisend_label_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
+        return self._label_response(request, object_id, carrier_code="unisend", error_label="Unisend")
 
     @admin.action(description="Perskaičiuoti sumas (items/shipping/total)")
     def recalculate_selected(self, request, queryset):
@@ -686,95 +691,83 @@ class OrderAdmin(admin.ModelAdmin):
                     "updated_at",
                 ]
             )
-    @admin.action(description="Generuoti DPD A6 lipdukus (PDF) pasirinktiems")
-    def generate_dpd_labels_a6(self, request: HttpRequest, queryset):
-        from dpd.client import DpdApiError
-        from dpd.labels import DpdLabelConfigError, generate_a6_labels_pdf_for_orders
+    def _enqueue_labels(self, request: HttpRequest, queryset, *, carrier_code: str, label: str):
+        from shipping.labels import build_label_sheet, enqueue_label_job, label_sheet_response
+        from shipping.models import LabelJob, LabelJobItem
 
-        orders = list(
-            queryset.filter(shipping_method__in=[
-                            "dpd_locker", "dpd_courier"]).prefetch_related("lines")
-        )
-        if not orders:
+        job = enqueue_label_job(carrier_code=carrier_code, orders=list(queryset), user=request.user)
+        if job is None:
             self.message_user(
                 request,
-                "Nepasirinkta jokių DPD užsakymų (dpd_locker/dpd_courier).",
+                f"Nepasirinkta jokių {label} užsakymų.",
                 level=messages.WARNING,
             )
             return None
 
-        try:
-            pdf, updated = generate_a6_labels_pdf_for_orders(orders)
-        except (DpdLabelConfigError, DpdApiError, RuntimeError, ValueError) as e:
+        job_url = reverse("admin:shipping_labeljob_change", args=[job.pk])
+        if job.status != LabelJob.Status.DONE:
             self.message_user(
                 request,
-                f"Nepavyko sugeneruoti DPD lipdukų: {e}",
-                level=messages.ERROR,
+                format_html(
+                    '{} lipdukai generuojami fone: <a href="{}">darbas #{}</a> ({} užsakymų). '
+                    "Kai baigsis, PDF atsisiųsite iš darbo puslapio.",
+                    label,
+                    job_url,
+                    job.pk,
+                    job.total,
+                ),
+                level=messages.SUCCESS,
             )
             return None
 
-        filename = f"dpd_labels_a6_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        resp = HttpResponse(pdf, content_type="application/pdf")
-        resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-        self.message_user(
-            request,
-            f"Sugeneruota DPD A6 lipdukų: {len(updated)}.",
-            level=messages.SUCCESS,
+        order_ids = list(
+            job.items.filter(status=LabelJobItem.Status.DONE).order_by("id").values_list("order_id", flat=True)
         )
+        sheet = build_label_sheet(order_ids)
+        if job.failed:
+            self.message_user(
+                request,
+                format_html('Nepavyko {} užsakymų lipdukų – žr. <a href="{}">darbą #{}</a>.', job.failed, job_url, job.pk),
+                level=messages.ERROR,
+            )
+        if sheet.file is None:
+            return None
+        filename = f"{carrier_code}_labels_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        return label_sheet_response(sheet, filename=filename)
 
-        now = timezone.now()
-        for o in orders:
-            if o.delivery_status != Order.DeliveryStatus.LABEL_CREATED:
-                o.delivery_status = Order.DeliveryStatus.LABEL_CREATED
-            if o.shipping_label_generated_at is None:
-                o.shipping_label_generated_at = now
-            o.save(update_fields=["delivery_status", "shipping_label_generated_at", "updated_at"])
-        return resp
+    @admin.action(description="Generuoti DPD A6 lipdukus (PDF) pasirinktiems")
+    def generate_dpd_labels_a6(self, request: HttpRequest, queryset):
+        return self._enqueue_labels(request, queryset, carrier_code="dpd", label="DPD")
 
     @admin.action(description="Generuoti Unisend 10x15 lipdukus (PDF) pasirinktiems")
     def generate_unisend_labels_10x15(self, request: HttpRequest, queryset):
-        from unisend.client import UnisendApiError
-        from unisend.labels import UnisendLabelConfigError, generate_labels_pdf_for_orders
-
-        orders = list(
-            queryset.filter(
-                shipping_method__in=[
-                    "unisend_pickup",
-                    "unisend_courier",
-                    "lpexpress",
-                    "lpexpress_courier",
-                ]
-            ).prefetch_related("lines")
-        )
-        if not orders:
+        return self._enqueue_labels(request, queryset, carrier_code="unisend", label="Unisend")
+
+    def _download_labels(self, request: HttpRequest, queryset, *, layout_code: str = ""):
+        from shipping.labels import build_label_sheet, label_sheet_response
+        from shipping.pdf import get_sheet_layout
+
+        layout = get_sheet_layout(layout_code) if layout_code else None
+        order_ids = list(queryset.order_by("id").values_list("id", flat=True))
+        sheet = build_label_sheet(order_ids, layout=layout)
+        if sheet.failed:
             self.message_user(
                 request,
-                "Nepasirinkta jokių Unisend užsakymų.",
+                f"Praleisti užsakymai ({len(sheet.failed)}): {sheet.failed_summary()}",
                 level=messages.WARNING,
             )
+        if sheet.file is None:
             return None
+        suffix = f"_{layout.code}" if layout else ""
+        return label_sheet_response(sheet, filename=f"labels_{timezone.now().strftime('%Y%m%d_%H%M%S')}{suffix}.pdf")
 
-        try:
-            pdf, _updated = generate_labels_pdf_for_orders(orders)
-            resp = HttpResponse(pdf, content_type="application/pdf")
-            resp["Content-Disposition"] = 'attachment; filename="unisend_labels_10x15.pdf"'
-
-            now = timezone.now()
-            for o in orders:
-                if o.delivery_status != Order.DeliveryStatus.LABEL_CREATED:
-                    o.delivery_status = Order.DeliveryStatus.LABEL_CREATED
-                if o.shipping_label_generated_at is None:
-                    o.shipping_label_generated_at = now
-                o.save(update_fields=["delivery_status", "shipping_label_generated_at", "updated_at"])
-            return resp
-        except (UnisendLabelConfigError, UnisendApiError, RuntimeError, ValueError) as e:
-            self.message_user(
-                request,
-                f"Nepavyko sugeneruoti Unisend lipdukų: {e}",
-                level=messages.ERROR,
-            )
-            return None
+    @admin.action(description="Atsisiųsti jau sugeneruotus lipdukus (PDF, be vežėjo API)")
+    def download_cached_labels(self, request: HttpRequest, queryset):
+        return self._download_labels(request, queryset)
+
+    @admin.action(description="Atsisiųsti jau sugeneruotus lipdukus A4 lapais (4 lape, DPD + Unisend)")
+    def download_cached_labels_a4(self, request: HttpRequest, queryset):
+        return self._download_labels(request, queryset, layout_code="a4")
 
     def save_related(self, request, form, formsets, change):
         super().save_related(request, form, formsets, change)
@@ -816,6 +809,10 @@ class OrderAdmin(admin.ModelAdmin):
             # but never keep a DPD locker FK.
             obj.pickup_locker = None
 
+        # Rollups bucket orders by the time they were paid.
+        if "status" in (getattr(form, "changed_data", None) or []) and obj.status == Order.Status.PAID:
+            obj.paid_at = timezone.now()
+
         super().save_model(request, obj, form, change)
 
 
@@ -6,19 +6,20 @@ from datetime import date
 import logging
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db import models
 from django.db import transaction
 from django.utils import timezone
 from ninja import Router
 from ninja.errors import HttpError
 
-from accounts.auth import JWTAuth
+from accounts.auth import JWTAuth, user_from_access_cookie
 from accounts.models import UserAddress, UserPhone, UserPickupPoint
 from catalog.models import Category, InventoryItem, Variant
+from pricing.context import get_pricing_context
 from pricing.services import get_vat_rate
 from promotions.models import Coupon
 from promotions.services import apply_promo_to_unit_net
+from shipping.pickup_points import resolve_pickup_point
 from shipping.services import estimate_delivery_window
 
 from analytics.services import track_event
@@ -422,160 +423,32 @@ def payment_options(request, country_code: str = "LT"):
                 }
             ]
         else:
-            # Prefer local DB cache (NeopayBank) to avoid external API calls in checkout.
+            # Synced catalogue (`Payments -> Neopay banks`, `is_enabled`), served from memory;
+            # a stale catalogue is refreshed in the background, so checkout never waits on Neopay.
             try:
-                from payments.models import NeopayBank
+                from payments.services.neopay_banks import get_neopay_banks
 
-                db_banks = list(
-                    NeopayBank.objects.filter(country_code=country_code, is_enabled=True)
-                    .order_by("sort_order", "name", "bic")
-                )
+                catalogue_banks = get_neopay_banks(country_code)
             except Exception:
-                db_banks = []
-
-            if db_banks:
-                for idx, b in enumerate(db_banks):
-                    bic = (getattr(b, "bic", "") or "").strip()
-                    if not bic:
-                        continue
-                    name = (getattr(b, "name", "") or "").strip() or bic
-                    logo_url = (getattr(b, "logo_url", "") or "").strip()
-                    _bank_rank[bic] = idx
-                    options.append(
-                        PaymentOptionOut(
-                            id=f"neopay:{bic}",
-                            kind="neopay_bank",
-                            title=name,
-                            provider="neopay",
-                            instructions="",
-                            logo_url=logo_url,
-                            payload={
-                                "payment_method": "neopay",
-                                "neopay_bank_bic": bic,
-                            },
-                        )
+                logger.exception("Neopay banks are not available for payment options")
+                catalogue_banks = []
+
+            for idx, b in enumerate(catalogue_banks):
+                _bank_rank[b.bic] = idx
+                options.append(
+                    PaymentOptionOut(
+                        id=f"neopay:{b.bic}",
+                        kind="neopay_bank",
+                        title=b.name,
+                        provider="neopay",
+                        instructions="",
+                        logo_url=b.logo_url,
+                        payload={
+                            "payment_method": "neopay",
+                            "neopay_bank_bic": b.bic,
+                        },
                     )
-
-                # DB is authoritative: do not also fetch from cache/live to avoid duplicates.
-                banks_raw = []
-            else:
-                cache_key = f"neopay:banks:{int(getattr(cfg, 'project_id', 0) or 0)}:{country_code}"
-                cached = cache.get(cache_key)
-                if isinstance(cached, list) and cached:
-                    # Cache stores already-normalized bank dicts.
-                    banks_raw = [b for b in cached if isinstance(b, dict)]
-                else:
-                    import requests
-
-                base_url = (getattr(cfg, "banks_api_base_url", "") or "https://psd2.neopay.lt/api").rstrip("/")
-                if base_url.endswith("/countries"):
-                    base_url = base_url[: -len("/countries")]
-                candidates = [
-                    f"{base_url}/countries/{cfg.project_id}",
-                    f"{base_url}/countries/{cfg.project_id}/",
-                    f"{base_url}/countries",
-                    f"{base_url}/countries/",
-                ]
-                if base_url.endswith("/api"):
-                    root = base_url[: -len("/api")]
-                    candidates.append(f"{root}/api/countries/{cfg.project_id}")
-                    candidates.append(f"{root}/api/countries/{cfg.project_id}/")
-
-                data = None
-                last_response = None
-                last_exc: Exception | None = None
-
-                for url in candidates:
-                    try:
-                        r = requests.get(
-                            url,
-                            timeout=5,
-                            headers={
-                                "Accept": "application/json",
-                                "User-Agent": "inultimo-backend/1.0",
-                            },
-                        )
-                    except requests.RequestException as e:
-                        last_exc = e
-                        continue
-
-                    last_response = r
-                    if r.status_code == 404:
-                        continue
-                    if r.status_code >= 400:
-                        body = (r.text or "").strip().replace("\n", " ")
-                        if len(body) > 300:
-                            body = body[:300] + "..."
-                        raise HttpError(502, f"Neopay banks api failed: {r.status_code} url={url} body={body}")
-
-                    try:
-                        data = r.json()
-                    except Exception:
-                        # Try next candidate if response isn't valid JSON.
-                        continue
-
-                    break
-
-                if data is None:
-                    if last_exc is not None:
-                        raise HttpError(502, f"Neopay banks api request failed: {type(last_exc).__name__}")
-                    if last_response is not None:
-                        body = (last_response.text or "").strip().replace("\n", " ")
-                        if len(body) > 300:
-                            body = body[:300] + "..."
-                        raise HttpError(
-                            502,
-                            f"Neopay banks api failed: {last_response.status_code} url={candidates[-1]} body={body}",
-                        )
-                    raise HttpError(502, "Neopay banks api failed: no response")
-
-                # Normalize to countries list
-                countries = []
-                if isinstance(data, list):
-                    countries = data
-                elif isinstance(data, dict):
-                    countries = data.get("countries") or []
-                    if not countries and country_code:
-                        cc = (country_code or "").strip().upper()
-                        if cc and cc in data and isinstance(data.get(cc), dict):
-                            countries = [{"code": cc, **data.get(cc)}]
-
-                cc = (country_code or "").strip().upper()
-                for c in countries:
-                    if not isinstance(c, dict):
-                        continue
-                    ccode = (c.get("code") or c.get("country") or c.get("countryCode") or "").strip().upper()
-                    if ccode and ccode != cc:
-                        continue
-                    candidate = c.get("aspsps") or c.get("banks") or []
-                    if isinstance(candidate, list):
-                        for b in candidate:
-                            if isinstance(b, dict):
-                                banks_raw.append(b)
-                    break
-
-                # Cache as simple dicts to avoid pickling issues.
-                try:
-                    normalized_cache: list[dict] = []
-                    for b in banks_raw:
-                        if not isinstance(b, dict):
-                            continue
-                        bic = (b.get("bic") or b.get("BIC") or "").strip()
-                        if not bic:
-                            continue
-                        normalized_cache.append(
-                            {
-                                "bic": bic,
-                                "name": (b.get("name") or b.get("bankName") or "").strip() or bic,
-                                "services": b.get("services") or b.get("serviceTypes") or [],
-                                "logo": (b.get("logo") or b.get("logoUrl") or "") if isinstance(b.get("logo") or b.get("logoUrl") or "", str) else "",
-                                "isOperating": b.get("isOperating") if "isOperating" in b else True,
-                            }
-                        )
-                    # 10 min cache is enough for UX and protects Neopay API.
-                    cache.set(cache_key, normalized_cache, timeout=600)
-                except Exception:
-                    logger.exception("Failed to cache neopay banks list")
+                )
 
         # NOTE: variable reuse guard (banks list may be nested above)
         normalized: list[dict] = []
@@ -675,26 +548,7 @@ def _user_from_cookie_if_present(request):
     except Exception:
         pass
 
-    try:
-        from accounts.jwt_utils import decode_token
-        from django.contrib.auth import get_user_model
-        from django.conf import settings
-
-        cookie_name = getattr(settings, "AUTH_COOKIE_ACCESS_NAME", "access_token")
-        token = (request.COOKIES.get(cookie_name) or "").strip()
-        if not token:
-            return None
-
-        payload = decode_token(token)
-        if payload.get("type") != "access":
-            return None
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
-        User = get_user_model()
-        return User.objects.get(id=int(user_id), is_active=True)
-    except Exception:
-        return None
+    return user_from_access_cookie(request)
 
 
 def _get_cart_for_request(request, *, create: bool) -> Cart | None:
@@ -708,7 +562,8 @@ def _get_cart_for_request(request, *, create: bool) -> Cart | None:
             session_key = ""
 
     if user:
-        user_cart = getattr(user, "cart", None)
+        # A filter instead of `user.cart`, so a token-claims user is not loaded.
+        user_cart = Cart.objects.filter(user=user).first()
 
         guest_cart = None
         if session_key:
@@ -777,29 +632,25 @@ def _country_code_from_address(addr: UserAddress) -> str:
 
 
 def _resolve_pickup_dpd(*, pickup_point_id: str, country_code: str):
-    from dpd.models import DpdLocker
-
-    locker = DpdLocker.objects.filter(locker_id=pickup_point_id, is_active=True).first()
-    if not locker:
+    point = resolve_pickup_point("dpd", pickup_point_id)
+    if point is None:
         raise HttpError(400, "Invalid pickup_point_id")
-    if locker.country_code and country_code and locker.country_code.upper() != country_code:
+    if point.country_code and country_code and point.country_code != country_code:
         raise HttpError(400, "pickup_point_id country mismatch")
-    return locker, None
+    return point.instance(), None
 
 
 def _resolve_pickup_unisend(*, pickup_point_id: str, country_code: str):
-    from unisend.models import UnisendTerminal
-
-    terminal = UnisendTerminal.objects.filter(terminal_id=pickup_point_id, is_active=True).first()
-    if not terminal:
+    point = resolve_pickup_point("unisend", pickup_point_id)
+    if point is None:
         raise HttpError(400, "Invalid pickup_point_id")
-    if terminal.country_code and country_code and terminal.country_code.upper() != country_code:
+    if point.country_code and country_code and point.country_code != country_code:
         raise HttpError(400, "pickup_point_id country mismatch")
 
     snapshot = {
-        "pickup_point_id": str(terminal.terminal_id or "").strip(),
-        "pickup_point_name": str(terminal.name or "").strip(),
-        "pickup_point_raw": terminal.raw or {},
+        "pickup_point_id": point.id,
+        "pickup_point_name": point.name,
+        "pickup_point_raw": point.raw,
     }
 
     # For Unisend we don't have a dedicated FK on Order yet (pickup_locker points to dpd.DpdLocker).
@@ -1137,6 +988,7 @@ def get_cart(request, country_code: str = "LT", channel: str = "normal"):
         items=items,
         country_code=country_code,
         channel=channel,
+        customer_group_id=get_pricing_context(request).customer_group_id,
     )
     return CartOut(
         country_code=country_code,
@@ -1548,8 +1400,7 @@ def checkout_preview(request, payload: CheckoutPreviewIn):
         if channel not in set(getattr(settings, "COUPON_ALLOWED_CHANNELS", ["normal"])):
             raise HttpError(400, "Coupon is not allowed for this channel")
 
-        primary = user.get_primary_customer_group() if user else None
-        if primary and not bool(getattr(primary, "allow_coupons", True)):
+        if not get_pricing_context(request).allow_coupons:
             raise HttpError(400, "Coupons are not allowed for this customer")
 
         coupon = Coupon.objects.filter(code=coupon_code).first()
@@ -1581,8 +1432,7 @@ def checkout_preview(request, payload: CheckoutPreviewIn):
         if int(available) < int(it.qty):
             raise HttpError(409, f"Not enough stock for {it.variant.sku}")
 
-    primary = user.get_primary_customer_group() if user else None
-    customer_group_id = int(primary.id) if primary else None
+    customer_group_id = get_pricing_context(request).customer_group_id
 
     out_items, items_total, delivery_window = _serialize_cart_items(
         items=items,
@@ -1924,11 +1774,10 @@ def checkout_confirm(request, payload: CheckoutConfirmIn):
                 order.shipping_net_manual = Decimal("0.00")
                 order.save(update_fields=["shipping_net_manual"])
 
+        customer_group_id = get_pricing_context(request).customer_group_id
         lines: list[OrderLine] = []
         for it in items:
             v = it.variant
-            primary = user.get_primary_customer_group() if user else None
-            customer_group_id = int(primary.id) if primary else None
             unit_price, line_total, _compare_at, _disc_pct, vat_rate = _cart_item_money(
                 item=it,
                 country_code=country_code,
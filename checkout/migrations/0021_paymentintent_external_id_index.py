@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0020_order_tracking_status"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="paymentintent",
+            index=models.Index(fields=["provider", "external_id"], name="checkout_pa_provide_66d6f0_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_paid_at(apps, schema_editor):
+    # Best available guess for orders paid before the field existed: the time the
+    # payment intent last changed (its success), else the order's last update.
+    Order = apps.get_model("checkout", "Order")
+    PaymentIntent = apps.get_model("checkout", "PaymentIntent")
+    succeeded_at = PaymentIntent.objects.filter(order_id=OuterRef("pk"), status="succeeded").values("updated_at")[:1]
+    Order.objects.filter(status="paid", paid_at__isnull=True).update(
+        paid_at=Coalesce(Subquery(succeeded_at, output_field=models.DateTimeField()), F("updated_at"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0021_paymentintent_external_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0022_order_paid_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="tracking_status_code",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
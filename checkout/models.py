@@ -114,6 +114,8 @@ class Order(models.Model):
 
     status = models.CharField(
         max_length=32, choices=Status.choices, default=Status.PENDING_PAYMENT)
+    # Set when the order becomes PAID; unlike updated_at it does not move on later edits.
+    paid_at = models.DateTimeField(null=True, blank=True)
 
     fulfillment_mode = models.CharField(
         max_length=20,
@@ -160,6 +162,12 @@ class Order(models.Model):
     carrier_shipment_id = models.CharField(
         max_length=80, blank=True, default="")
     tracking_number = models.CharField(max_length=64, blank=True, default="")
+    # Last carrier tracking payload seen by `sync_tracking_statuses` (hash of the raw response).
+    tracking_status_hash = models.CharField(max_length=64, blank=True, default="")
+    tracking_status_text = models.CharField(max_length=255, blank=True, default="")
+    # Exact carrier status code the last payload was mapped from (empty when none matched).
+    tracking_status_code = models.CharField(max_length=64, blank=True, default="")
+    tracking_status_changed_at = models.DateTimeField(null=True, blank=True)
 
     # Shipping label (PDF)
     shipping_label_pdf = models.FileField(
@@ -521,6 +529,8 @@ class PaymentIntent(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["provider", "status", "-created_at"]),
+            # Gateway callbacks look intents up by transaction id.
+            models.Index(fields=["provider", "external_id"]),
         ]
 
     def __str__(self) -> str:
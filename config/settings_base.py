@@ -15,6 +15,8 @@ env = environ.Env(
     JWT_ALGORITHM=(str, "HS256"),
     JWT_ACCESS_TTL_MINUTES=(int, 15),
     JWT_REFRESH_TTL_DAYS=(int, 30),
+    JWT_CLAIMS_AUTH=(bool, True),
+    AUTH_STATE_CACHE_SECONDS=(int, 10),
 
     AUTH_COOKIE_ACCESS_NAME=(str, "access_token"),
     AUTH_COOKIE_REFRESH_NAME=(str, "refresh_token"),
@@ -22,6 +24,26 @@ env = environ.Env(
     AUTH_COOKIE_SECURE=(str, ""),
     AUTH_COOKIE_DOMAIN=(str, ""),
     RECENTLY_VIEWED_MAX=(int, 12),
+    PRICING_CONTEXT_CACHE_SECONDS=(int, 300),
+    ANALYTICS_BUFFER_ENABLED=(bool, True),
+    ANALYTICS_BUFFER_MAX_EVENTS=(int, 10000),
+    ANALYTICS_BUFFER_BATCH_SIZE=(int, 500),
+    ANALYTICS_BUFFER_FLUSH_MS=(int, 500),
+    ANALYTICS_BUFFER_PUT_TIMEOUT_MS=(int, 50),
+    ANALYTICS_NEWSMAN_OUTBOX_URL=(str, ""),
+    ANALYTICS_NEWSMAN_OUTBOX_TOKEN=(str, ""),
+    ANALYTICS_OUTBOX_CONCURRENCY=(int, 4),
+    ANALYTICS_OUTBOX_MAX_ATTEMPTS=(int, 8),
+    ANALYTICS_OUTBOX_BACKOFF_SECONDS=(int, 30),
+    ANALYTICS_OUTBOX_BACKOFF_MAX_SECONDS=(int, 3600),
+    ANALYTICS_OUTBOX_LOCK_SECONDS=(int, 300),
+    ANALYTICS_ROLLUP_LAG_SECONDS=(int, 300),
+    ANALYTICS_ROLLUP_WINDOW_HOURS=(int, 24),
+    ANALYTICS_BEST_SELLING_DAYS=(int, 0),
+    ANALYTICS_EVENT_PARTITIONS_AHEAD=(int, 3),
+    ANALYTICS_EVENT_RETENTION_MONTHS=(int, 0),
+    ANALYTICS_EVENT_ARCHIVE=(bool, True),
+    ANALYTICS_EVENT_ARCHIVE_DIR=(str, ""),
     EMAIL_OTP_CODE_LENGTH=(int, 6),
     EMAIL_OTP_TTL_MINUTES=(int, 10),
     EMAIL_OTP_RESEND_COOLDOWN_SECONDS=(int, 30),
@@ -34,6 +56,13 @@ env = environ.Env(
     EMAIL_HOST_USER=(str, ""),
     EMAIL_HOST_PASSWORD=(str, ""),
     DEFAULT_FROM_EMAIL=(str, ""),
+    EMAIL_DELIVERY_MODE=(str, "sync"),
+    EMAIL_QUEUE_BATCH_SIZE=(int, 50),
+    EMAIL_QUEUE_MAX_ATTEMPTS=(int, 5),
+    EMAIL_QUEUE_BACKOFF_SECONDS=(int, 60),
+    EMAIL_QUEUE_BACKOFF_MAX_SECONDS=(int, 3600),
+    EMAIL_QUEUE_LOCK_SECONDS=(int, 300),
+    EMAIL_QUEUE_RATE_PER_SECOND=(float, 0.0),
 
     MEDIA_STORAGE=(str, "local"),  # local | s3
     DJANGO_USE_S3=(bool, False),
@@ -55,8 +84,23 @@ env = environ.Env(
     LISTING_IMAGE_SIZE=(int, 300),
     LISTING_TRIM_TOLERANCE=(int, 18),
 
+    # Background rendition worker (process_image_renditions)
+    IMAGE_RENDITIONS_ASYNC=(bool, True),
+    IMAGE_RENDITION_WORKERS=(int, 2),
+    IMAGE_RENDITION_LOCK_SECONDS=(int, 600),
+    IMAGE_RENDITION_MAX_ATTEMPTS=(int, 5),
+    BACK_IN_STOCK_ASYNC=(bool, True),
+    BACK_IN_STOCK_CHUNK_SIZE=(int, 500),
+    BACK_IN_STOCK_LOCK_SECONDS=(int, 600),
+
+    # Responsive srcset renditions
+    IMAGE_SRCSET_EAGER=(bool, False),
+    IMAGE_SRCSET_RENDER_CONCURRENCY=(int, 2),
+    IMAGE_SRCSET_RENDER_WAIT_SECONDS=(int, 5),
+
     ZB_PRODUCTS_FEED_URL=(str, ""),
     ZB_STOCKS_FEED_URL=(str, ""),
+    SUPPLIER_IMPORT_WORKERS=(int, 2),
 
     # Shipping (MVP)
     LPEXPRESS_SHIPPING_NET_EUR=(str, "0.00"),
@@ -86,6 +130,43 @@ env = environ.Env(
     DPD_SERVICE_ALIAS_LOCKER=(str, ""),
     DPD_SERVICE_ALIAS_COURIER=(str, ""),
 
+    # Carrier HTTP (DPD/Unisend clients)
+    CARRIER_HTTP_POOL_SIZE=(int, 10),
+    CARRIER_HTTP_RETRIES=(int, 2),
+    CARRIER_HTTP_BACKOFF=(float, 0.5),
+    CARRIER_CONFIG_CACHE_SECONDS=(int, 60),
+
+    # Shipping label jobs
+    LABEL_JOBS_ASYNC=(bool, True),
+    LABEL_JOB_LOCK_SECONDS=(int, 600),
+    DPD_LABEL_BATCH_SIZE=(int, 50),
+    UNISEND_LABEL_BATCH_SIZE=(int, 50),
+
+    # Carrier tracking sync
+    TRACKING_SYNC_WORKERS=(int, 8),
+    TRACKING_SYNC_PAGE_SIZE=(int, 500),
+    DPD_TRACKING_BATCH_SIZE=(int, 1),
+    UNISEND_TRACKING_BATCH_SIZE=(int, 20),
+    TRACKING_STATUS_CACHE_SECONDS=(int, 300),
+    TRACKING_STATUS_CACHE_FINAL_SECONDS=(int, 86400),
+    TRACKING_STATUS_CACHE_MISSING_SECONDS=(int, 60),
+
+    # Pickup point (locker/terminal) search
+    PICKUP_POINT_INDEX_CHECK_SECONDS=(int, 60),
+    PICKUP_POINT_NEAR_RADIUS_KM=(float, 50.0),
+
+    # Neopay bank catalogue
+    NEOPAY_BANKS_CACHE_SECONDS=(int, 60),
+    NEOPAY_BANKS_REFRESH_SECONDS=(int, 21600),
+    NEOPAY_BANKS_FETCH_TIMEOUT_SECONDS=(int, 5),
+    NEOPAY_BANKS_RETRY_SECONDS=(int, 60),
+
+    # Payment callback inbox
+    PAYMENT_CALLBACKS_ASYNC=(bool, True),
+    PAYMENT_CALLBACK_BATCH_SIZE=(int, 50),
+    PAYMENT_CALLBACK_MAX_ATTEMPTS=(int, 8),
+    PAYMENT_CALLBACK_LOCK_SECONDS=(int, 300),
+
     # Promotions/Coupons policy
     COUPON_ALLOWED_CHANNELS=(list, ["normal"]),
 )
@@ -105,6 +186,13 @@ JWT_ALGORITHM = env("JWT_ALGORITHM")
 JWT_ACCESS_TTL_MINUTES = env.int("JWT_ACCESS_TTL_MINUTES")
 JWT_REFRESH_TTL_DAYS = env.int("JWT_REFRESH_TTL_DAYS")
 
+# Access tokens carry the user's auth_version and active customer groups, so
+# authentication needs no User query; only (is_active, auth_version) is checked,
+# cached for AUTH_STATE_CACHE_SECONDS (the longest a deactivation takes to apply
+# in other processes). Tokens without claims still load the user.
+JWT_CLAIMS_AUTH = env.bool("JWT_CLAIMS_AUTH")
+AUTH_STATE_CACHE_SECONDS = env.int("AUTH_STATE_CACHE_SECONDS")
+
 AUTH_COOKIE_ACCESS_NAME = env("AUTH_COOKIE_ACCESS_NAME")
 AUTH_COOKIE_REFRESH_NAME = env("AUTH_COOKIE_REFRESH_NAME")
 AUTH_COOKIE_SAMESITE = env("AUTH_COOKIE_SAMESITE", default="lax").lower()
@@ -120,6 +208,47 @@ AUTH_RETURN_ACCESS_IN_BODY = env.bool("AUTH_RETURN_ACCESS_IN_BODY", default=Fals
 
 RECENTLY_VIEWED_MAX = env.int("RECENTLY_VIEWED_MAX", default=12)
 
+# Customer-group pricing context of users whose token claims are stale (or who use a
+# session); keyed by (user, auth_version), so group changes are picked up at once.
+PRICING_CONTEXT_CACHE_SECONDS = env.int("PRICING_CONTEXT_CACHE_SECONDS")
+
+# Analytics events are queued in-process and bulk-written by a background thread
+# every ANALYTICS_BUFFER_FLUSH_MS or ANALYTICS_BUFFER_BATCH_SIZE events.
+ANALYTICS_BUFFER_ENABLED = env.bool("ANALYTICS_BUFFER_ENABLED", default=True)
+ANALYTICS_BUFFER_MAX_EVENTS = env.int("ANALYTICS_BUFFER_MAX_EVENTS", default=10000)
+ANALYTICS_BUFFER_BATCH_SIZE = env.int("ANALYTICS_BUFFER_BATCH_SIZE", default=500)
+ANALYTICS_BUFFER_FLUSH_MS = env.int("ANALYTICS_BUFFER_FLUSH_MS", default=500)
+ANALYTICS_BUFFER_PUT_TIMEOUT_MS = env.int("ANALYTICS_BUFFER_PUT_TIMEOUT_MS", default=50)
+
+# Outbox delivery (`manage.py dispatch_analytics_outbox`). Providers without a URL are
+# skipped; "class" may point to an `analytics.providers.OutboxProvider` subclass.
+ANALYTICS_OUTBOX_PROVIDERS = {
+    "newsman": {
+        "url": env("ANALYTICS_NEWSMAN_OUTBOX_URL", default=""),
+        "token": env("ANALYTICS_NEWSMAN_OUTBOX_TOKEN", default=""),
+        "batch_size": 100,
+    },
+}
+ANALYTICS_OUTBOX_CONCURRENCY = env.int("ANALYTICS_OUTBOX_CONCURRENCY", default=4)
+ANALYTICS_OUTBOX_MAX_ATTEMPTS = env.int("ANALYTICS_OUTBOX_MAX_ATTEMPTS", default=8)
+ANALYTICS_OUTBOX_BACKOFF_SECONDS = env.int("ANALYTICS_OUTBOX_BACKOFF_SECONDS", default=30)
+ANALYTICS_OUTBOX_BACKOFF_MAX_SECONDS = env.int("ANALYTICS_OUTBOX_BACKOFF_MAX_SECONDS", default=3600)
+ANALYTICS_OUTBOX_LOCK_SECONDS = env.int("ANALYTICS_OUTBOX_LOCK_SECONDS", default=300)
+
+# Rollups (`manage.py rollup_analytics`): events newer than the lag are left for the
+# next run. best_selling sorts by units sold over the last N days (0 = all time).
+ANALYTICS_ROLLUP_LAG_SECONDS = env.int("ANALYTICS_ROLLUP_LAG_SECONDS", default=300)
+ANALYTICS_ROLLUP_WINDOW_HOURS = env.int("ANALYTICS_ROLLUP_WINDOW_HOURS", default=24)
+ANALYTICS_BEST_SELLING_DAYS = env.int("ANALYTICS_BEST_SELLING_DAYS", default=0)
+
+# Monthly event partitions on Postgres (`manage.py analytics_partitions`). Partitions
+# older than ANALYTICS_EVENT_RETENTION_MONTHS (0 = keep all) are archived to
+# ANALYTICS_EVENT_ARCHIVE_DIR as .csv.gz and dropped.
+ANALYTICS_EVENT_PARTITIONS_AHEAD = env.int("ANALYTICS_EVENT_PARTITIONS_AHEAD", default=3)
+ANALYTICS_EVENT_RETENTION_MONTHS = env.int("ANALYTICS_EVENT_RETENTION_MONTHS", default=0)
+ANALYTICS_EVENT_ARCHIVE = env.bool("ANALYTICS_EVENT_ARCHIVE", default=True)
+ANALYTICS_EVENT_ARCHIVE_DIR = env("ANALYTICS_EVENT_ARCHIVE_DIR", default="") or str(BASE_DIR / "var" / "analytics_archive")
+
 EMAIL_OTP_CODE_LENGTH = env.int("EMAIL_OTP_CODE_LENGTH")
 EMAIL_OTP_TTL_MINUTES = env.int("EMAIL_OTP_TTL_MINUTES")
 EMAIL_OTP_RESEND_COOLDOWN_SECONDS = env.int(
@@ -144,6 +273,17 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default=env(
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default=env(
     "DJANGO_DEFAULT_FROM_EMAIL", default=""))
 
+# sync: send_templated_email sends inline. queued: it only stores an OutboundEmail and
+# `manage.py send_queued_emails` delivers in batches over one SMTP connection.
+EMAIL_DELIVERY_MODE = env("EMAIL_DELIVERY_MODE", default="sync")
+EMAIL_QUEUE_BATCH_SIZE = env.int("EMAIL_QUEUE_BATCH_SIZE", default=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int("EMAIL_QUEUE_MAX_ATTEMPTS", default=5)
+EMAIL_QUEUE_BACKOFF_SECONDS = env.int("EMAIL_QUEUE_BACKOFF_SECONDS", default=60)
+EMAIL_QUEUE_BACKOFF_MAX_SECONDS = env.int("EMAIL_QUEUE_BACKOFF_MAX_SECONDS", default=3600)
+EMAIL_QUEUE_LOCK_SECONDS = env.int("EMAIL_QUEUE_LOCK_SECONDS", default=300)
+# Max messages per second per worker (0 = unlimited), e.g. for SMTP provider quotas.
+EMAIL_QUEUE_RATE_PER_SECOND = env.float("EMAIL_QUEUE_RATE_PER_SECOND", default=0.0)
+
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["localhost", "127.0.0.1"])
 
 INSTALLED_APPS = [
@@ -161,6 +301,7 @@ INSTALLED_APPS = [
     "catalog.apps.CatalogConfig",
     "cms.apps.CmsConfig",
     "homebuilder.apps.HomebuilderConfig",
+    "suppliers",
     "zaliuojibanga",
     "shipping",
     "payments",
@@ -185,6 +326,73 @@ DPD_PAYER_CODE = env("DPD_PAYER_CODE", default="")
 DPD_SERVICE_ALIAS_LOCKER = env("DPD_SERVICE_ALIAS_LOCKER", default="")
 DPD_SERVICE_ALIAS_COURIER = env("DPD_SERVICE_ALIAS_COURIER", default="")
 
+# Carrier HTTP layer (shipping.http): keep-alive pool per carrier and thread, transport
+# retries for idempotent calls (connection errors, 429/502/503/504) and how long the
+# DB-stored carrier config is kept in process memory (saves in admin drop it at once).
+CARRIER_HTTP_POOL_SIZE = env.int("CARRIER_HTTP_POOL_SIZE", default=10)
+CARRIER_HTTP_RETRIES = env.int("CARRIER_HTTP_RETRIES", default=2)
+CARRIER_HTTP_BACKOFF = env.float("CARRIER_HTTP_BACKOFF", default=0.5)
+CARRIER_CONFIG_CACHE_SECONDS = env.int("CARRIER_CONFIG_CACHE_SECONDS", default=60)
+
+# Shipping labels (`manage.py process_label_jobs`): admin actions queue a job instead of
+# calling the carrier inside the request; per-order PDFs are cached (content-addressed)
+# and reprints/merged PDFs are built from that cache. Batch sizes are orders per carrier call.
+SHIPPING_LABEL_PROVIDERS = [
+    "dpd.labels.DpdLabelProvider",
+    "unisend.labels.UnisendLabelProvider",
+]
+LABEL_JOBS_ASYNC = env.bool("LABEL_JOBS_ASYNC", default=True)
+LABEL_JOB_LOCK_SECONDS = env.int("LABEL_JOB_LOCK_SECONDS", default=600)
+DPD_LABEL_BATCH_SIZE = env.int("DPD_LABEL_BATCH_SIZE", default=50)
+UNISEND_LABEL_BATCH_SIZE = env.int("UNISEND_LABEL_BATCH_SIZE", default=50)
+
+# Carrier tracking sync (`manage.py sync_tracking_statuses`): concurrent HTTP requests,
+# orders per page (one bulk update each) and tracking numbers per carrier API call.
+SHIPPING_TRACKING_ADAPTERS = [
+    "dpd.tracking.DpdTrackingAdapter",
+    "unisend.tracking.UnisendTrackingAdapter",
+]
+TRACKING_SYNC_WORKERS = env.int("TRACKING_SYNC_WORKERS", default=8)
+TRACKING_SYNC_PAGE_SIZE = env.int("TRACKING_SYNC_PAGE_SIZE", default=500)
+DPD_TRACKING_BATCH_SIZE = env.int("DPD_TRACKING_BATCH_SIZE", default=1)
+UNISEND_TRACKING_BATCH_SIZE = env.int("UNISEND_TRACKING_BATCH_SIZE", default=20)
+# Status lookups (`/dpd/status`, `/unisend/status`) are cached per parcel: parcels on the
+# way for TRACKING_STATUS_CACHE_SECONDS, delivered/cancelled ones for *_FINAL_SECONDS and
+# numbers the carrier doesn't know (yet) for *_MISSING_SECONDS. The sync fills the same cache.
+TRACKING_STATUS_CACHE_SECONDS = env.int("TRACKING_STATUS_CACHE_SECONDS", default=300)
+TRACKING_STATUS_CACHE_FINAL_SECONDS = env.int("TRACKING_STATUS_CACHE_FINAL_SECONDS", default=86400)
+TRACKING_STATUS_CACHE_MISSING_SECONDS = env.int("TRACKING_STATUS_CACHE_MISSING_SECONDS", default=60)
+
+# Pickup point search (`near=lat,lng` on the locker/terminal endpoints, `/export` for maps):
+# each process keeps an in-memory grid index per carrier and country, rebuilt when a sync
+# changed the table (checked at most every PICKUP_POINT_INDEX_CHECK_SECONDS, also the
+# export's Cache-Control max-age, and the TTL of the per-id cache checkout uses to validate
+# `pickup_point_id`). PICKUP_POINT_NEAR_RADIUS_KM is the default `radius`.
+SHIPPING_PICKUP_POINT_SOURCES = [
+    "dpd.pickup_points.DpdPickupPointSource",
+    "unisend.pickup_points.UnisendPickupPointSource",
+]
+PICKUP_POINT_INDEX_CHECK_SECONDS = env.int("PICKUP_POINT_INDEX_CHECK_SECONDS", default=60)
+PICKUP_POINT_NEAR_RADIUS_KM = env.float("PICKUP_POINT_NEAR_RADIUS_KM", default=50.0)
+
+# Neopay banks/countries (bank picker, checkout payment options) are served from the synced
+# catalogue (`manage.py neopay_sync_banks`), kept in process memory for NEOPAY_BANKS_CACHE_SECONDS.
+# A catalogue older than NEOPAY_BANKS_REFRESH_SECONDS is still served and refreshed in the background.
+NEOPAY_BANKS_CACHE_SECONDS = env.int("NEOPAY_BANKS_CACHE_SECONDS", default=60)
+NEOPAY_BANKS_REFRESH_SECONDS = env.int("NEOPAY_BANKS_REFRESH_SECONDS", default=21600)
+# An empty catalogue is fetched inside the request, within this many seconds in total; after a
+# failed fetch a process waits NEOPAY_BANKS_RETRY_SECONDS before calling Neopay again.
+NEOPAY_BANKS_FETCH_TIMEOUT_SECONDS = env.int("NEOPAY_BANKS_FETCH_TIMEOUT_SECONDS", default=5)
+NEOPAY_BANKS_RETRY_SECONDS = env.int("NEOPAY_BANKS_RETRY_SECONDS", default=60)
+
+# Payment gateway callbacks are stored in an inbox and acknowledged at once; the worker
+# (`manage.py process_payment_callbacks --loop`) applies them. With PAYMENT_CALLBACKS_ASYNC
+# off (dev without a worker) they are applied in the request, as are client redirect tokens.
+PAYMENT_CALLBACKS_ASYNC = env.bool("PAYMENT_CALLBACKS_ASYNC", default=True)
+PAYMENT_CALLBACK_BATCH_SIZE = env.int("PAYMENT_CALLBACK_BATCH_SIZE", default=50)
+PAYMENT_CALLBACK_MAX_ATTEMPTS = env.int("PAYMENT_CALLBACK_MAX_ATTEMPTS", default=8)
+PAYMENT_CALLBACK_LOCK_SECONDS = env.int("PAYMENT_CALLBACK_LOCK_SECONDS", default=300)
+
 AUTH_USER_MODEL = "accounts.User"
 
 MIDDLEWARE = [
@@ -195,6 +403,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "pricing.middleware.PricingContextMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -258,9 +467,40 @@ LARGE_SIZE = env.int("LARGE_SIZE", default=600)
 LISTING_IMAGE_SIZE = env.int("LISTING_IMAGE_SIZE", default=MEDIUM_SIZE)
 LISTING_TRIM_TOLERANCE = env.int("LISTING_TRIM_TOLERANCE", default=18)
 
+# ProductImage renditions are generated by `manage.py process_image_renditions`.
+# Set IMAGE_RENDITIONS_ASYNC=False to render inline (dev without a worker).
+IMAGE_RENDITIONS_ASYNC = env.bool("IMAGE_RENDITIONS_ASYNC", default=True)
+IMAGE_RENDITION_WORKERS = env.int("IMAGE_RENDITION_WORKERS", default=2)
+IMAGE_RENDITION_LOCK_SECONDS = env.int("IMAGE_RENDITION_LOCK_SECONDS", default=600)
+# Attempts (including workers that died mid-job) before a job is marked failed.
+IMAGE_RENDITION_MAX_ATTEMPTS = env.int("IMAGE_RENDITION_MAX_ATTEMPTS", default=5)
+
+# Back-in-stock emails are sent by `manage.py process_back_in_stock_jobs`.
+# Set BACK_IN_STOCK_ASYNC=False to send inline after the restock commits (dev without a worker).
+BACK_IN_STOCK_ASYNC = env.bool("BACK_IN_STOCK_ASYNC", default=True)
+BACK_IN_STOCK_CHUNK_SIZE = env.int("BACK_IN_STOCK_CHUNK_SIZE", default=500)
+BACK_IN_STOCK_LOCK_SECONDS = env.int("BACK_IN_STOCK_LOCK_SECONDS", default=600)
+
+# Responsive `srcset` renditions (width x format, aspect ratio kept, never upscaled).
+# Lazy by default: rendered on the first request to the catalog rendition endpoint and
+# kept on storage. IMAGE_SRCSET_EAGER=True renders them together with the other renditions.
+IMAGE_SRCSET_WIDTHS = sorted({int(w) for w in env.list("IMAGE_SRCSET_WIDTHS", default=["200", "400", "800", "1600"]) if str(w).strip()})
+IMAGE_SRCSET_FORMATS = [f.strip().lower() for f in env.list("IMAGE_SRCSET_FORMATS", default=["avif", "webp"]) if f.strip()]
+IMAGE_SRCSET_EAGER = env.bool("IMAGE_SRCSET_EAGER", default=False)
+# Lazy renders running at once per process; a request that waits longer than
+# IMAGE_SRCSET_RENDER_WAIT_SECONDS for a slot is redirected to the stored rendition instead.
+IMAGE_SRCSET_RENDER_CONCURRENCY = env.int("IMAGE_SRCSET_RENDER_CONCURRENCY", default=2)
+IMAGE_SRCSET_RENDER_WAIT_SECONDS = env.int("IMAGE_SRCSET_RENDER_WAIT_SECONDS", default=5)
+
 ZB_PRODUCTS_FEED_URL = env("ZB_PRODUCTS_FEED_URL", default="")
 ZB_STOCKS_FEED_URL = env("ZB_STOCKS_FEED_URL", default="")
 
+# Supplier import framework: adapters (dotted paths) + parallel processes per run.
+SUPPLIER_ADAPTERS = [
+    "zaliuojibanga.adapter.ZaliojiBangaAdapter",
+]
+SUPPLIER_IMPORT_WORKERS = env.int("SUPPLIER_IMPORT_WORKERS", default=2)
+
 LPEXPRESS_SHIPPING_NET_EUR = env("LPEXPRESS_SHIPPING_NET_EUR", default="0.00")
 DEFAULT_SHIPPING_TAX_CLASS_CODE = env(
     "DEFAULT_SHIPPING_TAX_CLASS_CODE", default="standard")
@@ -320,6 +560,9 @@ CSRF_TRUSTED_ORIGINS = env.list(
 # API routing
 API_BASE_PATH = env("API_BASE_PATH", default=env(
     "NINJA_BASE_PATH", default="api"))
+# Public origin of the API (e.g. https://api.example.com) for absolute URLs in responses
+# (srcset rendition links, also in the cached home payload); empty = the request's host.
+API_PUBLIC_URL = env("API_PUBLIC_URL", default="")
 
 # --- Promotions/Coupons policy ---
 COUPON_ALLOWED_CHANNELS = [c.strip().lower() for c in env.list("COUPON_ALLOWED_CHANNELS", default=["normal"]) if c.strip()]
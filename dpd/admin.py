@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import helpers
 from django.http import HttpResponseRedirect
 
-from .client import DpdClient
+from shipping.http import format_carrier_http_metrics
+from shipping.pickup_points import sync_pickup_points
+
+from .client import DpdApiError
 from .models import DpdConfig, DpdLocker
 
 
@@ -50,6 +53,10 @@ class DpdConfigAdmin(admin.ModelAdmin):
         # Jei nėra įrašo – sukurk automatiškai, kad admin'e visada būtų kur suvesti.
         if not DpdConfig.objects.exists():
             DpdConfig.get_solo()
+        metrics = format_carrier_http_metrics("dpd")
+        if metrics:
+            # Calls made by this web process since it started.
+            self.message_user(request, f"DPD API: {metrics}")
         return super().changelist_view(request, extra_context=extra_context)
 
 
@@ -96,56 +103,19 @@ class DpdLockerAdmin(admin.ModelAdmin):
         return super().response_action(request, queryset)
 
     def _sync_country(self, request, *, country_code: str) -> None:
-        params: dict = {"countryCode": country_code, "limit": 10000}
-        items = DpdClient().list_lockers(params=params)
-        created = 0
-        updated = 0
-
-        for it in items:
-            if not isinstance(it, dict):
-                continue
-            locker_id = str(it.get("id") or it.get("lockerId")
-                            or it.get("code") or "").strip()
-            if not locker_id:
-                continue
-
-            addr = it.get("address")
-            addr = addr if isinstance(addr, dict) else {}
-
-            obj, was_created = DpdLocker.objects.get_or_create(
-                locker_id=locker_id)
-            obj.country_code = str(
-                it.get("countryCode")
-                or addr.get("country")
-                or country_code
-                or ""
-            ).strip().upper()
-            obj.city = str(it.get("city") or addr.get("city") or "").strip()
-            obj.name = str(it.get("name") or "").strip()
-            obj.street = str(
-                it.get("street")
-                or addr.get("street")
-                or it.get("address")
-                or ""
-            ).strip()
-            obj.postal_code = str(
-                it.get("postalCode")
-                or addr.get("postalCode")
-                or addr.get("postal_code")
-                or ""
-            ).strip()
-            obj.raw = it
-            obj.is_active = True
-            obj.save()
-
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
+        try:
+            stats = sync_pickup_points(
+                "dpd",
+                country_code,
+                deactivate_missing=False,
+            )
+        except DpdApiError as e:
+            self.message_user(request, f"DPD lockers sync ({country_code}): {e}", level=messages.ERROR)
+            return
         self.message_user(
             request,
-            f"DPD lockers sync ({country_code}): created={created}, updated={updated}, total_seen={created + updated}",
+            f"DPD lockers sync ({country_code}): created={stats.created}, updated={stats.updated}, "
+            f"unchanged={stats.unchanged}, deactivated={stats.deactivated}, total_seen={stats.seen}",
         )
 
     @admin.action(description="Sync DPD lockers: LT")
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import requests
 from django.db.models import Q
+from django.http import HttpResponse
 from ninja import Router
 from ninja.errors import HttpError
 
-from .client import DpdApiError, DpdClient
+from shipping.pickup_points import PickupPoint, export_pickup_points, nearest_pickup_points
+from shipping.schemas import PickupPointsExportOut, TrackingStatusOut
+from shipping.tracking import get_tracking_status
+
+from .client import DpdApiError
 from .models import DpdLocker
-from .schemas import LockerOut, StatusOut
+from .schemas import LockerOut
 
 router = Router(tags=["DPD"])  # mounted under /dpd
 
@@ -20,6 +26,8 @@ def list_lockers(
     locker_type: str | None = None,
     postal_code: str | None = None,
     limit: int | None = 1000,
+    near: str | None = None,
+    radius: float | None = None,
 ):
     cc = (country_code or "").strip().upper()
     if len(cc) != 2:
@@ -28,6 +36,24 @@ def list_lockers(
     lim = 50 if limit is None else int(limit)
     lim = max(1, min(lim, 1000))
 
+    if near:
+        # Nearest first, from the in-memory index (`limit` = K, `radius` in km).
+        try:
+            hits = nearest_pickup_points(
+                "dpd",
+                cc,
+                near,
+                k=lim,
+                radius_km=radius,
+                city=city,
+                postal_code=postal_code,
+                kind=locker_type,
+                search=search,
+            )
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return [_locker_out(p, distance_km=d) for p, d in hits]
+
     qs = DpdLocker.objects.filter(is_active=True, country_code=cc)
 
     if city:
@@ -71,15 +97,48 @@ def list_lockers(
     return [x for x in out if x.id]
 
 
-@router.get("/status", response=StatusOut)
-def get_status(request, tracking_number: str):
+def _locker_out(p: PickupPoint, *, distance_km: float | None = None) -> LockerOut:
+    return LockerOut(
+        id=p.id,
+        name=p.name,
+        lockerType=p.kind,
+        countryCode=p.country_code,
+        city=p.city,
+        street=p.street,
+        postalCode=p.postal_code,
+        latitude=p.latitude,
+        longitude=p.longitude,
+        distanceKm=round(distance_km, 3) if distance_km is not None else None,
+    )
+
+
+@router.get("/lockers/export", response=PickupPointsExportOut)
+def export_lockers(request, response: HttpResponse, country_code: str = "LT"):
+    """All active lockers of a country as compact rows (`fields` + `rows`) for the checkout map.
+
+    Served from the in-memory index with an `ETag`; a repeated request with
+    `If-None-Match` gets 304 until the next sync changes the lockers.
+    """
+    cc = (country_code or "").strip().upper()
+    if len(cc) != 2:
+        raise HttpError(400, "Invalid country_code")
+    return export_pickup_points(request, response, carrier_code="dpd", country_code=cc)
+
+
+@router.get("/status", response=TrackingStatusOut)
+def get_status(request, response: HttpResponse, tracking_number: str):
+    """Parcel status, cached per status (see `shipping.tracking.get_tracking_status`)."""
     pknr = (tracking_number or "").strip()
     if not pknr:
         raise HttpError(400, "tracking_number is required")
 
     try:
-        raw = DpdClient().get_status(pknr=pknr, detail="0", show_all="0")
+        snapshot = get_tracking_status("dpd", pknr)
     except DpdApiError as e:
         raise HttpError(502, str(e))
+    except (requests.RequestException, TimeoutError):
+        # No synced status to fall back to (see get_tracking_status).
+        raise HttpError(502, "DPD tracking is not available")
 
-    return StatusOut(raw=raw)
+    response["Cache-Control"] = f"private, max-age={snapshot.max_age}"
+    return snapshot.as_out()
@@ -6,6 +6,8 @@ from typing import Any
 import requests
 from django.conf import settings
 
+from shipping.http import CarrierHttp, ExpiringValue
+
 
 @dataclass(frozen=True)
 class DpdConfig:
@@ -18,7 +20,7 @@ class DpdApiError(RuntimeError):
     pass
 
 
-def _get_cfg() -> DpdConfig:
+def _load_cfg() -> DpdConfig:
     base_url = ""
     token = ""
     status_lang = ""
@@ -47,9 +49,24 @@ def _get_cfg() -> DpdConfig:
     return DpdConfig(base_url=base_url, token=token, status_lang=status_lang)
 
 
+# Read once per CARRIER_CONFIG_CACHE_SECONDS instead of on every client; dropped when
+# the admin saves `dpd.DpdConfig` (see dpd.signals).
+_cfg_cache: ExpiringValue[DpdConfig] = ExpiringValue(_load_cfg)
+
+
+def _get_cfg() -> DpdConfig:
+    return _cfg_cache.get()
+
+
+def invalidate_config_cache() -> None:
+    _cfg_cache.invalidate()
+
+
 class DpdClient:
-    def __init__(self) -> None:
+    def __init__(self, *, session: requests.Session | None = None) -> None:
         self.cfg = _get_cfg()
+        # Pooled keep-alive session (per thread unless `session` is given) with retries and metrics.
+        self.http = CarrierHttp("dpd", session=session)
 
     def _headers(self, *, accept: str = "application/json") -> dict[str, str]:
         headers = {
@@ -61,7 +78,7 @@ class DpdClient:
 
     def list_lockers(self, *, params: dict[str, Any]) -> list[dict[str, Any]]:
         url = f"{self.cfg.base_url}/lockers/"
-        r = requests.get(url, params=params,
+        r = self.http.get(url, op="lockers", params=params,
                          headers=self._headers(), timeout=20)
         if r.status_code >= 400:
             raise DpdApiError(
@@ -79,7 +96,7 @@ class DpdClient:
             "show_all": show_all,
             "lang": self.cfg.status_lang,
         }
-        r = requests.get(url, params=params,
+        r = self.http.get(url, op="status", params=params,
                          headers=self._headers(), timeout=20)
         if r.status_code >= 400:
             raise DpdApiError(
@@ -91,8 +108,9 @@ class DpdClient:
 
     def create_shipments(self, *, shipments: list[dict[str, Any]]) -> list[dict[str, Any]]:
         url = f"{self.cfg.base_url}/shipments"
-        r = requests.post(
+        r = self.http.post(
             url,
+            op="shipments.create",
             json=shipments,
             headers={
                 **self._headers(accept="application/json"),
@@ -114,7 +132,7 @@ class DpdClient:
         params: dict[str, Any] = {}
         if ids:
             params["ids[]"] = [str(x).strip() for x in ids if str(x).strip()]
-        r = requests.get(url, params=params, headers=self._headers(), timeout=20)
+        r = self.http.get(url, op="shipments", params=params, headers=self._headers(), timeout=20)
         if r.status_code >= 400:
             raise DpdApiError(
                 f"DPD shipments failed: {r.status_code} {r.text[:300]}"
@@ -131,8 +149,9 @@ class DpdClient:
     def create_labels_pdf(self, *, payload: dict[str, Any], endpoint: str = "/shipments/labels") -> bytes:
         endpoint = endpoint if endpoint.startswith("/") else f"/{endpoint}"
         url = f"{self.cfg.base_url}{endpoint}"
-        r = requests.post(
+        r = self.http.post(
             url,
+            op="labels",
             json=payload,
             headers={
                 **self._headers(accept="application/pdf"),
@@ -179,7 +198,7 @@ class DpdClient:
         if package_size:
             params["packageSize"] = str(package_size).strip()
 
-        r = requests.get(url, params=params, headers=self._headers(), timeout=20)
+        r = self.http.get(url, op="services", params=params, headers=self._headers(), timeout=20)
         if r.status_code >= 400:
             raise DpdApiError(f"DPD services failed: {r.status_code} {r.text[:300]}")
         return r.json()
@@ -9,6 +9,8 @@ from django.core.files.base import ContentFile
 from django.utils import timezone
 
 from checkout.models import Order
+from shipping.labels import LabelProvider
+from shipping.pdf import split_pages
 
 from .client import DpdApiError, DpdClient
 
@@ -375,29 +377,23 @@ def generate_a6_label_pdf_for_order(
     return pdf
 
 
-def generate_a6_labels_pdf_for_orders(
+def ensure_dpd_shipments(
     orders: Iterable[Order],
     *,
-    client: DpdClient | None = None,
-) -> tuple[bytes, list[tuple[int, str]]]:
-    client = client or DpdClient()
-    cfg = _get_shipment_cfg()
-
-    parcels: list[str] = []
-    shipment_ids: list[str] = []
-    updated: list[tuple[int, str]] = []
+    client: DpdClient,
+    cfg: DpdShipmentConfig | None = None,
+) -> list[tuple[Order, str, str]]:
+    """(order, shipment_id, parcel) for every order; missing shipments are created in one call."""
+    cfg = cfg or _get_shipment_cfg()
+    result: dict[int, tuple[Order, str, str]] = {}
+    orders = list(orders)
 
     to_create: list[Order] = []
     for o in orders:
         existing_shipment_id = (o.carrier_shipment_id or "").strip()
         existing_parcel = (o.tracking_number or "").strip()
         if (o.carrier_code or "").strip() == "dpd" and (existing_shipment_id or existing_parcel):
-            if existing_shipment_id:
-                shipment_ids.append(existing_shipment_id)
-                updated.append((o.id, existing_parcel or existing_shipment_id))
-            elif existing_parcel:
-                parcels.append(existing_parcel)
-                updated.append((o.id, existing_parcel))
+            result[o.id] = (o, existing_shipment_id, existing_parcel)
         else:
             to_create.append(o)
 
@@ -465,17 +461,42 @@ def generate_a6_labels_pdf_for_orders(
                     "updated_at",
                 ]
             )
+            result[o.id] = (o, shipment_id, parcel)
 
-            if shipment_id:
-                shipment_ids.append(shipment_id)
-                updated.append((o.id, parcel or shipment_id))
-            elif parcel:
-                parcels.append(parcel)
-                updated.append((o.id, parcel))
+    return [result[o.id] for o in orders]
 
-    if not shipment_ids and not parcels:
-        raise RuntimeError("Nėra shipmentIds/parcelNumbers lipdukų generavimui")
 
+def _backfill_parcel_numbers(orders: Iterable[Order], *, shipment_ids: list[str], client: DpdClient) -> None:
+    # Best-effort: backfill tracking numbers for shipments created without parcelNumbers.
+    if not shipment_ids:
+        return
+    try:
+        ships = client.get_shipments(ids=shipment_ids)
+        by_id: dict[str, dict[str, Any]] = {}
+        for sh in ships:
+            sid = str(sh.get("id") or "").strip()
+            if sid:
+                by_id[sid] = sh
+
+        for o in orders:
+            if (o.carrier_code or "").strip() != "dpd":
+                continue
+            if (o.tracking_number or "").strip():
+                continue
+            sid = (o.carrier_shipment_id or "").strip()
+            if not sid:
+                continue
+            sh = by_id.get(sid) or {}
+            pn = sh.get("parcelNumbers") or []
+            parcel = str(pn[0]).strip() if pn else ""
+            if parcel:
+                o.tracking_number = parcel
+                o.save(update_fields=["tracking_number", "updated_at"])
+    except Exception:
+        pass
+
+
+def _labels_payload(*, shipment_ids: list[str] | None = None, parcels: list[str] | None = None) -> dict[str, Any]:
     payload: dict[str, Any] = {
         "downloadLabel": True,
         "emailLabel": False,
@@ -487,35 +508,88 @@ def generate_a6_labels_pdf_for_orders(
     if shipment_ids:
         payload["shipmentIds"] = shipment_ids
     else:
-        payload["parcelNumbers"] = parcels
-    pdf = client.create_labels_pdf(
-        payload=payload, endpoint="/shipments/labels")
+        payload["parcelNumbers"] = parcels or []
+    return payload
 
-    # Best-effort: backfill tracking numbers for shipments created without parcelNumbers.
-    if shipment_ids:
-        try:
-            ships = client.get_shipments(ids=shipment_ids)
-            by_id: dict[str, dict[str, Any]] = {}
-            for sh in ships:
-                sid = str(sh.get("id") or "").strip()
-                if sid:
-                    by_id[sid] = sh
-
-            for o in orders:
-                if (o.carrier_code or "").strip() != "dpd":
-                    continue
-                if (o.tracking_number or "").strip():
-                    continue
-                sid = (o.carrier_shipment_id or "").strip()
-                if not sid:
-                    continue
-                sh = by_id.get(sid) or {}
-                pn = sh.get("parcelNumbers") or []
-                parcel = str(pn[0]).strip() if pn else ""
-                if parcel:
-                    o.tracking_number = parcel
-                    o.save(update_fields=["tracking_number", "updated_at"])
-        except Exception:
-            pass
+
+def generate_a6_labels_pdf_for_orders(
+    orders: Iterable[Order],
+    *,
+    client: DpdClient | None = None,
+) -> tuple[bytes, list[tuple[int, str]]]:
+    client = client or DpdClient()
+    orders = list(orders)
+
+    parcels: list[str] = []
+    shipment_ids: list[str] = []
+    updated: list[tuple[int, str]] = []
+    for o, shipment_id, parcel in ensure_dpd_shipments(orders, client=client):
+        if shipment_id:
+            shipment_ids.append(shipment_id)
+            updated.append((o.id, parcel or shipment_id))
+        elif parcel:
+            parcels.append(parcel)
+            updated.append((o.id, parcel))
+
+    if not shipment_ids and not parcels:
+        raise RuntimeError("Nėra shipmentIds/parcelNumbers lipdukų generavimui")
+
+    pdf = client.create_labels_pdf(
+        payload=_labels_payload(shipment_ids=shipment_ids, parcels=parcels), endpoint="/shipments/labels")
+    _backfill_parcel_numbers(orders, shipment_ids=shipment_ids, client=client)
 
     return pdf, updated
+
+
+def generate_a6_label_pdfs_by_order(
+    orders: Iterable[Order],
+    *,
+    client: DpdClient | None = None,
+) -> dict[int, bytes]:
+    """A6 label PDF per order id, fetched with one labels call per chunk where possible.
+
+    DPD returns one A6 page per shipment in request order; the batch PDF is split
+    back per order. If the page count does not match, labels are requested one
+    order at a time instead.
+    """
+    client = client or DpdClient()
+    orders = list(orders)
+    shipments = ensure_dpd_shipments(orders, client=client)
+
+    with_id = [(o, sid) for o, sid, _ in shipments if sid]
+    by_parcel = [(o, parcel) for o, sid, parcel in shipments if not sid and parcel]
+    missing = [o.id for o, sid, parcel in shipments if not sid and not parcel]
+    if missing:
+        raise RuntimeError(f"DPD: nerastas nei shipment_id, nei parcelNumber lipduko generavimui (order: {missing})")
+
+    out: dict[int, bytes] = {}
+    if with_id:
+        pdf = client.create_labels_pdf(payload=_labels_payload(shipment_ids=[sid for _, sid in with_id]))
+        pages = split_pages(pdf) if len(with_id) > 1 else [pdf]
+        if len(pages) == len(with_id):
+            out.update({o.id: page for (o, _), page in zip(with_id, pages)})
+        else:
+            for o, sid in with_id:
+                out[o.id] = client.create_labels_pdf(payload=_labels_payload(shipment_ids=[sid]))
+    for o, parcel in by_parcel:
+        out[o.id] = client.create_labels_pdf(payload=_labels_payload(parcels=[parcel]))
+
+    _backfill_parcel_numbers(orders, shipment_ids=[sid for _, sid in with_id], client=client)
+    return out
+
+
+class DpdLabelProvider(LabelProvider):
+    carrier_code = "dpd"
+    shipping_methods = ("dpd_locker", "dpd_courier")
+    label_format = "A6"
+    errors = (DpdLabelConfigError, DpdApiError, RuntimeError, ValueError)
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, int(getattr(settings, "DPD_LABEL_BATCH_SIZE", 50) or 50))
+
+    def open(self):
+        return DpdClient()
+
+    def generate(self, context: DpdClient, orders: list[Order]) -> dict[int, bytes]:
+        return generate_a6_label_pdfs_by_order(orders, client=context)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any
+
+from shipping.pickup_points import PickupPoint, PickupPointSource, coordinate
+
+from .client import DpdApiError, DpdClient
+from .models import DpdLocker
+
+
+class DpdPickupPointSource(PickupPointSource):
+    carrier_code = "dpd"
+    model = DpdLocker
+    id_field = "locker_id"
+    sync_fields = ("country_code", "city", "name", "street", "postal_code", "latitude", "longitude", "raw")
+    errors = (DpdApiError,)
+
+    def to_point(self, obj: DpdLocker) -> PickupPoint:
+        raw = obj.raw if isinstance(obj.raw, dict) else {}
+        return PickupPoint(
+            carrier_code=self.carrier_code,
+            id=str(obj.locker_id or ""),
+            country_code=str(obj.country_code or ""),
+            name=str(obj.name or ""),
+            city=str(obj.city or ""),
+            street=str(obj.street or ""),
+            postal_code=str(obj.postal_code or ""),
+            kind=str(raw.get("lockerType") or ""),
+            latitude=float(obj.latitude) if obj.latitude is not None else None,
+            longitude=float(obj.longitude) if obj.longitude is not None else None,
+        )
+
+    def fetch(self, country_code: str, *, city: str = "", limit: int = 10000) -> list[Any]:
+        params: dict[str, Any] = {"countryCode": country_code, "limit": int(limit or 10000)}
+        if city:
+            params["city"] = city
+        return DpdClient().list_lockers(params=params)
+
+    def parse(self, item: dict[str, Any], country_code: str) -> dict[str, Any] | None:
+        locker_id = str(item.get("id") or item.get("lockerId") or item.get("code") or "").strip()
+        if not locker_id:
+            return None
+
+        addr = item.get("address")
+        addr = addr if isinstance(addr, dict) else {}
+
+        lat = item.get("latitude")
+        lng = item.get("longitude")
+        if lat is None or lng is None:
+            lat_lng = addr.get("latLong")
+            if isinstance(lat_lng, (list, tuple)) and len(lat_lng) >= 2:
+                lat = lat if lat is not None else lat_lng[0]
+                lng = lng if lng is not None else lat_lng[1]
+
+        return {
+            "locker_id": locker_id,
+            "country_code": str(item.get("countryCode") or addr.get("country") or country_code or "").strip().upper(),
+            "city": str(item.get("city") or addr.get("city") or "").strip(),
+            "name": str(item.get("name") or "").strip(),
+            "street": str(item.get("street") or addr.get("street") or item.get("address") or "").strip(),
+            "postal_code": str(
+                item.get("postalCode") or addr.get("postalCode") or addr.get("postal_code") or ""
+            ).strip(),
+            "latitude": coordinate(lat),
+            "longitude": coordinate(lng),
+            "raw": item,
+        }
@@ -15,7 +15,5 @@ class LockerOut(Schema):
 
     latitude: float | None = None
     longitude: float | None = None
-
-
-class StatusOut(Schema):
-    raw: list[dict]
+    # Only in `near` mode: great-circle distance from the given point.
+    distanceKm: float | None = None
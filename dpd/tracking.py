@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from django.conf import settings
+
+from checkout.models import Order
+from shipping.tracking import TrackingAdapter, TrackingStatus
+
+from .client import DpdClient
+
+
+# DPD `statusCode` values we map; matched exactly (lower-cased).
+_CODES = {
+    "delivered": Order.DeliveryStatus.DELIVERED,
+    "label_created": Order.DeliveryStatus.LABEL_CREATED,
+    "created": Order.DeliveryStatus.LABEL_CREATED,
+}
+# Whole status texts (normalized, see `_phrase`). Delivery is final, so only
+# these exact phrases count: "Not delivered", "Undelivered", "Nepristatyta" or
+# "Delivered to pickup point" map to no conclusion.
+_DELIVERED = frozenset({
+    "delivered",
+    "parcel delivered",
+    "delivered to consignee",
+    "delivered to recipient",
+    "pristatyta",
+    "siunta pristatyta",
+    "pristatyta gavėjui",
+    "siunta pristatyta gavėjui",
+    "atsiimta",
+    "siunta atsiimta",
+    "atiduota",
+    "atiduota gavėjui",
+    "siunta atiduota gavėjui",
+})
+# Anchored at the start of the text, so negations ("not shipped", "neišsiųsta") don't match.
+_SHIPPED = ("shipped", "on the way", "in transit", "kelyje", "siunta kelyje", "išsiųsta", "issiusta", "siunta išsiųsta")
+_PARCEL_KEYS = ("parcelNumber", "parcelNo", "pknr", "parcel_number")
+
+
+def _status_text(item: dict[str, Any]) -> str:
+    return str(
+        item.get("status")
+        or item.get("statusText")
+        or item.get("statusDescription")
+        or item.get("statusName")
+        or ""
+    )
+
+
+def _phrase(text: str) -> str:
+    """Lower-cased status text with punctuation dropped and whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class DpdTrackingAdapter(TrackingAdapter):
+    """DPD `/status/tracking`; several parcel numbers per call when `DPD_TRACKING_BATCH_SIZE` > 1."""
+
+    carrier_code = "dpd"
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, int(getattr(settings, "DPD_TRACKING_BATCH_SIZE", 1) or 1))
+
+    def open(self, session):
+        return DpdClient(session=session)
+
+    def fetch(self, context: DpdClient, tracking_numbers: list[str]) -> dict[str, Any]:
+        raw = context.get_status(pknr=",".join(tracking_numbers), detail="0", show_all="0")
+        if len(tracking_numbers) == 1:
+            return {tracking_numbers[0]: raw} if raw else {}
+
+        # Batched call: split the statuses back per parcel number.
+        out: dict[str, list[dict[str, Any]]] = {}
+        for item in raw:
+            if not isinstance(item, dict):
+                continue
+            number = next((str(item[k]).strip() for k in _PARCEL_KEYS if item.get(k)), "")
+            if number in tracking_numbers:
+                out.setdefault(number, []).append(item)
+        return out
+
+    def map_status(self, raw: Any) -> TrackingStatus:
+        # DPD lists the latest status first.
+        latest = raw[0] if isinstance(raw, list) and raw and isinstance(raw[0], dict) else {}
+        text = _status_text(latest)
+        code = str(latest.get("statusCode") or latest.get("code") or "").strip().lower()
+        if code not in _CODES:
+            phrase = _phrase(text)
+            code = phrase if phrase in _DELIVERED else next(
+                (p for p in _SHIPPED if phrase == p or phrase.startswith(p + " ")), ""
+            )
+        status = self.status_for_code(code)
+        return TrackingStatus(status, text, code if status else "")
+
+    def status_for_code(self, code: str) -> str | None:
+        if code in _CODES:
+            return _CODES[code]
+        if code in _DELIVERED:
+            return Order.DeliveryStatus.DELIVERED
+        if code in _SHIPPED:
+            return Order.DeliveryStatus.SHIPPED
+        return None
@@ -8,6 +8,7 @@ from ninja.errors import HttpError
 from api.i18n import get_request_language_code
 
 from catalog.home_services import get_products_by_slugs_for_grid, get_products_for_grid
+from catalog.images import rendition_base_url
 from catalog.models import Category
 
 from cms.services import translation_fallback_chain
@@ -76,7 +77,12 @@ def home(
     if language_code is None:
         language_code = get_request_language_code(request)
 
-    cache_key = f"homebuilder:home:v1:cc:{(country_code or '').upper()}:ch:{(channel or '').lower()}:lang:{(language_code or '').lower()}"
+    # Lazy srcset links are absolute: API_PUBLIC_URL, else this request's host (then part of the key).
+    rendition_base = rendition_base_url(request)
+    cache_key = (
+        f"homebuilder:home:v1:cc:{(country_code or '').upper()}:ch:{(channel or '').lower()}"
+        f":lang:{(language_code or '').lower()}:img:{rendition_base}"
+    )
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
@@ -139,6 +145,7 @@ def home(
                 channel=channel,
                 product_slugs=pinned_slugs,
                 in_stock_only=True,
+                rendition_base=rendition_base,
             )
             pinned_ids = {int(p["id"]) for p in pinned_items if isinstance(p, dict) and p.get("id") is not None}
 
@@ -163,6 +170,7 @@ def home(
                     in_stock_only=in_stock_only,
                     limit=remaining,
                     exclude_product_ids=pinned_ids,
+                    rendition_base=rendition_base,
                 )
 
             items = pinned_items + grid_items
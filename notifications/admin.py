@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 
+from .delivery import email_queue_metrics
 from .models import EmailTemplate, OutboundEmail
 
 
@@ -14,23 +16,47 @@ class EmailTemplateAdmin(admin.ModelAdmin):
 @admin.register(OutboundEmail)
 class OutboundEmailAdmin(admin.ModelAdmin):
     list_display = ("to_email", "template_key",
-                    "status", "created_at", "sent_at")
+                    "status", "attempts", "created_at", "sent_at")
     list_filter = ("status", "template_key")
     search_fields = ("to_email", "subject", "template_key")
     ordering = ("-created_at",)
+    actions = ("retry_now",)
 
     readonly_fields = (
         "to_email",
+        "from_email",
         "template_key",
         "subject",
         "body_text",
         "body_html",
         "status",
+        "attempts",
+        "run_after",
         "error_message",
         "created_at",
         "sent_at",
     )
 
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=OutboundEmail.Status.SENT).update(
+            status=OutboundEmail.Status.PENDING,
+            attempts=0,
+            run_after=timezone.now(),
+            locked_at=None,
+        )
+        self.message_user(request, f"Queued {count} email(s) for delivery.")
+
+    retry_now.short_description = "Queue selected emails for (re)delivery"
+
+    def changelist_view(self, request, extra_context=None):
+        metrics = email_queue_metrics()
+        by_status = " ".join(f"{k}={v}" for k, v in metrics["by_status"].items())
+        self.message_user(
+            request,
+            f"{by_status} | due={metrics['due']} retrying={metrics['retrying']} sent (1h)={metrics['sent_recent']}",
+        )
+        return super().changelist_view(request, extra_context=extra_context)
+
     def has_add_permission(self, request):
         return False
 
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def queue_enabled() -> bool:
+    return str(getattr(settings, "EMAIL_DELIVERY_MODE", "sync") or "sync").strip().lower() == "queued"
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    base = max(1, _setting_int("EMAIL_QUEUE_BACKOFF_SECONDS", 60))
+    cap = max(base, _setting_int("EMAIL_QUEUE_BACKOFF_MAX_SECONDS", 3600))
+    return timedelta(seconds=min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+def build_message(outbound: OutboundEmail, *, connection=None) -> EmailMultiAlternatives:
+    msg = EmailMultiAlternatives(
+        subject=outbound.subject,
+        body=outbound.body_text,
+        from_email=outbound.from_email or getattr(settings, "DEFAULT_FROM_EMAIL", None) or None,
+        to=[outbound.to_email],
+        connection=connection,
+    )
+    if outbound.body_html:
+        msg.attach_alternative(outbound.body_html, "text/html")
+    return msg
+
+
+def _claim_for_inline_send(outbounds: list[OutboundEmail]) -> list[OutboundEmail]:
+    """Claim still-pending rows for an inline send; rows a queue worker already took are dropped."""
+    pending = {o.id: o for o in outbounds if o.status == OutboundEmail.Status.PENDING}
+    if not pending:
+        return outbounds
+    now = timezone.now()
+    with transaction.atomic():
+        won = set(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(id__in=list(pending), status=OutboundEmail.Status.PENDING)
+            .values_list("id", flat=True)
+        )
+        if won:
+            OutboundEmail.objects.filter(id__in=won).update(status=OutboundEmail.Status.SENDING, locked_at=now)
+    for outbound_id in won:
+        pending[outbound_id].status = OutboundEmail.Status.SENDING
+        pending[outbound_id].locked_at = now
+    return [o for o in outbounds if o.id not in pending or o.id in won]
+
+
+def send_outbound_now(outbounds: list[OutboundEmail], *, connection=None) -> dict[int, str]:
+    """Send already stored emails right away over one connection; returns {id: error} of failures.
+
+    Rows should be inserted claimed (`sending` with `locked_at` set) so the queue
+    worker never sees them; `pending` rows are claimed here first, and any a
+    worker got to earlier are left to it. Results are written only to rows still
+    holding this claim, so a worker that took over a stale lock is not
+    overwritten. Pass `connection` to reuse one backend connection across calls
+    (the caller closes it).
+    """
+    errors: dict[int, str] = {}
+    outbounds = _claim_for_inline_send(outbounds)
+    if not outbounds:
+        return errors
+    owned = connection is None
+    if owned:
+        connection = get_connection(fail_silently=False)
+    try:
+        for outbound in outbounds:
+            try:
+                # No-op when the connection is already open.
+                connection.open()
+                connection.send_messages([build_message(outbound, connection=connection)])
+            except Exception as exc:
+                errors[outbound.id] = str(exc) or exc.__class__.__name__
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+    finally:
+        if owned:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    now = timezone.now()
+    sent_by_lock: dict[datetime, list[int]] = {}
+    with transaction.atomic():
+        for outbound in outbounds:
+            lock = outbound.locked_at
+            outbound.attempts += 1
+            outbound.locked_at = None
+            if outbound.id in errors:
+                outbound.status = OutboundEmail.Status.FAILED
+                outbound.error_message = errors[outbound.id]
+                OutboundEmail.objects.filter(
+                    id=outbound.id, status=OutboundEmail.Status.SENDING, locked_at=lock
+                ).update(
+                    status=outbound.status,
+                    attempts=F("attempts") + 1,
+                    error_message=outbound.error_message,
+                    locked_at=None,
+                )
+            else:
+                outbound.status = OutboundEmail.Status.SENT
+                outbound.sent_at = now
+                sent_by_lock.setdefault(lock, []).append(outbound.id)
+        for lock, ids in sent_by_lock.items():
+            OutboundEmail.objects.filter(id__in=ids, status=OutboundEmail.Status.SENDING, locked_at=lock).update(
+                status=OutboundEmail.Status.SENT,
+                attempts=F("attempts") + 1,
+                sent_at=now,
+                error_message="",
+                locked_at=None,
+            )
+    return errors
+
+
+def claim_email_batch(*, batch_size: int) -> list[int]:
+    """Lock due emails (pending, or sending with an expired lock) for this worker."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting_int("EMAIL_QUEUE_LOCK_SECONDS", 300))
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboundEmail.Status.PENDING, run_after__lte=now)
+                | Q(status=OutboundEmail.Status.SENDING, locked_at__lt=stale_before)
+            )
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[: max(1, int(batch_size))]
+        )
+        if ids:
+            OutboundEmail.objects.filter(id__in=ids).update(status=OutboundEmail.Status.SENDING, locked_at=now)
+    return ids
+
+
+class _RateLimiter:
+    """Spaces sends so a worker stays under `per_second` messages per second."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second and per_second > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+@dataclass
+class DeliveryStats:
+    batches: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    reconnects: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def per_sec(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+def deliver_queued_emails(
+    *,
+    batch_size: int | None = None,
+    max_attempts: int | None = None,
+    rate_per_second: float | None = None,
+    max_batches: int | None = None,
+) -> DeliveryStats:
+    """Send due `OutboundEmail` rows over one reused backend connection.
+
+    Rows are claimed in batches with SKIP LOCKED, so several workers can run.
+    A failed message is retried with exponential backoff and marked `failed`
+    after `max_attempts`; after an error the connection is reopened, since the
+    SMTP session state is unknown.
+    """
+    batch_size = max(1, int(batch_size or _setting_int("EMAIL_QUEUE_BATCH_SIZE", 50)))
+    max_attempts = max(1, int(max_attempts or _setting_int("EMAIL_QUEUE_MAX_ATTEMPTS", 5)))
+    if rate_per_second is None:
+        rate_per_second = float(getattr(settings, "EMAIL_QUEUE_RATE_PER_SECOND", 0) or 0)
+    limiter = _RateLimiter(rate_per_second)
+
+    stats = DeliveryStats()
+    started = time.perf_counter()
+    connection = None
+    try:
+        while max_batches is None or stats.batches < max_batches:
+            ids = claim_email_batch(batch_size=batch_size)
+            if not ids:
+                break
+            stats.batches += 1
+            sent_ids: list[int] = []
+            retry: list[OutboundEmail] = []
+            for outbound in OutboundEmail.objects.filter(id__in=ids).order_by("id"):
+                limiter.wait()
+                try:
+                    if connection is None:
+                        connection = get_connection(fail_silently=False)
+                        connection.open()
+                    connection.send_messages([build_message(outbound, connection=connection)])
+                except Exception as exc:
+                    logger.warning("Email %s to %s failed: %s", outbound.id, outbound.to_email, exc)
+                    if connection is not None:
+                        try:
+                            connection.close()
+                        except Exception:
+                            pass
+                        connection = None
+                        stats.reconnects += 1
+
+                    outbound.attempts += 1
+                    outbound.error_message = str(exc) or exc.__class__.__name__
+                    outbound.locked_at = None
+                    if outbound.attempts >= max_attempts:
+                        outbound.status = OutboundEmail.Status.FAILED
+                        stats.failed += 1
+                    else:
+                        outbound.status = OutboundEmail.Status.PENDING
+                        outbound.run_after = timezone.now() + backoff_delay(outbound.attempts)
+                        stats.retried += 1
+                    retry.append(outbound)
+                else:
+                    sent_ids.append(outbound.id)
+
+            now = timezone.now()
+            with transaction.atomic():
+                if sent_ids:
+                    OutboundEmail.objects.filter(id__in=sent_ids).update(
+                        status=OutboundEmail.Status.SENT,
+                        sent_at=now,
+                        locked_at=None,
+                        error_message="",
+                    )
+                if retry:
+                    OutboundEmail.objects.bulk_update(
+                        retry, ["status", "attempts", "error_message", "run_after", "locked_at"]
+                    )
+            stats.sent += len(sent_ids)
+    finally:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def email_queue_metrics(*, since: timedelta = timedelta(hours=1)) -> dict:
+    """Counts per status plus what was sent within `since` (for admin and the worker log)."""
+    by_status = dict(
+        OutboundEmail.objects.values_list("status").annotate(n=Count("id")).order_by()
+    )
+    now = timezone.now()
+    return {
+        "by_status": {s: int(by_status.get(s, 0)) for s in OutboundEmail.Status.values},
+        "due": OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, run_after__lte=now).count(),
+        "sent_recent": OutboundEmail.objects.filter(
+            status=OutboundEmail.Status.SENT, sent_at__gte=now - since
+        ).count(),
+        "retrying": OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, attempts__gt=0).count(),
+    }
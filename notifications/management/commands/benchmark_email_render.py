@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.i18n import normalize_language_code, translation_fallback_chain
+from notifications.models import EmailTemplate
+from notifications.services import _base_context, _render_django_template
+from notifications.template_cache import get_compiled_email_template, invalidate_email_template
+
+
+def _legacy_render(template_key: str, language_code: str, context: dict):
+    """Previous per-message path: fallback-chain query + compile from source."""
+    langs = translation_fallback_chain(language_code)
+    templates = list(EmailTemplate.objects.filter(key=template_key, is_active=True, language_code__in=langs))
+    order_index = {lang: i for i, lang in enumerate(langs)}
+    template = min(templates, key=lambda t: order_index.get(normalize_language_code(t.language_code), 10_000))
+    return (
+        _render_django_template(template.subject, context).strip(),
+        _render_django_template(template.body_text, context),
+        _render_django_template(template.body_html, context) if template.body_html else "",
+    )
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: laiško šablono renderinimo kaina (be cache vs. sukompiliuotas šablonas vs. batch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--template-key", default="catalog_back_in_stock")
+        parser.add_argument("--language", default="lt")
+        parser.add_argument("--count", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        key = options["template_key"]
+        lang = options["language"]
+        count = max(1, int(options["count"]))
+        if not EmailTemplate.objects.filter(key=key, is_active=True).exists():
+            raise CommandError(f"Nėra aktyvaus šablono: {key}")
+
+        contexts = [
+            {
+                **_base_context(),
+                "product_name": f"Prekė {i}",
+                "product_slug": f"preke-{i}",
+                "product_sku": f"SKU-{i}",
+                "variant_sku": f"SKU-{i}-V",
+                "channel": "normal",
+            }
+            for i in range(count)
+        ]
+
+        def run(label, fn):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<22} {elapsed * 1e6 / count:8.1f} µs/laiškui  "
+                f"{len(ctx.captured_queries) / count:.3f} SQL/laiškui  ({elapsed:.3f}s, {count} laiškų)"
+            )
+            return elapsed
+
+        legacy = run("be cache", lambda: [_legacy_render(key, lang, c) for c in contexts])
+
+        invalidate_email_template(key)
+        cached = run(
+            "compiled (per laišką)",
+            lambda: [get_compiled_email_template(key, lang).render(c) for c in contexts],
+        )
+        batch = run("compiled (batch)", lambda: get_compiled_email_template(key, lang).render_many(contexts))
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Pagreitėjimas: x{legacy / cached:.1f} (per laišką), x{legacy / batch:.1f} (batch)")
+        )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.delivery import deliver_queued_emails, email_queue_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Išsiunčia eilėje laukiančius OutboundEmail (EMAIL_DELIVERY_MODE=queued) batch'ais "
+        "per vieną SMTP jungtį: SKIP LOCKED claim, retry su backoff, rate limit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Default settings.EMAIL_QUEUE_BATCH_SIZE.")
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=None,
+            help="Po tiek nesėkmių laiškas pažymimas failed (default settings.EMAIL_QUEUE_MAX_ATTEMPTS).",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="Max laiškų per sekundę (default settings.EMAIL_QUEUE_RATE_PER_SECOND, 0 – be ribos).",
+        )
+        parser.add_argument("--loop", action="store_true", help="Veikti nuolat (worker režimas).")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Pauzė (s) kai eilė tuščia (su --loop).")
+
+    def handle(self, *args, **options):
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 2.0))
+
+        try:
+            while True:
+                stats = deliver_queued_emails(
+                    batch_size=options.get("batch_size"),
+                    max_attempts=options.get("max_attempts"),
+                    rate_per_second=options.get("rate"),
+                )
+                if stats.batches or not loop:
+                    metrics = email_queue_metrics()
+                    self.stdout.write(
+                        f"sent={stats.sent} retried={stats.retried} failed={stats.failed} "
+                        f"reconnects={stats.reconnects} {stats.per_sec:.1f}/s | "
+                        + " ".join(f"{k}={v}" for k, v in metrics["by_status"].items())
+                    )
+                if not loop:
+                    break
+                if not stats.batches:
+                    time.sleep(sleep_s)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Nutraukta."))
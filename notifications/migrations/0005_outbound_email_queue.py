@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fail_leftover_pending(apps, schema_editor):
+    # Before the queue every email was sent inline, so a row still pending is a
+    # send that crashed midway. Do not let the first queue worker deliver stale
+    # OTP codes and order emails.
+    OutboundEmail = apps.get_model("notifications", "OutboundEmail")
+    OutboundEmail.objects.filter(status="pending").update(
+        status="failed",
+        error_message="Not sent: left pending by an interrupted synchronous send.",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_emailtemplate_language_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='from_email',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='outboundemail',
+            index=models.Index(fields=['status', 'run_after'], name='notificatio_status_37c417_idx'),
+        ),
+        migrations.RunPython(fail_leftover_pending, migrations.RunPython.noop),
+    ]
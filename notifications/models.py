@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class EmailTemplate(models.Model):
@@ -24,10 +25,12 @@ class EmailTemplate(models.Model):
 class OutboundEmail(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
         SENT = "sent", "Sent"
         FAILED = "failed", "Failed"
 
     to_email = models.EmailField()
+    from_email = models.CharField(max_length=255, blank=True, default="")
     template_key = models.SlugField(max_length=100, blank=True)
     subject = models.CharField(max_length=255)
     body_text = models.TextField(blank=True)
@@ -37,11 +40,17 @@ class OutboundEmail(models.Model):
         max_length=16, choices=Status.choices, default=Status.PENDING)
     error_message = models.TextField(blank=True)
 
+    # Queued delivery (`manage.py send_queued_emails`): retry schedule and claim lock.
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "run_after"])]
 
     def __str__(self) -> str:
         return f"{self.to_email} [{self.status}]"
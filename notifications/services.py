@@ -4,13 +4,14 @@ from dataclasses import dataclass
 from typing import Any
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
-from django.template import Context, Engine, TemplateDoesNotExist
+from django.template import Context, Engine
 from django.utils import timezone
 
-from api.i18n import get_default_language_code, normalize_language_code, translation_fallback_chain
+from api.i18n import get_default_language_code, normalize_language_code
 
-from .models import EmailTemplate, OutboundEmail
+from .delivery import queue_enabled, send_outbound_now
+from .models import OutboundEmail
+from .template_cache import EmailTemplateCompileError, get_compiled_email_template
 
 
 @dataclass(frozen=True)
@@ -21,11 +22,111 @@ class SendEmailResult:
 
 
 def _render_django_template(source: str, context: dict[str, Any]) -> str:
+    """Compile and render `source` in one go (uncached; see `template_cache` for sends)."""
     engine = Engine.get_default()
     template = engine.from_string(source)
     return template.render(Context(context))
 
 
+@dataclass(frozen=True)
+class TemplatedEmail:
+    to_email: str
+    context: dict[str, Any] | None = None
+    language_code: str | None = None
+
+
+def _base_context() -> dict[str, Any]:
+    return {
+        "site_name": getattr(settings, "SITE_NAME", ""),
+        "support_email": getattr(settings, "DEFAULT_FROM_EMAIL", ""),
+    }
+
+
+def send_templated_emails(
+    *,
+    template_key: str,
+    messages: list[TemplatedEmail],
+    from_email: str | None = None,
+    queued: bool | None = None,
+    connection=None,
+) -> list[SendEmailResult]:
+    """Render and send (or queue) many emails of one template.
+
+    The template is resolved and compiled once per language (see
+    `notifications.template_cache`), all `OutboundEmail` rows are inserted with
+    one bulk query, and synchronous sends share one connection (`connection`,
+    if given, is reused and left open). Results are in the order of `messages`.
+    """
+    if not messages:
+        return []
+    from_email = from_email or getattr(settings, "DEFAULT_FROM_EMAIL", None) or ""
+    if queued is None:
+        queued = queue_enabled()
+    base_context = _base_context()
+
+    compiled_by_lang: dict[str, Any] = {}
+    rows: list[OutboundEmail] = []
+    for message in messages:
+        lang = normalize_language_code(message.language_code) or get_default_language_code()
+        if lang not in compiled_by_lang:
+            try:
+                compiled_by_lang[lang] = get_compiled_email_template(template_key, lang)
+            except EmailTemplateCompileError as exc:
+                compiled_by_lang[lang] = exc
+        compiled = compiled_by_lang[lang]
+
+        row = OutboundEmail(to_email=message.to_email, from_email=from_email, template_key=template_key)
+        if compiled is None:
+            row.subject = ""
+            row.status = OutboundEmail.Status.FAILED
+            row.error_message = "Template not found or inactive"
+        elif isinstance(compiled, EmailTemplateCompileError):
+            row.subject = compiled.template.subject
+            row.body_text = compiled.template.body_text
+            row.body_html = compiled.template.body_html
+            row.status = OutboundEmail.Status.FAILED
+            row.error_message = f"Render failed: {compiled.error}"
+        else:
+            try:
+                rendered = compiled.render({**base_context, **(message.context or {})})
+            except Exception as exc:
+                row.subject = compiled.source.subject
+                row.body_text = compiled.source.body_text
+                row.body_html = compiled.source.body_html
+                row.status = OutboundEmail.Status.FAILED
+                row.error_message = f"Render failed: {exc}"
+            else:
+                row.subject = rendered.subject[:255]
+                row.body_text = rendered.body_text
+                row.body_html = rendered.body_html
+                row.status = OutboundEmail.Status.PENDING
+        rows.append(row)
+
+    if not queued:
+        # Insert inline sends already claimed, so a queue worker never picks them up mid-send.
+        now = timezone.now()
+        for row in rows:
+            if row.status == OutboundEmail.Status.PENDING:
+                row.status = OutboundEmail.Status.SENDING
+                row.locked_at = now
+
+    rows = OutboundEmail.objects.bulk_create(rows, batch_size=500)
+    # Queued rows are delivered by `manage.py send_queued_emails` once the transaction commits.
+    errors = {} if queued else send_outbound_now(
+        [r for r in rows if r.status == OutboundEmail.Status.SENDING], connection=connection
+    )
+
+    results = []
+    for row in rows:
+        if row.status == OutboundEmail.Status.FAILED and row.id not in errors:
+            results.append(SendEmailResult(ok=False, outbound_id=row.id, error=row.error_message))
+        elif row.id in errors:
+            results.append(SendEmailResult(ok=False, outbound_id=row.id, error=errors[row.id]))
+        else:
+            results.append(SendEmailResult(ok=True, outbound_id=row.id))
+    return results
+
+
 def send_templated_email(
     *,
     template_key: str,
@@ -33,89 +134,17 @@ def send_templated_email(
     context: dict[str, Any] | None = None,
     from_email: str | None = None,
     language_code: str | None = None,
+    queued: bool | None = None,
 ) -> SendEmailResult:
     """Send an email based on a DB-stored template.
 
+    With `queued=True` (default: `EMAIL_DELIVERY_MODE=queued`) the rendered
+    message is only stored as a pending `OutboundEmail` and `ok` means "queued".
     Returns success flag + OutboundEmail log id.
     """
-
-    resolved_language_code = normalize_language_code(language_code) or get_default_language_code()
-    langs = translation_fallback_chain(resolved_language_code)
-    templates = list(
-        EmailTemplate.objects.filter(
-            key=template_key,
-            is_active=True,
-            language_code__in=langs,
-        )
-    )
-    order_index = {lang: i for i, lang in enumerate(langs)}
-    template = None
-    best_idx = 10_000
-    for t in templates:
-        idx = order_index.get(normalize_language_code(getattr(t, "language_code", "")), 10_000)
-        if idx < best_idx:
-            template = t
-            best_idx = idx
-    if not template:
-        outbound = OutboundEmail.objects.create(
-            to_email=to_email,
-            template_key=template_key,
-            subject="",
-            status=OutboundEmail.Status.FAILED,
-            error_message="Template not found or inactive",
-        )
-        return SendEmailResult(ok=False, outbound_id=outbound.id, error=outbound.error_message)
-
-    render_ctx: dict[str, Any] = {
-        "site_name": getattr(settings, "SITE_NAME", ""),
-        "support_email": getattr(settings, "DEFAULT_FROM_EMAIL", ""),
-        **(context or {}),
-    }
-
-    try:
-        subject = _render_django_template(template.subject, render_ctx).strip()
-        body_text = _render_django_template(template.body_text, render_ctx)
-        body_html = _render_django_template(
-            template.body_html, render_ctx) if template.body_html else ""
-    except Exception as exc:
-        outbound = OutboundEmail.objects.create(
-            to_email=to_email,
-            template_key=template_key,
-            subject=template.subject,
-            body_text=template.body_text,
-            body_html=template.body_html,
-            status=OutboundEmail.Status.FAILED,
-            error_message=f"Render failed: {exc}",
-        )
-        return SendEmailResult(ok=False, outbound_id=outbound.id, error=outbound.error_message)
-
-    outbound = OutboundEmail.objects.create(
-        to_email=to_email,
+    return send_templated_emails(
         template_key=template_key,
-        subject=subject,
-        body_text=body_text,
-        body_html=body_html,
-        status=OutboundEmail.Status.PENDING,
-    )
-
-    try:
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=body_text,
-            from_email=from_email or getattr(
-                settings, "DEFAULT_FROM_EMAIL", None) or None,
-            to=[to_email],
-        )
-        if body_html:
-            msg.attach_alternative(body_html, "text/html")
-        msg.send(fail_silently=False)
-    except Exception as exc:
-        outbound.status = OutboundEmail.Status.FAILED
-        outbound.error_message = str(exc)
-        outbound.save(update_fields=["status", "error_message"])
-        return SendEmailResult(ok=False, outbound_id=outbound.id, error=outbound.error_message)
-
-    outbound.status = OutboundEmail.Status.SENT
-    outbound.sent_at = timezone.now()
-    outbound.save(update_fields=["status", "sent_at"])
-    return SendEmailResult(ok=True, outbound_id=outbound.id)
+        messages=[TemplatedEmail(to_email=to_email, context=context, language_code=language_code)],
+        from_email=from_email,
+        queued=queued,
+    )[0]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import EmailTemplate
+from .template_cache import invalidate_email_template
+
+
+@receiver(pre_save, sender=EmailTemplate)
+def email_template_pre_save(sender, instance: EmailTemplate, **kwargs):
+    instance._prev_key = None
+    if instance.pk:
+        instance._prev_key = EmailTemplate.objects.filter(pk=instance.pk).values_list("key", flat=True).first()
+
+
+@receiver(post_save, sender=EmailTemplate)
+def email_template_post_save(sender, instance: EmailTemplate, **kwargs):
+    invalidate_email_template(instance.key)
+    prev_key = getattr(instance, "_prev_key", None)
+    if prev_key and prev_key != instance.key:
+        invalidate_email_template(prev_key)
+
+
+@receiver(post_delete, sender=EmailTemplate)
+def email_template_post_delete(sender, instance: EmailTemplate, **kwargs):
+    invalidate_email_template(instance.key)
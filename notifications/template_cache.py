@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.template import Context, Engine, Template
+
+from api.i18n import get_default_language_code, normalize_language_code, translation_fallback_chain
+
+from .models import EmailTemplate
+
+
+class EmailTemplateCompileError(Exception):
+    def __init__(self, template: EmailTemplate, error: Exception):
+        super().__init__(str(error))
+        self.template = template
+        self.error = error
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    body_text: str
+    body_html: str
+
+
+@dataclass(frozen=True)
+class CompiledEmailTemplate:
+    """An `EmailTemplate` row with subject/text/HTML parsed once, ready to render many times."""
+
+    key: str
+    language_code: str
+    updated_at: datetime
+    source: EmailTemplate
+    subject: Template
+    body_text: Template
+    body_html: Template | None
+
+    def render(self, context: dict[str, Any]) -> RenderedEmail:
+        ctx = Context(context)
+        return RenderedEmail(
+            subject=self.subject.render(ctx).strip(),
+            body_text=self.body_text.render(ctx),
+            body_html=self.body_html.render(ctx) if self.body_html is not None else "",
+        )
+
+    def render_many(self, contexts: list[dict[str, Any]]) -> list[RenderedEmail]:
+        return [self.render(c) for c in contexts]
+
+
+def _active_variants(template_key: str) -> list[tuple[int, str, datetime]]:
+    """(id, language_code, updated_at) of the active rows of a key.
+
+    Read on every lookup (one small indexed query) rather than cached: the
+    Django cache is per process here, so a cached list would keep other workers
+    on an edited template until it expired. `updated_at` then validates the
+    in-process compiled cache below.
+    """
+    return list(
+        EmailTemplate.objects.filter(key=template_key, is_active=True).values_list(
+            "id", "language_code", "updated_at"
+        )
+    )
+
+
+def invalidate_email_template(template_key: str) -> None:
+    """Drop compiled entries of a key (they would otherwise only age out of the LRU)."""
+    with _compiled_lock:
+        for k in [k for k in _compiled if k[0] == template_key]:
+            del _compiled[k]
+
+
+_COMPILED_MAX = 256
+_compiled: OrderedDict[tuple[str, str, datetime], CompiledEmailTemplate] = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_email_template(template: EmailTemplate) -> CompiledEmailTemplate:
+    engine = Engine.get_default()
+    return CompiledEmailTemplate(
+        key=template.key,
+        language_code=normalize_language_code(template.language_code),
+        updated_at=template.updated_at,
+        source=template,
+        subject=engine.from_string(template.subject),
+        body_text=engine.from_string(template.body_text),
+        body_html=engine.from_string(template.body_html) if template.body_html else None,
+    )
+
+
+def _pick_variant(template_key: str, language_code: str | None) -> tuple[int, str, datetime] | None:
+    resolved = normalize_language_code(language_code) or get_default_language_code()
+    order_index = {lang: i for i, lang in enumerate(translation_fallback_chain(resolved))}
+    best = None
+    best_idx = 10_000
+    for variant in _active_variants(template_key):
+        idx = order_index.get(normalize_language_code(variant[1]), 10_000)
+        if idx < best_idx:
+            best, best_idx = variant, idx
+    return best
+
+
+def get_compiled_email_template(template_key: str, language_code: str | None) -> CompiledEmailTemplate | None:
+    """Compiled template for (key, language fallback), cached per (key, language, updated_at).
+
+    Returns None when no active template matches; raises
+    `EmailTemplateCompileError` when the stored source does not compile.
+    """
+    best = _pick_variant(template_key, language_code)
+    if best is None:
+        return None
+
+    compiled_key = (template_key, normalize_language_code(best[1]), best[2])
+    with _compiled_lock:
+        compiled = _compiled.get(compiled_key)
+        if compiled is not None:
+            _compiled.move_to_end(compiled_key)
+            return compiled
+
+    template = EmailTemplate.objects.filter(pk=best[0], is_active=True).first()
+    if template is None:
+        invalidate_email_template(template_key)
+        return None
+    try:
+        compiled = compile_email_template(template)
+    except Exception as exc:
+        raise EmailTemplateCompileError(template, exc) from exc
+    with _compiled_lock:
+        _compiled[(template_key, compiled.language_code, compiled.updated_at)] = compiled
+        while len(_compiled) > _COMPILED_MAX:
+            _compiled.popitem(last=False)
+    return compiled
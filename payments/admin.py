@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import NeopayBank, NeopayConfig, PaymentMethod
+from .models import NeopayBank, NeopayConfig, NeopayCountry, PaymentCallback, PaymentMethod
+from .services.callbacks import format_payment_callback_metrics, payment_callback_metrics
 
 
 @admin.register(PaymentMethod)
@@ -32,10 +34,19 @@ class NeopayConfigAdmin(admin.ModelAdmin):
         "enable_bank_preselect",
         "widget_host",
         "client_redirect_url",
+        "banks_synced_at",
         "updated_at",
     )
     list_filter = ("is_active",)
     search_fields = ("project_id", "client_redirect_url")
+    readonly_fields = ("banks_synced_at",)
+
+
+@admin.register(NeopayCountry)
+class NeopayCountryAdmin(admin.ModelAdmin):
+    list_display = ("code", "name", "currency", "default_language", "last_synced_at", "updated_at")
+    search_fields = ("code", "name")
+    readonly_fields = ("raw", "last_synced_at", "created_at", "updated_at")
 
 
 @admin.register(NeopayBank)
@@ -53,3 +64,42 @@ class NeopayBankAdmin(admin.ModelAdmin):
     list_filter = ("country_code", "is_enabled", "is_operating")
     search_fields = ("bic", "name")
     ordering = ("country_code", "sort_order", "name")
+
+
+@admin.register(PaymentCallback)
+class PaymentCallbackAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "provider",
+        "tx_id",
+        "status",
+        "state",
+        "order",
+        "result",
+        "duplicates",
+        "attempts",
+        "received_at",
+        "processed_at",
+    )
+    list_filter = ("provider", "state", "status")
+    search_fields = ("tx_id", "order__id")
+    ordering = ("-id",)
+    actions = ("retry_now",)
+    readonly_fields = [f.name for f in PaymentCallback._meta.fields]
+
+    @admin.action(description="Apdoroti iš naujo (grąžinti į eilę)")
+    def retry_now(self, request, queryset):
+        n = queryset.exclude(state=PaymentCallback.State.PROCESSED).update(
+            state=PaymentCallback.State.PENDING, run_after=timezone.now(), locked_at=None, attempts=0
+        )
+        self.message_user(request, f"Grąžinta į eilę: {n}")
+
+    def changelist_view(self, request, extra_context=None):
+        self.message_user(request, format_payment_callback_metrics(payment_callback_metrics()))
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services.callbacks import (
+    format_payment_callback_metrics,
+    payment_callback_metrics,
+    process_payment_callbacks,
+)
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment gateway callbacks (Neopay) to payment intents and orders, in arrival order."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=None, help="Callbacks claimed per poll (default settings.PAYMENT_CALLBACK_BATCH_SIZE)."
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=None,
+            help="Mark a callback failed after this many errors (default settings.PAYMENT_CALLBACK_MAX_ATTEMPTS).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            default=False,
+            help="Keep polling the inbox instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when the inbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 1.0))
+
+        try:
+            while True:
+                stats = process_payment_callbacks(
+                    batch_size=options.get("batch_size"),
+                    max_attempts=options.get("max_attempts"),
+                )
+                if stats.batches or not loop:
+                    self.stdout.write(f"{stats.as_line()} | {format_payment_callback_metrics(payment_callback_metrics())}")
+                if not loop:
+                    break
+                if not stats.batches:
+                    time.sleep(sleep_s)
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted; claimed callbacks are picked up again once their lock expires.")
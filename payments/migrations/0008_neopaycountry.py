@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_rename_payments_neop_country__96a492_idx_payments_ne_country_ccef0c_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NeopayCountry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("code", models.CharField(max_length=2, unique=True)),
+                ("name", models.CharField(blank=True, default="", max_length=200)),
+                ("currency", models.CharField(blank=True, default="", max_length=8)),
+                ("default_language", models.CharField(blank=True, default="", max_length=8)),
+                ("languages", models.JSONField(blank=True, default=list)),
+                ("rules", models.JSONField(blank=True, default=dict)),
+                ("raw", models.JSONField(blank=True, default=dict)),
+                ("last_synced_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["code"],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0021_paymentintent_external_id_index"),
+        ("payments", "0008_neopaycountry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentCallback",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("provider", models.CharField(max_length=20)),
+                ("tx_id", models.CharField(max_length=120)),
+                ("status", models.CharField(blank=True, default="", max_length=32)),
+                ("action", models.CharField(blank=True, default="", max_length=32)),
+                ("bank_bic", models.CharField(blank=True, default="", max_length=32)),
+                ("bank_name", models.CharField(blank=True, default="", max_length=200)),
+                ("payload", models.JSONField(blank=True, default=dict)),
+                ("state", models.CharField(choices=[("pending", "Pending"), ("processing", "Processing"), ("processed", "Processed"), ("skipped", "Skipped"), ("failed", "Failed")], default="pending", max_length=16)),
+                ("result", models.CharField(blank=True, default="", max_length=255)),
+                ("duplicates", models.PositiveIntegerField(default=0)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                ("order", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="+", to="checkout.order")),
+            ],
+            options={
+                "ordering": ["-id"],
+                "indexes": [models.Index(fields=["state", "run_after"], name="payments_pa_state_d2c2f1_idx"), models.Index(fields=["provider", "tx_id"], name="payments_pa_provide_915944_idx")],
+                "constraints": [models.UniqueConstraint(fields=("provider", "tx_id", "status"), name="uniq_payment_callback_tx_status")],
+            },
+        ),
+    ]
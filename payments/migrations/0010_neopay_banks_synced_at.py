@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+def backfill_banks_synced_at(apps, schema_editor):
+    # Catalogues synced before this field existed keep their age (newest country sync).
+    NeopayConfig = apps.get_model("payments", "NeopayConfig")
+    NeopayCountry = apps.get_model("payments", "NeopayCountry")
+    synced_at = NeopayCountry.objects.aggregate(value=models.Max("last_synced_at"))["value"]
+    if synced_at is not None:
+        NeopayConfig.objects.filter(banks_synced_at__isnull=True).update(banks_synced_at=synced_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0009_payment_callback_inbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="neopayconfig",
+            name="banks_synced_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_banks_synced_at, migrations.RunPython.noop),
+    ]
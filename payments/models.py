@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from django.db import models
+from django.utils import timezone
 
 
 class PaymentMethod(models.Model):
@@ -86,6 +87,9 @@ class NeopayConfig(models.Model):
     )
     client_redirect_url = models.URLField(blank=True, default="")
 
+    # Last successful full sync of the bank catalogue (staleness of the whole catalogue).
+    banks_synced_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -99,6 +103,29 @@ class NeopayConfig(models.Model):
         return f"neopay:{self.project_id}"
 
 
+class NeopayCountry(models.Model):
+    """Neopay country (currency, languages, rules texts) from the synced bank catalogue."""
+
+    code = models.CharField(max_length=2, unique=True)
+    name = models.CharField(max_length=200, blank=True, default="")
+    currency = models.CharField(max_length=8, blank=True, default="")
+    default_language = models.CharField(max_length=8, blank=True, default="")
+    languages = models.JSONField(default=list, blank=True)
+    rules = models.JSONField(default=dict, blank=True)
+
+    raw = models.JSONField(default=dict, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["code"]
+
+    def __str__(self) -> str:
+        return self.code
+
+
 class NeopayBank(models.Model):
     country_code = models.CharField(max_length=2)
     bic = models.CharField(max_length=32)
@@ -127,3 +154,54 @@ class NeopayBank(models.Model):
 
     def __str__(self) -> str:
         return f"{self.country_code}:{self.bic}"
+
+
+class PaymentCallback(models.Model):
+    """Gateway callback inbox: stored and acknowledged at once, applied by `process_payment_callbacks`.
+
+    One row per (provider, tx_id, status): a gateway retrying the same callback
+    only bumps `duplicates`.
+    """
+
+    class State(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        PROCESSED = "processed", "Processed"
+        SKIPPED = "skipped", "Skipped"
+        FAILED = "failed", "Failed"
+
+    provider = models.CharField(max_length=20)
+    tx_id = models.CharField(max_length=120)
+    status = models.CharField(max_length=32, blank=True, default="")
+    action = models.CharField(max_length=32, blank=True, default="")
+    bank_bic = models.CharField(max_length=32, blank=True, default="")
+    bank_name = models.CharField(max_length=200, blank=True, default="")
+    payload = models.JSONField(default=dict, blank=True)
+
+    order = models.ForeignKey(
+        "checkout.Order", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    state = models.CharField(max_length=16, choices=State.choices, default=State.PENDING)
+    result = models.CharField(max_length=255, blank=True, default="")
+    duplicates = models.PositiveIntegerField(default=0)
+
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "tx_id", "status"], name="uniq_payment_callback_tx_status"),
+        ]
+        indexes = [
+            models.Index(fields=["state", "run_after"]),
+            models.Index(fields=["provider", "tx_id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.tx_id}:{self.status} [{self.state}]"
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min, Q
+from django.utils import timezone
+
+from payments.models import PaymentCallback
+
+
+logger = logging.getLogger(__name__)
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def callbacks_async() -> bool:
+    return bool(getattr(settings, "PAYMENT_CALLBACKS_ASYNC", True))
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    return timedelta(minutes=min(60, 2 ** max(0, attempts - 1)))
+
+
+# --- Inbox ---
+
+
+def _str(value: Any, limit: int) -> str:
+    return str(value or "").strip()[:limit]
+
+
+def neopay_callback_rows(decoded: dict[str, Any]) -> list[PaymentCallback]:
+    """Inbox rows for a decoded Neopay token (raises ValueError on an unusable payload).
+
+    Neopay sends either a server-side callback token
+    `{transactions: {<txId>: {status, action, bank, ...}}}` or a client redirect
+    token `{transactionId, status, action, bank, ...}`.
+    """
+    transactions = decoded.get("transactions")
+    if transactions is None:
+        tx_id = _str(decoded.get("transactionId"), 120)
+        if not tx_id:
+            raise ValueError("Invalid token payload")
+        transactions = {tx_id: decoded}
+    elif not isinstance(transactions, dict):
+        raise ValueError("Invalid token payload")
+
+    rows: dict[tuple[str, str], PaymentCallback] = {}
+    for tx_id, info in transactions.items():
+        tx_id = _str(tx_id, 120)
+        if not tx_id or not isinstance(info, dict):
+            continue
+        bank = info.get("bank") if isinstance(info.get("bank"), dict) else {}
+        status = _str(info.get("status"), 32).lower()
+        rows[(tx_id, status)] = PaymentCallback(
+            provider="neopay",
+            tx_id=tx_id,
+            status=status,
+            action=_str(info.get("action"), 32).lower(),
+            bank_bic=_str(bank.get("bic"), 32),
+            bank_name=_str(bank.get("name"), 200),
+            payload=decoded,
+        )
+    return list(rows.values())
+
+
+def record_callbacks(rows: list[PaymentCallback]) -> list[int]:
+    """Store callbacks in the inbox; returns ids of rows that still need processing.
+
+    A callback already in the inbox (same provider, tx_id and status) is not
+    stored again, only counted in `duplicates`. No order, intent or inventory
+    row is touched here, so the gateway gets its answer without waiting on locks.
+    """
+    if not rows:
+        return []
+    provider = rows[0].provider
+    keys = {(r.tx_id, r.status) for r in rows}
+    existing = {
+        (tx_id, status): (pk, state)
+        for pk, tx_id, status, state in PaymentCallback.objects.filter(
+            provider=provider, tx_id__in={tx for tx, _ in keys}
+        ).values_list("id", "tx_id", "status", "state")
+        if (tx_id, status) in keys
+    }
+
+    new = [r for r in rows if (r.tx_id, r.status) not in existing]
+    if existing:
+        PaymentCallback.objects.filter(id__in=[pk for pk, _ in existing.values()]).update(
+            duplicates=F("duplicates") + 1
+        )
+    if new:
+        try:
+            with transaction.atomic():
+                PaymentCallback.objects.bulk_create(new)
+        except IntegrityError:
+            # A concurrent delivery of the same callback won the insert.
+            PaymentCallback.objects.bulk_create(new, ignore_conflicts=True)
+
+    pending = (PaymentCallback.State.PENDING, PaymentCallback.State.PROCESSING)
+    ids = [pk for pk, state in existing.values() if state in pending]
+    if new:
+        ids += PaymentCallback.objects.filter(
+            provider=provider,
+            tx_id__in={r.tx_id for r in new},
+            status__in={r.status for r in new},
+            state=PaymentCallback.State.PENDING,
+        ).values_list("id", flat=True)
+    return sorted(set(ids))
+
+
+# --- Processing ---
+
+# Neopay transaction status -> PaymentIntent status (succeeded pays the order, failed/cancelled cancel it).
+_NEOPAY_STATUS = {
+    "success": "succeeded",
+    "failed": "failed",
+    "rejected": "failed",
+    "error": "failed",
+    "canceled": "cancelled",
+    "cancelled": "cancelled",
+    "signed": "pending",
+    "pending": "pending",
+    "started": "pending",
+    "unknown": "pending",
+    "partially signed": "pending",
+    "partially_signed": "pending",
+}
+
+
+def _apply(callback: PaymentCallback) -> tuple[PaymentCallback.State, str]:
+    """Apply one callback inside the caller's transaction, with the order row locked."""
+    from checkout.models import Order, PaymentIntent
+    from checkout.services import capture_inventory_for_order, release_inventory_for_order
+    from promotions.services import redeem_coupon_for_paid_order, release_coupon_for_order
+
+    pi = (
+        PaymentIntent.objects.filter(provider=PaymentIntent.Provider.NEOPAY, external_id=callback.tx_id)
+        .only("id", "order_id")
+        .first()
+    )
+    if pi is None:
+        return PaymentCallback.State.SKIPPED, "no payment intent"
+
+    # Per-order serialisation: callbacks of one order (any worker) apply one at a time.
+    order = Order.objects.select_for_update().get(pk=pi.order_id)
+    pi = PaymentIntent.objects.get(pk=pi.pk)
+    callback.order_id = order.id
+
+    target = _NEOPAY_STATUS.get(callback.status)
+    final = (PaymentIntent.Status.SUCCEEDED, PaymentIntent.Status.FAILED, PaymentIntent.Status.CANCELLED)
+    if target is not None and pi.status == target:
+        return PaymentCallback.State.SKIPPED, f"already {pi.status}"
+    if target is not None and pi.status == PaymentIntent.Status.SUCCEEDED:
+        # A late failure/pending callback must not undo a completed payment.
+        return PaymentCallback.State.SKIPPED, f"ignored {callback.status}: already succeeded"
+    if target == PaymentIntent.Status.PENDING and pi.status in final:
+        return PaymentCallback.State.SKIPPED, f"ignored {callback.status}: already {pi.status}"
+
+    pi.raw_response = {
+        **(pi.raw_response or {}),
+        "neopay_callback": callback.payload,
+        "last_callback_tx": callback.tx_id,
+        "last_callback_status": callback.status,
+        "last_callback_action": callback.action,
+    }
+    if callback.bank_bic:
+        pi.neopay_bank_bic = callback.bank_bic
+    if callback.bank_name:
+        pi.neopay_bank_name = callback.bank_name
+
+    if target == PaymentIntent.Status.SUCCEEDED:
+        pi.status = target
+        order.status = Order.Status.PAID
+        order.paid_at = timezone.now()
+        order.save(update_fields=["status", "paid_at", "updated_at"])
+        capture_inventory_for_order(order_id=order.id)
+        redeem_coupon_for_paid_order(order_id=order.id)
+    elif target in (PaymentIntent.Status.FAILED, PaymentIntent.Status.CANCELLED):
+        pi.status = target
+        order.status = Order.Status.CANCELLED
+        order.save(update_fields=["status", "updated_at"])
+        release_coupon_for_order(order_id=order.id)
+        release_inventory_for_order(order_id=order.id)
+    elif target == PaymentIntent.Status.PENDING:
+        pi.status = target
+
+    pi.save(update_fields=["status", "raw_response", "neopay_bank_bic", "neopay_bank_name", "updated_at"])
+    return PaymentCallback.State.PROCESSED, f"payment {pi.status}"
+
+
+def claim_callback_batch(*, batch_size: int, ids: list[int] | None = None) -> list[int]:
+    """Lock due callbacks (pending, or processing with an expired lock) for this worker."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=_setting_int("PAYMENT_CALLBACK_LOCK_SECONDS", 300))
+    qs = PaymentCallback.objects.select_for_update(skip_locked=True).filter(
+        Q(state=PaymentCallback.State.PENDING, run_after__lte=now)
+        | Q(state=PaymentCallback.State.PROCESSING, locked_at__lt=stale_before)
+    )
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    with transaction.atomic():
+        claimed = list(qs.order_by("id").values_list("id", flat=True)[: max(1, int(batch_size))])
+        if claimed:
+            PaymentCallback.objects.filter(id__in=claimed).update(state=PaymentCallback.State.PROCESSING, locked_at=now)
+    return claimed
+
+
+@dataclass
+class CallbackStats:
+    batches: int = 0
+    processed: int = 0
+    skipped: int = 0
+    retried: int = 0
+    failed: int = 0
+    max_lag: float = 0.0
+    elapsed: float = 0.0
+
+    def as_line(self) -> str:
+        return (
+            f"processed={self.processed} skipped={self.skipped} retried={self.retried} "
+            f"failed={self.failed} max_lag={self.max_lag:.1f}s elapsed={self.elapsed:.2f}s"
+        )
+
+
+def process_payment_callbacks(
+    *,
+    batch_size: int | None = None,
+    max_attempts: int | None = None,
+    max_batches: int | None = None,
+    ids: list[int] | None = None,
+) -> CallbackStats:
+    """Apply due inbox callbacks in arrival order.
+
+    Rows are claimed with SKIP LOCKED, so several workers can run; each callback
+    is applied in its own short transaction holding the order row lock, which
+    serialises callbacks of one order without blocking the others. A callback
+    that doesn't change the payment (repeat status, or a late one after success)
+    is marked `skipped`. Errors roll the callback back and retry it with backoff,
+    up to `max_attempts`.
+    """
+    batch_size = max(1, int(batch_size or _setting_int("PAYMENT_CALLBACK_BATCH_SIZE", 50)))
+    max_attempts = max(1, int(max_attempts or _setting_int("PAYMENT_CALLBACK_MAX_ATTEMPTS", 8)))
+
+    stats = CallbackStats()
+    started = time.perf_counter()
+    while max_batches is None or stats.batches < max_batches:
+        claimed = claim_callback_batch(batch_size=batch_size, ids=ids)
+        if not claimed:
+            break
+        stats.batches += 1
+        for callback in PaymentCallback.objects.filter(id__in=claimed).order_by("id"):
+            try:
+                with transaction.atomic():
+                    state, result = _apply(callback)
+            except Exception as exc:
+                logger.warning("Payment callback %s (%s %s) failed: %s", callback.id, callback.tx_id, callback.status, exc)
+                callback.attempts += 1
+                callback.last_error = str(exc) or exc.__class__.__name__
+                callback.locked_at = None
+                if callback.attempts >= max_attempts:
+                    callback.state = PaymentCallback.State.FAILED
+                    stats.failed += 1
+                else:
+                    callback.state = PaymentCallback.State.PENDING
+                    callback.run_after = timezone.now() + backoff_delay(callback.attempts)
+                    stats.retried += 1
+                callback.save(update_fields=["attempts", "last_error", "locked_at", "state", "run_after"])
+                continue
+
+            now = timezone.now()
+            callback.state = state
+            callback.result = result[:255]
+            callback.processed_at = now
+            callback.locked_at = None
+            callback.last_error = ""
+            callback.save(update_fields=["state", "result", "order", "processed_at", "locked_at", "last_error"])
+            stats.max_lag = max(stats.max_lag, (now - callback.received_at).total_seconds())
+            if state == PaymentCallback.State.PROCESSED:
+                stats.processed += 1
+            else:
+                stats.skipped += 1
+        if ids is not None:
+            break
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def payment_callback_metrics(*, since: timedelta = timedelta(hours=1)) -> dict:
+    """Counts per state, backlog age and processing lag within `since` (admin and worker log)."""
+    now = timezone.now()
+    by_state = dict(PaymentCallback.objects.values_list("state").annotate(n=Count("id")).order_by())
+    oldest = PaymentCallback.objects.filter(
+        state__in=(PaymentCallback.State.PENDING, PaymentCallback.State.PROCESSING)
+    ).aggregate(oldest=Min("received_at"))["oldest"]
+    lag = ExpressionWrapper(F("processed_at") - F("received_at"), output_field=DurationField())
+    recent = PaymentCallback.objects.filter(processed_at__gte=now - since).aggregate(
+        n=Count("id"), avg=Avg(lag), max=Max(lag), duplicates=Count("id", filter=Q(duplicates__gt=0))
+    )
+    return {
+        "by_state": {s: int(by_state.get(s, 0)) for s in PaymentCallback.State.values},
+        "backlog_age": (now - oldest).total_seconds() if oldest else 0.0,
+        "handled_recent": int(recent["n"] or 0),
+        "lag_avg": recent["avg"].total_seconds() if recent["avg"] else 0.0,
+        "lag_max": recent["max"].total_seconds() if recent["max"] else 0.0,
+        "with_duplicates": int(recent["duplicates"] or 0),
+    }
+
+
+def format_payment_callback_metrics(metrics: dict) -> str:
+    by_state = " ".join(f"{k}={v}" for k, v in metrics["by_state"].items())
+    return (
+        f"{by_state} | backlog_age={metrics['backlog_age']:.0f}s | 1h: handled={metrics['handled_recent']} "
+        f"lag_avg={metrics['lag_avg']:.1f}s lag_max={metrics['lag_max']:.1f}s "
+        f"with_duplicates={metrics['with_duplicates']}"
+    )
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .neopay import NeopayConfigData, get_neopay_config
+
+
+logger = logging.getLogger(__name__)
+
+
+class NeopayBanksError(RuntimeError):
+    pass
+
+
+# Checkout and the bank picker read the catalogue synced into NeopayCountry/NeopayBank
+# (`manage.py neopay_sync_banks`), through a short per-country memory cache. When the
+# catalogue is older than NEOPAY_BANKS_REFRESH_SECONDS it is still served while one
+# background thread (one process at a time) refreshes it; only an empty catalogue is
+# fetched synchronously, with a short time budget. A failed fetch is not retried by this
+# process for NEOPAY_BANKS_RETRY_SECONDS.
+
+_HEADERS = {"Accept": "application/json", "User-Agent": "inultimo-backend/1.0"}
+_REFRESH_LOCK_KEY = "neopay:banks:refreshing"
+_URL_CACHE_KEY = "neopay:banks:url:{project_id}"
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class NeopayBankData:
+    country_code: str
+    bic: str
+    name: str
+    service_types: tuple[str, ...] = ()
+    logo_url: str = ""
+    is_operating: bool = True
+
+
+@dataclass(frozen=True)
+class NeopayCountryData:
+    code: str
+    name: str = ""
+    currency: str = ""
+    default_language: str = ""
+    languages: tuple[str, ...] = ()
+    rules: dict[str, str] | None = None
+    banks: tuple[NeopayBankData, ...] = ()
+
+
+# --- Fetching ---
+
+
+def candidate_urls(cfg: NeopayConfigData) -> list[str]:
+    base = (cfg.banks_api_base_url or "https://psd2.neopay.lt/api").rstrip("/")
+    if base.endswith("/countries"):
+        base = base[: -len("/countries")]
+    candidates = [
+        f"{base}/countries/{cfg.project_id}",
+        f"{base}/countries/{cfg.project_id}/",
+        # Fallback: some environments expose only the generic countries list.
+        f"{base}/countries",
+        f"{base}/countries/",
+    ]
+    # Some environments/document versions use base without '/api'.
+    if base.endswith("/api"):
+        root = base[: -len("/api")]
+        candidates.append(f"{root}/api/countries/{cfg.project_id}")
+        candidates.append(f"{root}/api/countries/{cfg.project_id}/")
+    return list(dict.fromkeys(candidates))
+
+
+# Working URL per project, learned on the first successful fetch (also shared via cache).
+_working_urls: dict[int, str] = {}
+
+
+def _short_body(r) -> str:
+    body = (r.text or "").strip().replace("\n", " ")
+    return body[:300] + "..." if len(body) > 300 else body
+
+
+def fetch_neopay_countries(
+    cfg: NeopayConfigData, *, timeout: float = 20, total_timeout: float | None = None
+) -> list[dict[str, Any]]:
+    """Raw `countries` list from Neopay.
+
+    The URL that answered last time is tried first, so a refresh normally makes
+    one request instead of probing every candidate. `total_timeout` caps the
+    time spent over all candidates.
+    """
+    candidates = candidate_urls(cfg)
+    url_key = _URL_CACHE_KEY.format(project_id=cfg.project_id)
+    known = _working_urls.get(cfg.project_id) or cache.get(url_key)
+    if known in candidates:
+        candidates = [known, *[u for u in candidates if u != known]]
+
+    deadline = time.monotonic() + total_timeout if total_timeout else None
+    data = None
+    last_response = None
+    last_exc: Exception | None = None
+    for url in candidates:
+        request_timeout = timeout
+        if deadline is not None:
+            request_timeout = min(timeout, deadline - time.monotonic())
+            if request_timeout <= 0:
+                break
+        try:
+            r = requests.get(url, timeout=request_timeout, headers=_HEADERS)
+        except requests.RequestException as e:
+            last_exc = e
+            continue
+
+        last_response = r
+        if r.status_code == 404:
+            continue
+        if r.status_code >= 400:
+            raise NeopayBanksError(f"Neopay banks api failed: {r.status_code} url={url} body={_short_body(r)}")
+        try:
+            data = r.json()
+        except ValueError:
+            # Try next candidate if response isn't valid JSON.
+            continue
+
+        if url != known:
+            _working_urls[cfg.project_id] = url
+            cache.set(url_key, url, timeout=None)
+        break
+
+    if data is None:
+        if last_exc is not None:
+            raise NeopayBanksError(f"Neopay banks api request failed: {type(last_exc).__name__}")
+        if last_response is not None:
+            raise NeopayBanksError(
+                f"Neopay banks api failed: {last_response.status_code} url={candidates[-1]} body={_short_body(last_response)}"
+            )
+        raise NeopayBanksError("Neopay banks api failed: no response")
+
+    if isinstance(data, list):
+        countries = data
+    elif isinstance(data, dict):
+        countries = data.get("countries") or []
+        if not countries:
+            # Some shapes are keyed by country code.
+            countries = [
+                {"code": k, **v} for k, v in data.items() if isinstance(v, dict) and len(str(k).strip()) == 2
+            ]
+    else:
+        countries = []
+    return [c for c in countries if isinstance(c, dict)]
+
+
+def _country_code(c: dict[str, Any]) -> str:
+    return str(c.get("code") or c.get("country") or c.get("countryCode") or "").strip().upper()
+
+
+def _bank_fields(b: dict[str, Any]) -> dict[str, Any] | None:
+    bic = str(b.get("bic") or b.get("BIC") or "").strip()
+    if not bic:
+        return None
+    services = b.get("services") or b.get("serviceTypes") or []
+    if isinstance(services, str):
+        services = [services]
+    if not isinstance(services, list):
+        services = []
+    logo = b.get("logo") or b.get("logoUrl") or ""
+    return {
+        "bic": bic,
+        "name": str(b.get("name") or b.get("bankName") or "").strip() or bic,
+        "services": [str(x).strip() for x in services if str(x).strip()],
+        "logo_url": logo.strip() if isinstance(logo, str) else "",
+        "is_operating": bool(b.get("isOperating")) if "isOperating" in b else True,
+    }
+
+
+# --- Sync ---
+
+
+@dataclass
+class NeopaySyncStats:
+    countries: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+
+    @property
+    def total_seen(self) -> int:
+        return self.created + self.updated + self.unchanged
+
+
+def sync_neopay_catalogue(
+    *,
+    country_code: str = "",
+    deactivate_missing: bool = False,
+    limit: int = 0,
+    cfg: NeopayConfigData | None = None,
+    timeout: float = 20,
+    total_timeout: float | None = None,
+) -> NeopaySyncStats:
+    """Fetch the Neopay catalogue into NeopayCountry/NeopayBank (PISP banks only).
+
+    Only changed rows are written; admin fields (`is_enabled`, `sort_order`) are
+    never touched. `deactivate_missing` marks banks that disappeared from a
+    synced country as not operating (ignored with `limit`, which syncs a partial list).
+    A full sync (no country filter, no limit) records `NeopayConfig.banks_synced_at`.
+    """
+    from payments.models import NeopayBank, NeopayConfig, NeopayCountry
+
+    cfg = cfg or get_neopay_config()
+    if not cfg:
+        raise NeopayBanksError("Neopay config is not set")
+
+    cc_filter = (country_code or "").strip().upper()
+    countries = fetch_neopay_countries(cfg, timeout=timeout, total_timeout=total_timeout)
+    if not countries:
+        raise NeopayBanksError("Neopay banks sync: unexpected response")
+
+    stats = NeopaySyncStats()
+    now = timezone.now()
+    bank_fields = ["name", "logo_url", "is_operating", "raw", "last_synced_at", "updated_at"]
+    country_fields = ["name", "currency", "default_language", "languages", "rules", "raw", "last_synced_at", "updated_at"]
+
+    with transaction.atomic():
+        existing_countries = {c.code: c for c in NeopayCountry.objects.all()}
+        for c in countries:
+            ccode = _country_code(c)
+            if not ccode or (cc_filter and ccode != cc_filter):
+                continue
+            stats.countries += 1
+
+            languages = c.get("languages") or []
+            if isinstance(languages, str):
+                languages = [languages]
+            rules = c.get("rules") if isinstance(c.get("rules"), dict) else {}
+            country = existing_countries.get(ccode) or NeopayCountry(code=ccode)
+            country.name = str(c.get("name") or c.get("countryName") or "").strip()
+            country.currency = str(c.get("currency") or "").strip()
+            country.default_language = str(c.get("defaultLanguage") or c.get("defaultLocale") or "").strip().upper()
+            country.languages = [str(x).strip().upper() for x in languages if str(x).strip()] if isinstance(languages, list) else []
+            country.rules = {str(k).strip().upper(): str(v) for k, v in rules.items() if str(k).strip() and str(v).strip()}
+            country.raw = {k: v for k, v in c.items() if k not in ("aspsps", "banks")}
+            country.last_synced_at = now
+            if country.pk:
+                country.updated_at = now
+                country.save(update_fields=country_fields)
+            else:
+                country.save()
+
+            banks = c.get("aspsps") or c.get("banks") or []
+            existing = {b.bic: b for b in NeopayBank.objects.filter(country_code=ccode)}
+            seen: set[str] = set()
+            to_create: list[NeopayBank] = []
+            to_update: list[NeopayBank] = []
+            for raw in banks if isinstance(banks, list) else []:
+                if limit and stats.total_seen >= limit:
+                    break
+                fields = _bank_fields(raw) if isinstance(raw, dict) else None
+                if fields is None or fields["bic"] in seen:
+                    continue
+                if "pisp" not in {s.lower() for s in fields["services"]}:
+                    continue
+                seen.add(fields["bic"])
+
+                values = {
+                    "name": fields["name"],
+                    "logo_url": fields["logo_url"],
+                    "is_operating": fields["is_operating"],
+                    "raw": raw,
+                }
+                obj = existing.get(fields["bic"])
+                if obj is None:
+                    to_create.append(NeopayBank(country_code=ccode, bic=fields["bic"], last_synced_at=now, **values))
+                elif any(getattr(obj, k) != v for k, v in values.items()):
+                    for k, v in values.items():
+                        setattr(obj, k, v)
+                    obj.last_synced_at = now
+                    obj.updated_at = now
+                    to_update.append(obj)
+                else:
+                    stats.unchanged += 1
+
+            if to_create:
+                NeopayBank.objects.bulk_create(to_create)
+            if to_update:
+                NeopayBank.objects.bulk_update(to_update, bank_fields)
+            stats.created += len(to_create)
+            stats.updated += len(to_update)
+            if seen:
+                NeopayBank.objects.filter(country_code=ccode, bic__in=seen).update(last_synced_at=now)
+
+            if deactivate_missing and not limit:
+                stats.deactivated += (
+                    NeopayBank.objects.filter(country_code=ccode, is_operating=True)
+                    .exclude(bic__in=seen)
+                    .update(is_operating=False, updated_at=now)
+                )
+
+            if limit and stats.total_seen >= limit:
+                break
+
+        if not cc_filter and not limit:
+            NeopayConfig.objects.filter(project_id=cfg.project_id).update(banks_synced_at=now)
+
+    invalidate_neopay_catalogue()
+    return stats
+
+
+# --- Reading ---
+
+_memory: dict[str, tuple[float, list[NeopayCountryData]]] = {}
+_memory_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+# monotonic time until which this process doesn't try to fetch again after a failure
+_retry_after = 0.0
+
+
+def invalidate_neopay_catalogue() -> None:
+    with _memory_lock:
+        _memory.clear()
+
+
+def _load(country_code: str) -> list[NeopayCountryData]:
+    """Catalogue rows from the DB."""
+    from payments.models import NeopayBank, NeopayCountry
+
+    countries = NeopayCountry.objects.all()
+    banks = NeopayBank.objects.filter(is_enabled=True).order_by("country_code", "sort_order", "name", "bic")
+    if country_code:
+        countries = countries.filter(code=country_code)
+        banks = banks.filter(country_code=country_code)
+
+    by_country: dict[str, list[NeopayBankData]] = {}
+    for b in banks:
+        raw = b.raw if isinstance(b.raw, dict) else {}
+        services = (_bank_fields(raw) or {}).get("services") or ["pisp"]
+        by_country.setdefault(b.country_code, []).append(
+            NeopayBankData(
+                country_code=b.country_code,
+                bic=b.bic,
+                name=b.name or b.bic,
+                service_types=tuple(services),
+                logo_url=b.logo_url or "",
+                is_operating=bool(b.is_operating),
+            )
+        )
+
+    out: list[NeopayCountryData] = []
+    for c in countries:
+        out.append(
+            NeopayCountryData(
+                code=c.code,
+                name=c.name,
+                currency=c.currency,
+                default_language=c.default_language,
+                languages=tuple(c.languages or ()),
+                rules=dict(c.rules or {}),
+                banks=tuple(by_country.pop(c.code, ())),
+            )
+        )
+    # Banks synced before countries were stored (or added by hand) still count.
+    for code, items in sorted(by_country.items()):
+        out.append(NeopayCountryData(code=code, banks=tuple(items)))
+    return out
+
+
+def _synced_at():
+    """When the catalogue was last fully synced (None if never); rows added in admin don't count."""
+    from payments.models import NeopayConfig
+
+    return (
+        NeopayConfig.objects.filter(is_active=True)
+        .order_by("-id")
+        .values_list("banks_synced_at", flat=True)
+        .first()
+    )
+
+
+def _has_catalogue() -> bool:
+    from payments.models import NeopayBank, NeopayCountry
+
+    return NeopayCountry.objects.exists() or NeopayBank.objects.exists()
+
+
+def _fetch_failed() -> None:
+    global _retry_after
+    _retry_after = time.monotonic() + max(0, _setting_int("NEOPAY_BANKS_RETRY_SECONDS", 60))
+
+
+def _refresh_in_background() -> None:
+    if time.monotonic() < _retry_after:
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    # One refreshing process at a time (when the cache backend is shared).
+    if not cache.add(_REFRESH_LOCK_KEY, 1, timeout=300):
+        _refresh_lock.release()
+        return
+
+    def run():
+        try:
+            sync_neopay_catalogue(deactivate_missing=True)
+        except Exception as exc:
+            _fetch_failed()
+            logger.warning("Neopay banks background refresh failed: %s", exc)
+        finally:
+            cache.delete(_REFRESH_LOCK_KEY)
+            _refresh_lock.release()
+            connections.close_all()
+
+    threading.Thread(target=run, name="neopay-banks-refresh", daemon=True).start()
+
+
+def get_neopay_catalogue(country_code: str = "") -> list[NeopayCountryData]:
+    """Countries (with their enabled banks) for `country_code`, or all when empty.
+
+    Served from process memory for NEOPAY_BANKS_CACHE_SECONDS, then from the DB.
+    A stale catalogue is returned as-is and refreshed in the background; only
+    when nothing was ever synced is it fetched from Neopay first, within
+    NEOPAY_BANKS_FETCH_TIMEOUT_SECONDS (raises NeopayBanksError if that fails,
+    or failed less than NEOPAY_BANKS_RETRY_SECONDS ago).
+    """
+    cc = (country_code or "").strip().upper()
+    key = cc or "*"
+    hit = _memory.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+
+    catalogue = _load(cc)
+    if not catalogue and not _has_catalogue():
+        # First run: one fetch returns every country, so store them all.
+        if time.monotonic() < _retry_after:
+            raise NeopayBanksError("Neopay banks are not available (last fetch failed)")
+        budget = max(1, _setting_int("NEOPAY_BANKS_FETCH_TIMEOUT_SECONDS", 5))
+        try:
+            sync_neopay_catalogue(timeout=budget, total_timeout=budget)
+        except Exception:
+            _fetch_failed()
+            raise
+        catalogue = _load(cc)
+    else:
+        synced_at = _synced_at()
+        if synced_at is None or (timezone.now() - synced_at).total_seconds() > _setting_int(
+            "NEOPAY_BANKS_REFRESH_SECONDS", 21600
+        ):
+            _refresh_in_background()
+
+    with _memory_lock:
+        _memory[key] = (time.monotonic() + max(0, _setting_int("NEOPAY_BANKS_CACHE_SECONDS", 60)), catalogue)
+    return catalogue
+
+
+def get_neopay_banks(country_code: str) -> list[NeopayBankData]:
+    cc = (country_code or "").strip().upper() or "LT"
+    return [b for c in get_neopay_catalogue(cc) for b in c.banks]
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import NeopayBank, NeopayConfig, NeopayCountry
+from .services.neopay_banks import invalidate_neopay_catalogue
+
+
+@receiver(post_save, sender=NeopayBank)
+@receiver(post_delete, sender=NeopayBank)
+@receiver(post_save, sender=NeopayCountry)
+@receiver(post_delete, sender=NeopayCountry)
+@receiver(post_save, sender=NeopayConfig)
+def neopay_catalogue_changed(sender, **kwargs):
+    # Admin edits (is_enabled, sort_order) show up immediately in this process;
+    # other processes pick them up within NEOPAY_BANKS_CACHE_SECONDS.
+    invalidate_neopay_catalogue()
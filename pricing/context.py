@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.auth import user_from_access_cookie
+from accounts.claims import AuthUser, GroupClaim, active_group_claims
+from accounts.models import CustomerGroup
+
+_CACHE_KEY = "pricing:context:{}:{}"
+
+
+@dataclass(frozen=True)
+class PricingContext:
+    """Customer group terms prices are computed with (the user's highest priority active group)."""
+
+    customer_group_id: int | None = None
+    pricing_type: str = CustomerGroup.PricingType.RETAIL
+    allow_additional_discounts: bool = True
+    allow_coupons: bool = True
+
+    @classmethod
+    def from_group(cls, group: GroupClaim | None) -> "PricingContext":
+        if group is None:
+            return RETAIL
+        return cls(
+            customer_group_id=group.id,
+            pricing_type=group.pricing_type,
+            allow_additional_discounts=group.allow_additional_discounts,
+            allow_coupons=group.allow_coupons,
+        )
+
+
+# Guests and users without an active customer group.
+RETAIL = PricingContext()
+
+
+def pricing_context_for_user(user) -> PricingContext:
+    """Pricing context of `user`; retail for guests.
+
+    Taken from the access-token claims when they are current; otherwise looked up
+    once and cached per (user, auth_version), so a change to the user's groups
+    (which bumps auth_version) never serves a stale context.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return RETAIL
+
+    if type(user) is AuthUser and user.group_claims is not None:
+        groups = user.group_claims
+        return PricingContext.from_group(groups[0] if groups else None)
+
+    key = _CACHE_KEY.format(int(user.id), int(user.auth_version))
+    context = cache.get(key)
+    if context is None:
+        groups = active_group_claims(user.id)
+        context = PricingContext.from_group(groups[0] if groups else None)
+        ttl = int(getattr(settings, "PRICING_CONTEXT_CACHE_SECONDS", 300))
+        if ttl > 0:
+            cache.set(key, context, ttl)
+    return context
+
+
+def _request_user(request):
+    # Same precedence as the cart: ninja auth, then a Django session, then the access cookie.
+    user = getattr(request, "auth", None)
+    if user:
+        return user
+    try:
+        user = getattr(request, "user", None)
+        if user is not None and getattr(user, "is_authenticated", False):
+            return user
+    except Exception:
+        pass
+    return user_from_access_cookie(request)
+
+
+def get_pricing_context(request) -> PricingContext:
+    """Pricing context of the request's user, resolved once per request."""
+    context = getattr(request, "_pricing_context", None)
+    if context is None:
+        context = pricing_context_for_user(_request_user(request))
+        try:
+            request._pricing_context = context
+        except Exception:
+            pass
+    return context
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from django.utils.functional import SimpleLazyObject
+
+from .context import get_pricing_context
+
+
+class PricingContextMiddleware:
+    """Exposes `request.pricing_context`, resolved on first use.
+
+    Must come after AuthenticationMiddleware (session users are honoured).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.pricing_context = SimpleLazyObject(lambda: get_pricing_context(request))
+        return self.get_response(request)
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import path, reverse
+from django.utils.html import format_html
 
 from .models import (
     DeliveryRule,
     Holiday,
+    LabelJob,
+    LabelJobItem,
     ShippingCountry,
     ShippingCountryTranslation,
     ShippingMethod,
+    ShippingLabel,
     ShippingRate,
 )
 
@@ -71,3 +78,105 @@ class DeliveryRuleAdmin(admin.ModelAdmin):
     search_fields = ("code", "name")
     autocomplete_fields = ("warehouse", "brand", "category", "product_group", "product")
     ordering = ("-priority", "code")
+
+
+@admin.register(ShippingLabel)
+class ShippingLabelAdmin(admin.ModelAdmin):
+    list_display = ("id", "order", "carrier_code", "tracking_number", "pages", "size_bytes", "created_at")
+    list_filter = ("carrier_code",)
+    search_fields = ("order__id", "tracking_number", "sha256")
+    raw_id_fields = ("order",)
+    readonly_fields = ("order", "carrier_code", "tracking_number", "sha256", "file", "size_bytes", "pages", "created_at")
+
+
+class LabelJobItemInline(admin.TabularInline):
+    model = LabelJobItem
+    extra = 0
+    can_delete = False
+    fields = ("order", "status", "label", "error")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LabelJob)
+class LabelJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "carrier_code",
+        "status",
+        "progress",
+        "succeeded",
+        "failed",
+        "attempts",
+        "created_by",
+        "created_at",
+        "finished_at",
+        "pdf_link",
+    )
+    list_filter = ("status", "carrier_code")
+    search_fields = ("id", "last_error")
+    readonly_fields = (
+        "carrier_code",
+        "status",
+        "total",
+        "succeeded",
+        "failed",
+        "attempts",
+        "run_after",
+        "locked_at",
+        "last_error",
+        "created_by",
+        "created_at",
+        "updated_at",
+        "finished_at",
+    )
+    inlines = (LabelJobItemInline,)
+
+    @admin.display(description="Progress")
+    def progress(self, obj: LabelJob) -> str:
+        return f"{obj.processed}/{obj.total}"
+
+    @admin.display(description="PDF")
+    def pdf_link(self, obj: LabelJob) -> str:
+        if not obj.succeeded:
+            return "-"
+        url = reverse("admin:shipping_labeljob_pdf", args=[obj.pk])
+        return format_html('<a href="{}">PDF</a> · <a href="{}?layout=a4">A4</a>', url, url)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom = [
+            path(
+                "<path:object_id>/pdf/",
+                self.admin_site.admin_view(self.pdf_view),
+                name="shipping_labeljob_pdf",
+            ),
+        ]
+        return custom + urls
+
+    def pdf_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
+        from .labels import build_label_sheet, label_sheet_response
+        from .pdf import get_sheet_layout
+
+        job = get_object_or_404(LabelJob, pk=object_id)
+        job_url = reverse("admin:shipping_labeljob_change", args=[job.pk])
+        layout_code = (request.GET.get("layout") or "").strip()
+        try:
+            layout = get_sheet_layout(layout_code) if layout_code else None
+        except KeyError:
+            messages.error(request, f"Nežinomas lapo formatas: {layout_code}")
+            return redirect(job_url)
+
+        order_ids = list(
+            job.items.filter(status=LabelJobItem.Status.DONE).order_by("id").values_list("order_id", flat=True)
+        )
+        sheet = build_label_sheet(order_ids, layout=layout)
+        if sheet.failed:
+            messages.warning(request, f"Praleisti užsakymai: {sheet.failed_summary()}")
+        if sheet.file is None:
+            messages.error(request, "Šiame darbe nėra sugeneruotų lipdukų.")
+            return redirect(job_url)
+        suffix = f"_{layout.code}" if layout else ""
+        return label_sheet_response(sheet, filename=f"{job.carrier_code}_labels_job_{job.pk}{suffix}.pdf")
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, TypeVar
+
+import requests
+from django.conf import settings
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _setting_float(name: str, default: float) -> float:
+    try:
+        return float(getattr(settings, name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def build_session(*, pool_size: int | None = None) -> requests.Session:
+    """Keep-alive session for carrier APIs with transport-level retries.
+
+    Only idempotent methods are retried (connection errors, 429 and 5xx gateway
+    errors, honouring `Retry-After`); a POST that creates shipments or parcels is
+    never sent twice by the transport.
+    """
+    pool_size = max(1, int(pool_size or _setting_int("CARRIER_HTTP_POOL_SIZE", 10)))
+    retry = Retry(
+        total=max(0, _setting_int("CARRIER_HTTP_RETRIES", 2)),
+        backoff_factor=max(0.0, _setting_float("CARRIER_HTTP_BACKOFF", 0.5)),
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_local = threading.local()
+
+
+def carrier_session(carrier: str) -> requests.Session:
+    # One pooled session per carrier per thread, reused by every client instance created
+    # on that thread. requests does not promise Session thread-safety: concurrent
+    # requests that only pass per-call arguments are fine (the connection pool and the
+    # cookie jar are locked), but code that mutates session state (headers, auth,
+    # adapters) while other threads send must not share it.
+    sessions = getattr(_local, "sessions", None)
+    if sessions is None:
+        sessions = _local.sessions = {}
+    session = sessions.get(carrier)
+    if session is None:
+        session = sessions[carrier] = build_session()
+    return session
+
+
+@dataclass
+class CallMetrics:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_error: str = ""
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+_metrics: dict[tuple[str, str], CallMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(carrier: str, op: str, duration_ms: float, error: str | None) -> None:
+    with _metrics_lock:
+        m = _metrics.setdefault((carrier, op), CallMetrics())
+        m.calls += 1
+        m.total_ms += duration_ms
+        m.max_ms = max(m.max_ms, duration_ms)
+        if error:
+            m.errors += 1
+            m.last_error = error[:300]
+
+
+def carrier_http_metrics(carrier: str | None = None) -> dict[tuple[str, str], CallMetrics]:
+    """Snapshot of per-(carrier, operation) call metrics of this process."""
+    with _metrics_lock:
+        return {
+            k: CallMetrics(**vars(v)) for k, v in _metrics.items() if carrier is None or k[0] == carrier
+        }
+
+
+def reset_carrier_http_metrics() -> None:
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def format_carrier_http_metrics(carrier: str | None = None) -> str:
+    return "; ".join(
+        f"{c}.{op}: calls={m.calls} errors={m.errors} avg={m.avg_ms:.0f}ms max={m.max_ms:.0f}ms"
+        for (c, op), m in sorted(carrier_http_metrics(carrier).items())
+    )
+
+
+class CarrierHttp:
+    """Thin wrapper over a pooled session that times every call per operation.
+
+    HTTP status >= 400 counts as an error in the metrics, but the response is
+    returned unchanged; raising stays with the carrier client.
+    """
+
+    def __init__(self, carrier: str, *, session: requests.Session | None = None):
+        self.carrier = carrier
+        self.session = session or carrier_session(carrier)
+
+    def request(self, method: str, url: str, *, op: str, **kwargs: Any) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as exc:
+            self._done(op, method, started, str(exc) or exc.__class__.__name__)
+            raise
+        self._done(op, method, started, f"HTTP {response.status_code}" if response.status_code >= 400 else None)
+        return response
+
+    def _done(self, op: str, method: str, started: float, error: str | None) -> None:
+        duration_ms = (time.perf_counter() - started) * 1000
+        _record(self.carrier, op, duration_ms, error)
+        if error:
+            logger.warning("%s %s %s failed after %.0fms: %s", self.carrier, op, method, duration_ms, error)
+
+    def get(self, url: str, *, op: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, op=op, **kwargs)
+
+    def post(self, url: str, *, op: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, op=op, **kwargs)
+
+
+class ExpiringValue(Generic[T]):
+    """Process-wide cached value (carrier config, tokens) with a TTL and explicit invalidation."""
+
+    def __init__(self, loader: Callable[[], T], *, ttl_setting: str = "CARRIER_CONFIG_CACHE_SECONDS", default_ttl: int = 60):
+        self._loader = loader
+        self._ttl_setting = ttl_setting
+        self._default_ttl = default_ttl
+        self._value: T | None = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        now = time.monotonic()
+        if self._value is not None and now < self._expires:
+            return self._value
+        with self._lock:
+            if self._value is None or time.monotonic() >= self._expires:
+                self._value = self._loader()
+                self._expires = time.monotonic() + max(0, _setting_int(self._ttl_setting, self._default_ttl))
+            return self._value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._expires = 0.0
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
+from typing import IO, Any, Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from checkout.models import Order
+
+from .models import LabelJob, LabelJobItem, ShippingLabel
+from .pdf import LabelSheetWriter, SheetLayout, page_count
+
+
+logger = logging.getLogger(__name__)
+
+
+class LabelProvider:
+    """Base class for carrier label generation.
+
+    `generate` returns a label PDF per order id for one chunk of at most
+    `batch_size` orders (the carrier's batch limit) and raises one of `errors`
+    when the carrier or the order data is at fault.
+    """
+
+    carrier_code: str = ""
+    shipping_methods: tuple[str, ...] = ()
+    label_format: str = ""
+    batch_size: int = 50
+    errors: tuple[type[Exception], ...] = (RuntimeError, ValueError)
+
+    def open(self) -> Any:
+        """Return the per-job context (typically a carrier client)."""
+        raise NotImplementedError
+
+    def generate(self, context: Any, orders: list[Order]) -> dict[int, bytes]:
+        raise NotImplementedError
+
+
+@lru_cache(maxsize=1)
+def _load_providers() -> dict[str, LabelProvider]:
+    out: dict[str, LabelProvider] = {}
+    for path in getattr(settings, "SHIPPING_LABEL_PROVIDERS", []) or []:
+        provider = import_string(path)()
+        code = (provider.carrier_code or "").strip()
+        if not code:
+            raise ValueError(f"Label provider {path} has no carrier_code")
+        if code in out:
+            raise ValueError(f"Duplicate label provider carrier_code: {code}")
+        out[code] = provider
+    return out
+
+
+def get_label_providers() -> dict[str, LabelProvider]:
+    return dict(_load_providers())
+
+
+def get_label_provider(carrier_code: str) -> LabelProvider:
+    provider = _load_providers().get((carrier_code or "").strip())
+    if provider is None:
+        raise KeyError(f"Unknown label provider: {carrier_code}")
+    return provider
+
+
+def label_storage_name(digest: str) -> str:
+    return f"shipping_labels/sha256/{digest[:2]}/{digest}.pdf"
+
+
+def store_label_pdf(order: Order, *, carrier_code: str, pdf: bytes) -> ShippingLabel:
+    """Keep `pdf` as the order's label; identical content is stored once."""
+    digest = hashlib.sha256(pdf).hexdigest()
+    name = label_storage_name(digest)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(pdf))
+    try:
+        pages = page_count(pdf)
+    except Exception:
+        pages = 1
+    label, _ = ShippingLabel.objects.get_or_create(
+        order=order,
+        sha256=digest,
+        defaults={
+            "carrier_code": carrier_code,
+            "tracking_number": (order.tracking_number or "").strip(),
+            "file": name,
+            "size_bytes": len(pdf),
+            "pages": pages,
+        },
+    )
+    return label
+
+
+def latest_labels(order_ids: Iterable[int]) -> dict[int, ShippingLabel]:
+    out: dict[int, ShippingLabel] = {}
+    for label in ShippingLabel.objects.filter(order_id__in=list(order_ids)).order_by("order_id", "-created_at", "-id"):
+        out.setdefault(label.order_id, label)
+    return out
+
+
+def read_label(label: ShippingLabel) -> bytes:
+    with label.file.open("rb") as f:
+        return f.read()
+
+
+# Sheets up to this size stay in memory; larger ones are spooled to a temp file.
+_SHEET_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@dataclass
+class LabelSheet:
+    """A print job assembled from cached labels; `file` is None when nothing could be included."""
+
+    file: IO[bytes] | None = None
+    pages: int = 0
+    included: list[int] = field(default_factory=list)
+    failed: dict[int, str] = field(default_factory=dict)
+
+    def failed_summary(self, limit: int = 20) -> str:
+        parts = [f"#{oid}: {error}" for oid, error in list(self.failed.items())[:limit]]
+        if len(self.failed) > limit:
+            parts.append(f"... (+{len(self.failed) - limit})")
+        return "; ".join(parts)
+
+
+def build_label_sheet(order_ids: list[int], *, layout: SheetLayout | None = None) -> LabelSheet:
+    """One PDF of the cached labels of `order_ids` (in that order), any carrier mix.
+
+    With a `layout` labels are imposed n-up onto sheets (e.g. 4 x A6 on A4).
+    Orders without a label or with an unreadable file are reported in `failed`
+    and skipped; they never abort the job. Labels are read one at a time and the
+    result is spooled to a temporary file, ready to be streamed. No carrier API
+    is called.
+    """
+    labels = latest_labels(order_ids)
+    writer = LabelSheetWriter(layout)
+    sheet = LabelSheet()
+    for oid in order_ids:
+        label = labels.get(oid)
+        if label is None:
+            sheet.failed[oid] = "nėra sugeneruoto lipduko"
+            continue
+        try:
+            writer.add(read_label(label))
+        except Exception as exc:
+            logger.warning("Label %s of order %s is unreadable: %s", label.pk, oid, exc)
+            sheet.failed[oid] = f"nepavyko nuskaityti lipduko ({exc.__class__.__name__})"
+            continue
+        sheet.included.append(oid)
+
+    if not sheet.included:
+        return sheet
+    out = tempfile.SpooledTemporaryFile(max_size=_SHEET_SPOOL_BYTES)
+    writer.write(out)
+    out.seek(0)
+    sheet.file = out
+    sheet.pages = writer.pages
+    return sheet
+
+
+def label_sheet_response(sheet: LabelSheet, *, filename: str) -> FileResponse:
+    return FileResponse(sheet.file, as_attachment=True, filename=filename, content_type="application/pdf")
+
+
+def _mark_labelled(orders: list[Order], labels: dict[int, ShippingLabel], now) -> None:
+    for order in orders:
+        order.shipping_label_pdf.name = labels[order.id].file.name
+        order.shipping_label_generated_at = now
+        # Labels never move an order back (e.g. a reprint of an already shipped parcel).
+        if order.delivery_status in (Order.DeliveryStatus.PENDING, Order.DeliveryStatus.ERROR):
+            order.delivery_status = Order.DeliveryStatus.LABEL_CREATED
+        order.updated_at = now
+    Order.objects.bulk_update(
+        orders, ["shipping_label_pdf", "shipping_label_generated_at", "delivery_status", "updated_at"]
+    )
+
+
+def generate_labels(provider: LabelProvider, context: Any, orders: list[Order]) -> dict[int, bytes | str]:
+    """Label PDF (bytes) or error message (str) per order id.
+
+    A failing chunk is split in halves and retried, so one bad order (missing
+    phone, rejected address) costs a few extra calls instead of failing the
+    others. Shipments created before the failure are already saved on the
+    orders and are not created twice.
+    """
+    try:
+        pdfs = provider.generate(context, orders)
+    except provider.errors as exc:
+        if len(orders) == 1:
+            return {orders[0].id: str(exc) or exc.__class__.__name__}
+        logger.info("%s label chunk of %s failed (%s); splitting", provider.carrier_code, len(orders), exc)
+        mid = len(orders) // 2
+        return {
+            **generate_labels(provider, context, orders[:mid]),
+            **generate_labels(provider, context, orders[mid:]),
+        }
+    return {o.id: pdfs.get(o.id) or "Vežėjas negrąžino lipduko" for o in orders}
+
+
+def label_pdf_for_order(order: Order, *, carrier_code: str, regenerate: bool = False) -> bytes:
+    """Cached label of one order; the carrier is called only when there is none (or `regenerate`)."""
+    if not regenerate:
+        label = latest_labels([order.id]).get(order.id)
+        if label is not None:
+            return read_label(label)
+
+    provider = get_label_provider(carrier_code)
+    result = generate_labels(provider, provider.open(), [order])[order.id]
+    if isinstance(result, str):
+        raise RuntimeError(result)
+    label = store_label_pdf(order, carrier_code=carrier_code, pdf=result)
+    _mark_labelled([order], {order.id: label}, timezone.now())
+    return result
+
+
+def _stale_lock_after() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "LABEL_JOB_LOCK_SECONDS", 600) or 600))
+
+
+def enqueue_label_job(*, carrier_code: str, orders: Iterable[Order], user=None) -> LabelJob | None:
+    """Create a label job for the carrier's orders among `orders`.
+
+    Orders that already have a cached label are recorded as done right away; the
+    rest are generated by `manage.py process_label_jobs` (or inline when
+    `LABEL_JOBS_ASYNC` is off).
+    """
+    provider = get_label_provider(carrier_code)
+    orders = [o for o in orders if (o.shipping_method or "").strip() in provider.shipping_methods]
+    if not orders:
+        return None
+
+    labels = latest_labels([o.id for o in orders])
+    with transaction.atomic():
+        job = LabelJob.objects.create(
+            carrier_code=carrier_code,
+            total=len(orders),
+            succeeded=sum(1 for o in orders if o.id in labels),
+            created_by=user if getattr(user, "pk", None) else None,
+        )
+        LabelJobItem.objects.bulk_create(
+            [
+                LabelJobItem(
+                    job=job,
+                    order=o,
+                    status=LabelJobItem.Status.DONE if o.id in labels else LabelJobItem.Status.PENDING,
+                    label=labels.get(o.id),
+                )
+                for o in orders
+            ]
+        )
+        if job.succeeded == job.total:
+            job.status = LabelJob.Status.DONE
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "finished_at", "updated_at"])
+
+    if job.status == LabelJob.Status.PENDING and not getattr(settings, "LABEL_JOBS_ASYNC", True):
+        process_label_job(job.id)
+        job.refresh_from_db()
+    return job
+
+
+def claim_label_jobs(*, batch_size: int) -> list[int]:
+    """Lock a batch of due jobs (pending, or processing with an expired lock)."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            LabelJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=LabelJob.Status.PENDING, run_after__lte=now)
+                | Q(status=LabelJob.Status.PROCESSING, locked_at__lt=now - _stale_lock_after())
+            )
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[: max(1, int(batch_size))]
+        )
+        if ids:
+            LabelJob.objects.filter(id__in=ids).update(
+                status=LabelJob.Status.PROCESSING,
+                locked_at=now,
+                updated_at=now,
+            )
+    return ids
+
+
+@dataclass(frozen=True)
+class LabelJobResult:
+    job_id: int
+    ok: bool
+    succeeded: int = 0
+    failed: int = 0
+    error: str = ""
+
+
+def process_label_job(job_id: int, *, max_attempts: int = 5) -> LabelJobResult:
+    """Generate the pending labels of a job, `provider.batch_size` orders per carrier call.
+
+    Each chunk's labels, item statuses, order fields and the job counters are
+    written in one transaction, so progress is visible while the job runs and an
+    interrupted job resumes with the remaining items.
+    """
+    job = LabelJob.objects.filter(id=job_id).first()
+    if job is None:
+        return LabelJobResult(job_id=job_id, ok=False, error="missing job")
+
+    job.attempts += 1
+    succeeded = failed = 0
+    try:
+        provider = get_label_provider(job.carrier_code)
+        context = provider.open()
+        while True:
+            items = list(
+                job.items.filter(status=LabelJobItem.Status.PENDING)
+                .select_related("order")
+                .order_by("id")[: max(1, int(provider.batch_size or 1))]
+            )
+            if not items:
+                break
+
+            results = generate_labels(provider, context, [item.order for item in items])
+            now = timezone.now()
+            with transaction.atomic():
+                labels: dict[int, ShippingLabel] = {}
+                for item in items:
+                    result = results.get(item.order_id)
+                    if isinstance(result, bytes):
+                        item.label = labels[item.order_id] = store_label_pdf(
+                            item.order, carrier_code=job.carrier_code, pdf=result
+                        )
+                        item.status = LabelJobItem.Status.DONE
+                        item.error = ""
+                    else:
+                        item.status = LabelJobItem.Status.FAILED
+                        item.error = str(result or "")[:2000]
+                LabelJobItem.objects.bulk_update(items, ["status", "label", "error"])
+                if labels:
+                    _mark_labelled([i.order for i in items if i.order_id in labels], labels, now)
+
+                chunk_ok = len(labels)
+                job.succeeded += chunk_ok
+                job.failed += len(items) - chunk_ok
+                job.locked_at = now  # heartbeat: keeps the lock fresh on long batches
+                job.save(update_fields=["succeeded", "failed", "locked_at", "attempts", "updated_at"])
+            succeeded += chunk_ok
+            failed += len(items) - chunk_ok
+    except Exception as exc:
+        error = str(exc)[:2000] or exc.__class__.__name__
+        if job.attempts >= max_attempts:
+            job.status = LabelJob.Status.FAILED
+        else:
+            job.status = LabelJob.Status.PENDING
+            job.run_after = timezone.now() + timedelta(minutes=2 ** job.attempts)
+        job.locked_at = None
+        job.last_error = error
+        job.save(update_fields=["status", "attempts", "run_after", "locked_at", "last_error", "updated_at"])
+        return LabelJobResult(job_id=job_id, ok=False, succeeded=succeeded, failed=failed, error=error)
+
+    job.status = LabelJob.Status.DONE
+    job.locked_at = None
+    job.last_error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "attempts", "locked_at", "last_error", "finished_at", "updated_at"])
+    return LabelJobResult(job_id=job_id, ok=True, succeeded=succeeded, failed=failed)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipping.labels import claim_label_jobs, process_label_job
+
+
+class Command(BaseCommand):
+    help = "Generate queued shipping labels (DPD/Unisend) in carrier-sized chunks and cache the PDFs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5, help="Jobs claimed per poll.")
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            default=False,
+            help="Keep polling the queue instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when the queue is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, int(options.get("batch_size") or 5))
+        max_attempts = max(1, int(options.get("max_attempts") or 5))
+        loop = bool(options.get("loop"))
+        sleep_s = max(0.1, float(options.get("sleep") or 5.0))
+
+        jobs = succeeded = failed = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                job_ids = claim_label_jobs(batch_size=batch_size)
+                if not job_ids:
+                    if not loop:
+                        break
+                    time.sleep(sleep_s)
+                    continue
+
+                for job_id in job_ids:
+                    result = process_label_job(job_id, max_attempts=max_attempts)
+                    jobs += 1
+                    succeeded += result.succeeded
+                    failed += result.failed
+                    if not result.ok:
+                        self.stderr.write(f"job={result.job_id} error={result.error}")
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted; the job resumes with its pending orders once its lock expires.")
+
+        elapsed = max(0.001, time.perf_counter() - started)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done. jobs={jobs}, labels={succeeded}, failed={failed}, elapsed={elapsed:.1f}s"
+            )
+        )
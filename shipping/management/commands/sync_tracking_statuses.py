@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shipping.http import format_carrier_http_metrics
+from shipping.tracking import get_tracking_adapters, sync_tracking_statuses
+
+
+class Command(BaseCommand):
+    help = "Sync carrier tracking statuses for in-flight orders (DPD, Unisend, ...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--carrier",
+            action="append",
+            default=[],
+            help="Carrier code (repeatable); default: all configured tracking adapters",
+        )
+        parser.add_argument("--limit", type=int, default=0, help="Max orders per carrier (0 = all)")
+        parser.add_argument("--workers", type=int, default=0, help="Concurrent HTTP requests (default: TRACKING_SYNC_WORKERS)")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        available = get_tracking_adapters()
+        carriers = options["carrier"] or list(available)
+        unknown = [c for c in carriers if c not in available]
+        if unknown:
+            raise CommandError(f"Unknown carrier(s): {', '.join(unknown)}; configured: {', '.join(available)}")
+
+        for carrier in carriers:
+            stats = sync_tracking_statuses(
+                carrier,
+                limit=int(options["limit"]) or None,
+                workers=int(options["workers"]) or None,
+                dry_run=bool(options["dry_run"]),
+            )
+            self.stdout.write(f"{stats.as_line()} dry_run={bool(options['dry_run'])}")
+            metrics = format_carrier_http_metrics(carrier)
+            if metrics:
+                self.stdout.write(f"  http: {metrics}")
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkout', '0020_order_tracking_status'),
+        ('shipping', '0008_rename_shipping_shi_shipping_21fe3e_idx_shipping_sh_shippin_a2d220_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('carrier_code', models.CharField(max_length=32)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShippingLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('carrier_code', models.CharField(max_length=32)),
+                ('tracking_number', models.CharField(blank=True, default='', max_length=64)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to='shipping_labels/sha256/')),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('pages', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shipping_labels', to='checkout.order')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LabelJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shipping.labeljob')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='checkout.order')),
+                ('label', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shipping.shippinglabel')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='labeljob',
+            index=models.Index(fields=['status', 'run_after'], name='shipping_la_status_d73734_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shippinglabel',
+            index=models.Index(fields=['order', '-created_at'], name='shipping_sh_order_i_b73364_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='shippinglabel',
+            constraint=models.UniqueConstraint(fields=('order', 'sha256'), name='uniq_shipping_label_order_sha256'),
+        ),
+        migrations.AddConstraint(
+            model_name='labeljobitem',
+            constraint=models.UniqueConstraint(fields=('job', 'order'), name='uniq_label_job_item_order'),
+        ),
+    ]
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class ShippingCountry(models.Model):
@@ -185,3 +187,103 @@ class DeliveryRule(models.Model):
 
     def __str__(self) -> str:
         return self.code
+
+
+class ShippingLabel(models.Model):
+    """Carrier label PDF of one order; the file is stored once per content hash.
+
+    Reprints and merged batch PDFs are assembled from these files, so the
+    carrier is only called when an order has no label yet.
+    """
+
+    order = models.ForeignKey(
+        "checkout.Order",
+        on_delete=models.CASCADE,
+        related_name="shipping_labels",
+    )
+    carrier_code = models.CharField(max_length=32)
+    tracking_number = models.CharField(max_length=64, blank=True, default="")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    file = models.FileField(upload_to="shipping_labels/sha256/", max_length=255)
+    size_bytes = models.PositiveIntegerField(default=0)
+    pages = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["order", "sha256"], name="uniq_shipping_label_order_sha256"),
+        ]
+        indexes = [
+            models.Index(fields=["order", "-created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.carrier_code} label order:{self.order_id} ({self.sha256[:12]})"
+
+
+class LabelJob(models.Model):
+    """Background label generation for a set of orders of one carrier (resumable)."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    carrier_code = models.CharField(max_length=32)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.carrier_code} labels #{self.pk} ({self.status})"
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+
+class LabelJobItem(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    job = models.ForeignKey(LabelJob, on_delete=models.CASCADE, related_name="items")
+    order = models.ForeignKey("checkout.Order", on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    label = models.ForeignKey(ShippingLabel, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "order"], name="uniq_label_job_item_order"),
+        ]
+
+    def __str__(self) -> str:
+        return f"job:{self.job_id} order:{self.order_id} ({self.status})"
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from pypdf import PageObject, PdfReader, PdfWriter, Transformation
+
+
+# 1 mm in PDF points.
+MM = 72 / 25.4
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """N-up sheet: labels are scaled to fit `columns` x `rows` cells (never enlarged)."""
+
+    code: str
+    title: str
+    width: float
+    height: float
+    columns: int
+    rows: int
+    margin: float = 0.0
+
+    @property
+    def per_sheet(self) -> int:
+        return self.columns * self.rows
+
+
+# A6 (105x148 mm) and 10x15 cm labels both fit 2x2 on A4 (10x15 is scaled down ~1%).
+SHEET_LAYOUTS: dict[str, SheetLayout] = {
+    "a4": SheetLayout(code="a4", title="A4, 4 lipdukai lape", width=210 * MM, height=297 * MM, columns=2, rows=2),
+}
+
+
+def get_sheet_layout(code: str) -> SheetLayout:
+    layout = SHEET_LAYOUTS.get((code or "").strip().lower())
+    if layout is None:
+        raise KeyError(f"Unknown sheet layout: {code}")
+    return layout
+
+
+def _reader(source) -> PdfReader:
+    return PdfReader(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def page_count(pdf: bytes) -> int:
+    return len(_reader(pdf).pages)
+
+
+def split_pages(pdf: bytes) -> list[bytes]:
+    """One single-page PDF per page of `pdf` (carrier batch PDFs carry one label per page)."""
+    reader = _reader(pdf)
+    out: list[bytes] = []
+    for page in reader.pages:
+        writer = PdfWriter()
+        writer.add_page(page)
+        buf = io.BytesIO()
+        writer.write(buf)
+        out.append(buf.getvalue())
+    return out
+
+
+class LabelSheetWriter:
+    """Assembles label PDFs into one document, as-is or imposed onto sheets.
+
+    Sources are added one at a time and released once their pages are copied
+    (with a layout, at most one sheet's worth of sources is referenced), so a
+    large print job never holds every label file at once. `add` either copies
+    all pages of a source or raises without changing the output, which lets the
+    caller report a broken label and go on with the rest.
+    """
+
+    def __init__(self, layout: SheetLayout | None = None):
+        self.layout = layout
+        self.labels = 0
+        self._writer = PdfWriter()
+        self._sheet: PageObject | None = None
+        self._slot = 0
+
+    @property
+    def pages(self) -> int:
+        return len(self._writer.pages) + (1 if self._sheet is not None else 0)
+
+    def add(self, source) -> int:
+        """Add every page of `source` (bytes or a binary file); returns the number of labels added."""
+        pages = list(_reader(source).pages)
+        for page in pages:
+            # Parse the parts used below up front, so a broken file fails before anything is copied.
+            page.transfer_rotation_to_content()
+            page.get_contents()
+            _ = page.mediabox.width, page.mediabox.height
+        for page in pages:
+            if self.layout is None:
+                self._writer.add_page(page)
+            else:
+                self._place(page)
+        self.labels += len(pages)
+        return len(pages)
+
+    def _place(self, page: PageObject) -> None:
+        layout = self.layout
+        if self._sheet is None:
+            self._sheet = PageObject.create_blank_page(width=layout.width, height=layout.height)
+            self._slot = 0
+
+        cell_w = (layout.width - 2 * layout.margin) / layout.columns
+        cell_h = (layout.height - 2 * layout.margin) / layout.rows
+        col, row = self._slot % layout.columns, self._slot // layout.columns
+        cell_x = layout.margin + col * cell_w
+        cell_y = layout.height - layout.margin - (row + 1) * cell_h
+
+        box = page.mediabox
+        w, h = float(box.width), float(box.height)
+        ctm = Transformation().translate(-float(box.left), -float(box.bottom))
+        # Landscape label into a portrait cell (or vice versa): turn it a quarter.
+        if (w > h) != (cell_w > cell_h):
+            ctm = ctm.rotate(90).translate(h, 0)
+            w, h = h, w
+        scale = min(cell_w / w, cell_h / h, 1.0)
+        ctm = ctm.scale(scale, scale).translate(
+            cell_x + (cell_w - w * scale) / 2,
+            cell_y + (cell_h - h * scale) / 2,
+        )
+        self._sheet.merge_transformed_page(page, ctm)
+
+        self._slot += 1
+        if self._slot >= layout.per_sheet:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._sheet is not None:
+            self._writer.add_page(self._sheet)
+            self._sheet = None
+            self._slot = 0
+
+    def write(self, out: BinaryIO) -> None:
+        self._flush()
+        # Labels of one carrier repeat the same fonts and logos; keep one copy of each.
+        self._writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        self._writer.write(out)
+
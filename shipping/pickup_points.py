@@ -0,0 +1,598 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max, Q
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cell edge; a country's lockers spread over a few hundred cells.
+_CELL_KM = 5.0
+# Fixed-latitude projection error within one country (LT/LV/EE span ~4 degrees) stays
+# under ~7%; rings are searched this much further to never miss a nearer point.
+_PROJECTION_SLACK = 0.9
+
+EXPORT_FIELDS = ("id", "name", "city", "street", "postalCode", "lat", "lng", "type")
+
+
+@dataclass(frozen=True)
+class PickupPoint:
+    carrier_code: str
+    id: str
+    country_code: str
+    name: str = ""
+    city: str = ""
+    street: str = ""
+    postal_code: str = ""
+    kind: str = ""
+    latitude: float | None = None
+    longitude: float | None = None
+
+    @property
+    def has_location(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+
+@dataclass(frozen=True)
+class PickupPointRecord:
+    """One synced row as checkout needs it: snapshot fields plus the row's column values.
+
+    `raw` and `values` are shared between requests; treat them as read-only.
+    """
+
+    carrier_code: str
+    id: str
+    country_code: str
+    name: str
+    raw: Any
+    model: Any
+    values: tuple[tuple[str, Any], ...]
+
+    def instance(self):
+        """A fresh model instance of the row (no query), e.g. for `Order.pickup_locker`."""
+        names, vals = zip(*self.values)
+        return self.model.from_db(DEFAULT_DB_ALIAS, list(names), list(vals))
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_near(value: str) -> tuple[float, float]:
+    """`"lat,lng"` -> (lat, lng); raises ValueError on anything else."""
+    parts = [p.strip() for p in str(value or "").split(",")]
+    if len(parts) != 2:
+        raise ValueError("near must be 'lat,lng'")
+    lat, lng = float(parts[0]), float(parts[1])
+    if not (math.isfinite(lat) and math.isfinite(lng)) or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("near is out of range")
+    return lat, lng
+
+
+def coordinate(value: Any) -> Decimal | None:
+    """Carrier latitude/longitude as stored (6 decimals), so re-syncs compare equal; None if unusable."""
+    if value is None or not str(value).strip():
+        return None
+    try:
+        d = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return d.quantize(Decimal("0.000001")) if d.is_finite() else None
+
+
+class PickupPointSource:
+    """Base class for a carrier's synced pickup points (lockers, terminals).
+
+    `model` is the local table filled by `sync_pickup_points`; it needs
+    `country_code`, `is_active`, `updated_at`, `latitude` and `longitude` plus the
+    unique carrier id in `id_field`. `parse` maps one carrier item to values of
+    `sync_fields` (and `id_field`); only those fields are compared and written.
+    """
+
+    carrier_code: str = ""
+    model: Any = None
+    id_field: str = ""
+    sync_fields: tuple[str, ...] = ()
+    errors: tuple[type[Exception], ...] = ()
+
+    def queryset(self, country_code: str):
+        return self.model.objects.filter(is_active=True, country_code=country_code)
+
+    def signature(self, country_code: str) -> tuple:
+        """Cheap fingerprint of the table for one country; changes whenever a sync changes rows."""
+        agg = self.model.objects.filter(country_code=country_code).aggregate(
+            active=Count("id", filter=Q(is_active=True)),
+            last=Max("updated_at"),
+        )
+        return (agg["active"], agg["last"].isoformat() if agg["last"] else "")
+
+    def to_point(self, obj) -> PickupPoint:
+        raise NotImplementedError
+
+    def load(self, country_code: str) -> list[PickupPoint]:
+        return [p for p in (self.to_point(o) for o in self.queryset(country_code).iterator()) if p.id]
+
+    def to_record(self, obj) -> PickupPointRecord:
+        return PickupPointRecord(
+            carrier_code=self.carrier_code,
+            id=str(getattr(obj, self.id_field) or "").strip(),
+            country_code=str(obj.country_code or "").strip().upper(),
+            name=str(obj.name or "").strip(),
+            raw=obj.raw or {},
+            model=self.model,
+            values=tuple((f.attname, getattr(obj, f.attname)) for f in obj._meta.concrete_fields),
+        )
+
+    def fetch(self, country_code: str, **options: Any) -> list[Any]:
+        """The carrier's full list for one country; raises one of `errors`."""
+        raise NotImplementedError
+
+    def parse(self, item: dict[str, Any], country_code: str) -> dict[str, Any] | None:
+        """Field values for one carrier item, or None to skip it."""
+        raise NotImplementedError
+
+
+@lru_cache(maxsize=1)
+def _load_sources() -> dict[str, PickupPointSource]:
+    out: dict[str, PickupPointSource] = {}
+    for path in getattr(settings, "SHIPPING_PICKUP_POINT_SOURCES", []) or []:
+        source = import_string(path)()
+        code = (source.carrier_code or "").strip()
+        if not code:
+            raise ValueError(f"Pickup point source {path} has no carrier_code")
+        if code in out:
+            raise ValueError(f"Duplicate pickup point source carrier_code: {code}")
+        out[code] = source
+    return out
+
+
+def get_pickup_point_sources() -> dict[str, PickupPointSource]:
+    return dict(_load_sources())
+
+
+def get_pickup_point_source(carrier_code: str) -> PickupPointSource:
+    source = _load_sources().get((carrier_code or "").strip())
+    if source is None:
+        raise KeyError(f"Unknown pickup point source: {carrier_code}")
+    return source
+
+
+class PickupPointIndex:
+    """In-memory nearest-point index over one carrier's points in one country.
+
+    Points are bucketed into a uniform grid (`_CELL_KM`) on an equirectangular
+    projection around the country's mean latitude; a query scans rings of cells
+    outwards and stops once no unscanned cell can hold a nearer point than the
+    K-th found. Distances are exact (haversine).
+    """
+
+    def __init__(self, points: list[PickupPoint], *, version: str = ""):
+        self.points = points
+        self.version = version
+        self._located = [p for p in points if p.has_location]
+        lat0 = sum(p.latitude for p in self._located) / len(self._located) if self._located else 0.0
+        self._kx = 111.320 * max(0.1, math.cos(math.radians(lat0)))
+        self._ky = 110.574
+        self._cells: dict[tuple[int, int], list[PickupPoint]] = {}
+        for p in self._located:
+            self._cells.setdefault(self._cell(p.latitude, p.longitude), []).append(p)
+        xs = [c[0] for c in self._cells] or [0]
+        ys = [c[1] for c in self._cells] or [0]
+        self._bounds = (min(xs), max(xs), min(ys), max(ys))
+        self._export: dict[str, Any] | None = None
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lng * self._kx / _CELL_KM), math.floor(lat * self._ky / _CELL_KM)
+
+    def _ring(self, cx: int, cy: int, r: int) -> Iterable[tuple[int, int]]:
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        *,
+        k: int,
+        radius_km: float | None = None,
+        predicate: Callable[[PickupPoint], bool] | None = None,
+    ) -> list[tuple[PickupPoint, float]]:
+        """Up to `k` points closest to (lat, lng), nearest first, as (point, distance_km)."""
+        k = max(1, int(k))
+        best: list[tuple[float, int, PickupPoint]] = []  # max-heap on distance via negation
+
+        def consider(p: PickupPoint) -> None:
+            if predicate is not None and not predicate(p):
+                return
+            d = haversine_km(lat, lng, p.latitude, p.longitude)
+            if radius_km is not None and d > radius_km:
+                return
+            item = (-d, id(p), p)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, item)
+
+        cx, cy = self._cell(lat, lng)
+        if self._cells:
+            x0, x1, y0, y1 = self._bounds
+            max_ring = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+        else:
+            max_ring = -1
+        if radius_km is not None:
+            max_ring = min(max_ring, int(math.ceil(radius_km / (_CELL_KM * _PROJECTION_SLACK))) + 1)
+
+        r = 0
+        while r <= max_ring:
+            if (2 * r + 1) ** 2 > 4 * len(self._cells):
+                # Far from the points (or a huge radius): the ring walk would visit more
+                # empty cells than there are occupied ones, a plain scan of the rest is cheaper.
+                for cell, points in self._cells.items():
+                    if max(abs(cell[0] - cx), abs(cell[1] - cy)) >= r:
+                        for p in points:
+                            consider(p)
+                break
+            for cell in self._ring(cx, cy, r):
+                for p in self._cells.get(cell, ()):
+                    consider(p)
+            # Every unscanned cell lies at least r cells away from the query point.
+            if len(best) >= k and r * _CELL_KM * _PROJECTION_SLACK >= -best[0][0]:
+                break
+            r += 1
+
+        return [(p, -neg) for neg, _, p in sorted(best, key=lambda x: -x[0])]
+
+    def export(self) -> dict[str, Any]:
+        """Compact column/row form of every point for the frontend map (built once per index)."""
+        if self._export is None:
+            self._export = {
+                "fields": list(EXPORT_FIELDS),
+                "rows": [
+                    [
+                        p.id,
+                        p.name,
+                        p.city,
+                        p.street,
+                        p.postal_code,
+                        round(p.latitude, 6) if p.latitude is not None else None,
+                        round(p.longitude, 6) if p.longitude is not None else None,
+                        p.kind,
+                    ]
+                    for p in self.points
+                ],
+            }
+        return self._export
+
+
+@dataclass
+class _Entry:
+    signature: tuple
+    checked_at: float
+    index: PickupPointIndex
+
+
+_indexes: dict[tuple[str, str], _Entry] = {}
+_indexes_lock = threading.Lock()
+
+
+def _check_seconds() -> int:
+    try:
+        return int(getattr(settings, "PICKUP_POINT_INDEX_CHECK_SECONDS", 60))
+    except (TypeError, ValueError):
+        return 60
+
+
+def get_pickup_point_index(carrier_code: str, country_code: str) -> PickupPointIndex:
+    """Process-wide index for (carrier, country).
+
+    The table fingerprint is re-read at most every `PICKUP_POINT_INDEX_CHECK_SECONDS`;
+    the index is rebuilt only when it changed (a sync in any process), and at once
+    after `invalidate_pickup_point_index` in this process.
+    """
+    key = (carrier_code, country_code)
+    entry = _indexes.get(key)
+    now = time.monotonic()
+    if entry is not None and now - entry.checked_at < _check_seconds():
+        return entry.index
+
+    source = get_pickup_point_source(carrier_code)
+    signature = source.signature(country_code)
+    if entry is not None and entry.signature == signature:
+        entry.checked_at = now
+        return entry.index
+
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is None or entry.signature != signature:
+            version = hashlib.sha1(repr((key, signature)).encode("utf-8")).hexdigest()[:16]
+            entry = _Entry(signature, now, PickupPointIndex(source.load(country_code), version=version))
+            _indexes[key] = entry
+        entry.checked_at = now
+        return entry.index
+
+
+def invalidate_pickup_point_index(carrier_code: str | None = None, country_code: str | None = None) -> None:
+    with _indexes_lock:
+        for key in list(_indexes):
+            if (carrier_code is None or key[0] == carrier_code) and (country_code is None or key[1] == country_code):
+                del _indexes[key]
+
+
+# Resolved pickup points by (carrier, id): ids are unique per carrier table, the
+# record carries its country for the caller's check. None = unknown/inactive id.
+_RECORDS_MAX = 20000
+_records: OrderedDict[tuple[str, str], tuple[PickupPointRecord | None, float]] = OrderedDict()
+_records_lock = threading.Lock()
+
+
+def _store_records(entries: Iterable[tuple[tuple[str, str], PickupPointRecord | None]], now: float) -> None:
+    with _records_lock:
+        for key, record in entries:
+            _records[key] = (record, now)
+            _records.move_to_end(key)
+        while len(_records) > _RECORDS_MAX:
+            _records.popitem(last=False)
+
+
+def resolve_pickup_point(carrier_code: str, pickup_point_id: str) -> PickupPointRecord | None:
+    """Active pickup point by carrier id, from process memory when possible.
+
+    Entries live `PICKUP_POINT_INDEX_CHECK_SECONDS` (changes made by other
+    processes show up within that), are replaced right after a sync or admin
+    edit in this process, and a miss costs one query.
+    """
+    pid = (pickup_point_id or "").strip()
+    key = (carrier_code, pid)
+    now = time.monotonic()
+    with _records_lock:
+        entry = _records.get(key)
+        if entry is not None and now - entry[1] < _check_seconds():
+            _records.move_to_end(key)
+            return entry[0]
+
+    source = get_pickup_point_source(carrier_code)
+    obj = source.model.objects.filter(**{source.id_field: pid, "is_active": True}).first() if pid else None
+    record = source.to_record(obj) if obj is not None else None
+    _store_records([(key, record)], now)
+    return record
+
+
+def warm_pickup_point_cache(carrier_code: str, country_code: str) -> int:
+    """Load every active point of a country into the resolution cache (one query)."""
+    source = get_pickup_point_source(carrier_code)
+    records = [source.to_record(o) for o in source.queryset(country_code).iterator()]
+    _store_records((((carrier_code, r.id), r) for r in records if r.id), time.monotonic())
+    return len(records)
+
+
+def invalidate_pickup_point_cache(
+    carrier_code: str | None = None,
+    country_code: str | None = None,
+    pickup_point_id: str | None = None,
+) -> None:
+    """Drop resolved points (all, a carrier, a carrier's country or one id) and the matching indexes."""
+    with _records_lock:
+        for key, (record, _) in list(_records.items()):
+            if carrier_code is not None and key[0] != carrier_code:
+                continue
+            if pickup_point_id is not None and key[1] != pickup_point_id:
+                continue
+            # Negative entries have no country; drop them with any country-wide invalidation.
+            if country_code is not None and record is not None and record.country_code != country_code:
+                continue
+            del _records[key]
+    invalidate_pickup_point_index(carrier_code, country_code)
+
+
+def point_matches(
+    point: PickupPoint,
+    *,
+    city: str | None = None,
+    postal_code: str | None = None,
+    kind: str | None = None,
+    search: str | None = None,
+) -> bool:
+    """The list endpoints' filters (exact city/postal code/type, substring search) on one point."""
+    if city and point.city.casefold() != city.strip().casefold():
+        return False
+    if postal_code and point.postal_code.casefold() != postal_code.strip().casefold():
+        return False
+    if kind and point.kind != kind.strip():
+        return False
+    s = (search or "").strip().casefold()
+    if s and not any(s in v.casefold() for v in (point.id, point.name, point.city, point.street, point.postal_code)):
+        return False
+    return True
+
+
+def _default_radius_km() -> float:
+    try:
+        return float(getattr(settings, "PICKUP_POINT_NEAR_RADIUS_KM", 50))
+    except (TypeError, ValueError):
+        return 50.0
+
+
+def nearest_pickup_points(
+    carrier_code: str,
+    country_code: str,
+    near: str,
+    *,
+    k: int,
+    radius_km: float | None = None,
+    **filters: str | None,
+) -> list[tuple[PickupPoint, float]]:
+    """`near=lat,lng&radius=` lookup of the list endpoints; raises ValueError on bad input."""
+    lat, lng = parse_near(near)
+    radius_km = _default_radius_km() if radius_km is None else float(radius_km)
+    if not math.isfinite(radius_km) or radius_km <= 0:
+        raise ValueError("radius must be > 0 (km)")
+    predicate = (lambda p: point_matches(p, **filters)) if any(filters.values()) else None
+    index = get_pickup_point_index(carrier_code, country_code)
+    return index.nearest(lat, lng, k=k, radius_km=radius_km, predicate=predicate)
+
+
+def export_pickup_points(request: HttpRequest, response: HttpResponse, *, carrier_code: str, country_code: str):
+    """Compact export payload, or 304 when the client's `If-None-Match` matches the index version."""
+    index = get_pickup_point_index(carrier_code, country_code)
+    etag = f'"{index.version}"'
+    cache_control = f"public, max-age={max(0, _check_seconds())}"
+    if request.headers.get("If-None-Match") == etag:
+        not_modified = HttpResponseNotModified()
+        not_modified["ETag"] = etag
+        not_modified["Cache-Control"] = cache_control
+        return not_modified
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return {"carrier": carrier_code, "countryCode": country_code, "version": index.version, **index.export()}
+
+
+# Ids per `__in` lookup when loading existing rows.
+_SYNC_CHUNK = 2000
+
+
+@dataclass
+class PickupPointSyncStats:
+    carrier_code: str
+    country_code: str
+    seen: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+    skipped: int = 0
+    fetch_seconds: float = 0.0
+    diff_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.deactivated)
+
+    def as_line(self) -> str:
+        return (
+            f"carrier={self.carrier_code} country={self.country_code} seen={self.seen} "
+            f"created={self.created} updated={self.updated} unchanged={self.unchanged} "
+            f"deactivated={self.deactivated} skipped={self.skipped} "
+            f"fetch={self.fetch_seconds:.2f}s diff={self.diff_seconds:.2f}s write={self.write_seconds:.2f}s"
+        )
+
+
+def sync_pickup_points(
+    carrier_code: str,
+    country_code: str,
+    *,
+    deactivate_missing: bool = False,
+    dry_run: bool = False,
+    **fetch_options: Any,
+) -> PickupPointSyncStats:
+    """Fetch the carrier's list for a country and write only what changed.
+
+    Existing rows are loaded in a few `__in` queries and compared field by field
+    (`source.sync_fields` and `is_active`); new rows go in with `bulk_create`,
+    changed rows with `bulk_update`, unchanged rows are not touched (their
+    `updated_at` stays, so the pickup point index and map export keep their
+    version). With `deactivate_missing`, active rows of the country the carrier
+    no longer lists are switched off (only valid for a full-country fetch).
+    """
+    source = get_pickup_point_source(carrier_code)
+    model, id_field = source.model, source.id_field
+    stats = PickupPointSyncStats(carrier_code=carrier_code, country_code=country_code)
+
+    started = time.perf_counter()
+    items = source.fetch(country_code, **fetch_options)
+    stats.fetch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parsed: dict[str, dict[str, Any]] = {}
+    for item in items:
+        values = source.parse(item, country_code) if isinstance(item, dict) else None
+        key = str((values or {}).get(id_field) or "").strip()
+        if not key:
+            stats.skipped += 1
+            continue
+        parsed[key] = {**values, id_field: key, "is_active": True}
+    stats.seen = len(parsed)
+
+    keys = list(parsed)
+    existing: dict[str, Any] = {}
+    for i in range(0, len(keys), _SYNC_CHUNK):
+        for obj in model.objects.filter(**{f"{id_field}__in": keys[i : i + _SYNC_CHUNK]}):
+            existing[getattr(obj, id_field)] = obj
+
+    now = timezone.now()
+    fields = [f for f in source.sync_fields if f != id_field] + ["is_active"]
+    to_create: list[Any] = []
+    to_update: list[Any] = []
+    for key, values in parsed.items():
+        obj = existing.get(key)
+        if obj is None:
+            to_create.append(model(**values))
+            continue
+        dirty = False
+        for f in fields:
+            if getattr(obj, f) != values[f]:
+                setattr(obj, f, values[f])
+                dirty = True
+        if dirty:
+            obj.updated_at = now
+            to_update.append(obj)
+    stats.created = len(to_create)
+    stats.updated = len(to_update)
+    stats.unchanged = len(parsed) - len(to_create) - len(to_update)
+
+    stale: list[int] = []
+    if deactivate_missing:
+        stale = [
+            pk
+            for pk, key in model.objects.filter(country_code=country_code, is_active=True).values_list("pk", id_field)
+            if key not in parsed
+        ]
+    stats.deactivated = len(stale)
+    stats.diff_seconds = time.perf_counter() - started
+
+    if dry_run:
+        return stats
+
+    if not stats.changed:
+        return stats
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            model.objects.bulk_update(to_update, [*fields, "updated_at"], batch_size=500)
+        for i in range(0, len(stale), _SYNC_CHUNK):
+            model.objects.filter(pk__in=stale[i : i + _SYNC_CHUNK]).update(is_active=False, updated_at=now)
+    stats.write_seconds = time.perf_counter() - started
+
+    # Replace what this process holds right away (admin sync runs in a web process);
+    # other processes pick the change up within PICKUP_POINT_INDEX_CHECK_SECONDS.
+    invalidate_pickup_point_cache(carrier_code, country_code)
+    warm_pickup_point_cache(carrier_code, country_code)
+    return stats
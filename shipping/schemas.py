@@ -1,8 +1,27 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from ninja import Schema
 
 
 class ShippingCountryOut(Schema):
     code: str
     name: str
+
+
+class PickupPointsExportOut(Schema):
+    carrier: str
+    countryCode: str
+    version: str
+    fields: list[str]
+    rows: list[list[str | float | None]]
+
+
+class TrackingStatusOut(Schema):
+    # Carrier payload as returned by its API (empty when served from the order's synced status).
+    raw: list[dict]
+    status: str = ""
+    deliveryStatus: str | None = None
+    checkedAt: datetime | None = None
+    source: str = ""
@@ -0,0 +1,496 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from checkout.models import Order
+
+from .http import build_session, carrier_session
+
+
+logger = logging.getLogger(__name__)
+
+
+# Orders in these delivery states are never polled again.
+TERMINAL_DELIVERY_STATUSES = (Order.DeliveryStatus.DELIVERED, Order.DeliveryStatus.CANCELLED)
+
+# Carrier statuses only move an order forward (a late "label created" event must not undo "shipped").
+_PROGRESS = {
+    Order.DeliveryStatus.PENDING: 0,
+    Order.DeliveryStatus.ERROR: 0,
+    Order.DeliveryStatus.LABEL_CREATED: 1,
+    Order.DeliveryStatus.SHIPPED: 2,
+    Order.DeliveryStatus.DELIVERED: 3,
+}
+
+
+@dataclass(frozen=True)
+class TrackingStatus:
+    """Carrier status mapped to our `Order.DeliveryStatus` (None = no conclusion).
+
+    `code` is the exact carrier status code (or phrase) the mapping was made
+    from, as accepted by `TrackingAdapter.status_for_code`; empty when none matched.
+    """
+
+    delivery_status: str | None
+    text: str = ""
+    code: str = ""
+
+
+class TrackingAdapter:
+    """Base class for carrier tracking.
+
+    `fetch` runs on worker threads and should only do HTTP: everything that
+    needs the DB (config, tokens) is resolved in `open` on the calling thread
+    (the exception is renewing a token the carrier rejected). `batch_size` is
+    how many tracking numbers one API call accepts.
+    """
+
+    carrier_code: str = ""
+    batch_size: int = 1
+
+    def open(self, session: requests.Session) -> Any:
+        """Return the per-run context (typically a client bound to `session`)."""
+        raise NotImplementedError
+
+    def fetch(self, context: Any, tracking_numbers: list[str]) -> dict[str, Any]:
+        """Raw status payload per tracking number; numbers the carrier doesn't know are omitted."""
+        raise NotImplementedError
+
+    def map_status(self, raw: Any) -> TrackingStatus:
+        raise NotImplementedError
+
+    def status_for_code(self, code: str) -> str | None:
+        """Delivery status an exact carrier status code maps to (None = no conclusion)."""
+        return None
+
+
+@lru_cache(maxsize=1)
+def _load_adapters() -> dict[str, TrackingAdapter]:
+    out: dict[str, TrackingAdapter] = {}
+    for path in getattr(settings, "SHIPPING_TRACKING_ADAPTERS", []) or []:
+        adapter = import_string(path)()
+        code = (adapter.carrier_code or "").strip()
+        if not code:
+            raise ValueError(f"Tracking adapter {path} has no carrier_code")
+        if code in out:
+            raise ValueError(f"Duplicate tracking adapter carrier_code: {code}")
+        out[code] = adapter
+    return out
+
+
+def get_tracking_adapters() -> dict[str, TrackingAdapter]:
+    return dict(_load_adapters())
+
+
+def get_tracking_adapter(carrier_code: str) -> TrackingAdapter:
+    adapter = _load_adapters().get((carrier_code or "").strip())
+    if adapter is None:
+        raise KeyError(f"Unknown tracking adapter: {carrier_code}")
+    return adapter
+
+
+def status_hash(raw: Any) -> str:
+    payload = json.dumps(raw, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class TrackingSyncStats:
+    carrier_code: str
+    polled: int = 0
+    requests: int = 0
+    changed: int = 0
+    status_updated: int = 0
+    unchanged: int = 0
+    missing: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    def as_line(self) -> str:
+        return (
+            f"carrier={self.carrier_code} polled={self.polled} requests={self.requests} "
+            f"changed={self.changed} status_updated={self.status_updated} unchanged={self.unchanged} "
+            f"missing={self.missing} failed={self.failed} elapsed={self.elapsed:.2f}s"
+        )
+
+
+def trackable_orders(carrier_code: str):
+    return (
+        Order.objects.filter(carrier_code=carrier_code)
+        .exclude(tracking_number="")
+        .exclude(delivery_status__in=TERMINAL_DELIVERY_STATUSES)
+    )
+
+
+def _apply(order: Order, *, raw: Any, adapter: TrackingAdapter, now) -> tuple[bool, bool]:
+    """Update `order` in memory from a raw payload; returns (changed, delivery_status_changed)."""
+    digest = status_hash(raw)
+    if digest == order.tracking_status_hash:
+        return False, False
+
+    mapped = adapter.map_status(raw)
+    order.tracking_status_hash = digest
+    order.tracking_status_text = (mapped.text or "")[:255]
+    order.tracking_status_code = (mapped.code or "")[:64]
+    order.tracking_status_changed_at = now
+    order.updated_at = now
+
+    new_status = mapped.delivery_status
+    if not new_status or new_status == order.delivery_status:
+        return True, False
+    if new_status != Order.DeliveryStatus.CANCELLED and _PROGRESS.get(new_status, 0) <= _PROGRESS.get(
+        order.delivery_status, 0
+    ):
+        return True, False
+    order.delivery_status = new_status
+    return True, True
+
+
+def sync_tracking_statuses(
+    carrier_code: str,
+    *,
+    limit: int | None = None,
+    workers: int | None = None,
+    page_size: int | None = None,
+    dry_run: bool = False,
+) -> TrackingSyncStats:
+    """Poll the carrier for every non-terminal order with a tracking number.
+
+    Orders are read in id-ordered pages; within a page tracking numbers are
+    grouped into `adapter.batch_size` chunks and fetched concurrently over one
+    keep-alive session. A payload whose hash matches the stored
+    `tracking_status_hash` causes no write; orders whose only change is the
+    tracking text are saved with one `bulk_update` per page. A new delivery
+    status is written only where the order still has the status read at the
+    start of the page, so an admin edit made meanwhile is kept (that order is
+    re-evaluated on the next run).
+    """
+    adapter = get_tracking_adapter(carrier_code)
+    workers = max(1, int(workers or _setting_int("TRACKING_SYNC_WORKERS", 8)))
+    page_size = max(1, int(page_size or _setting_int("TRACKING_SYNC_PAGE_SIZE", 500)))
+    batch_size = max(1, int(adapter.batch_size or 1))
+
+    stats = TrackingSyncStats(carrier_code=carrier_code)
+    started = time.perf_counter()
+    fields = [
+        "tracking_status_hash",
+        "tracking_status_text",
+        "tracking_status_code",
+        "tracking_status_changed_at",
+        "updated_at",
+    ]
+
+    # One keep-alive session for the whole run, its pool sized to the worker count.
+    # Sharing it between worker threads is safe here: tracking calls are plain GETs
+    # that pass all settings per request, the urllib3 pool is thread-safe and the
+    # cookie jar locks itself (see shipping.http.carrier_session).
+    session = build_session(pool_size=workers)
+    try:
+        context = adapter.open(session)
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"tracking-{carrier_code}") as pool:
+            while limit is None or stats.polled < limit:
+                take = page_size if limit is None else min(page_size, limit - stats.polled)
+                page = list(
+                    trackable_orders(carrier_code)
+                    .filter(id__gt=last_id)
+                    .order_by("id")
+                    .only("id", "tracking_number", "delivery_status", "tracking_status_hash")[:take]
+                )
+                if not page:
+                    break
+                last_id = page[-1].id
+                stats.polled += len(page)
+
+                by_number: dict[str, list[Order]] = {}
+                for order in page:
+                    by_number.setdefault(order.tracking_number.strip(), []).append(order)
+                numbers = list(by_number)
+                chunks = [numbers[i : i + batch_size] for i in range(0, len(numbers), batch_size)]
+
+                futures = {pool.submit(adapter.fetch, context, chunk): chunk for chunk in chunks}
+                now = timezone.now()
+                dirty: list[Order] = []
+                moved: list[tuple[Order, str]] = []
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    stats.requests += 1
+                    try:
+                        raw_by_number = future.result()
+                    except Exception as exc:
+                        stats.failed += sum(len(by_number[n]) for n in chunk)
+                        logger.warning("Tracking %s failed for %s: %s", carrier_code, ",".join(chunk), exc)
+                        continue
+                    for number in chunk:
+                        orders = by_number[number]
+                        raw = raw_by_number.get(number)
+                        if not raw:
+                            stats.missing += len(orders)
+                            continue
+                        for order in orders:
+                            previous = order.delivery_status
+                            changed, status_changed = _apply(order, raw=raw, adapter=adapter, now=now)
+                            if status_changed:
+                                moved.append((order, previous))
+                                stats.changed += 1
+                            elif changed:
+                                dirty.append(order)
+                                stats.changed += 1
+                            else:
+                                stats.unchanged += 1
+
+                if dirty and not dry_run:
+                    Order.objects.bulk_update(dirty, fields, batch_size=500)
+                for order, previous in moved:
+                    if dry_run:
+                        stats.status_updated += 1
+                        continue
+                    stats.status_updated += Order.objects.filter(id=order.id, delivery_status=previous).update(
+                        delivery_status=order.delivery_status,
+                        **{name: getattr(order, name) for name in fields},
+                    )
+                if len(page) < take:
+                    break
+    finally:
+        session.close()
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+# --- Status lookups for customers/frontend (`/dpd/status`, `/unisend/status`) ---
+#
+# Each lookup is cached (Django cache, shared when a shared backend is configured)
+# for a TTL that depends on the mapped status: short while a parcel moves, long
+# once it is delivered or cancelled, short again for numbers the carrier doesn't
+# know yet. Parcels of orders that reached delivered or cancelled through an exact
+# carrier code are answered from the order without a carrier call. Concurrent misses for the same number
+# within a process share one carrier request.
+
+
+@dataclass(frozen=True)
+class TrackingSnapshot:
+    carrier_code: str
+    tracking_number: str
+    raw: Any
+    delivery_status: str | None
+    text: str
+    checked_at: datetime | None
+    # "carrier" (fetched now), "cache" or "order" (carrier failed; last synced status).
+    source: str
+    expires_at: float = 0.0
+
+    @property
+    def max_age(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+    def as_out(self) -> dict[str, Any]:
+        raw = self.raw if isinstance(self.raw, list) else []
+        return {
+            "raw": [x for x in raw if isinstance(x, dict)],
+            "status": self.text,
+            "deliveryStatus": self.delivery_status,
+            "checkedAt": self.checked_at,
+            "source": self.source,
+        }
+
+
+def tracking_status_ttl(delivery_status: str | None, *, found: bool = True) -> int:
+    if not found:
+        return max(0, _setting_int("TRACKING_STATUS_CACHE_MISSING_SECONDS", 60))
+    if delivery_status in TERMINAL_DELIVERY_STATUSES:
+        return max(0, _setting_int("TRACKING_STATUS_CACHE_FINAL_SECONDS", 86400))
+    return max(0, _setting_int("TRACKING_STATUS_CACHE_SECONDS", 300))
+
+
+def _status_cache_key(carrier_code: str, tracking_number: str) -> str:
+    digest = hashlib.sha1(tracking_number.encode("utf-8")).hexdigest()
+    return f"tracking:status:{carrier_code}:{digest}"
+
+
+def _status_entry(adapter: TrackingAdapter, raw: Any, now, *, final: bool = False) -> tuple[dict[str, Any], int]:
+    mapped = adapter.map_status(raw) if raw else TrackingStatus(None)
+    ttl = tracking_status_ttl(mapped.delivery_status, found=bool(raw))
+    if final:
+        # The order is final and no longer synced; ask the carrier at most once per final TTL.
+        ttl = tracking_status_ttl(Order.DeliveryStatus.DELIVERED)
+    entry = {
+        "raw": raw or [],
+        "delivery_status": mapped.delivery_status,
+        "text": (mapped.text or "")[:255],
+        "checked_at": now,
+        "expires_at": time.time() + ttl,
+    }
+    return entry, ttl
+
+
+def _snapshot(carrier_code: str, tracking_number: str, entry: dict[str, Any], *, source: str) -> TrackingSnapshot:
+    return TrackingSnapshot(
+        carrier_code=carrier_code,
+        tracking_number=tracking_number,
+        raw=entry.get("raw"),
+        delivery_status=entry.get("delivery_status"),
+        text=entry.get("text") or "",
+        checked_at=entry.get("checked_at"),
+        source=source,
+        expires_at=float(entry.get("expires_at") or 0.0),
+    )
+
+
+def _stored_order(carrier_code: str, tracking_number: str, *, terminal: bool = False) -> Order | None:
+    """Order of the parcel with a synced status, or with `terminal` one in a final status."""
+    orders = Order.objects.filter(carrier_code=carrier_code, tracking_number=tracking_number)
+    if terminal:
+        orders = orders.filter(delivery_status__in=TERMINAL_DELIVERY_STATUSES)
+    else:
+        orders = orders.exclude(tracking_status_hash="")
+    return (
+        orders.only("delivery_status", "tracking_status_text", "tracking_status_code", "tracking_status_changed_at")
+        .order_by("-id")
+        .first()
+    )
+
+
+def _order_snapshot(carrier_code: str, tracking_number: str, order: Order | None, *, final: bool = False) -> TrackingSnapshot | None:
+    if order is None:
+        return None
+    return TrackingSnapshot(
+        carrier_code=carrier_code,
+        tracking_number=tracking_number,
+        raw=[],
+        delivery_status=order.delivery_status,
+        text=order.tracking_status_text or order.get_delivery_status_display(),
+        checked_at=order.tracking_status_changed_at,
+        source="order",
+        expires_at=time.time() + tracking_status_ttl(order.delivery_status) if final else 0.0,
+    )
+
+
+def _is_exact_final(adapter: TrackingAdapter, order: Order | None) -> bool:
+    # Final only when the stored carrier code itself maps to the order's status; a status set
+    # by hand or mapped before codes were stored is checked with the carrier instead.
+    return bool(
+        order is not None
+        and order.tracking_status_code
+        and adapter.status_for_code(order.tracking_status_code) == order.delivery_status
+    )
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: TrackingSnapshot | None = None
+        self.error: BaseException | None = None
+
+
+# Waiters give up after this long (the carrier client's own timeout is 20 s).
+_FLIGHT_WAIT_SECONDS = 30
+
+_flights: dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _single_flight(key: str, load) -> TrackingSnapshot:
+    """Run `load` once per key at a time; concurrent callers wait for and share its result."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(_FLIGHT_WAIT_SECONDS):
+            raise TimeoutError(f"Tracking status lookup timed out: {key}")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = load()
+        return flight.result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def get_tracking_status(carrier_code: str, tracking_number: str, *, refresh: bool = False) -> TrackingSnapshot:
+    """Current carrier status of one parcel, from the cache when possible.
+
+    A parcel whose order reached delivered or cancelled through an exact carrier
+    status code is answered from the order (`source="order"`, empty `raw`)
+    without asking the carrier; other final orders are looked up once per final
+    TTL, so `raw` is kept. On a miss
+    the carrier is asked once (concurrent callers share the request) and the
+    answer is cached for `tracking_status_ttl`. If the carrier call fails (or
+    waiting for a concurrent one times out) and the parcel belongs to an order
+    already synced by `sync_tracking_statuses`, that stored status is returned
+    instead; otherwise the error is raised.
+    """
+    adapter = get_tracking_adapter(carrier_code)
+    number = (tracking_number or "").strip()
+    key = _status_cache_key(carrier_code, number)
+
+    if not refresh:
+        entry = cache.get(key)
+        if entry is not None:
+            return _snapshot(carrier_code, number, entry, source="cache")
+
+    final = _stored_order(carrier_code, number, terminal=True)
+    if _is_exact_final(adapter, final):
+        return _order_snapshot(carrier_code, number, final, final=True)
+
+    def load() -> TrackingSnapshot:
+        if not refresh:
+            # Filled by another process while this one waited for its turn.
+            entry = cache.get(key)
+            if entry is not None:
+                return _snapshot(carrier_code, number, entry, source="cache")
+        try:
+            context = adapter.open(carrier_session(carrier_code))
+            raw = adapter.fetch(context, [number]).get(number)
+        except Exception as exc:
+            fallback = _order_snapshot(carrier_code, number, _stored_order(carrier_code, number))
+            if fallback is None:
+                raise
+            logger.warning("Tracking %s status for %s failed, serving synced status: %s", carrier_code, number, exc)
+            return fallback
+        entry, ttl = _status_entry(adapter, raw, timezone.now(), final=final is not None)
+        if ttl:
+            cache.set(key, entry, timeout=ttl)
+        return _snapshot(carrier_code, number, entry, source="carrier")
+
+    try:
+        return _single_flight(key, load)
+    except TimeoutError:
+        fallback = _order_snapshot(carrier_code, number, _stored_order(carrier_code, number))
+        if fallback is None:
+            raise
+        return fallback
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    """Normalised catalog row produced by a supplier adapter."""
+
+    sku: str
+    name: str
+    barcode: str = ""
+    brand_name: str = ""
+    category_path: list[str] = field(default_factory=list)
+    cost_net: Decimal | None = None
+    price_net: Decimal | None = None
+    summary_html: str = ""
+    description_html: str = ""
+    image_urls: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class StockItem:
+    """Normalised stock row; resolved to a Variant by SKU first, then barcode."""
+
+    sku: str
+    barcode: str
+    qty: int
+
+
+class SupplierAdapter:
+    """Base class for supplier feeds.
+
+    An adapter only knows how to read its supplier's feed(s) and turn them into
+    `CatalogItem` / `StockItem` streams. All DB writes go through
+    `suppliers.writer`, so adapters stay free of ORM code.
+    """
+
+    code: str = ""
+    name: str = ""
+    warehouse_code: str = ""
+    tax_class_code: str = "standard"
+    max_images_per_product: int = 5
+    user_agent: str = "django_ecommerce/supplier-import"
+    # Whole-feed retries when the connection drops mid-stream.
+    feed_max_retries: int = 3
+
+    def catalog_url(self, override: str | None = None) -> str:
+        return (override or "").strip()
+
+    def stock_url(self, override: str | None = None) -> str:
+        return (override or "").strip()
+
+    def iter_catalog_items(self, *, url: str) -> Iterable[CatalogItem]:
+        raise NotImplementedError
+
+    def iter_stock_items(self, *, url: str) -> Iterable[StockItem]:
+        raise NotImplementedError
+
+    def supports(self, kind: str) -> bool:
+        method = {
+            "catalog": "iter_catalog_items",
+            "stock": "iter_stock_items",
+        }.get(kind)
+        if not method:
+            return False
+        return getattr(type(self), method) is not getattr(SupplierAdapter, method)
+
+
+@lru_cache(maxsize=1)
+def _load_adapters() -> dict[str, SupplierAdapter]:
+    out: dict[str, SupplierAdapter] = {}
+    for path in getattr(settings, "SUPPLIER_ADAPTERS", []) or []:
+        adapter = import_string(path)()
+        code = (adapter.code or "").strip()
+        if not code:
+            raise ValueError(f"Supplier adapter {path} has no code")
+        if code in out:
+            raise ValueError(f"Duplicate supplier adapter code: {code}")
+        out[code] = adapter
+    return out
+
+
+def get_adapters() -> dict[str, SupplierAdapter]:
+    return dict(_load_adapters())
+
+
+def get_adapter(code: str) -> SupplierAdapter:
+    adapter = _load_adapters().get((code or "").strip())
+    if adapter is None:
+        raise KeyError(f"Unknown supplier adapter: {code}")
+    return adapter
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from django.contrib import admin
+
+from .models import SupplierImportRun, SupplierSchedule
+
+
+@admin.register(SupplierSchedule)
+class SupplierScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        "supplier_code",
+        "kind",
+        "is_active",
+        "interval_minutes",
+        "last_run_at",
+        "next_run_at",
+    )
+    list_filter = ("is_active", "kind", "supplier_code")
+    search_fields = ("supplier_code",)
+    readonly_fields = ("last_run_at", "created_at", "updated_at")
+
+
+@admin.register(SupplierImportRun)
+class SupplierImportRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "supplier_code",
+        "kind",
+        "status",
+        "trigger",
+        "dry_run",
+        "started_at",
+        "duration_ms",
+    )
+    list_filter = ("status", "kind", "trigger", "dry_run", "supplier_code")
+    search_fields = ("id", "supplier_code", "error")
+    readonly_fields = (
+        "supplier_code",
+        "kind",
+        "status",
+        "trigger",
+        "dry_run",
+        "source_url",
+        "started_at",
+        "finished_at",
+        "duration_ms",
+        "summary",
+        "timings",
+        "error",
+    )
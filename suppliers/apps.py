@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from django.apps import AppConfig
+
+
+class SuppliersConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "suppliers"
+    verbose_name = "Supplier imports"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from suppliers.adapters import get_adapters
+from suppliers.models import ImportKind, SupplierImportRun
+from suppliers.runner import run_due_imports, run_imports_parallel
+
+
+class Command(BaseCommand):
+    help = (
+        "Paleidžia tiekėjų importus (katalogas/likučiai). "
+        "Su --due vykdo tik tuos, kuriems pagal SupplierSchedule atėjo laikas (skirta cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--supplier",
+            action="append",
+            default=None,
+            help="Tiekėjo adapterio kodas (pvz. zalioji_banga). Galima kartoti. Default – visi.",
+        )
+        parser.add_argument(
+            "--kind",
+            action="append",
+            choices=ImportKind.values,
+            default=None,
+            help="catalog ir/arba stock. Galima kartoti. Default – abu.",
+        )
+        parser.add_argument(
+            "--due",
+            action="store_true",
+            help="Vykdyti tik aktyvius ir suėjusius SupplierSchedule įrašus.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Kiek tiekėjų vykdyti lygiagrečiai atskiruose procesuose (default settings.SUPPLIER_IMPORT_WORKERS).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Nieko nekeičia DB, tik parodo suvestinę.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maksimalus įrašų skaičius kiekvienam feed'ui (debug).",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = bool(options.get("dry_run"))
+        workers = options.get("workers")
+        if workers is None:
+            workers = int(getattr(settings, "SUPPLIER_IMPORT_WORKERS", 2) or 1)
+        if workers < 1:
+            raise CommandError("--workers turi būti teigiamas skaičius")
+        limit = options.get("limit")
+        if limit is not None and limit < 1:
+            raise CommandError("--limit turi būti teigiamas skaičius")
+
+        if options.get("due"):
+            run_ids = run_due_imports(workers=workers, dry_run=dry_run)
+        else:
+            adapters = get_adapters()
+            codes = options.get("supplier") or list(adapters.keys())
+            unknown = [c for c in codes if c not in adapters]
+            if unknown:
+                raise CommandError(f"Nežinomas tiekėjas: {', '.join(unknown)}")
+
+            kinds = options.get("kind") or [ImportKind.CATALOG, ImportKind.STOCK]
+            jobs_by_supplier = {
+                code: [
+                    (kind, {"limit": limit})
+                    for kind in ImportKind.values
+                    if kind in kinds and adapters[code].supports(kind)
+                ]
+                for code in codes
+            }
+            run_ids = run_imports_parallel(jobs_by_supplier, workers=workers, dry_run=dry_run)
+
+        if not run_ids:
+            self.stdout.write("Nėra ką vykdyti.")
+            return
+
+        failed = 0
+        for run in SupplierImportRun.objects.filter(id__in=run_ids).order_by("id"):
+            line = (
+                f"run_id={run.id} {run.supplier_code}:{run.kind} status={run.status} "
+                f"duration_ms={run.duration_ms} summary={run.summary}"
+            )
+            if run.status == SupplierImportRun.Status.FAILED:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"{line} error={run.error}"))
+            elif run.status == SupplierImportRun.Status.SKIPPED:
+                self.stdout.write(self.style.WARNING(f"{line} ({run.error})"))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if failed:
+            raise CommandError(f"Nepavyko importų: {failed}")
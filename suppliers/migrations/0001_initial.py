@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supplier_code', models.SlugField()),
+                ('kind', models.CharField(choices=[('catalog', 'Catalog'), ('stock', 'Stock')], max_length=20)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='running', max_length=20)),
+                ('trigger', models.CharField(choices=[('manual', 'Manual'), ('schedule', 'Schedule')], default='manual', max_length=20)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('source_url', models.URLField(blank=True, default='', max_length=500)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('timings', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['supplier_code', 'kind', 'started_at'], name='suppliers_s_supplie_15c64f_idx'), models.Index(fields=['status', 'started_at'], name='suppliers_s_status_73e7ea_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supplier_code', models.SlugField()),
+                ('kind', models.CharField(choices=[('catalog', 'Catalog'), ('stock', 'Stock')], max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('interval_minutes', models.PositiveIntegerField(default=60)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['supplier_code', 'kind'],
+                'constraints': [models.UniqueConstraint(fields=('supplier_code', 'kind'), name='uniq_supplier_schedule_supplier_kind')],
+            },
+        ),
+    ]
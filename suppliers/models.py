@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+
+class ImportKind(models.TextChoices):
+    CATALOG = "catalog", "Catalog"
+    STOCK = "stock", "Stock"
+
+
+class SupplierSchedule(models.Model):
+    """Per-supplier cadence for `run_supplier_imports --due`."""
+
+    supplier_code = models.SlugField(max_length=50)
+    kind = models.CharField(max_length=20, choices=ImportKind.choices)
+
+    is_active = models.BooleanField(default=True)
+    interval_minutes = models.PositiveIntegerField(default=60)
+    # Extra adapter/writer options, e.g. {"limit": 500, "url": "..."}.
+    options = models.JSONField(blank=True, default=dict)
+
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["supplier_code", "kind"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["supplier_code", "kind"],
+                name="uniq_supplier_schedule_supplier_kind",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.supplier_code}:{self.kind}"
+
+    def clean(self) -> None:
+        from .adapters import get_adapters
+
+        adapter = get_adapters().get((self.supplier_code or "").strip())
+        if adapter is None:
+            raise ValidationError({"supplier_code": f"Unknown supplier adapter: {self.supplier_code}"})
+        if self.kind and not adapter.supports(self.kind):
+            raise ValidationError({"kind": f"Supplier '{self.supplier_code}' does not support '{self.kind}' imports"})
+
+    def is_due(self, *, now=None) -> bool:
+        if not self.is_active:
+            return False
+        now = now or timezone.now()
+        return self.next_run_at is None or self.next_run_at <= now
+
+    def mark_started(self, *, now=None) -> None:
+        now = now or timezone.now()
+        self.last_run_at = now
+        self.next_run_at = now + timedelta(minutes=max(1, int(self.interval_minutes or 1)))
+        self.save(update_fields=["last_run_at", "next_run_at", "updated_at"])
+
+
+class SupplierImportRun(models.Model):
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+        SKIPPED = "skipped", "Skipped"
+
+    class Trigger(models.TextChoices):
+        MANUAL = "manual", "Manual"
+        SCHEDULE = "schedule", "Schedule"
+
+    supplier_code = models.SlugField(max_length=50)
+    kind = models.CharField(max_length=20, choices=ImportKind.choices)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.RUNNING
+    )
+    trigger = models.CharField(
+        max_length=20, choices=Trigger.choices, default=Trigger.MANUAL
+    )
+    dry_run = models.BooleanField(default=False)
+    source_url = models.URLField(max_length=500, blank=True, default="")
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    # Counters (created/updated/skipped...) and per-phase timings in ms.
+    summary = models.JSONField(blank=True, default=dict)
+    timings = models.JSONField(blank=True, default=dict)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["supplier_code", "kind", "started_at"]),
+            models.Index(fields=["status", "started_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"run:{self.id} {self.supplier_code}:{self.kind}"
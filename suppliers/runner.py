@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import http.client
+import time
+from datetime import timedelta
+from typing import Callable
+from urllib.error import URLError
+
+from django.db import connections
+from django.utils import timezone
+
+from api.workers import django_process_pool
+
+from .adapters import get_adapter
+from .models import ImportKind, SupplierImportRun, SupplierSchedule
+from .writer import CatalogWriter, SupplierImportError, ImportStats, StockWriter
+
+
+# A RUNNING row older than this is treated as a crashed run and no longer blocks new ones.
+STALE_RUN_AFTER = timedelta(hours=6)
+
+FEED_ERRORS = (http.client.IncompleteRead, TimeoutError, URLError, OSError)
+
+# (kind, options) pairs executed sequentially for one supplier.
+SupplierJobs = list[tuple[str, dict]]
+
+
+def _has_running_run(supplier_code: str, *, now) -> bool:
+    return SupplierImportRun.objects.filter(
+        supplier_code=supplier_code,
+        status=SupplierImportRun.Status.RUNNING,
+        dry_run=False,
+        started_at__gte=now - STALE_RUN_AFTER,
+    ).exists()
+
+
+def run_supplier_import(
+    *,
+    supplier_code: str,
+    kind: str,
+    dry_run: bool = False,
+    limit: int | None = None,
+    url: str | None = None,
+    trigger: str = SupplierImportRun.Trigger.MANUAL,
+    log: Callable[[str], None] | None = None,
+    raise_errors: bool = True,
+) -> SupplierImportRun:
+    """Run one feed of one supplier and record it as a SupplierImportRun.
+
+    Feed connection drops are retried (the writer skips rows it already
+    created); configuration errors (including an unknown supplier or kind) and
+    unexpected exceptions mark the run FAILED and are re-raised (unless
+    `raise_errors=False`).
+    """
+    try:
+        adapter = get_adapter(supplier_code)
+        if kind not in ImportKind.values or not adapter.supports(kind):
+            raise ValueError(f"Supplier '{supplier_code}' does not support '{kind}' imports")
+        source_url = adapter.catalog_url(url) if kind == ImportKind.CATALOG else adapter.stock_url(url)
+    except Exception as exc:
+        if raise_errors:
+            raise
+        now = timezone.now()
+        return SupplierImportRun.objects.create(
+            supplier_code=(supplier_code or "")[:50],
+            kind=kind,
+            trigger=trigger,
+            dry_run=bool(dry_run),
+            status=SupplierImportRun.Status.FAILED,
+            started_at=now,
+            finished_at=now,
+            duration_ms=0,
+            error=str(exc.args[0] if isinstance(exc, KeyError) and exc.args else exc),
+        )
+    now = timezone.now()
+
+    run = SupplierImportRun(
+        supplier_code=adapter.code,
+        kind=kind,
+        trigger=trigger,
+        dry_run=bool(dry_run),
+        source_url=source_url[:500],
+        started_at=now,
+    )
+    if not dry_run and _has_running_run(adapter.code, now=now):
+        run.status = SupplierImportRun.Status.SKIPPED
+        run.finished_at = now
+        run.duration_ms = 0
+        run.error = "Another import for this supplier is still running."
+        run.save()
+        return run
+    run.save()
+
+    stats = ImportStats()
+    started = time.perf_counter()
+    try:
+        if kind == ImportKind.CATALOG:
+            writer = CatalogWriter(adapter=adapter, dry_run=dry_run, limit=limit, stats=stats)
+            iter_items = adapter.iter_catalog_items
+        else:
+            writer = StockWriter(adapter=adapter, dry_run=dry_run, limit=limit, stats=stats)
+            iter_items = adapter.iter_stock_items
+
+        attempt = 0
+        while True:
+            try:
+                writer.write(iter_items(url=source_url))
+                break
+            except FEED_ERRORS as exc:
+                attempt += 1
+                stats.incr("feed_retries")
+                if attempt >= adapter.feed_max_retries:
+                    raise SupplierImportError(
+                        f"Nepavyko perskaityti feed (bandymai={attempt}). Paskutinė klaida: {exc}"
+                    ) from exc
+                if log:
+                    log(f"Feed ryšys nutrūko ({exc}). Kartojam {attempt}/{adapter.feed_max_retries}...")
+                time.sleep(min(2 ** attempt, 8))
+    except Exception as exc:
+        _finish(run, stats=stats, started=started, status=SupplierImportRun.Status.FAILED, error=str(exc))
+        if raise_errors:
+            raise
+        return run
+
+    _finish(run, stats=stats, started=started, status=SupplierImportRun.Status.DONE)
+    return run
+
+
+def _finish(run: SupplierImportRun, *, stats: ImportStats, started: float, status: str, error: str = "") -> None:
+    total_ms = int((time.perf_counter() - started) * 1000)
+    timings = dict(stats.timings_ms)
+    # Whatever is not downloads/DB/images was spent reading and parsing the feed.
+    timings["feed"] = max(0, total_ms - sum(timings.values()))
+    timings["total"] = total_ms
+
+    run.status = status
+    run.finished_at = timezone.now()
+    run.duration_ms = total_ms
+    run.summary = dict(stats.counts)
+    run.timings = timings
+    run.error = error
+    run.save(update_fields=["status", "finished_at", "duration_ms", "summary", "timings", "error"])
+
+
+def _run_supplier_jobs(supplier_code: str, jobs: SupplierJobs, trigger: str, dry_run: bool) -> list[int]:
+    """Process-pool entry point: run one supplier's feeds back to back."""
+    run_ids: list[int] = []
+    try:
+        for kind, options in jobs:
+            # Failures are recorded on the run; keep going with the next feed.
+            run = run_supplier_import(
+                supplier_code=supplier_code,
+                kind=kind,
+                dry_run=dry_run,
+                limit=options.get("limit"),
+                url=options.get("url"),
+                trigger=trigger,
+                raise_errors=False,
+            )
+            run_ids.append(run.id)
+    finally:
+        connections.close_all()
+    return run_ids
+
+
+def run_imports_parallel(
+    jobs_by_supplier: dict[str, SupplierJobs],
+    *,
+    workers: int = 1,
+    trigger: str = SupplierImportRun.Trigger.MANUAL,
+    dry_run: bool = False,
+) -> list[int]:
+    """Run independent suppliers in separate processes (one supplier per task).
+
+    Feeds of the same supplier share a warehouse, so they always run
+    sequentially inside one task.
+    """
+    jobs_by_supplier = {code: jobs for code, jobs in jobs_by_supplier.items() if jobs}
+    if not jobs_by_supplier:
+        return []
+
+    if workers <= 1 or len(jobs_by_supplier) == 1:
+        run_ids: list[int] = []
+        for code, jobs in jobs_by_supplier.items():
+            run_ids.extend(_run_supplier_jobs(code, jobs, trigger, dry_run))
+        return run_ids
+
+    run_ids = []
+    with django_process_pool(min(int(workers), len(jobs_by_supplier))) as pool:
+        futures = [
+            pool.submit(_run_supplier_jobs, code, jobs, trigger, dry_run)
+            for code, jobs in jobs_by_supplier.items()
+        ]
+        for fut in futures:
+            run_ids.extend(fut.result())
+    return run_ids
+
+
+def run_due_imports(*, workers: int = 1, dry_run: bool = False, now=None) -> list[int]:
+    now = now or timezone.now()
+    jobs_by_supplier: dict[str, SupplierJobs] = {}
+
+    schedules = SupplierSchedule.objects.filter(is_active=True).order_by("supplier_code", "kind")
+    for schedule in schedules:
+        if not schedule.is_due(now=now):
+            continue
+        if not dry_run:
+            schedule.mark_started(now=now)
+        jobs_by_supplier.setdefault(schedule.supplier_code, []).append(
+            (schedule.kind, dict(schedule.options or {}))
+        )
+
+    # Catalog first so new products get their stock in the same cycle.
+    for jobs in jobs_by_supplier.values():
+        jobs.sort(key=lambda job: 0 if job[0] == ImportKind.CATALOG else 1)
+
+    return run_imports_parallel(
+        jobs_by_supplier,
+        workers=workers,
+        trigger=SupplierImportRun.Trigger.SCHEDULE,
+        dry_run=dry_run,
+    )
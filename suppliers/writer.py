@@ -0,0 +1,545 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.text import slugify
+
+from catalog.models import Brand, Category, InventoryItem, Product, ProductImage, TaxClass, Variant, Warehouse
+from catalog.richtext import normalize_richtext_to_markdown
+
+from .adapters import CatalogItem, StockItem, SupplierAdapter
+
+
+CATALOG_BATCH_SIZE = 25
+STOCK_BATCH_SIZE = 500
+IMAGE_DOWNLOAD_WORKERS = 8
+
+
+class SupplierImportError(Exception):
+    """Supplier import failed (missing warehouse/tax class, unreadable feed...)."""
+
+
+class ImportStats:
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self.timings_ms: dict[str, int] = {}
+
+    def incr(self, key: str, n: int = 1) -> None:
+        self.counts[key] = self.counts.get(key, 0) + int(n)
+
+    @contextmanager
+    def timed(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = int((time.perf_counter() - started) * 1000)
+            self.timings_ms[phase] = self.timings_ms.get(phase, 0) + elapsed
+
+
+def _money_2dp(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _stable_suffix(value: str, *, length: int = 6) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:length]
+
+
+def _unique_slug_for_model(model, base: str, *, max_length: int = 200) -> str:
+    base = (base or "").strip("-")
+    if not base:
+        base = "item"
+
+    base = base[:max_length]
+    candidate = base
+    suffix = 2
+    while model.objects.filter(slug=candidate).exists():
+        tail = f"-{suffix}"
+        candidate = f"{base[: max_length - len(tail)]}{tail}"
+        suffix += 1
+    return candidate
+
+
+def download_image(url: str, *, timeout: int = 30, user_agent: str = "django_ecommerce/supplier-import") -> tuple[str, bytes] | None:
+    """Download image bytes for storing in ImageField.
+
+    Returns (filename, content) or None on failure.
+    """
+    u = (url or "").strip()
+    if not u:
+        return None
+
+    try:
+        parsed = urlparse(u)
+        name = (parsed.path.rsplit("/", 1)[-1] or "image")
+        # Strip query leftovers (just in case)
+        name = name.split("?", 1)[0].split("#", 1)[0]
+        if "." not in name:
+            name = f"{name}.jpg"
+
+        req = Request(u, headers={"User-Agent": user_agent})
+        with urlopen(req, timeout=timeout) as resp:
+            if getattr(resp, "status", 200) >= 400:
+                return None
+            content = resp.read()
+            if not content:
+                return None
+        return (name, content)
+    except Exception:
+        return None
+
+
+class CatalogWriter:
+    """Creates missing products (+ variant, inventory row, images) in batches.
+
+    Existing SKUs are never touched. Images are downloaded concurrently for the
+    whole batch before the DB transaction, then brands/categories are resolved
+    through caches and products/variants/inventory rows are bulk-inserted.
+    """
+
+    def __init__(
+        self,
+        *,
+        adapter: SupplierAdapter,
+        dry_run: bool = False,
+        limit: int | None = None,
+        batch_size: int = CATALOG_BATCH_SIZE,
+        download_workers: int = IMAGE_DOWNLOAD_WORKERS,
+        stats: ImportStats | None = None,
+    ):
+        self.adapter = adapter
+        self.dry_run = bool(dry_run)
+        self.limit = limit
+        self.batch_size = max(1, int(batch_size))
+        self.download_workers = max(1, int(download_workers))
+        self.stats = stats or ImportStats()
+
+        self.tax_class = TaxClass.objects.filter(code=adapter.tax_class_code).first()
+        if not self.tax_class:
+            raise SupplierImportError(
+                f"TaxClass '{adapter.tax_class_code}' nerastas. Pirma susikonfigūruok mokesčius.")
+
+        self.warehouse = Warehouse.objects.filter(code=adapter.warehouse_code).first()
+        if not self.warehouse:
+            raise SupplierImportError(
+                f"Warehouse '{adapter.warehouse_code}' nerastas (spec sako, kad jau turi būti sukurtas)."
+            )
+
+        self.existing_skus: set[str] = set(Product.objects.values_list("sku", flat=True))
+
+        # Cache lookups to reduce DB queries during import.
+        # - brands: by normalized name
+        # - categories: by (parent_id, normalized name)
+        self.brand_cache: dict[str, Brand] = {}
+        self.category_cache: dict[tuple[int | None, str], Category] = {}
+
+        self._pending: list[CatalogItem] = []
+        self._pending_skus: set[str] = set()
+
+    @property
+    def created_products(self) -> int:
+        return self.stats.counts.get("products", 0)
+
+    def is_full(self) -> bool:
+        if self.limit is None:
+            return False
+        return self.created_products + len(self._pending) >= self.limit
+
+    def write(self, items: Iterable[CatalogItem]) -> None:
+        for item in items:
+            if self.is_full():
+                break
+            self.add(item)
+        self.flush()
+
+    def add(self, item: CatalogItem) -> None:
+        if item.sku in self.existing_skus or item.sku in self._pending_skus:
+            return
+
+        # Reikalavimas: skipinti prekes be nuotraukos.
+        if not item.image_urls:
+            self.stats.incr("skipped_no_image")
+            return
+
+        if item.price_net is None:
+            # Be pardavimo kainos negalim sukurti nei produkto, nei varianto.
+            self.stats.incr("skipped_no_price")
+            return
+
+        if self.dry_run:
+            self.stats.incr("products")
+            # Avoid double-counting if the feed connection drops and we retry.
+            self.existing_skus.add(item.sku)
+            return
+
+        self._pending.append(item)
+        self._pending_skus.add(item.sku)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        batch = self._pending
+        self._pending = []
+        self._pending_skus = set()
+        if not batch:
+            return
+
+        # Download images BEFORE DB transaction (network can be slow).
+        with self.stats.timed("download"):
+            with ThreadPoolExecutor(max_workers=min(self.download_workers, len(batch))) as pool:
+                payloads = list(pool.map(self._download_item_images, batch))
+
+        ready: list[tuple[CatalogItem, list[tuple[str, str, bytes]]]] = []
+        for item, images in zip(batch, payloads):
+            # If all URLs failed, treat as "no image" and skip.
+            if not images:
+                self.stats.incr("skipped_image_download")
+                continue
+            ready.append((item, images))
+
+        if ready:
+            self._write_batch(ready)
+
+    def _download_item_images(self, item: CatalogItem) -> list[tuple[str, str, bytes]]:
+        out: list[tuple[str, str, bytes]] = []
+        seen_urls: set[str] = set()
+        for img_url in item.image_urls:
+            if img_url in seen_urls:
+                continue
+            seen_urls.add(img_url)
+            dl = download_image(img_url, user_agent=self.adapter.user_agent)
+            if not dl:
+                continue
+            filename, content = dl
+            out.append((img_url, filename, content))
+            if len(out) >= self.adapter.max_images_per_product:
+                break
+        return out
+
+    def _write_batch(self, ready: list[tuple[CatalogItem, list[tuple[str, str, bytes]]]]) -> None:
+        ready_images = {item.sku: images for item, images in ready}
+        with transaction.atomic():
+            with self.stats.timed("db"):
+                products, variants = self._insert_rows(ready)
+
+            with self.stats.timed("images"):
+                images_saved = 0
+                for product in products:
+                    for idx, (img_url, filename, content) in enumerate(ready_images[product.sku]):
+                        img = ProductImage(
+                            product=product,
+                            image_url=img_url,
+                            alt_text="",
+                            sort_order=idx,
+                        )
+                        # Saving to ImageField triggers storage upload (local/S3);
+                        # ProductImage.save() queues the AVIF + WEBP renditions.
+                        img.image.save(filename, ContentFile(content), save=True)
+                        images_saved += 1
+
+        self.stats.incr("products", len(products))
+        self.stats.incr("variants", len(variants))
+        self.stats.incr("images", images_saved)
+        self.existing_skus.update(p.sku for p in products)
+
+    def _insert_rows(self, ready: list[tuple[CatalogItem, list[tuple[str, str, bytes]]]]) -> tuple[list[Product], list[Variant]]:
+        # A Variant may already own the SKU even though the Product does not.
+        items = [item for item, _ in ready]
+        taken_variant_skus = set(
+            Variant.objects.filter(sku__in=[item.sku for item in items]).values_list("sku", flat=True)
+        )
+        if taken_variant_skus:
+            self.stats.incr("skipped_sku_conflict", len(taken_variant_skus))
+            items = [item for item in items if item.sku not in taken_variant_skus]
+            if not items:
+                return [], []
+
+        self._prefetch_brands([item.brand_name for item in items])
+        slugs = self._product_slugs(items)
+
+        products = [
+            Product(
+                sku=item.sku,
+                name=item.name,
+                slug=slugs[item.sku],
+                description=self._description_markdown(item),
+                brand=self._resolve_brand(item.brand_name),
+                category=self._resolve_category(item.category_path),
+                tax_class=self.tax_class,
+                is_active=True,
+                seo_description=self._seo_description(item),
+            )
+            for item in items
+        ]
+        Product.objects.bulk_create(products)
+
+        variants = [
+            Variant(
+                product=product,
+                sku=item.sku,
+                barcode=item.barcode,
+                name="",
+                price_eur=_money_2dp(item.price_net),
+                cost_eur=_money_2dp(item.cost_net) if item.cost_net is not None else None,
+                is_active=True,
+            )
+            for product, item in zip(products, items)
+        ]
+        Variant.objects.bulk_create(variants)
+
+        # Spec: likučiai ateina atskiru feed'u, todėl qty čia nenaudojam.
+        InventoryItem.objects.bulk_create(
+            [
+                InventoryItem(
+                    variant=variant,
+                    warehouse=self.warehouse,
+                    qty_on_hand=0,
+                    qty_reserved=0,
+                    cost_eur=variant.cost_eur,
+                )
+                for variant in variants
+            ],
+            ignore_conflicts=True,
+        )
+        return products, variants
+
+    def _description_markdown(self, item: CatalogItem) -> str:
+        combined_html = (item.summary_html + "\n\n" + item.description_html).strip()
+        return normalize_richtext_to_markdown(combined_html, input_format="html").markdown
+
+    def _seo_description(self, item: CatalogItem) -> str:
+        seo_desc = normalize_richtext_to_markdown(item.summary_html, input_format="html").markdown
+        seo_desc = (seo_desc or "").replace("\n", " ").strip()
+        if len(seo_desc) > 320:
+            seo_desc = seo_desc[:320].rstrip()
+        return seo_desc
+
+    def _product_slugs(self, items: list[CatalogItem]) -> dict[str, str]:
+        bases = {
+            item.sku: f"{slugify(item.name) or 'product'}-{item.sku}"[:255].strip("-") or "item"
+            for item in items
+        }
+        taken = set(Product.objects.filter(slug__in=bases.values()).values_list("slug", flat=True))
+
+        out: dict[str, str] = {}
+        for sku, base in bases.items():
+            if base in taken:
+                base = _unique_slug_for_model(Product, base, max_length=255)
+                while base in taken:
+                    base = _unique_slug_for_model(Product, f"{base}-{_stable_suffix(sku)}", max_length=255)
+            taken.add(base)
+            out[sku] = base
+        return out
+
+    def _prefetch_brands(self, names: list[str]) -> None:
+        missing = {
+            (n or "").strip().lower()
+            for n in names
+            if (n or "").strip() and (n or "").strip().casefold() not in self.brand_cache
+        }
+        if not missing:
+            return
+        qs = Brand.objects.annotate(_name_lower=Lower("name")).filter(_name_lower__in=missing).order_by("id")
+        for brand in qs:
+            self.brand_cache.setdefault(brand.name.strip().casefold(), brand)
+
+    def _resolve_brand(self, raw_name: str) -> Brand | None:
+        brand_name = (raw_name or "").strip()
+        if not brand_name:
+            return None
+
+        brand_key = brand_name.casefold()
+        brand = self.brand_cache.get(brand_key)
+        if brand is not None:
+            return brand
+
+        brand = Brand.objects.filter(name__iexact=brand_name).first()
+        if brand is None:
+            base = (slugify(brand_name) or "brand")[:200]
+            slug = base
+            # Keep slug short; only add stable suffix if the base already exists.
+            if Brand.objects.filter(slug=slug).exists():
+                suffix = _stable_suffix(brand_key)
+                slug = f"{base[: 200 - 1 - len(suffix)]}-{suffix}"
+            slug = _unique_slug_for_model(Brand, slug, max_length=200)
+            brand = Brand.objects.create(name=brand_name, slug=slug, is_active=True)
+            self.stats.incr("brands")
+        self.brand_cache[brand_key] = brand
+        return brand
+
+    def _resolve_category(self, path: list[str]) -> Category | None:
+        parent = None
+        for raw_seg in path or []:
+            seg = (raw_seg or "").strip()
+            if not seg:
+                continue
+
+            cache_key = (parent.pk if parent else None, seg.casefold())
+            cached = self.category_cache.get(cache_key)
+            if cached is not None:
+                parent = cached
+                continue
+
+            # Idempotency: prefer existing category by (parent, name).
+            existing = Category.objects.filter(parent=parent, name__iexact=seg).first()
+            if existing is not None:
+                parent = existing
+                self.category_cache[cache_key] = parent
+                continue
+
+            # Slug in this project is globally unique, so use a short segment-based slug.
+            # Add a stable suffix only when the base collides.
+            base = (slugify(seg) or "category")[:80]
+            slug = base
+            if Category.objects.filter(slug=slug).exists():
+                suffix = _stable_suffix(f"{parent.pk if parent else 'root'}:{seg.casefold()}")
+                slug = f"{base[: 200 - 1 - len(suffix)]}-{suffix}"
+            slug = _unique_slug_for_model(Category, slug, max_length=200)
+
+            parent = Category.objects.create(name=seg, slug=slug, parent=parent, is_active=True)
+            self.category_cache[cache_key] = parent
+            self.stats.incr("categories")
+        return parent
+
+
+class StockWriter:
+    """Sets `qty_on_hand` on the adapter's warehouse for matched variants."""
+
+    def __init__(
+        self,
+        *,
+        adapter: SupplierAdapter,
+        dry_run: bool = False,
+        limit: int | None = None,
+        batch_size: int = STOCK_BATCH_SIZE,
+        stats: ImportStats | None = None,
+    ):
+        self.adapter = adapter
+        self.dry_run = bool(dry_run)
+        self.limit = limit
+        self.batch_size = max(1, int(batch_size))
+        self.stats = stats or ImportStats()
+
+        self.warehouse = Warehouse.objects.filter(code=adapter.warehouse_code).first()
+        if not self.warehouse:
+            raise SupplierImportError(
+                f"Warehouse '{adapter.warehouse_code}' nerastas (spec sako, kad jau turi būti sukurtas)."
+            )
+
+        self.affected_product_ids: set[int] = set()
+        self._processed = 0
+
+    def write(self, items: Iterable[StockItem]) -> None:
+        # A retry after a feed error re-reads the feed from the start; setting stock is
+        # idempotent, so `limit` counts from zero again.
+        self._processed = 0
+        batch: list[StockItem] = []
+        for item in items:
+            batch.append(item)
+            self._processed += 1
+
+            if self.limit is not None and self._processed >= self.limit:
+                break
+
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch)
+                batch = []
+
+        if batch:
+            self._process_batch(batch)
+
+        self.stats.counts["products_updated"] = len(self.affected_product_ids)
+
+    def _process_batch(self, batch: list[StockItem]) -> None:
+        with self.stats.timed("db"):
+            resolved = self._resolve(batch)
+
+            if self.dry_run:
+                # In dry-run we only count what would be updated.
+                self.stats.incr("inventory_updated", len(resolved))
+                self.stats.incr("variants_updated", len(resolved))
+                for v, _qty in resolved:
+                    self.affected_product_ids.add(v.product_id)
+                return
+
+            # DB write: keep it transactional per batch.
+            with transaction.atomic():
+                variant_ids = [v.pk for v, _ in resolved]
+                inv_qs = InventoryItem.objects.filter(warehouse=self.warehouse, variant_id__in=variant_ids)
+                inv_by_variant_id = {inv.variant_id: inv for inv in inv_qs}
+
+                to_create: list[InventoryItem] = []
+                to_update: list[InventoryItem] = []
+                unchanged = 0
+
+                for variant, qty in resolved:
+                    inv = inv_by_variant_id.get(variant.pk)
+                    if inv is None:
+                        to_create.append(
+                            InventoryItem(
+                                variant=variant,
+                                warehouse=self.warehouse,
+                                qty_on_hand=qty,
+                                qty_reserved=0,
+                                cost_eur=getattr(variant, "cost_eur", None),
+                            )
+                        )
+                    elif inv.qty_on_hand != qty:
+                        inv.qty_on_hand = qty
+                        to_update.append(inv)
+                    else:
+                        unchanged += 1
+
+                    self.affected_product_ids.add(variant.product_id)
+
+                if to_create:
+                    InventoryItem.objects.bulk_create(to_create, ignore_conflicts=True)
+
+                if to_update:
+                    InventoryItem.objects.bulk_update(to_update, ["qty_on_hand"])  # reserved stays as-is
+
+                self.stats.incr("inventory_created", len(to_create))
+                self.stats.incr("inventory_updated", len(resolved))
+                self.stats.incr("inventory_unchanged", unchanged)
+                self.stats.incr("variants_updated", len(resolved))
+
+    def _resolve(self, batch: list[StockItem]) -> list[tuple[Variant, int]]:
+        skus = {b.sku for b in batch if b.sku}
+        barcodes = {b.barcode for b in batch if b.barcode}
+
+        variants_by_sku = {v.sku: v for v in Variant.objects.filter(sku__in=skus)} if skus else {}
+        variants_by_barcode = (
+            {v.barcode: v for v in Variant.objects.filter(barcode__in=barcodes)} if barcodes else {}
+        )
+
+        # Resolve items -> variants (SKU preferred, then barcode)
+        resolved: list[tuple[Variant, int]] = []
+        for item in batch:
+            variant = None
+            if item.sku:
+                variant = variants_by_sku.get(item.sku)
+            if variant is None and item.barcode:
+                variant = variants_by_barcode.get(item.barcode)
+
+            if variant is None:
+                self.stats.incr("not_found")
+                continue
+
+            # If both sku+barcode exist and point to different variants, prefer SKU but count conflict.
+            if item.sku and item.barcode:
+                v2 = variants_by_barcode.get(item.barcode)
+                if v2 is not None and v2.pk != variant.pk:
+                    self.stats.incr("conflicts")
+
+            resolved.append((variant, item.qty))
+        return resolved
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import helpers
 from django.http import HttpResponseRedirect
 
-from .client import UnisendClient
+from shipping.http import format_carrier_http_metrics
+from shipping.pickup_points import sync_pickup_points
+
+from .client import UnisendApiError
 from .models import UnisendApiConfig, UnisendTerminal
 
 
@@ -54,6 +57,10 @@ class UnisendApiConfigAdmin(admin.ModelAdmin):
     def changelist_view(self, request, extra_context=None):
         if not UnisendApiConfig.objects.exists():
             UnisendApiConfig.get_solo()
+        metrics = format_carrier_http_metrics("unisend")
+        if metrics:
+            # Calls made by this web process since it started.
+            self.message_user(request, f"Unisend API: {metrics}")
         return super().changelist_view(request, extra_context=extra_context)
 
 
@@ -97,63 +104,20 @@ class UnisendTerminalAdmin(admin.ModelAdmin):
         return super().response_action(request, queryset)
 
     def _sync_country(self, request, *, country_code: str) -> None:
-        items = UnisendClient().list_terminals(receiver_country_code=country_code, size=10000)
-        items_list = items
-        if isinstance(items, dict) and isinstance(items.get("items"), list):
-            items_list = items.get("items")
-
-        created = 0
-        updated = 0
-        seen_ids: set[str] = set()
-
-        if not isinstance(items_list, list):
-            self.message_user(request, f"Unisend terminals sync ({country_code}): unexpected response")
+        try:
+            stats = sync_pickup_points(
+                "unisend",
+                country_code,
+                # Deactivate terminals which disappeared from Unisend API (safe because we sync by full country).
+                deactivate_missing=True,
+            )
+        except UnisendApiError as e:
+            self.message_user(request, f"Unisend terminals sync ({country_code}): {e}", level=messages.ERROR)
             return
-
-        for it in items_list:
-            if not isinstance(it, dict):
-                continue
-            tid = str(it.get("terminalId") or it.get("id") or "").strip()
-            if not tid:
-                continue
-            seen_ids.add(tid)
-
-            obj, was_created = UnisendTerminal.objects.get_or_create(terminal_id=tid)
-
-            obj.country_code = str(it.get("countryCode") or country_code or "").strip().upper()
-            obj.name = str(it.get("name") or "").strip()
-            obj.locality = str(it.get("locality") or it.get("city") or "").strip()
-            obj.street = str(it.get("street") or "").strip()
-            obj.postal_code = str(it.get("postalCode") or "").strip()
-
-            lat = it.get("latitude")
-            lng = it.get("longitude")
-            try:
-                obj.latitude = float(lat) if lat is not None and str(lat).strip() else None
-            except Exception:
-                obj.latitude = None
-            try:
-                obj.longitude = float(lng) if lng is not None and str(lng).strip() else None
-            except Exception:
-                obj.longitude = None
-
-            obj.raw = it
-            obj.is_active = True
-            obj.save()
-
-            if was_created:
-                created += 1
-            else:
-                updated += 1
-
-        # Deactivate terminals which disappeared from Unisend API (safe because we sync by full country).
-        UnisendTerminal.objects.filter(country_code=country_code).exclude(
-            terminal_id__in=seen_ids
-        ).update(is_active=False)
-
         self.message_user(
             request,
-            f"Unisend terminals sync ({country_code}): created={created}, updated={updated}, total_seen={len(seen_ids)}",
+            f"Unisend terminals sync ({country_code}): created={stats.created}, updated={stats.updated}, "
+            f"unchanged={stats.unchanged}, deactivated={stats.deactivated}, total_seen={stats.seen}",
         )
 
     @admin.action(description="Sync Unisend terminals: LT")
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import requests
 from django.db.models import Q
+from django.http import HttpResponse
 from ninja import Router
 from ninja.errors import HttpError
 
+from shipping.pickup_points import PickupPoint, export_pickup_points, nearest_pickup_points
+from shipping.schemas import PickupPointsExportOut, TrackingStatusOut
+from shipping.tracking import get_tracking_status
+
+from .client import UnisendApiError
 from .models import UnisendTerminal
 from .schemas import TerminalOut
 
@@ -20,6 +27,8 @@ def list_terminals(
     search: str | None = None,
     postal_code: str | None = None,
     limit: int | None = 1000,
+    near: str | None = None,
+    radius: float | None = None,
 ):
     cc = (country_code or "").strip().upper()
     if len(cc) != 2:
@@ -28,12 +37,29 @@ def list_terminals(
     lim = 50 if limit is None else int(limit)
     lim = max(1, min(lim, 1000))
 
-    qs = UnisendTerminal.objects.filter(is_active=True, country_code=cc)
-
     loc = locality
     if not loc and city:
         loc = city
 
+    if near:
+        # Nearest first, from the in-memory index (`limit` = K, `radius` in km).
+        try:
+            hits = nearest_pickup_points(
+                "unisend",
+                cc,
+                near,
+                k=lim,
+                radius_km=radius,
+                city=loc,
+                postal_code=postal_code,
+                search=search,
+            )
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return [_terminal_out(p, distance_km=d) for p, d in hits]
+
+    qs = UnisendTerminal.objects.filter(is_active=True, country_code=cc)
+
     if loc:
         qs = qs.filter(locality__iexact=str(loc).strip())
     if postal_code:
@@ -75,3 +101,50 @@ def list_terminals(
         )
 
     return [x for x in out if x.id]
+
+
+def _terminal_out(p: PickupPoint, *, distance_km: float | None = None) -> TerminalOut:
+    return TerminalOut(
+        id=p.id,
+        name=p.name,
+        countryCode=p.country_code,
+        city=p.city,
+        locality=p.city,
+        street=p.street,
+        postalCode=p.postal_code,
+        latitude=p.latitude,
+        longitude=p.longitude,
+        distanceKm=round(distance_km, 3) if distance_km is not None else None,
+    )
+
+
+@router.get("/terminals/export", response=PickupPointsExportOut)
+def export_terminals(request, response: HttpResponse, country_code: str = "LT"):
+    """All active terminals of a country as compact rows (`fields` + `rows`) for the checkout map.
+
+    Served from the in-memory index with an `ETag`; a repeated request with
+    `If-None-Match` gets 304 until the next sync changes the terminals.
+    """
+    cc = (country_code or "").strip().upper()
+    if len(cc) != 2:
+        raise HttpError(400, "Invalid country_code")
+    return export_pickup_points(request, response, carrier_code="unisend", country_code=cc)
+
+
+@router.get("/status", response=TrackingStatusOut)
+def get_status(request, response: HttpResponse, tracking_number: str):
+    """Parcel status (tracking events), cached per status like `/dpd/status`."""
+    barcode = (tracking_number or "").strip()
+    if not barcode:
+        raise HttpError(400, "tracking_number is required")
+
+    try:
+        snapshot = get_tracking_status("unisend", barcode)
+    except UnisendApiError as e:
+        raise HttpError(502, str(e))
+    except (requests.RequestException, TimeoutError):
+        # No synced status to fall back to (see get_tracking_status).
+        raise HttpError(502, "Unisend tracking is not available")
+
+    response["Cache-Control"] = f"private, max-age={snapshot.max_age}"
+    return snapshot.as_out()
@@ -6,3 +6,6 @@ from django.apps import AppConfig
 class UnisendConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "unisend"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Any
 
 import requests
 from django.conf import settings
 from django.utils import timezone
 
+from shipping.http import CarrierHttp, ExpiringValue
+
 
 @dataclass(frozen=True)
 class UnisendHttpConfig:
@@ -18,7 +21,7 @@ class UnisendApiError(RuntimeError):
     pass
 
 
-def _get_base_url() -> str:
+def _load_base_url() -> str:
     base_url = ""
     try:
         from .models import UnisendApiConfig as UnisendDbConfig
@@ -34,9 +37,44 @@ def _get_base_url() -> str:
     return base_url
 
 
+# Config and the access token live in process memory; both are dropped when
+# `unisend.UnisendApiConfig` is saved (see unisend.signals). A token rejected with
+# 401 (refreshed or revoked elsewhere) is replaced and the call repeated once.
+_base_url_cache: ExpiringValue[str] = ExpiringValue(_load_base_url)
+
+# A token is refreshed this long before it expires.
+_TOKEN_MARGIN = timedelta(seconds=30)
+
+
+@dataclass(frozen=True)
+class _Token:
+    access_token: str
+    expires_at: datetime | None
+
+    def valid(self) -> bool:
+        return bool(self.access_token) and self.expires_at is not None and self.expires_at > timezone.now() + _TOKEN_MARGIN
+
+
+_token: _Token | None = None
+_token_lock = threading.RLock()  # re-entered when saving the config fires the invalidation signal
+
+
+def _get_base_url() -> str:
+    return _base_url_cache.get()
+
+
+def invalidate_config_cache() -> None:
+    global _token
+    _base_url_cache.invalidate()
+    with _token_lock:
+        _token = None
+
+
 class UnisendClient:
-    def __init__(self) -> None:
+    def __init__(self, *, session: requests.Session | None = None) -> None:
         self.base_url = _get_base_url()
+        # Pooled keep-alive session (per thread unless `session` is given) with retries and metrics.
+        self.http = CarrierHttp("unisend", session=session)
 
     def _get_db_cfg(self):
         from .models import UnisendApiConfig
@@ -48,12 +86,57 @@ class UnisendClient:
         return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
 
     def _ensure_token(self) -> str:
-        cfg = self._get_db_cfg()
+        """Valid access token; served from memory until shortly before it expires.
+
+        Only on expiry is the DB config read (another process may already have
+        refreshed it) and, if needed, a new token requested and stored.
+        """
+        global _token
+        token = _token
+        if token is not None and token.valid():
+            return token.access_token
+
+        with _token_lock:
+            token = _token
+            if token is not None and token.valid():
+                return token.access_token
+            cfg = self._get_db_cfg()
+            token = _Token(cfg.access_token, cfg.token_expires_at)
+            if not token.valid():
+                token = self._obtain_token(cfg)
+            _token = token
+            return token.access_token
 
-        now = timezone.now()
-        if cfg.access_token and cfg.token_expires_at and cfg.token_expires_at > now + timedelta(seconds=30):
-            return cfg.access_token
+    def _renew_token(self, *, rejected: str) -> str:
+        """Access token to use after `rejected` got a 401 (revoked, or replaced elsewhere).
 
+        A token another thread or process already stored is taken over; otherwise
+        a new one is requested.
+        """
+        global _token
+        with _token_lock:
+            token = _token
+            if token is not None and token.access_token != rejected and token.valid():
+                return token.access_token
+            cfg = self._get_db_cfg()
+            token = _Token(cfg.access_token, cfg.token_expires_at)
+            if token.access_token == rejected or not token.valid():
+                token = self._obtain_token(cfg)
+            _token = token
+            return token.access_token
+
+    def _authorized(
+        self, method: str, url: str, *, op: str, token: str | None = None, headers: dict[str, str] | None = None, **kwargs: Any
+    ) -> requests.Response:
+        """Call with the bearer token; on a 401 the token is renewed and the call repeated once."""
+        token = token or self._ensure_token()
+        response = self.http.request(method, url, op=op, headers={**self._auth_headers(token=token), **(headers or {})}, **kwargs)
+        if response.status_code == 401:
+            token = self._renew_token(rejected=token)
+            response = self.http.request(method, url, op=op, headers={**self._auth_headers(token=token), **(headers or {})}, **kwargs)
+        return response
+
+    def _obtain_token(self, cfg) -> _Token:
         if cfg.refresh_token:
             try:
                 data = self.refresh_token(refresh_token=cfg.refresh_token)
@@ -67,7 +150,7 @@ class UnisendClient:
                     if expires_in > 0:
                         cfg.token_expires_at = timezone.now() + timedelta(seconds=expires_in)
                     cfg.save(update_fields=["access_token", "refresh_token", "token_expires_at", "updated_at"])
-                    return access
+                    return _Token(access, cfg.token_expires_at)
             except Exception:
                 pass
 
@@ -84,7 +167,7 @@ class UnisendClient:
         if expires_in > 0:
             cfg.token_expires_at = timezone.now() + timedelta(seconds=expires_in)
         cfg.save(update_fields=["access_token", "refresh_token", "token_expires_at", "updated_at"])
-        return access
+        return _Token(access, cfg.token_expires_at)
 
     def password_token(self, *, username: str, password: str, client_system: str = "PUBLIC") -> dict[str, Any]:
         url = f"{self.base_url}/oauth/token"
@@ -95,7 +178,7 @@ class UnisendClient:
             "username": username,
             "password": password,
         }
-        r = requests.post(url, params=params, timeout=30)
+        r = self.http.post(url, op="token.password", params=params, timeout=30)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend token failed: {r.status_code} {r.text[:300]}")
         data = r.json()
@@ -111,7 +194,7 @@ class UnisendClient:
             "clientSystem": client_system or "PUBLIC",
             "refresh_token": refresh_token,
         }
-        r = requests.post(url, params=params, timeout=30)
+        r = self.http.post(url, op="token.refresh", params=params, timeout=30)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend refresh token failed: {r.status_code} {r.text[:300]}")
         data = r.json()
@@ -126,22 +209,20 @@ class UnisendClient:
         find: str | None = None,
         size: int | None = None,
     ) -> Any:
-        token = self._ensure_token()
         url = f"{self.base_url}/api/v2/terminal"
         params: dict[str, Any] = {"receiverCountryCode": str(receiver_country_code or "").strip().upper()}
         if find:
             params["find"] = str(find).strip()
         if size is not None:
             params["size"] = int(size)
-        r = requests.get(url, params=params, headers=self._auth_headers(token=token), timeout=30)
+        r = self._authorized("GET", url, op="terminals", params=params, timeout=30)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend terminals failed: {r.status_code} {r.text[:300]}")
         return r.json()
 
     def create_parcel(self, *, payload: dict[str, Any]) -> dict[str, Any]:
-        token = self._ensure_token()
         url = f"{self.base_url}/api/v2/parcel"
-        r = requests.post(url, json=payload, headers={**self._auth_headers(token=token), "Content-Type": "application/json"}, timeout=30)
+        r = self._authorized("POST", url, op="parcel.create", json=payload, headers={"Content-Type": "application/json"}, timeout=30)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend parcel create failed: {r.status_code} {r.text[:300]}")
         data = r.json()
@@ -150,11 +231,10 @@ class UnisendClient:
         return data
 
     def initiate_shipping(self, *, parcel_ids: list[int], process_async: bool = False) -> dict[str, Any]:
-        token = self._ensure_token()
         url = f"{self.base_url}/api/v2/shipping/initiate"
         params = {"processAsync": str(bool(process_async)).lower()}
         payload = {"parcelIds": parcel_ids}
-        r = requests.post(url, params=params, json=payload, headers={**self._auth_headers(token=token), "Content-Type": "application/json"}, timeout=60)
+        r = self._authorized("POST", url, op="shipping.initiate", params=params, json=payload, headers={"Content-Type": "application/json"}, timeout=60)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend shipping initiate failed: {r.status_code} {r.text[:300]}")
         data = r.json()
@@ -163,10 +243,9 @@ class UnisendClient:
         return data
 
     def list_barcodes(self, *, parcel_ids: list[int]) -> Any:
-        token = self._ensure_token()
         url = f"{self.base_url}/api/v2/shipping/barcode/list"
         params: dict[str, Any] = {"parcelIds": [int(x) for x in parcel_ids]}
-        r = requests.get(url, params=params, headers=self._auth_headers(token=token), timeout=30)
+        r = self._authorized("GET", url, op="barcodes", params=params, timeout=30)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend barcode list failed: {r.status_code} {r.text[:300]}")
         return r.json()
@@ -180,7 +259,6 @@ class UnisendClient:
         include_cn23: bool = False,
         include_manifest: bool = False,
     ) -> bytes:
-        token = self._ensure_token()
         url = f"{self.base_url}/api/v2/sticker/pdf"
         params: dict[str, Any] = {
             "parcelIds": [int(x) for x in parcel_ids],
@@ -189,7 +267,17 @@ class UnisendClient:
             "includeCn23": str(bool(include_cn23)).lower(),
             "includeManifest": str(bool(include_manifest)).lower(),
         }
-        r = requests.get(url, params=params, headers={"Authorization": f"Bearer {token}", "Accept": "application/pdf"}, timeout=60)
+        r = self._authorized("GET", url, op="sticker_pdf", params=params, headers={"Accept": "application/pdf"}, timeout=60)
         if r.status_code >= 400:
             raise UnisendApiError(f"Unisend sticker pdf failed: {r.status_code} {r.text[:300]}")
         return r.content
+
+    def get_tracking_events(self, *, barcodes: list[str], token: str | None = None) -> Any:
+        # `token` lets concurrent callers reuse one token instead of re-reading the DB config
+        # (the DB is only touched again when that token is rejected).
+        url = f"{self.base_url}/api/v2/tracking/events"
+        params: dict[str, Any] = {"barcodes": [str(x).strip() for x in barcodes if str(x).strip()]}
+        r = self._authorized("GET", url, op="tracking", token=token, params=params, timeout=30)
+        if r.status_code >= 400:
+            raise UnisendApiError(f"Unisend tracking failed: {r.status_code} {r.text[:300]}")
+        return r.json()
@@ -3,10 +3,13 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import Any, Iterable
 
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils import timezone
 
 from checkout.models import Order
+from shipping.labels import LabelProvider
+from shipping.pdf import split_pages
 
 from .client import UnisendApiError, UnisendClient
 from .models import UnisendApiConfig, UnisendTerminal
@@ -237,30 +240,11 @@ def generate_label_pdf_for_order(
     return pdf
 
 
-def generate_labels_pdf_for_orders(
-    orders: Iterable[Order],
-    *,
-    client: UnisendClient | None = None,
-) -> tuple[bytes, list[tuple[int, str]]]:
-    client = client or UnisendClient()
-
-    parcel_ids: list[int] = []
-    by_order_id: dict[int, int] = {}
+def _backfill_barcodes(orders: Iterable[Order], *, by_order_id: dict[int, int], client: UnisendClient) -> list[tuple[int, str]]:
     updated: list[tuple[int, str]] = []
-
-    for o in orders:
-        pid = ensure_unisend_parcel(o, client=client)
-        parcel_ids.append(pid)
-        by_order_id[o.id] = pid
-
-    if not parcel_ids:
-        raise RuntimeError("Nėra Unisend parcelIds lipdukų generavimui")
-
-    client.initiate_shipping(parcel_ids=parcel_ids, process_async=False)
-
     # Try to backfill tracking numbers.
     try:
-        barcodes = client.list_barcodes(parcel_ids=parcel_ids)
+        barcodes = client.list_barcodes(parcel_ids=list(by_order_id.values()))
         by_parcel: dict[int, str] = {}
         items: list[Any] = []
         if isinstance(barcodes, dict) and isinstance(barcodes.get("items"), list):
@@ -294,8 +278,11 @@ def generate_labels_pdf_for_orders(
             pid = by_order_id.get(o.id)
             if pid:
                 updated.append((o.id, str(pid)))
+    return updated
 
-    pdf = client.get_sticker_pdf(
+
+def _sticker_pdf(client: UnisendClient, parcel_ids: list[int]) -> bytes:
+    return client.get_sticker_pdf(
         parcel_ids=parcel_ids,
         layout="LAYOUT_10x15",
         label_orientation="PORTRAIT",
@@ -303,4 +290,74 @@ def generate_labels_pdf_for_orders(
         include_manifest=False,
     )
 
+
+def generate_labels_pdf_for_orders(
+    orders: Iterable[Order],
+    *,
+    client: UnisendClient | None = None,
+) -> tuple[bytes, list[tuple[int, str]]]:
+    client = client or UnisendClient()
+    orders = list(orders)
+
+    parcel_ids: list[int] = []
+    by_order_id: dict[int, int] = {}
+
+    for o in orders:
+        pid = ensure_unisend_parcel(o, client=client)
+        parcel_ids.append(pid)
+        by_order_id[o.id] = pid
+
+    if not parcel_ids:
+        raise RuntimeError("Nėra Unisend parcelIds lipdukų generavimui")
+
+    client.initiate_shipping(parcel_ids=parcel_ids, process_async=False)
+    updated = _backfill_barcodes(orders, by_order_id=by_order_id, client=client)
+    pdf = _sticker_pdf(client, parcel_ids)
+
     return pdf, updated
+
+
+def generate_label_pdfs_by_order(
+    orders: Iterable[Order],
+    *,
+    client: UnisendClient | None = None,
+) -> dict[int, bytes]:
+    """10x15 sticker PDF per order id; shipping is initiated and stickers fetched once per chunk.
+
+    Unisend returns one 10x15 page per parcel in `parcelIds` order; the batch PDF
+    is split back per order, or stickers are fetched one parcel at a time when the
+    page count does not match.
+    """
+    client = client or UnisendClient()
+    orders = list(orders)
+
+    by_order_id = {o.id: ensure_unisend_parcel(o, client=client) for o in orders}
+    parcel_ids = list(by_order_id.values())
+    if not parcel_ids:
+        return {}
+
+    client.initiate_shipping(parcel_ids=parcel_ids, process_async=False)
+    _backfill_barcodes(orders, by_order_id=by_order_id, client=client)
+
+    pdf = _sticker_pdf(client, parcel_ids)
+    pages = split_pages(pdf) if len(parcel_ids) > 1 else [pdf]
+    if len(pages) == len(parcel_ids):
+        return {order_id: page for order_id, page in zip(by_order_id, pages)}
+    return {order_id: _sticker_pdf(client, [pid]) for order_id, pid in by_order_id.items()}
+
+
+class UnisendLabelProvider(LabelProvider):
+    carrier_code = "unisend"
+    shipping_methods = ("unisend_pickup", "unisend_courier", "lpexpress", "lpexpress_courier")
+    label_format = "10x15"
+    errors = (UnisendLabelConfigError, UnisendApiError, RuntimeError, ValueError)
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, int(getattr(settings, "UNISEND_LABEL_BATCH_SIZE", 50) or 50))
+
+    def open(self):
+        return UnisendClient()
+
+    def generate(self, context: UnisendClient, orders: list[Order]) -> dict[int, bytes]:
+        return generate_label_pdfs_by_order(orders, client=context)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Any
+
+from shipping.pickup_points import PickupPoint, PickupPointSource, coordinate
+
+from .client import UnisendApiError, UnisendClient
+from .models import UnisendTerminal
+
+
+class UnisendPickupPointSource(PickupPointSource):
+    carrier_code = "unisend"
+    model = UnisendTerminal
+    id_field = "terminal_id"
+    sync_fields = ("country_code", "name", "locality", "street", "postal_code", "latitude", "longitude", "raw")
+    errors = (UnisendApiError,)
+
+    def to_point(self, obj: UnisendTerminal) -> PickupPoint:
+        raw_addr = str(obj.raw.get("address") or "").strip() if isinstance(obj.raw, dict) else ""
+        return PickupPoint(
+            carrier_code=self.carrier_code,
+            id=str(obj.terminal_id or ""),
+            country_code=str(obj.country_code or ""),
+            name=str(obj.name or ""),
+            city=str(obj.locality or ""),
+            street=str((obj.street or "").strip() or raw_addr),
+            postal_code=str(obj.postal_code or ""),
+            latitude=float(obj.latitude) if obj.latitude is not None else None,
+            longitude=float(obj.longitude) if obj.longitude is not None else None,
+        )
+
+    def fetch(self, country_code: str, *, limit: int = 10000) -> list[Any]:
+        raw = UnisendClient().list_terminals(receiver_country_code=country_code, size=int(limit or 10000))
+        items = raw.get("items") if isinstance(raw, dict) else raw
+        if not isinstance(items, list):
+            raise UnisendApiError("Unisend terminals sync: unexpected response")
+        return items
+
+    def parse(self, item: dict[str, Any], country_code: str) -> dict[str, Any] | None:
+        tid = str(item.get("terminalId") or item.get("id") or "").strip()
+        if not tid:
+            return None
+        return {
+            "terminal_id": tid,
+            "country_code": str(item.get("countryCode") or country_code or "").strip().upper(),
+            "name": str(item.get("name") or "").strip(),
+            "locality": str(item.get("locality") or item.get("city") or "").strip(),
+            "street": str(item.get("street") or item.get("address") or "").strip(),
+            "postal_code": str(item.get("postalCode") or "").strip(),
+            "latitude": coordinate(item.get("latitude")),
+            "longitude": coordinate(item.get("longitude")),
+            "raw": item,
+        }
@@ -15,3 +15,5 @@ class TerminalOut(Schema):
 
     latitude: float | None = None
     longitude: float | None = None
+    # Only in `near` mode: great-circle distance from the given point.
+    distanceKm: float | None = None
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shipping.pickup_points import invalidate_pickup_point_cache
+
+from .client import invalidate_config_cache
+from .models import UnisendApiConfig, UnisendTerminal
+
+
+@receiver(post_save, sender=UnisendApiConfig)
+@receiver(post_delete, sender=UnisendApiConfig)
+def unisend_config_changed(sender, **kwargs):
+    invalidate_config_cache()
+
+
+# Admin edits of single rows; syncs use bulk writes and refresh the cache themselves.
+@receiver(post_save, sender=UnisendTerminal)
+@receiver(post_delete, sender=UnisendTerminal)
+def unisend_terminal_changed(sender, instance, **kwargs):
+    invalidate_pickup_point_cache("unisend", pickup_point_id=instance.terminal_id)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+
+from checkout.models import Order
+from shipping.tracking import TrackingAdapter, TrackingStatus
+
+from .client import UnisendClient
+
+
+# Exact Unisend state codes; anything else (e.g. NOT_DELIVERED, RESENT) maps to no conclusion.
+_DELIVERED = frozenset({"DELIVERED", "PICKED_UP", "RECEIVED_BY_RECIPIENT"})
+_SHIPPED = frozenset({"ON_THE_WAY", "IN_TRANSIT", "ACCEPTED", "AT_TERMINAL", "AT_POST", "PARCEL_RECEIVED", "SENT"})
+_CREATED = frozenset({"LABEL_CREATED", "CREATED", "PENDING", "REGISTERED"})
+_CANCELLED = frozenset({"CANCELLED", "CANCELED"})
+
+
+def _items(data: Any) -> list[dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("content") or data.get("data") or []
+    return [x for x in data if isinstance(x, dict)] if isinstance(data, list) else []
+
+
+def _events(item: dict[str, Any]) -> list[dict[str, Any]]:
+    events = item.get("events")
+    if isinstance(events, list):
+        return [e for e in events if isinstance(e, dict)]
+    return [item]
+
+
+class UnisendTrackingAdapter(TrackingAdapter):
+    """Unisend `/api/v2/tracking/events`, up to `UNISEND_TRACKING_BATCH_SIZE` barcodes per call."""
+
+    carrier_code = "unisend"
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, int(getattr(settings, "UNISEND_TRACKING_BATCH_SIZE", 20) or 20))
+
+    def open(self, session):
+        client = UnisendClient(session=session)
+        # Resolved once here: `_ensure_token` reads and writes the DB config.
+        return client, client._ensure_token()
+
+    def fetch(self, context: tuple[UnisendClient, str], tracking_numbers: list[str]) -> dict[str, Any]:
+        client, token = context
+        out: dict[str, list[dict[str, Any]]] = {}
+        for item in _items(client.get_tracking_events(barcodes=tracking_numbers, token=token)):
+            number = str(item.get("barcode") or item.get("parcelNumber") or "").strip()
+            if number in tracking_numbers:
+                out.setdefault(number, []).extend(_events(item))
+        return out
+
+    def map_status(self, raw: Any) -> TrackingStatus:
+        events = [e for e in raw if isinstance(e, dict)] if isinstance(raw, list) else []
+        # Newest event wins; fall back to list order when timestamps are missing.
+        latest = max(events, key=lambda e: str(e.get("eventDate") or e.get("date") or ""), default={})
+        state = str(latest.get("state") or latest.get("stateType") or latest.get("eventType") or "").strip().upper()
+        text = str(latest.get("publicStateText") or latest.get("eventTitle") or latest.get("description") or state)
+
+        status = self.status_for_code(state)
+        return TrackingStatus(status, text, state if status else "")
+
+    def status_for_code(self, code: str) -> str | None:
+        if code in _CANCELLED:
+            return Order.DeliveryStatus.CANCELLED
+        if code in _DELIVERED:
+            return Order.DeliveryStatus.DELIVERED
+        if code in _SHIPPED:
+            return Order.DeliveryStatus.SHIPPED
+        if code in _CREATED:
+            return Order.DeliveryStatus.LABEL_CREATED
+        return None
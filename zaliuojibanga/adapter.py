@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import html
+import xml.etree.ElementTree as ET
+from decimal import Decimal
+from typing import Iterable
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+
+from suppliers.adapters import CatalogItem, StockItem, SupplierAdapter
+
+
+DEFAULT_PRODUCTS_URL = "https://zaliojibanga.lt/integrations/services/products.php?key=3fWgWWXyTa9OCXG8"
+DEFAULT_STOCKS_URL = "https://zaliojibanga.lt/integrations/services/stocks.php?key=3fWgWWXyTa9OCXG8"
+
+
+def _parse_decimal(value: str | None) -> Decimal | None:
+    if value is None:
+        return None
+    s = (value or "").strip()
+    if not s:
+        return None
+    s = s.replace(",", ".")
+    try:
+        return Decimal(s)
+    except Exception:
+        return None
+
+
+def _parse_int(value: str) -> int | None:
+    s = (value or "").strip()
+    if not s:
+        return None
+    try:
+        return int(s)
+    except Exception:
+        return None
+
+
+def _text(el: ET.Element | None) -> str:
+    if el is None:
+        return ""
+    return (el.text or "").strip()
+
+
+def _cdata_html(el: ET.Element | None) -> str:
+    # Values in feed are often CDATA with escaped HTML like &lt;p&gt;...
+    raw = _text(el)
+    if not raw:
+        return ""
+    return html.unescape(raw).strip()
+
+
+def _split_category_path(value: str) -> list[str]:
+    # Feed uses "A / B / C". Be tolerant to spaces.
+    parts = [p.strip() for p in (value or "").split("/")]
+    return [p for p in parts if p]
+
+
+def iter_catalog_items(xml_stream) -> Iterable[CatalogItem]:
+    # Stream-parse large XML feeds.
+    context = ET.iterparse(xml_stream, events=("end",))
+    for _event, elem in context:
+        if elem.tag != "item":
+            continue
+
+        sku = _text(elem.find("code"))
+        barcode = _text(elem.find("ean"))
+        name = _cdata_html(elem.find("name"))
+        brand_name = _cdata_html(elem.find("brand"))
+        category_raw = _cdata_html(elem.find("category"))
+
+        cost = _parse_decimal(_text(elem.find("price")))
+        rrp = _parse_decimal(_text(elem.find("rrp")))
+
+        summary_html = _cdata_html(elem.find("summary"))
+        description_html = _cdata_html(elem.find("description"))
+
+        image_urls: list[str] = []
+        images_el = elem.find("images")
+        if images_el is not None:
+            for img_el in images_el.findall("image"):
+                u = _cdata_html(img_el)
+                if u:
+                    image_urls.append(u)
+
+        # free memory
+        elem.clear()
+
+        if not sku or not name:
+            continue
+
+        yield CatalogItem(
+            sku=sku,
+            barcode=barcode,
+            name=name,
+            brand_name=brand_name,
+            category_path=_split_category_path(category_raw),
+            cost_net=cost,
+            price_net=rrp,
+            summary_html=summary_html,
+            description_html=description_html,
+            image_urls=image_urls,
+        )
+
+
+def iter_stock_items(xml_stream) -> Iterable[StockItem]:
+    # Stream-parse large XML feeds.
+    context = ET.iterparse(xml_stream, events=("end",))
+    for _event, elem in context:
+        if elem.tag != "item":
+            continue
+
+        sku = _text(elem.find("code"))
+        barcode = _text(elem.find("ean"))
+        qty = _parse_int(_text(elem.find("qty")))
+
+        elem.clear()
+
+        if qty is None:
+            continue
+        if not sku and not barcode:
+            continue
+
+        yield StockItem(sku=sku, barcode=barcode, qty=qty)
+
+
+class ZaliojiBangaAdapter(SupplierAdapter):
+    code = "zalioji_banga"
+    name = "Žalioji banga"
+    warehouse_code = "zalioji_banga"
+    tax_class_code = "standard"
+    max_images_per_product = 5
+    user_agent = "django_ecommerce/zb-import"
+
+    def catalog_url(self, override: str | None = None) -> str:
+        return (override or getattr(settings, "ZB_PRODUCTS_FEED_URL", "") or DEFAULT_PRODUCTS_URL).strip()
+
+    def stock_url(self, override: str | None = None) -> str:
+        return (override or getattr(settings, "ZB_STOCKS_FEED_URL", "") or DEFAULT_STOCKS_URL).strip()
+
+    def _open(self, url: str):
+        req = Request(
+            url,
+            headers={
+                "User-Agent": self.user_agent,
+                # Be conservative: avoid compression/chunking edge cases on flaky servers.
+                "Accept-Encoding": "identity",
+                "Connection": "close",
+            },
+        )
+        resp = urlopen(req, timeout=60)
+        if getattr(resp, "status", 200) >= 400:
+            resp.close()
+            raise OSError(f"HTTP klaida: {getattr(resp, 'status', 'unknown')}")
+        return resp
+
+    def iter_catalog_items(self, *, url: str) -> Iterable[CatalogItem]:
+        with self._open(url) as resp:
+            yield from iter_catalog_items(resp)
+
+    def iter_stock_items(self, *, url: str) -> Iterable[StockItem]:
+        with self._open(url) as resp:
+            yield from iter_stock_items(resp)